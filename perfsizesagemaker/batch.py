@@ -0,0 +1,269 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import json
+import logging
+import os
+from perfsize.perfsize import EnvironmentManager
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND
+from perfsizesagemaker.environment.quota import (
+    InstanceQuota,
+    QuotaEnvironmentManager,
+    SharedInstanceQuota,
+    load_type_limits,
+)
+from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
+from perfsizesagemaker.environment.status import StatusService
+from perfsizesagemaker.main import Main
+from perfsizesagemaker.reporter.batch import BatchReporter
+from perfsizesagemaker.step.budget import ENDPOINT_OVERHEAD_MINUTES
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+import yaml
+
+log = logging.getLogger(__name__)
+
+# Steps assumed for the auto scale binary search when estimating job length.
+AUTO_SCALE_STEPS = 4
+
+
+def manifest_argv(entry: Dict[str, Any]) -> List[str]:
+    """Turn one manifest entry into perfsizesagemaker.main arguments."""
+    argv: List[str] = []
+    for key, value in entry.items():
+        if value is None or value is False:
+            continue
+        if value is True:
+            argv.append(f"--{key}")
+            continue
+        if isinstance(value, dict) or (
+            key == "scenario_requests" and not isinstance(value, str)
+        ):
+            value = json.dumps(value)
+        elif isinstance(value, list):
+            value = ",".join(map(str, value))
+        argv.append(f"--{key}={value}")
+    return argv
+
+
+def load_manifest(manifest_file: str) -> List[Dict[str, Any]]:
+    """Read a yaml (or json) manifest of models to size.
+
+    The manifest has an optional "defaults" mapping and a "models" list.
+    Keys are perfsizesagemaker.main argument names without the dashes, and
+    each model entry overrides the defaults.
+    """
+    with open(manifest_file, "r") as f:
+        manifest = yaml.safe_load(f)
+    if not isinstance(manifest, dict) or not manifest.get("models"):
+        raise RuntimeError(f"ERROR: {manifest_file} has no models to size")
+    defaults = manifest.get("defaults") or {}
+    entries = []
+    for model in manifest["models"]:
+        entry = dict(defaults)
+        entry.update(model)
+        for key in ["model_name", "endpoint_name"]:
+            if key not in entry:
+                raise RuntimeError(f"ERROR: {manifest_file} entry missing {key}")
+        entries.append(entry)
+    for key in ["model_name", "endpoint_name"]:
+        names = [entry[key] for entry in entries]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise RuntimeError(
+                f"ERROR: {manifest_file} has duplicate {key}: {duplicates}"
+            )
+    return entries
+
+
+def estimated_minutes(job: Main) -> Decimal:
+    """Rough worst case length of a sizing job, used to order the batch."""
+    type_configs = len(job.type_walk) * len(job.count_walk)
+    minutes = (type_configs + len(job.tps_walk)) * job.duration_minutes
+    minutes = minutes + type_configs * ENDPOINT_OVERHEAD_MINUTES
+    if job.endurance_steady_state_minutes > 0:
+        minutes = minutes + (job.endurance_retries + 1) * (
+            job.endurance_steady_state_minutes + ENDPOINT_OVERHEAD_MINUTES
+        )
+        if job.endurance_ramp_minutes > 0 or job.traffic_trace:
+            minutes = minutes + AUTO_SCALE_STEPS * (
+                job.endurance_ramp_minutes
+                + job.endurance_steady_state_minutes
+                + ENDPOINT_OVERHEAD_MINUTES
+            )
+    return minutes
+
+
+class BatchJob(Main):
+    """One sizing job of a batch, sharing the account quota with the others."""
+
+    def __init__(self, argv: List[str], quota: Optional[InstanceQuota] = None):
+        super().__init__(argv)
+        if quota is not None:
+            self.quota = quota
+        self.estimated_minutes = estimated_minutes(self)
+        self.start_ms = self.clock.time_ms()
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"BatchJob(model_name={self.model_name}, "
+            f"endpoint_name={self.endpoint_name}, "
+            f"estimated_minutes={self.estimated_minutes})"
+        )
+
+    def remaining_minutes(self) -> Decimal:
+        elapsed = Decimal(self.clock.time_ms() - self.start_ms)
+        return max(
+            Decimal("0"),
+            self.estimated_minutes - elapsed / MILLISECONDS_PER_SECOND / 60,
+        )
+
+    def _scheduled(self, environment_manager: EnvironmentManager) -> EnvironmentManager:
+        if self.quota is None:
+            return environment_manager
+        return QuotaEnvironmentManager(
+            environment_manager=environment_manager,
+            quota=self.quota,
+            owner=self.endpoint_name,
+            priority=self.remaining_minutes,
+            clock=self.clock,
+        )
+
+    def report_file(self) -> str:
+        return f"{self.job_id_dir}/Final_Job_Report.html"
+
+    def summary(self, index_dir: str) -> Dict[str, str]:
+        summary: Dict[str, str] = {}
+        summary["model_name"] = self.model_name
+        summary["endpoint_name"] = self.endpoint_name
+        summary["status"] = "error" if self.error else "done"
+        if self.recommend_type:
+            summary["instance_type"] = self.recommend_type["instance_type"]
+        if self.recommend_max:
+            summary["max_instance_count"] = self.recommend_max["max_instance_count"]
+        if self.recommend_min:
+            summary["min_instance_count"] = self.recommend_min["min_instance_count"]
+        summary["test_spend_usd"] = f"{self.spend.total():.2f}"
+        summary["estimated_minutes"] = f"{self.estimated_minutes}"
+        elapsed = Decimal(self.clock.time_ms() - self.start_ms)
+        summary["elapsed_minutes"] = f"{elapsed / MILLISECONDS_PER_SECOND / 60:.1f}"
+        if self.error:
+            summary["error"] = self.error
+        if os.path.isfile(self.report_file()):
+            summary["report"] = os.path.relpath(self.report_file(), index_dir)
+        return summary
+
+
+def run_job(job: BatchJob) -> BatchJob:
+    try:
+        job.main()
+    except Exception as err:
+        log.exception(f"Sizing failed for {job}")
+        job.error = f"{type(err).__name__}: {err}"
+    return job
+
+
+def main(argv: Optional[List[str]] = None) -> List[BatchJob]:
+    parser = argparse.ArgumentParser(
+        description="Size many models concurrently from a manifest."
+    )
+    parser.add_argument(
+        "--manifest",
+        help="yaml or json file with defaults and a list of models to size",
+        required=True,
+    )
+    parser.add_argument(
+        "--max_concurrent_jobs",
+        help="number of sizing jobs to run at the same time",
+        default=4,
+    )
+    parser.add_argument(
+        "--max_instances",
+        help="account wide limit on instances in use across all jobs",
+        required=False,
+    )
+    parser.add_argument(
+        "--instance_quotas",
+        help="json file mapping instance type to the account endpoint quota for it, shared by all jobs",
+        required=False,
+    )
+    parser.add_argument(
+        "--quota_db",
+        help="sqlite file to also share the quotas with other batches on this host",
+        required=False,
+    )
+    parser.add_argument(
+        "--batch_results_dir",
+        help="directory for the combined index report, and default perfsize_results_dir for each job",
+        default="perfsize-results-dir",
+    )
+    args = parser.parse_args(argv)
+    try:
+        max_concurrent_jobs = int(args.max_concurrent_jobs)
+        if max_concurrent_jobs < 1:
+            raise ValueError()
+    except:
+        parser.error(
+            f"argument --max_concurrent_jobs: expected a positive integer but got: {args.max_concurrent_jobs}"
+        )
+    max_instances: Optional[int] = None
+    if args.max_instances is not None:
+        try:
+            max_instances = int(args.max_instances)
+            if max_instances < 1:
+                raise ValueError()
+        except:
+            parser.error(
+                f"argument --max_instances: expected a positive integer but got: {args.max_instances}"
+            )
+    type_limits: Dict[str, int] = {}
+    if args.instance_quotas:
+        try:
+            type_limits = load_type_limits(args.instance_quotas)
+        except:
+            parser.error(
+                f"argument --instance_quotas: error loading {args.instance_quotas}"
+            )
+    quota: Optional[InstanceQuota] = None
+    if args.quota_db:
+        if max_instances is None and not type_limits:
+            parser.error(
+                "argument --quota_db: requires --max_instances or --instance_quotas"
+            )
+        quota = SharedInstanceQuota(args.quota_db, max_instances, type_limits)
+    elif max_instances is not None or type_limits:
+        quota = InstanceQuota(max_instances, type_limits)
+    os.makedirs(args.batch_results_dir, exist_ok=True)
+
+    jobs: List[BatchJob] = []
+    for entry in load_manifest(args.manifest):
+        entry.setdefault("perfsize_results_dir", args.batch_results_dir)
+        jobs.append(BatchJob(manifest_argv(entry), quota))
+    # Jobs on the same account poll their endpoints through one StatusService.
+    status_services: Dict[Tuple[Optional[str], Optional[str]], StatusService] = {}
+    for job in jobs:
+        if job.local_account:
+            continue
+        account = (job.iam_role_arn, job.region)
+        if account not in status_services:
+            status_services[account] = StatusService(
+                SageMakerEnvironmentManager(job.iam_role_arn, job.region)
+            )
+        job.status_service = status_services[account]
+    # Longest jobs first, so the batch is not left waiting on one at the end.
+    jobs.sort(key=lambda job: job.estimated_minutes, reverse=True)
+    log.info(f"Starting batch of {len(jobs)} jobs: {jobs}")
+    with ThreadPoolExecutor(max_workers=max_concurrent_jobs) as executor:
+        list(executor.map(run_job, jobs))
+
+    reporter = BatchReporter([job.summary(args.batch_results_dir) for job in jobs])
+    index_file = os.path.join(args.batch_results_dir, "index.html")
+    with open(index_file, "w") as file:
+        file.write(reporter.render())
+    log.info(f"See batch report at {index_file}")
+    return jobs
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
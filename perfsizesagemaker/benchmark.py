@@ -0,0 +1,139 @@
+import argparse
+from decimal import Decimal
+import json
+import logging
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.main import Main
+from perfsizesagemaker.step.sagemaker import STRATEGIES
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class StrategyResult:
+    """Cost of one full sizing job with a given search strategy."""
+
+    def __init__(
+        self,
+        strategy: str,
+        steps: int,
+        simulated_seconds: Decimal,
+        simulated_spend: Decimal,
+        real_seconds: Decimal,
+        recommendation: Dict[str, str],
+    ):
+        self.strategy = strategy
+        self.steps = steps
+        self.simulated_seconds = simulated_seconds
+        self.simulated_spend = simulated_spend
+        self.real_seconds = real_seconds
+        self.recommendation = recommendation
+
+    def __repr__(self) -> str:
+        return (
+            f"StrategyResult(strategy={self.strategy}, steps={self.steps}, "
+            f"simulated_seconds={self.simulated_seconds}, "
+            f"simulated_spend={self.simulated_spend}, "
+            f"real_seconds={self.real_seconds}, "
+            f"recommendation={self.recommendation})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "steps": self.steps,
+            "simulated_hours": f"{self.simulated_seconds / 3600:.2f}",
+            "simulated_spend": f"{self.simulated_spend:.2f}",
+            "real_seconds": f"{self.real_seconds:.2f}",
+            "recommendation": self.recommendation,
+        }
+
+
+def run_strategy(strategy: str, argv: List[str]) -> StrategyResult:
+    """Run a full sizing job against the local emulator with the given
+    strategy. argv is the same as for Main and must include --local_config."""
+    if strategy not in STRATEGIES:
+        raise RuntimeError(
+            f"ERROR: Unknown strategy {strategy}, expected one of {list(STRATEGIES)}"
+        )
+    job = Main(argv)
+    if not job.local_account:
+        raise RuntimeError("ERROR: Benchmark needs --local_config for simulated time")
+    account = job.local_account
+    job.write_logs = False
+    (
+        job.type_step_manager,
+        job.max_step_manager,
+        job.min_step_manager,
+    ) = STRATEGIES[strategy]
+    real_start = time.perf_counter()
+    job.run()
+    real_seconds = Decimal(f"{time.perf_counter() - real_start:.3f}")
+    steps = sum(
+        len(plan.history)
+        for plan in [job.type_plan, job.max_count_plan, job.min_count_plan]
+        if plan
+    )
+    recommendation: Dict[str, str] = {}
+    if job.recommend_type:
+        recommendation[Parameter.instance_type] = job.recommend_type[
+            Parameter.instance_type
+        ]
+    if job.recommend_max:
+        recommendation["max_instance_count"] = job.recommend_max["max_instance_count"]
+    if job.recommend_min:
+        recommendation["min_instance_count"] = job.recommend_min["min_instance_count"]
+    return StrategyResult(
+        strategy=strategy,
+        steps=steps,
+        simulated_seconds=Decimal(account.clock.elapsed_ms()) / MILLISECONDS_PER_SECOND,
+        simulated_spend=account.spend(job.cost.rates),
+        real_seconds=real_seconds,
+        recommendation=recommendation,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> List[StrategyResult]:
+    parser = argparse.ArgumentParser(
+        description="Compare step manager strategies on full sizing jobs in "
+        "simulated time. Other arguments are passed to perfsizesagemaker.main."
+    )
+    parser.add_argument(
+        "--strategies",
+        help=f"comma separated strategies to compare, from {list(STRATEGIES)}",
+        default=",".join(STRATEGIES),
+    )
+    parser.add_argument(
+        "--benchmark_output",
+        help="path to save results as json",
+        required=False,
+    )
+    args, job_argv = parser.parse_known_args(argv)
+    results = []
+    for strategy in args.strategies.split(","):
+        result = run_strategy(strategy, job_argv)
+        log.info(f"Benchmark result: {result}")
+        results.append(result)
+
+    print(
+        f"{'strategy':<16}{'steps':>8}{'sim hours':>12}{'sim $':>10}"
+        f"{'real s':>10}  recommendation"
+    )
+    for result in results:
+        row = result.to_dict()
+        print(
+            f"{row['strategy']:<16}{row['steps']:>8}{row['simulated_hours']:>12}"
+            f"{row['simulated_spend']:>10}{row['real_seconds']:>10}  "
+            f"{row['recommendation']}"
+        )
+    if args.benchmark_output:
+        with open(args.benchmark_output, "w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
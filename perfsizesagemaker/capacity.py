@@ -0,0 +1,280 @@
+import argparse
+from decimal import Decimal
+import json
+import logging.config
+import math
+from perfsize.perfsize import Run
+from perfsizesagemaker.constants import SageMaker
+from perfsizesagemaker.load.payload import Payload, PayloadBundle
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Name of the model file saved in the job directory.
+CAPACITY_MODEL_FILE = "capacity_model.json"
+
+
+class PayloadSample:
+    """Mean service time measured for requests sent with one payload."""
+
+    def __init__(
+        self, name: str, size: int, weight: int, count: int, latency_mean_ms: Decimal
+    ):
+        self.name = name
+        self.size = size
+        self.weight = weight
+        self.count = count
+        self.latency_mean_ms = latency_mean_ms
+
+    def __repr__(self) -> str:
+        return (
+            f"PayloadSample(name={self.name}, size={self.size}, "
+            f"weight={self.weight}, count={self.count}, "
+            f"latency_mean_ms={self.latency_mean_ms})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": self.size,
+            "weight": self.weight,
+            "count": self.count,
+            "latency_mean_ms": f"{self.latency_mean_ms}",
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "PayloadSample":
+        return PayloadSample(
+            name=data["name"],
+            size=int(data["size"]),
+            weight=int(data["weight"]),
+            count=int(data["count"]),
+            latency_mean_ms=Decimal(data["latency_mean_ms"]),
+        )
+
+
+class CapacityModel:
+    """Service time against payload size, fitted from one sizing run.
+
+    An instance at capacity is busy for the mean service time of each
+    request, so TPS per instance scales with the inverse of the mean service
+    time of the mix. Payloads that were measured use their own mean, others
+    use a line fitted by least squares through the measured payloads,
+    weighted by request count. Latency under load includes some queueing,
+    so the fit is only as good as the mix it came from.
+    """
+
+    def __init__(
+        self,
+        instance_type: str,
+        tps_per_instance: Decimal,
+        samples: List[PayloadSample],
+    ):
+        if not samples:
+            raise RuntimeError("ERROR: capacity model needs at least one sample")
+        self.instance_type = instance_type
+        self.tps_per_instance = tps_per_instance
+        self.samples = samples
+        self.intercept_ms, self.ms_per_byte = self.fit()
+
+    def __repr__(self) -> str:
+        return (
+            f"CapacityModel(instance_type={self.instance_type}, "
+            f"tps_per_instance={self.tps_per_instance}, "
+            f"intercept_ms={self.intercept_ms}, ms_per_byte={self.ms_per_byte})"
+        )
+
+    def fit(self) -> Tuple[Decimal, Decimal]:
+        total = Decimal(sum(sample.count for sample in self.samples))
+        if not total:
+            raise RuntimeError("ERROR: capacity model samples have no requests")
+        mean_size = sum(sample.count * sample.size for sample in self.samples) / total
+        mean_latency = (
+            sum(sample.count * sample.latency_mean_ms for sample in self.samples)
+            / total
+        )
+        variance = sum(
+            sample.count * (sample.size - mean_size) ** 2 for sample in self.samples
+        )
+        if not variance:
+            # All one size, so nothing to tell how size changes service time.
+            return mean_latency, Decimal(0)
+        covariance = sum(
+            sample.count
+            * (sample.size - mean_size)
+            * (sample.latency_mean_ms - mean_latency)
+            for sample in self.samples
+        )
+        slope = covariance / variance
+        return mean_latency - slope * mean_size, slope
+
+    def service_time_ms(self, name: Optional[str], size: int) -> Decimal:
+        for sample in self.samples:
+            if sample.name == name and sample.size == size:
+                return sample.latency_mean_ms
+        return self.intercept_ms + self.ms_per_byte * size
+
+    def mix_service_time_ms(self, payloads: List[Payload]) -> Decimal:
+        total = sum(payload.weight for payload in payloads)
+        return (
+            sum(
+                (
+                    payload.weight * self.service_time_ms(payload.name, payload.size)
+                    for payload in payloads
+                ),
+                Decimal(0),
+            )
+            / total
+        )
+
+    def measured_service_time_ms(self) -> Decimal:
+        total = sum(sample.weight for sample in self.samples)
+        return (
+            sum(
+                (sample.weight * sample.latency_mean_ms for sample in self.samples),
+                Decimal(0),
+            )
+            / total
+        )
+
+    def predict(self, payloads: List[Payload], peak_tps: Decimal) -> Dict[str, str]:
+        """Instances needed for peak_tps with a different payload mix, with
+        the invocations target from the safety factor."""
+        measured = self.measured_service_time_ms()
+        service_time = self.mix_service_time_ms(payloads)
+        if service_time <= 0:
+            raise RuntimeError(
+                f"ERROR: model predicts no service time for {payloads}: {self}"
+            )
+        tps_per_instance = self.tps_per_instance * measured / service_time
+        instance_count = math.ceil(peak_tps / tps_per_instance)
+        invocations_target = int(tps_per_instance * 60 * SageMaker.SAFETY_FACTOR)
+        prediction: Dict[str, str] = {}
+        prediction["instance_type"] = self.instance_type
+        prediction["max_tps_per_instance"] = f"{tps_per_instance:.2f}"
+        prediction["max_instance_count"] = f"{instance_count}"
+        prediction["invocations_target"] = f"{invocations_target}"
+        prediction["explanation"] = (
+            f"Measured mix averaged {measured:.2f} ms per request at {self.tps_per_instance:.2f} TPS per instance.\n"
+            f"New mix averages {service_time:.2f} ms per request "
+            f"(fit: {self.intercept_ms:.2f} ms + {self.ms_per_byte:.6f} ms/byte for unmeasured payloads).\n"
+            f"max_tps_per_instance = {self.tps_per_instance:.2f} * {measured:.2f} / {service_time:.2f} = {tps_per_instance:.2f}\n"
+            f"max_instance_count = ceil({peak_tps} / {tps_per_instance:.2f}) = {instance_count}"
+        )
+        return prediction
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "instance_type": self.instance_type,
+            "tps_per_instance": f"{self.tps_per_instance}",
+            "samples": [sample.to_dict() for sample in self.samples],
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "CapacityModel":
+        if data.get("version") != 1:
+            raise ValueError(f"ERROR: Unsupported capacity model version: {data}")
+        return CapacityModel(
+            instance_type=data["instance_type"],
+            tps_per_instance=Decimal(data["tps_per_instance"]),
+            samples=[PayloadSample.from_dict(sample) for sample in data["samples"]],
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @staticmethod
+    def load(path: str) -> "CapacityModel":
+        with open(path, "r") as file:
+            return CapacityModel.from_dict(json.load(file))
+
+    @staticmethod
+    def from_run(
+        instance_type: str,
+        tps_per_instance: Decimal,
+        run: Run,
+        bundle: PayloadBundle,
+    ) -> Optional["CapacityModel"]:
+        """Model from the per request name results of a run, or None unless
+        every payload of the bundle was matched to a request name."""
+        # Imported here, so predicting from a saved model does not load pandas.
+        from perfsize.result.gatling import Metric
+        from perfsizesagemaker.result.histogram import (
+            LATENCY_SUCCESS_MEAN,
+            request_name_metric,
+        )
+
+        values = {result.metric: result.value for result in run.results}
+        mean_prefix = f"{LATENCY_SUCCESS_MEAN}["
+        names = [
+            metric[len(mean_prefix) : -1]
+            for metric in values
+            if metric.startswith(mean_prefix) and metric.endswith("]")
+        ]
+        samples = []
+        for payload in bundle.payloads:
+            matches = [name for name in names if bundle.match(name) is payload]
+            if len(matches) != 1:
+                log.info(
+                    f"No capacity model from {run.id}: request names {names} "
+                    f"do not identify payload {payload.name}"
+                )
+                return None
+            name = matches[0]
+            samples.append(
+                PayloadSample(
+                    name=payload.name,
+                    size=payload.size,
+                    weight=payload.weight,
+                    count=int(values[request_name_metric(Metric.count_total, name)]),
+                    latency_mean_ms=values[
+                        request_name_metric(LATENCY_SUCCESS_MEAN, name)
+                    ],
+                )
+            )
+        return CapacityModel(instance_type, tps_per_instance, samples)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, str]:
+    parser = argparse.ArgumentParser(
+        description="Predict the max instance count for a different payload mix "
+        "from the capacity model saved by a sizing job, without testing again."
+    )
+    parser.add_argument(
+        "--capacity_model",
+        help=f"path to {CAPACITY_MODEL_FILE} in the job directory",
+        required=True,
+    )
+    parser.add_argument(
+        "--scenario_requests",
+        help="json array of new payload mix, same format as for perfsizesagemaker.main",
+        required=True,
+    )
+    parser.add_argument("--peak_tps", help="required highest TPS", required=True)
+    args = parser.parse_args(argv)
+    try:
+        model = CapacityModel.load(args.capacity_model)
+    except:
+        error = sys.exc_info()[0]
+        description = sys.exc_info()[1]
+        parser.error(f"argument --capacity_model: got error {error}: {description}")
+    try:
+        bundle = PayloadBundle(args.scenario_requests)
+    except:
+        error = sys.exc_info()[0]
+        description = sys.exc_info()[1]
+        parser.error(f"argument --scenario_requests: got error {error}: {description}")
+    try:
+        peak_tps = Decimal(args.peak_tps)
+    except:
+        parser.error(f"argument --peak_tps: expected a number but got: {args.peak_tps}")
+    prediction = model.predict(bundle.payloads, peak_tps)
+    print(json.dumps(prediction, indent=2))
+    return prediction
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
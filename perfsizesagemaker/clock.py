@@ -0,0 +1,109 @@
+from datetime import datetime
+import threading
+import time
+from typing import Callable, List, Optional
+
+MILLISECONDS_PER_SECOND = 1000
+MILLISECONDS_PER_HOUR = 3600 * MILLISECONDS_PER_SECOND
+
+
+class Timer:
+    """Handle for a callback repeated by Clock.every, until stopped."""
+
+    def __init__(self, seconds: float, callback: Callable[[], None]):
+        self.interval_ms = int(seconds * MILLISECONDS_PER_SECOND)
+        if self.interval_ms < 1:
+            raise RuntimeError(f"ERROR: timer interval too short: {seconds} seconds")
+        self.callback = callback
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        # Next time the callback runs, for timers on a VirtualClock.
+        self.due_ms = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"Timer(interval_ms={self.interval_ms}, "
+            f"stopped={self.stopped.is_set()})"
+        )
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+
+class Clock:
+    """Wall clock shared by environment, load, and result managers.
+
+    Managers read time and wait through a Clock instead of calling datetime
+    and time directly, so a VirtualClock can fast-forward a whole job.
+    """
+
+    def time_ms(self) -> int:
+        return int(time.time() * MILLISECONDS_PER_SECOND)
+
+    def now(self) -> datetime:
+        # Naive UTC datetime, same as datetime.utcnow()
+        return datetime.utcfromtimestamp(self.time_ms() / MILLISECONDS_PER_SECOND)
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def every(self, seconds: float, callback: Callable[[], None]) -> Timer:
+        """Call callback every given seconds on a background thread, while
+        the caller goes on, until the returned Timer is stopped."""
+        timer = Timer(seconds, callback)
+
+        def loop() -> None:
+            while not timer.stopped.wait(seconds):
+                callback()
+
+        timer.thread = threading.Thread(target=loop, daemon=True)
+        timer.thread.start()
+        return timer
+
+
+class VirtualClock(Clock):
+    """Simulated clock that only moves when advanced or slept on.
+
+    Timers from every run in the thread that advances the clock, at their
+    due times along the way, so background sampling stays deterministic.
+    """
+
+    def __init__(self, start_ms: Optional[int] = None):
+        self.current_ms = start_ms if start_ms is not None else super().time_ms()
+        self.start_ms = self.current_ms
+        self.timers: List[Timer] = []
+
+    def __repr__(self) -> str:
+        return f"VirtualClock(start_ms={self.start_ms}, current_ms={self.current_ms})"
+
+    def time_ms(self) -> int:
+        return self.current_ms
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(int(seconds * MILLISECONDS_PER_SECOND))
+
+    def every(self, seconds: float, callback: Callable[[], None]) -> Timer:
+        timer = Timer(seconds, callback)
+        timer.due_ms = self.current_ms + timer.interval_ms
+        self.timers.append(timer)
+        return timer
+
+    def advance(self, milliseconds: int) -> None:
+        if milliseconds < 0:
+            raise RuntimeError(f"ERROR: clock cannot go back by {milliseconds} ms")
+        until = self.current_ms + milliseconds
+        while True:
+            self.timers = [timer for timer in self.timers if not timer.stopped.is_set()]
+            due = [timer for timer in self.timers if timer.due_ms <= until]
+            if not due:
+                break
+            timer = min(due, key=lambda timer: timer.due_ms)
+            self.current_ms = timer.due_ms
+            timer.due_ms = timer.due_ms + timer.interval_ms
+            timer.callback()
+        self.current_ms = until
+
+    def elapsed_ms(self) -> int:
+        return self.current_ms - self.start_ms
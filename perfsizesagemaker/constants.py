@@ -23,6 +23,10 @@ class Parameter:
 
 class SageMaker:
     SAFETY_FACTOR = Decimal("0.5")
+    # Targets tried by --optimize_scaling_target, as fractions of the measured
+    # max TPS per instance, from SAFETY_FACTOR up to MAX_TARGET_FACTOR.
+    TARGET_FACTOR_STEP = Decimal("0.1")
+    MAX_TARGET_FACTOR = Decimal("1.0")
 
 
 class AwsRegion:
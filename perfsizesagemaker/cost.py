@@ -1,5 +1,8 @@
 from decimal import Decimal
 import json
+from perfsizesagemaker.clock import Clock, MILLISECONDS_PER_HOUR
+import threading
+from typing import Any, Dict, Optional, Tuple
 
 
 class CostEstimator:
@@ -30,3 +33,60 @@ class CostEstimator:
         annual = 365 * daily
         explanation += f"annual = 365 days * {daily}/day = ${annual}/year\n"
         return explanation
+
+
+class SpendTracker:
+    """Meter what the sizing job itself spends on endpoint instances.
+
+    Keeps the last known instance type and count per endpoint and bills the
+    time between updates at CostEstimator rates. Updates come from
+    MeteredEnvironmentManager around setup, load, and teardown, so the total
+    covers deploying, warming up, sending load, and deleting.
+    """
+
+    def __init__(self, rates: Dict[str, Any], clock: Optional[Clock] = None):
+        self.rates = rates
+        self.clock = clock if clock is not None else Clock()
+        # Retired endpoints are updated from a background thread, see
+        # perfsizesagemaker/environment/retiring.py.
+        self.lock = threading.Lock()
+        # endpoint_name -> (instance_type, instance_count, billed until ms)
+        self.endpoints: Dict[str, Tuple[str, int, int]] = {}
+        self.instance_milliseconds: Dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"SpendTracker(endpoints={self.endpoints}, total={self.total():.2f})"
+
+    def _bill(self, now: int) -> None:
+        for endpoint_name, (instance_type, count, since) in self.endpoints.items():
+            self.instance_milliseconds[instance_type] = self.instance_milliseconds.get(
+                instance_type, 0
+            ) + count * (now - since)
+            self.endpoints[endpoint_name] = (instance_type, count, now)
+
+    def update(self, endpoint_name: str, instance_type: str, count: int) -> None:
+        """Record that endpoint_name now runs count instances of instance_type."""
+        if count and instance_type not in self.rates:
+            raise RuntimeError(f"ERROR: Cost lookup did not find type {instance_type}")
+        with self.lock:
+            now = self.clock.time_ms()
+            self._bill(now)
+            if count:
+                self.endpoints[endpoint_name] = (instance_type, count, now)
+            else:
+                self.endpoints.pop(endpoint_name, None)
+
+    def total(self) -> Decimal:
+        """Dollars spent so far, including instances still running."""
+        with self.lock:
+            self._bill(self.clock.time_ms())
+            total = Decimal("0")
+            for instance_type, milliseconds in self.instance_milliseconds.items():
+                hours = Decimal(milliseconds) / MILLISECONDS_PER_HOUR
+                total = total + hours * Decimal(str(self.rates[instance_type]))
+            return total
+
+    def estimate(self, instance_type: str, count: int, minutes: Decimal) -> Decimal:
+        if instance_type not in self.rates:
+            raise RuntimeError(f"ERROR: Cost lookup did not find type {instance_type}")
+        return count * Decimal(str(self.rates[instance_type])) * minutes / 60
@@ -0,0 +1,232 @@
+from contextlib import closing
+import logging.config
+import os
+from perfsizesagemaker.clock import Clock, MILLISECONDS_PER_SECOND, Timer
+from perfsizesagemaker.process import process_alive
+import socket
+import sqlite3
+import threading
+from typing import List, Optional
+import uuid
+
+log = logging.getLogger(__name__)
+
+# Kinds of resources recorded, in the order orphans are deleted.
+SCALABLE_TARGET = "scalable_target"
+ENDPOINT = "endpoint"
+ENDPOINT_CONFIG = "endpoint_config"
+KINDS = [SCALABLE_TARGET, ENDPOINT, ENDPOINT_CONFIG]
+
+# Ledger file in perfsize_results_dir, shared by every job writing there.
+LEDGER_FILE = "resources.db"
+
+# Open rows not renewed for this long belong to a job that is gone. The job
+# renews its rows every LEASE_SECONDS / LEASE_RENEWALS seconds.
+LEASE_SECONDS = 600
+LEASE_RENEWALS = 4
+
+
+class Resource:
+    """One row of the ResourceLedger. Scalable targets are named by their
+    resource id, like endpoint/<endpoint_name>/variant/<variant_name>. The
+    lease of the job that created it was last renewed at updated_ms."""
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        region: Optional[str],
+        iam_role_arn: Optional[str],
+        owner: str,
+        host: str,
+        pid: int,
+        created_ms: int,
+        updated_ms: int,
+        session: str = "",
+        deleted_ms: Optional[int] = None,
+    ):
+        self.kind = kind
+        self.name = name
+        self.region = region
+        self.iam_role_arn = iam_role_arn
+        self.owner = owner
+        self.host = host
+        self.pid = pid
+        self.created_ms = created_ms
+        self.updated_ms = updated_ms
+        self.session = session
+        self.deleted_ms = deleted_ms
+
+    def __repr__(self) -> str:
+        return (
+            f"Resource(kind={self.kind}, name={self.name}, region={self.region}, "
+            f"owner={self.owner}, host={self.host}, pid={self.pid}, "
+            f"created_ms={self.created_ms}, updated_ms={self.updated_ms}, "
+            f"deleted_ms={self.deleted_ms})"
+        )
+
+
+class ResourceLedger:
+    """SageMaker resources created by sizing jobs, kept in a SQLite file.
+
+    SageMakerEnvironmentManager writes each resource before the call that
+    creates it and marks it deleted once deleted, so a job killed in between
+    leaves an open row behind. While a ledger has open rows, a Clock.every
+    timer renews their lease. Open rows of other ledgers whose lease expired,
+    from any host, are orphans, see perfsizesagemaker/reaper.py.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        owner: str = "",
+        clock: Optional[Clock] = None,
+        lease_seconds: float = LEASE_SECONDS,
+    ):
+        self.path = path
+        self.owner = owner
+        self.clock = clock if clock is not None else Clock()
+        self.lease_seconds = lease_seconds
+        self.host = socket.gethostname()
+        # Rows of this ledger. A restarted container may get the same host
+        # and process id, but never the same session.
+        self.session = uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.timer: Optional[Timer] = None
+        with closing(self._connect()) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS resources (kind TEXT, name TEXT, "
+                "region TEXT, iam_role_arn TEXT, owner TEXT, host TEXT, "
+                "pid INTEGER, created_ms INTEGER, deleted_ms INTEGER, "
+                "updated_ms INTEGER, session TEXT, "
+                "PRIMARY KEY (kind, name, region))"
+            )
+            db.execute("BEGIN IMMEDIATE")
+            columns = [row[1] for row in db.execute("PRAGMA table_info(resources)")]
+            if "updated_ms" not in columns:
+                # Ledger from before leases, start their leases at creation.
+                db.execute("ALTER TABLE resources ADD COLUMN updated_ms INTEGER")
+                db.execute("ALTER TABLE resources ADD COLUMN session TEXT")
+                db.execute("UPDATE resources SET updated_ms = created_ms")
+            db.execute("COMMIT")
+
+    def __repr__(self) -> str:
+        return f"ResourceLedger(path={self.path}, owner={self.owner})"
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, each statement is written right away.
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def created(
+        self,
+        kind: str,
+        name: str,
+        region: Optional[str],
+        iam_role_arn: Optional[str],
+    ) -> None:
+        now = self.clock.time_ms()
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT OR REPLACE INTO resources VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (
+                    kind,
+                    name,
+                    region or "",
+                    iam_role_arn or "",
+                    self.owner,
+                    self.host,
+                    os.getpid(),
+                    now,
+                    now,
+                    self.session,
+                ),
+            )
+        with self.lock:
+            if self.timer is None:
+                self.timer = self.clock.every(
+                    self.lease_seconds / LEASE_RENEWALS, self.renew
+                )
+
+    def deleted(self, kind: str, name: str, region: Optional[str]) -> None:
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE resources SET deleted_ms = ? WHERE kind = ? AND name = ? "
+                "AND region = ? AND deleted_ms IS NULL",
+                (self.clock.time_ms(), kind, name, region or ""),
+            )
+
+    def renew(self) -> None:
+        """Extend the lease of the open rows of this ledger."""
+        try:
+            with closing(self._connect()) as db:
+                db.execute(
+                    "UPDATE resources SET updated_ms = ? WHERE session = ? "
+                    "AND deleted_ms IS NULL",
+                    (self.clock.time_ms(), self.session),
+                )
+        except sqlite3.Error as e:
+            # Runs on the timer thread, so leave it for the next renewal.
+            log.warning(f"Could not renew the lease in {self.path}: {e}")
+
+    def close(self) -> None:
+        """Stop renewing, once the job is done with its resources."""
+        with self.lock:
+            timer = self.timer
+            self.timer = None
+        if timer is not None:
+            timer.stop()
+
+    def open_resources(self) -> List[Resource]:
+        """Resources not deleted yet, oldest first."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT kind, name, region, iam_role_arn, owner, host, pid, "
+                "created_ms, updated_ms, session FROM resources "
+                "WHERE deleted_ms IS NULL ORDER BY created_ms"
+            ).fetchall()
+        return [
+            Resource(
+                kind=kind,
+                name=name,
+                region=region or None,
+                iam_role_arn=iam_role_arn or None,
+                owner=owner,
+                host=host,
+                pid=pid,
+                created_ms=created_ms,
+                updated_ms=updated_ms,
+                session=session,
+            )
+            for (
+                kind,
+                name,
+                region,
+                iam_role_arn,
+                owner,
+                host,
+                pid,
+                created_ms,
+                updated_ms,
+                session,
+            ) in rows
+        ]
+
+    def orphans(self, include_live: bool = False) -> List[Resource]:
+        """Open resources of other ledgers whose lease expired, or that a
+        process on this host no longer running wrote. With include_live, also
+        every open resource of other ledgers, which may belong to jobs still
+        running."""
+        expired_ms = self.clock.time_ms() - int(
+            self.lease_seconds * MILLISECONDS_PER_SECOND
+        )
+        return [
+            resource
+            for resource in self.open_resources()
+            if resource.session != self.session
+            and (
+                include_live
+                or resource.updated_ms < expired_ms
+                or (resource.host == self.host and not process_alive(resource.pid))
+            )
+        ]
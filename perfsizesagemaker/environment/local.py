@@ -0,0 +1,644 @@
+from botocore.exceptions import ClientError, WaiterError
+from datetime import datetime, timezone
+from decimal import Decimal
+import json
+import logging.config
+import math
+from perfsizesagemaker.clock import (
+    MILLISECONDS_PER_HOUR,
+    MILLISECONDS_PER_SECOND,
+    VirtualClock,
+)
+from perfsizesagemaker.environment.ledger import ResourceLedger
+from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
+from perfsizesagemaker.tracing import Tracer
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# In-process stand-in for the SageMaker and Application Auto Scaling APIs
+# used by SageMakerEnvironmentManager, so whole jobs can run without an AWS
+# account. Time comes from a VirtualClock: waiters advance the clock instead
+# of sleeping, and LocalLoadManager advances it by the length of each run.
+#
+# Settings are loaded from a json file like resources/configs/local/model-simulator.json
+# with timings in seconds and a runtime profile per instance type, see
+# perfsizesagemaker/load/local.py for the runtime model. An optional
+# "instance_quotas" mapping of instance type to count makes create and update
+# fail with ResourceLimitExceeded past that many instances, like the account
+# level endpoint quotas.
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "create_seconds": 360,
+    "update_seconds": 360,
+    "delete_seconds": 60,
+    "scale_out_seconds": 300,
+    "scale_evaluation_seconds": 60,
+}
+
+
+def _error(code: str, message: str, operation_name: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation_name)
+
+
+def _response() -> Dict[str, Any]:
+    return {"ResponseMetadata": {"HTTPStatusCode": 200, "RetryAttempts": 0}}
+
+
+class LocalEndpoint:
+    def __init__(
+        self,
+        endpoint_name: str,
+        endpoint_config_name: str,
+        variant_name: str,
+        instance_type: str,
+        instance_count: int,
+        ready_at: int,
+        other_variants: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.endpoint_name = endpoint_name
+        self.endpoint_config_name = endpoint_config_name
+        self.variant_name = variant_name
+        self.instance_type = instance_type
+        self.status = "Creating"
+        self.current_instance_count = instance_count
+        self.desired_instance_count = instance_count
+        # Simulated time (ms) when the pending status change completes.
+        self.ready_at: Optional[int] = ready_at
+        # Invocations counted in the current scaling evaluation period.
+        self.period_start = ready_at
+        self.period_invocations = 0
+        # ProductionVariants after the first, for comparison endpoints. These
+        # keep their initial count, auto scaling only applies to the first.
+        self.other_variants = other_variants or []
+
+    def __repr__(self) -> str:
+        return (
+            f"LocalEndpoint(endpoint_name={self.endpoint_name}, "
+            f"endpoint_config_name={self.endpoint_config_name}, "
+            f"instance_type={self.instance_type}, "
+            f"status={self.status}, "
+            f"current_instance_count={self.current_instance_count}, "
+            f"desired_instance_count={self.desired_instance_count}, "
+            f"other_variants={self.other_variants})"
+        )
+
+    def billed_instance_count(self) -> int:
+        # Instances being added are billed while they start up.
+        if self.status in ("Creating", "Updating"):
+            return max(self.current_instance_count, self.desired_instance_count)
+        return self.current_instance_count
+
+    def variant(self, variant_name: str) -> Tuple[str, int]:
+        """Instance type and in service count of one variant."""
+        if variant_name == self.variant_name:
+            count = self.current_instance_count
+            instance_type = self.instance_type
+        else:
+            found = [
+                variant
+                for variant in self.other_variants
+                if variant["VariantName"] == variant_name
+            ]
+            if not found:
+                raise RuntimeError(
+                    f"ERROR: Endpoint {self.endpoint_name} has no variant {variant_name}"
+                )
+            count = found[0]["InitialInstanceCount"]
+            instance_type = found[0]["InstanceType"]
+        if self.status not in ("InService", "Updating"):
+            count = 0
+        return instance_type, count
+
+
+class LocalSageMaker:
+    """State of one emulated account: endpoints, configs, and auto scaling.
+
+    Shared by LocalSageMakerEnvironmentManager and LocalLoadManager so the
+    load sees the instance type and count the environment manager set up,
+    including instances added by the target tracking policy mid-run.
+
+    Also keeps instance time per type from endpoint creation to deletion, to
+    price a simulated job with the same rates as CostEstimator.
+    """
+
+    def __init__(self, settings: Dict[str, Any], clock: Optional[VirtualClock] = None):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings)
+        self.clock = clock if clock is not None else VirtualClock()
+        self.updated_at = self.clock.time_ms()
+        self.endpoint_configs: Dict[str, Dict[str, Any]] = {}
+        self.endpoints: Dict[str, LocalEndpoint] = {}
+        self.scalable_targets: Dict[str, Dict[str, Any]] = {}
+        self.scaling_policies: Dict[str, Dict[str, Any]] = {}
+        self.instance_milliseconds: Dict[str, int] = {}
+
+    @staticmethod
+    def from_file(
+        settings_file: str, clock: Optional[VirtualClock] = None
+    ) -> "LocalSageMaker":
+        with open(settings_file, "r") as f:
+            return LocalSageMaker(json.load(f), clock)
+
+    @property
+    def now(self) -> int:
+        return self.clock.time_ms()
+
+    def __repr__(self) -> str:
+        return f"LocalSageMaker(now={self.now}, endpoints={self.endpoints})"
+
+    def milliseconds(self, setting: str) -> int:
+        return int(self.settings[setting] * MILLISECONDS_PER_SECOND)
+
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.now / MILLISECONDS_PER_SECOND, timezone.utc)
+
+    def advance(self, milliseconds: int) -> None:
+        self.clock.advance(milliseconds)
+        self.refresh()
+
+    def refresh(self) -> None:
+        # Catch up with the clock, completing pending status changes in order.
+        now = self.clock.time_ms()
+        while True:
+            due = [
+                endpoint.ready_at
+                for endpoint in self.endpoints.values()
+                if endpoint.ready_at is not None and endpoint.ready_at <= now
+            ]
+            until = min(due) if due else now
+            self._bill(until)
+            if not due:
+                return
+            self._complete(until)
+
+    def _bill(self, until: int) -> None:
+        elapsed = until - self.updated_at
+        if elapsed <= 0:
+            return
+        for endpoint in self.endpoints.values():
+            billed = [(endpoint.instance_type, endpoint.billed_instance_count())]
+            for variant in endpoint.other_variants:
+                billed.append(
+                    (variant["InstanceType"], variant["InitialInstanceCount"])
+                )
+            for instance_type, count in billed:
+                self.instance_milliseconds[instance_type] = (
+                    self.instance_milliseconds.get(instance_type, 0) + count * elapsed
+                )
+        self.updated_at = until
+
+    def spend(self, rates: Dict[str, Any]) -> Decimal:
+        """Dollars for instance time so far, given hourly rate per type."""
+        self.refresh()
+        total = Decimal("0")
+        for instance_type, milliseconds in self.instance_milliseconds.items():
+            hours = Decimal(milliseconds) / MILLISECONDS_PER_HOUR
+            total = total + hours * Decimal(str(rates[instance_type]))
+        return total
+
+    def _complete(self, now: int) -> None:
+        for endpoint_name in list(self.endpoints):
+            endpoint = self.endpoints[endpoint_name]
+            if endpoint.ready_at is None or endpoint.ready_at > now:
+                continue
+            endpoint.ready_at = None
+            if endpoint.status == "Deleting":
+                del self.endpoints[endpoint_name]
+                resource_id = self.resource_id(endpoint)
+                self.scalable_targets.pop(resource_id, None)
+                self.scaling_policies.pop(resource_id, None)
+            else:
+                endpoint.status = "InService"
+                endpoint.current_instance_count = endpoint.desired_instance_count
+
+    def resource_id(self, endpoint: LocalEndpoint) -> str:
+        return f"endpoint/{endpoint.endpoint_name}/variant/{endpoint.variant_name}"
+
+    def check_quota(
+        self,
+        endpoint_name: str,
+        instance_type: str,
+        instance_count: int,
+        operation_name: str,
+    ) -> None:
+        quota = self.settings.get("instance_quotas", {}).get(instance_type)
+        if quota is None:
+            return
+        in_use = 0
+        for endpoint in self.endpoints.values():
+            if endpoint.endpoint_name == endpoint_name:
+                continue
+            if endpoint.instance_type == instance_type:
+                in_use = in_use + endpoint.billed_instance_count()
+            for variant in endpoint.other_variants:
+                if variant["InstanceType"] == instance_type:
+                    in_use = in_use + variant["InitialInstanceCount"]
+        if in_use + instance_count > quota:
+            raise _error(
+                "ResourceLimitExceeded",
+                f"The account-level service limit '{instance_type} for endpoint "
+                f"usage' is {quota} Instances, with current utilization of "
+                f"{in_use} Instances and a request delta of {instance_count} "
+                f"Instances.",
+                operation_name,
+            )
+
+    def in_service_instance_count(self, endpoint_name: str) -> int:
+        self.refresh()
+        endpoint = self.endpoints.get(endpoint_name)
+        if endpoint is None or endpoint.status not in ("InService", "Updating"):
+            return 0
+        return endpoint.current_instance_count
+
+    def record_invocations(self, endpoint_name: str, count: int) -> None:
+        """Count invocations at the current time and apply target tracking.
+
+        Like SageMakerVariantInvocationsPerInstance, the metric is invocations
+        per instance per minute. When it is over the policy target, desired
+        count goes up to what the target needs (capped at MaxCapacity), and the
+        new instances come into service after scale_out_seconds. Scale in is
+        not modeled since test runs are short.
+        """
+        self.refresh()
+        endpoint = self.endpoints.get(endpoint_name)
+        if endpoint is None or endpoint.status not in ("InService", "Updating"):
+            return
+        endpoint.period_invocations = endpoint.period_invocations + count
+        period = self.milliseconds("scale_evaluation_seconds")
+        if self.now - endpoint.period_start < period:
+            return
+        per_minute = (
+            endpoint.period_invocations * 60000 // (self.now - endpoint.period_start)
+        )
+        endpoint.period_start = self.now
+        endpoint.period_invocations = 0
+        resource_id = self.resource_id(endpoint)
+        target = self.scalable_targets.get(resource_id)
+        policy = self.scaling_policies.get(resource_id)
+        if target is None or policy is None or endpoint.status != "InService":
+            return
+        configuration = policy["TargetTrackingScalingPolicyConfiguration"]
+        target_value = configuration["TargetValue"]
+        current = endpoint.current_instance_count
+        if per_minute <= target_value * current:
+            return
+        desired = min(target["MaxCapacity"], math.ceil(per_minute / target_value))
+        if desired <= current:
+            return
+        log.debug(
+            f"Scaling out {endpoint_name} from {current} to {desired} instances "
+            f"at {per_minute} invocations per minute"
+        )
+        endpoint.desired_instance_count = desired
+        endpoint.status = "Updating"
+        endpoint.ready_at = self.now + self.milliseconds("scale_out_seconds")
+
+
+class LocalSageMakerClient:
+    """Subset of the boto3 sagemaker client backed by LocalSageMaker."""
+
+    def __init__(self, account: LocalSageMaker):
+        self.account = account
+
+    def create_endpoint_config(
+        self, EndpointConfigName: str, ProductionVariants: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        if EndpointConfigName in self.account.endpoint_configs:
+            raise _error(
+                "ValidationException",
+                f'Cannot create already existing endpoint configuration "{EndpointConfigName}".',
+                "CreateEndpointConfig",
+            )
+        self.account.endpoint_configs[EndpointConfigName] = {
+            "EndpointConfigName": EndpointConfigName,
+            "ProductionVariants": [dict(variant) for variant in ProductionVariants],
+            "CreationTime": self.account.datetime(),
+        }
+        return _response()
+
+    def describe_endpoint_config(self, EndpointConfigName: str) -> Dict[str, Any]:
+        if EndpointConfigName not in self.account.endpoint_configs:
+            raise _error(
+                "ValidationException",
+                f'Could not find endpoint configuration "{EndpointConfigName}".',
+                "DescribeEndpointConfig",
+            )
+        response = _response()
+        response.update(self.account.endpoint_configs[EndpointConfigName])
+        return response
+
+    def delete_endpoint_config(self, EndpointConfigName: str) -> Dict[str, Any]:
+        if EndpointConfigName not in self.account.endpoint_configs:
+            raise _error(
+                "ValidationException",
+                f'Could not find endpoint configuration "{EndpointConfigName}".',
+                "DeleteEndpointConfig",
+            )
+        del self.account.endpoint_configs[EndpointConfigName]
+        return _response()
+
+    def _variants(
+        self, endpoint_config_name: str, operation_name: str
+    ) -> List[Dict[str, Any]]:
+        if endpoint_config_name not in self.account.endpoint_configs:
+            raise _error(
+                "ValidationException",
+                f'Could not find endpoint configuration "{endpoint_config_name}".',
+                operation_name,
+            )
+        variants: List[Dict[str, Any]] = self.account.endpoint_configs[
+            endpoint_config_name
+        ]["ProductionVariants"]
+        return variants
+
+    def create_endpoint(
+        self, EndpointName: str, EndpointConfigName: str
+    ) -> Dict[str, Any]:
+        self.account.refresh()
+        if EndpointName in self.account.endpoints:
+            raise _error(
+                "ValidationException",
+                f'Cannot create already existing endpoint "{EndpointName}".',
+                "CreateEndpoint",
+            )
+        variants = self._variants(EndpointConfigName, "CreateEndpoint")
+        for instance_type in {variant["InstanceType"] for variant in variants}:
+            self.account.check_quota(
+                EndpointName,
+                instance_type,
+                sum(
+                    variant["InitialInstanceCount"]
+                    for variant in variants
+                    if variant["InstanceType"] == instance_type
+                ),
+                "CreateEndpoint",
+            )
+        variant = variants[0]
+        self.account.endpoints[EndpointName] = LocalEndpoint(
+            endpoint_name=EndpointName,
+            endpoint_config_name=EndpointConfigName,
+            variant_name=variant["VariantName"],
+            instance_type=variant["InstanceType"],
+            instance_count=variant["InitialInstanceCount"],
+            ready_at=self.account.now + self.account.milliseconds("create_seconds"),
+            other_variants=[dict(other) for other in variants[1:]],
+        )
+        return _response()
+
+    def update_endpoint(
+        self, EndpointName: str, EndpointConfigName: str
+    ) -> Dict[str, Any]:
+        endpoint = self._endpoint(EndpointName, "UpdateEndpoint")
+        if endpoint.status != "InService":
+            raise _error(
+                "ValidationException",
+                f'Cannot update in-progress endpoint "{EndpointName}".',
+                "UpdateEndpoint",
+            )
+        variants = self._variants(EndpointConfigName, "UpdateEndpoint")
+        if len(variants) != 1 or endpoint.other_variants:
+            raise _error(
+                "ValidationException",
+                "Local emulator only updates endpoints with one variant.",
+                "UpdateEndpoint",
+            )
+        variant = variants[0]
+        self.account.check_quota(
+            EndpointName,
+            variant["InstanceType"],
+            variant["InitialInstanceCount"],
+            "UpdateEndpoint",
+        )
+        endpoint.endpoint_config_name = EndpointConfigName
+        endpoint.variant_name = variant["VariantName"]
+        endpoint.instance_type = variant["InstanceType"]
+        endpoint.desired_instance_count = variant["InitialInstanceCount"]
+        endpoint.status = "Updating"
+        endpoint.ready_at = self.account.now + self.account.milliseconds(
+            "update_seconds"
+        )
+        return _response()
+
+    def _endpoint(self, endpoint_name: str, operation_name: str) -> LocalEndpoint:
+        self.account.refresh()
+        if endpoint_name not in self.account.endpoints:
+            raise _error(
+                "ValidationException",
+                f'Could not find endpoint "{endpoint_name}".',
+                operation_name,
+            )
+        return self.account.endpoints[endpoint_name]
+
+    def describe_endpoint(self, EndpointName: str) -> Dict[str, Any]:
+        endpoint = self._endpoint(EndpointName, "DescribeEndpoint")
+        response = _response()
+        response["EndpointName"] = EndpointName
+        response["EndpointConfigName"] = endpoint.endpoint_config_name
+        response["EndpointStatus"] = endpoint.status
+        if endpoint.status != "Creating":
+            # Like the real API, no ProductionVariants until created.
+            response["ProductionVariants"] = [
+                {
+                    "VariantName": endpoint.variant_name,
+                    "CurrentWeight": 1.0,
+                    "DesiredWeight": 1.0,
+                    "CurrentInstanceCount": endpoint.current_instance_count,
+                    "DesiredInstanceCount": endpoint.desired_instance_count,
+                }
+            ]
+            for variant in endpoint.other_variants:
+                response["ProductionVariants"].append(
+                    {
+                        "VariantName": variant["VariantName"],
+                        "CurrentWeight": 1.0,
+                        "DesiredWeight": 1.0,
+                        "CurrentInstanceCount": variant["InitialInstanceCount"],
+                        "DesiredInstanceCount": variant["InitialInstanceCount"],
+                    }
+                )
+        return response
+
+    def delete_endpoint(self, EndpointName: str) -> Dict[str, Any]:
+        endpoint = self._endpoint(EndpointName, "DeleteEndpoint")
+        endpoint.status = "Deleting"
+        endpoint.ready_at = self.account.now + self.account.milliseconds(
+            "delete_seconds"
+        )
+        return _response()
+
+    def get_waiter(self, waiter_name: str) -> "LocalWaiter":
+        if waiter_name not in ("endpoint_in_service", "endpoint_deleted"):
+            raise ValueError(f"Waiter does not exist: {waiter_name}")
+        return LocalWaiter(self.account, waiter_name)
+
+
+class LocalWaiter:
+    """Poll like a boto3 waiter, but advance simulated time between attempts."""
+
+    def __init__(self, account: LocalSageMaker, waiter_name: str):
+        self.account = account
+        self.waiter_name = waiter_name
+
+    def wait(
+        self, EndpointName: str, WaiterConfig: Optional[Dict[str, int]] = None
+    ) -> None:
+        waiter_config = WaiterConfig or {}
+        delay = waiter_config.get("Delay", 30)
+        max_attempts = waiter_config.get("MaxAttempts", 120)
+        for attempt in range(max_attempts):
+            self.account.refresh()
+            endpoint = self.account.endpoints.get(EndpointName)
+            if self.waiter_name == "endpoint_deleted":
+                if endpoint is None:
+                    return
+                if endpoint.status == "Failed":
+                    raise WaiterError(
+                        self.waiter_name, "Waiter encountered a terminal failure", {}
+                    )
+            else:
+                if endpoint is None or endpoint.status == "Failed":
+                    raise WaiterError(
+                        self.waiter_name, "Waiter encountered a terminal failure", {}
+                    )
+                if endpoint.status == "InService":
+                    return
+            self.account.clock.sleep(delay)
+        raise WaiterError(self.waiter_name, "Max attempts exceeded", {})
+
+
+class LocalAutoScalingClient:
+    """Subset of the boto3 application-autoscaling client for SageMaker."""
+
+    def __init__(self, account: LocalSageMaker):
+        self.account = account
+
+    def register_scalable_target(
+        self,
+        ServiceNamespace: str,
+        ResourceId: str,
+        ScalableDimension: str,
+        MinCapacity: int,
+        MaxCapacity: int,
+    ) -> Dict[str, Any]:
+        if MinCapacity > MaxCapacity:
+            raise _error(
+                "ValidationException",
+                "Minimum capacity cannot be greater than maximum capacity",
+                "RegisterScalableTarget",
+            )
+        self.account.scalable_targets[ResourceId] = {
+            "ServiceNamespace": ServiceNamespace,
+            "ResourceId": ResourceId,
+            "ScalableDimension": ScalableDimension,
+            "MinCapacity": MinCapacity,
+            "MaxCapacity": MaxCapacity,
+            "CreationTime": self.account.datetime(),
+        }
+        return _response()
+
+    def describe_scalable_targets(
+        self,
+        ServiceNamespace: str,
+        ResourceIds: List[str],
+        NextToken: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        response = _response()
+        response["ScalableTargets"] = [
+            dict(self.account.scalable_targets[resource_id])
+            for resource_id in ResourceIds
+            if resource_id in self.account.scalable_targets
+        ]
+        return response
+
+    def deregister_scalable_target(
+        self, ServiceNamespace: str, ResourceId: str, ScalableDimension: str
+    ) -> Dict[str, Any]:
+        if ResourceId not in self.account.scalable_targets:
+            raise _error(
+                "ObjectNotFoundException",
+                f"No scalable target registered for service namespace: {ServiceNamespace}, resource ID: {ResourceId}, scalable dimension: {ScalableDimension}",
+                "DeregisterScalableTarget",
+            )
+        del self.account.scalable_targets[ResourceId]
+        self.account.scaling_policies.pop(ResourceId, None)
+        return _response()
+
+    def put_scaling_policy(
+        self,
+        PolicyName: str,
+        ServiceNamespace: str,
+        ResourceId: str,
+        PolicyType: str,
+        ScalableDimension: str,
+        TargetTrackingScalingPolicyConfiguration: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        if ResourceId not in self.account.scalable_targets:
+            raise _error(
+                "ObjectNotFoundException",
+                f"No scalable target registered for service namespace: {ServiceNamespace}, resource ID: {ResourceId}, scalable dimension: {ScalableDimension}",
+                "PutScalingPolicy",
+            )
+        self.account.scaling_policies[ResourceId] = {
+            "PolicyName": PolicyName,
+            "ServiceNamespace": ServiceNamespace,
+            "ResourceId": ResourceId,
+            "ScalableDimension": ScalableDimension,
+            "PolicyType": PolicyType,
+            "TargetTrackingScalingPolicyConfiguration": dict(
+                TargetTrackingScalingPolicyConfiguration
+            ),
+            "CreationTime": self.account.datetime(),
+        }
+        return _response()
+
+    def describe_scaling_policies(
+        self,
+        ServiceNamespace: str,
+        ResourceId: Optional[str] = None,
+        NextToken: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # Without ResourceId, every policy in the namespace, in one page.
+        response = _response()
+        response["ScalingPolicies"] = [
+            dict(policy)
+            for resource_id, policy in self.account.scaling_policies.items()
+            if ResourceId is None or resource_id == ResourceId
+        ]
+        return response
+
+    def delete_scaling_policy(
+        self,
+        PolicyName: str,
+        ServiceNamespace: str,
+        ResourceId: str,
+        ScalableDimension: str,
+    ) -> Dict[str, Any]:
+        if ResourceId not in self.account.scaling_policies:
+            raise _error(
+                "ObjectNotFoundException",
+                f"No scaling policy found for service namespace: {ServiceNamespace}, resource ID: {ResourceId}, scalable dimension: {ScalableDimension}, policy name: {PolicyName}",
+                "DeleteScalingPolicy",
+            )
+        del self.account.scaling_policies[ResourceId]
+        return _response()
+
+
+class LocalSageMakerEnvironmentManager(SageMakerEnvironmentManager):
+    """SageMakerEnvironmentManager running against a LocalSageMaker account."""
+
+    def __init__(
+        self,
+        account: LocalSageMaker,
+        tracer: Optional[Tracer] = None,
+        ledger: Optional[ResourceLedger] = None,
+    ):
+        super().__init__(clock=account.clock, tracer=tracer, ledger=ledger)
+        self.account = account
+
+    def _client(self, service_name: str) -> Any:
+        if service_name == "sagemaker":
+            return LocalSageMakerClient(self.account)
+        if service_name == "application-autoscaling":
+            return LocalAutoScalingClient(self.account)
+        raise RuntimeError(f"ERROR: No local emulator for service {service_name}")
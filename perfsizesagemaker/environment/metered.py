@@ -0,0 +1,82 @@
+import logging.config
+from perfsize.perfsize import Config, EnvironmentManager
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
+from perfsizesagemaker.environment.status import StatusService
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+class MeteredEnvironmentManager(EnvironmentManager):
+    """Wrap a SageMakerEnvironmentManager to meter test spend.
+
+    Updates the SpendTracker with the instance count right before and after
+    each setup and teardown, and whenever observe is called (SpendResultManager
+    calls it after each load run, to catch instances added by auto scaling).
+    With a StatusService, observe reads its shared snapshots, so concurrent
+    jobs poll their endpoints together.
+    """
+
+    def __init__(
+        self,
+        environment_manager: SageMakerEnvironmentManager,
+        tracker: SpendTracker,
+        status_service: Optional[StatusService] = None,
+    ):
+        self.environment_manager = environment_manager
+        self.tracker = tracker
+        self.status_service = status_service
+
+    def __repr__(self) -> str:
+        return (
+            f"MeteredEnvironmentManager(environment_manager="
+            f"{self.environment_manager}, tracker={self.tracker})"
+        )
+
+    def observe(self, config: Config) -> None:
+        endpoint_name = config.parameters[Parameter.endpoint_name]
+        if self.status_service is not None:
+            count = self.status_service.status(endpoint_name).current_instance_count
+        else:
+            count = self.environment_manager.get_endpoint(
+                endpoint_name
+            ).current_instance_count
+        self.tracker.update(
+            endpoint_name,
+            config.parameters[Parameter.instance_type],
+            count or 0,
+        )
+
+    def _changed(self, config: Config) -> None:
+        if self.status_service is not None:
+            self.status_service.invalidate(config.parameters[Parameter.endpoint_name])
+
+    def setup(self, config: Config) -> None:
+        # Instances are billed from the start of creation, so count the
+        # requested instances during setup, then check what is actually up.
+        if Parameter.initial_instance_count in config.parameters:
+            count = int(config.parameters[Parameter.initial_instance_count])
+        else:
+            count = int(config.parameters[Parameter.scaling_min_instance_count])
+        self.tracker.update(
+            config.parameters[Parameter.endpoint_name],
+            config.parameters[Parameter.instance_type],
+            count,
+        )
+        self.environment_manager.setup(config)
+        self._changed(config)
+        self.observe(config)
+        log.info(f"Test spend so far: ${self.tracker.total():.2f}")
+
+    def teardown(self, config: Config) -> None:
+        self.observe(config)
+        self.environment_manager.teardown(config)
+        self._changed(config)
+        self.tracker.update(
+            config.parameters[Parameter.endpoint_name],
+            config.parameters[Parameter.instance_type],
+            0,
+        )
+        log.info(f"Test spend so far: ${self.tracker.total():.2f}")
@@ -0,0 +1,338 @@
+from botocore.exceptions import ClientError
+from contextlib import closing
+from decimal import Decimal
+import json
+import logging.config
+import os
+from perfsize.perfsize import Config, EnvironmentManager
+from perfsizesagemaker.clock import Clock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.process import process_alive
+import socket
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# How long setup waits before trying again after SageMaker reports
+# ResourceLimitExceeded, and how many times it tries.
+RESOURCE_LIMIT_RETRY_SECONDS = 60
+RESOURCE_LIMIT_RETRIES = 60
+
+# How often a SharedInstanceQuota checks the database for room.
+SHARED_QUOTA_POLL_SECONDS = 15
+
+
+def instances_needed(config: Config) -> int:
+    """Most instances a config can run at once. Auto scale configs can grow
+    to their max count during a run, so that much is reserved."""
+    if Parameter.scaling_max_instance_count in config.parameters:
+        return int(config.parameters[Parameter.scaling_max_instance_count])
+    return int(config.parameters[Parameter.initial_instance_count])
+
+
+def load_type_limits(quotas_file: str) -> Dict[str, int]:
+    """Read a json mapping of instance type to the most instances of that
+    type the account may run as endpoints, like {"ml.m5.large": 4}."""
+    with open(quotas_file, "r") as f:
+        limits = json.load(f)
+    if not isinstance(limits, dict):
+        raise RuntimeError(f"ERROR: {quotas_file} must map instance type to count")
+    return {str(instance_type): int(count) for instance_type, count in limits.items()}
+
+
+class InstanceQuota:
+    """Limits on instances in use by concurrent sizing jobs.
+
+    max_instances caps the total across all instance types, and type_limits
+    caps each listed type, matching the per type SageMaker endpoint quotas.
+    Each owner (one endpoint per job) holds some number of instances of one
+    type. Owners waiting for room are served by priority, highest first, so
+    jobs with the most estimated time left get instances before short ones.
+    """
+
+    def __init__(
+        self,
+        max_instances: Optional[int] = None,
+        type_limits: Optional[Dict[str, int]] = None,
+    ):
+        if max_instances is None and not type_limits:
+            raise RuntimeError("ERROR: quota needs max_instances or type_limits")
+        limits = dict(type_limits or {})
+        if max_instances is not None:
+            limits["max_instances"] = max_instances
+        for name, limit in limits.items():
+            if limit < 1:
+                raise RuntimeError(
+                    f"ERROR: {name} quota must be positive, got: {limit}"
+                )
+        self.max_instances = max_instances
+        self.type_limits = type_limits or {}
+        self.condition = threading.Condition()
+        # owner -> (instance_type, count) for owners holding instances
+        self.held: Dict[str, Tuple[str, int]] = {}
+        # owner -> (priority, instance_type, count) for owners waiting in acquire
+        self.waiting: Dict[str, Tuple[Decimal, str, int]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceQuota(max_instances={self.max_instances}, "
+            f"type_limits={self.type_limits}, held={self.held}, "
+            f"waiting={self.waiting})"
+        )
+
+    def _check(self, owner: str, instance_type: str, count: int) -> None:
+        # Fail fast on requests that could never be granted.
+        for limit in [self.max_instances, self.type_limits.get(instance_type)]:
+            if limit is not None and count > limit:
+                raise RuntimeError(
+                    f"ERROR: {owner} needs {count} {instance_type} instances, "
+                    f"more than the quota of {limit}"
+                )
+
+    def _fits(
+        self,
+        held: Dict[str, Tuple[str, int]],
+        owner: str,
+        instance_type: str,
+        count: int,
+    ) -> bool:
+        others = [value for name, value in held.items() if name != owner]
+        if self.max_instances is not None:
+            if sum(n for _, n in others) + count > self.max_instances:
+                return False
+        limit = self.type_limits.get(instance_type)
+        if limit is not None:
+            same_type = sum(n for t, n in others if t == instance_type)
+            if same_type + count > limit:
+                return False
+        return True
+
+    def _turn(
+        self,
+        held: Dict[str, Tuple[str, int]],
+        waiting: Dict[str, Tuple[Decimal, str, int]],
+        owner: str,
+    ) -> bool:
+        # Only the highest priority waiter that fits may go next.
+        priority, instance_type, count = waiting[owner]
+        if not self._fits(held, owner, instance_type, count):
+            return False
+        for other, (other_priority, other_type, other_count) in waiting.items():
+            if (
+                other != owner
+                and other_priority > priority
+                and self._fits(held, other, other_type, other_count)
+            ):
+                return False
+        return True
+
+    def acquire(
+        self, owner: str, count: int, priority: Decimal, instance_type: str = ""
+    ) -> None:
+        """Block until owner can hold count instances of instance_type,
+        replacing what it held before."""
+        self._check(owner, instance_type, count)
+        with self.condition:
+            self.waiting[owner] = (priority, instance_type, count)
+            try:
+                while not self._turn(self.held, self.waiting, owner):
+                    log.debug(f"{owner} waiting for {count} instances: {self}")
+                    self.condition.wait()
+            finally:
+                del self.waiting[owner]
+            self.held[owner] = (instance_type, count)
+            self.condition.notify_all()
+
+    def release(self, owner: str) -> None:
+        with self.condition:
+            self.held.pop(owner, None)
+            self.condition.notify_all()
+
+
+class SharedInstanceQuota(InstanceQuota):
+    """InstanceQuota kept in a SQLite file, so separate perfsizesagemaker
+    processes on the same host (like parallel CI jobs) share the limits.
+
+    Rows left behind by processes that died are cleared on the next check.
+    Waiters poll the file instead of being notified.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_instances: Optional[int] = None,
+        type_limits: Optional[Dict[str, int]] = None,
+        clock: Optional[Clock] = None,
+        poll_seconds: float = SHARED_QUOTA_POLL_SECONDS,
+    ):
+        super().__init__(max_instances, type_limits)
+        self.path = path
+        self.clock = clock if clock is not None else Clock()
+        self.poll_seconds = poll_seconds
+        self.host = socket.gethostname()
+        with closing(self._connect()) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS held (owner TEXT PRIMARY KEY, "
+                "instance_type TEXT, count INTEGER, host TEXT, pid INTEGER)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS waiting (owner TEXT PRIMARY KEY, "
+                "priority TEXT, instance_type TEXT, count INTEGER, host TEXT, "
+                "pid INTEGER)"
+            )
+
+    def __repr__(self) -> str:
+        return (
+            f"SharedInstanceQuota(path={self.path}, "
+            f"max_instances={self.max_instances}, type_limits={self.type_limits})"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are started explicitly.
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def _clear_dead(self, db: sqlite3.Connection) -> None:
+        for table in ["held", "waiting"]:
+            rows = db.execute(
+                f"SELECT DISTINCT pid FROM {table} WHERE host = ?", (self.host,)
+            ).fetchall()
+            for (pid,) in rows:
+                if not process_alive(pid):
+                    log.warning(f"Clearing {table} quota rows of dead process {pid}")
+                    db.execute(
+                        f"DELETE FROM {table} WHERE host = ? AND pid = ?",
+                        (self.host, pid),
+                    )
+
+    def _state(
+        self, db: sqlite3.Connection
+    ) -> Tuple[Dict[str, Tuple[str, int]], Dict[str, Tuple[Decimal, str, int]]]:
+        held = {
+            owner: (instance_type, count)
+            for owner, instance_type, count in db.execute(
+                "SELECT owner, instance_type, count FROM held"
+            )
+        }
+        waiting = {
+            owner: (Decimal(priority), instance_type, count)
+            for owner, priority, instance_type, count in db.execute(
+                "SELECT owner, priority, instance_type, count FROM waiting"
+            )
+        }
+        return held, waiting
+
+    def held_instances(self) -> Dict[str, Tuple[str, int]]:
+        with closing(self._connect()) as db:
+            return self._state(db)[0]
+
+    def acquire(
+        self, owner: str, count: int, priority: Decimal, instance_type: str = ""
+    ) -> None:
+        self._check(owner, instance_type, count)
+        with closing(self._connect()) as db:
+            try:
+                while True:
+                    db.execute("BEGIN IMMEDIATE")
+                    self._clear_dead(db)
+                    db.execute(
+                        "INSERT OR REPLACE INTO waiting VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            owner,
+                            f"{priority}",
+                            instance_type,
+                            count,
+                            self.host,
+                            os.getpid(),
+                        ),
+                    )
+                    held, waiting = self._state(db)
+                    if self._turn(held, waiting, owner):
+                        db.execute("DELETE FROM waiting WHERE owner = ?", (owner,))
+                        db.execute(
+                            "INSERT OR REPLACE INTO held VALUES (?, ?, ?, ?, ?)",
+                            (owner, instance_type, count, self.host, os.getpid()),
+                        )
+                        db.execute("COMMIT")
+                        return
+                    db.execute("COMMIT")
+                    log.debug(
+                        f"{owner} waiting for {count} {instance_type} instances, "
+                        f"held: {held}"
+                    )
+                    self.clock.sleep(self.poll_seconds)
+            except:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                db.execute("DELETE FROM waiting WHERE owner = ?", (owner,))
+                raise
+
+    def release(self, owner: str) -> None:
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM held WHERE owner = ?", (owner,))
+
+
+def _resource_limit_exceeded(err: Exception) -> bool:
+    return (
+        isinstance(err, ClientError)
+        and err.response.get("Error", {}).get("Code") == "ResourceLimitExceeded"
+    )
+
+
+class QuotaEnvironmentManager(EnvironmentManager):
+    """Wrap an environment manager so setup waits for room in an InstanceQuota.
+
+    Instances are reserved before setup and given back after teardown.
+    priority is called each time setup waits, so it can reflect the time the
+    job has left. If SageMaker still rejects the setup with
+    ResourceLimitExceeded, because something outside the quota is using
+    instances, the reservation is given back and setup is tried again later.
+    """
+
+    def __init__(
+        self,
+        environment_manager: EnvironmentManager,
+        quota: InstanceQuota,
+        owner: str,
+        priority: Callable[[], Decimal],
+        clock: Optional[Clock] = None,
+        retry_seconds: int = RESOURCE_LIMIT_RETRY_SECONDS,
+        retries: int = RESOURCE_LIMIT_RETRIES,
+    ):
+        self.environment_manager = environment_manager
+        self.quota = quota
+        self.owner = owner
+        self.priority = priority
+        self.clock = clock if clock is not None else Clock()
+        self.retry_seconds = retry_seconds
+        self.retries = retries
+
+    def __repr__(self) -> str:
+        return (
+            f"QuotaEnvironmentManager(environment_manager="
+            f"{self.environment_manager}, quota={self.quota}, owner={self.owner})"
+        )
+
+    def setup(self, config: Config) -> None:
+        instance_type = config.parameters.get(Parameter.instance_type, "")
+        for attempt in range(self.retries + 1):
+            self.quota.acquire(
+                self.owner, instances_needed(config), self.priority(), instance_type
+            )
+            try:
+                self.environment_manager.setup(config)
+                return
+            except Exception as err:
+                self.quota.release(self.owner)
+                if not _resource_limit_exceeded(err) or attempt == self.retries:
+                    raise
+                log.warning(
+                    f"{self.owner} hit ResourceLimitExceeded for {instance_type}, "
+                    f"retrying in {self.retry_seconds} seconds: {err}"
+                )
+                self.clock.sleep(self.retry_seconds)
+
+    def teardown(self, config: Config) -> None:
+        self.environment_manager.teardown(config)
+        self.quota.release(self.owner)
@@ -0,0 +1,324 @@
+import logging.config
+from perfsize.perfsize import (
+    Config,
+    EnvironmentManager,
+    LoadManager,
+    ResultManager,
+    Run,
+)
+from perfsizesagemaker.clock import Clock, MILLISECONDS_PER_SECOND, Timer
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+import threading
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# SageMaker endpoint and endpoint config names are at most this long.
+MAX_NAME_LENGTH = 63
+
+# How often the ledger checks whether retired endpoints are gone.
+RETIRED_POLL_SECONDS = 30
+
+# Endpoint statuses that can be deleted right away. Endpoints still changing
+# are torn down as usual, waiting for them first.
+RETIRABLE_STATUSES = ["InService", "OutOfService", "Failed"]
+
+
+class RetiredEndpoint:
+    """Entry of the CleanupLedger for one endpoint being deleted."""
+
+    def __init__(
+        self,
+        endpoint_name: str,
+        endpoint_config_name: str,
+        instance_type: str,
+        retired_ms: int,
+    ):
+        self.endpoint_name = endpoint_name
+        self.endpoint_config_name = endpoint_config_name
+        self.instance_type = instance_type
+        self.retired_ms = retired_ms
+        # Deleting until the endpoint is gone, then Deleted once its endpoint
+        # config is deleted too, or Failed with the error.
+        self.status = "Deleting"
+        self.deleted_ms: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"RetiredEndpoint(endpoint_name={self.endpoint_name}, "
+            f"endpoint_config_name={self.endpoint_config_name}, "
+            f"status={self.status}, retired_ms={self.retired_ms}, "
+            f"deleted_ms={self.deleted_ms}, error={self.error})"
+        )
+
+
+class CleanupLedger:
+    """Endpoints retired by RetiringEnvironmentManager, until deleted.
+
+    One per job, shared by the environment managers of every phase, so fresh
+    names never repeat and drain can finish all the cleanup before the job
+    exits. While any endpoint is Deleting, a Clock.every timer checks on them
+    in the background and deletes the endpoint config of each one gone.
+    """
+
+    def __init__(self, clock: Clock, poll_seconds: float = RETIRED_POLL_SECONDS):
+        self.clock = clock
+        self.poll_seconds = poll_seconds
+        self.lock = threading.Lock()
+        self.entries: List[RetiredEndpoint] = []
+        # Environment manager that retired each endpoint still Deleting.
+        self.managers: Dict[str, MeteredEnvironmentManager] = {}
+        # Fresh name -> name it was made from, to keep suffixes from piling up.
+        self.bases: Dict[str, str] = {}
+        # Plan endpoint name -> endpoint and endpoint config names deployed for
+        # it, once its configs moved to fresh names.
+        self.renamed: Dict[str, Tuple[str, str]] = {}
+        self.generation = 0
+        self.timer: Optional[Timer] = None
+
+    def __repr__(self) -> str:
+        return f"CleanupLedger(entries={self.entries})"
+
+    def retired(self, endpoint_name: str) -> bool:
+        with self.lock:
+            return any(entry.endpoint_name == endpoint_name for entry in self.entries)
+
+    def pending(self) -> List[RetiredEndpoint]:
+        with self.lock:
+            return [entry for entry in self.entries if entry.status == "Deleting"]
+
+    def _fresh(self, name: str, suffix: str) -> str:
+        base = self.bases.get(name, name)
+        fresh = base[: MAX_NAME_LENGTH - len(suffix)] + suffix
+        self.bases[fresh] = base
+        return fresh
+
+    def fresh_names(
+        self, endpoint_name: str, endpoint_config_name: str
+    ) -> Tuple[str, str]:
+        """Unused endpoint and endpoint config names, like name-1, name-2."""
+        with self.lock:
+            self.generation = self.generation + 1
+            suffix = f"-{self.generation}"
+            return (
+                self._fresh(endpoint_name, suffix),
+                self._fresh(endpoint_config_name, suffix),
+            )
+
+    def deployed(self, config: Config) -> Config:
+        """Copy of config with the names of the endpoint deployed for it. The
+        config itself keeps the plan's names, for the history and reports."""
+        with self.lock:
+            names = self.renamed.get(config.parameters[Parameter.endpoint_name])
+        if names is None:
+            return config
+        parameters = dict(config.parameters)
+        (
+            parameters[Parameter.endpoint_name],
+            parameters[Parameter.endpoint_config_name],
+        ) = names
+        deployed = Config(parameters=parameters, requirements=config.requirements)
+        deployed.runs = config.runs
+        return deployed
+
+    def rename(self, config: Config) -> Config:
+        """Move config and the rest of its plan to fresh names."""
+        deployed = self.deployed(config)
+        names = self.fresh_names(
+            deployed.parameters[Parameter.endpoint_name],
+            deployed.parameters[Parameter.endpoint_config_name],
+        )
+        with self.lock:
+            self.renamed[config.parameters[Parameter.endpoint_name]] = names
+        return self.deployed(config)
+
+    def add(
+        self, entry: RetiredEndpoint, environment_manager: MeteredEnvironmentManager
+    ) -> None:
+        with self.lock:
+            self.entries.append(entry)
+            self.managers[entry.endpoint_name] = environment_manager
+            if self.timer is None:
+                self.timer = self.clock.every(self.poll_seconds, self.poll)
+
+    def _finish(self, entry: RetiredEndpoint) -> None:
+        # Endpoint is gone: delete its endpoint config and stop billing it.
+        environment_manager = self.managers[entry.endpoint_name]
+        sagemaker = environment_manager.environment_manager
+        try:
+            if sagemaker.get_endpoint_config(entry.endpoint_config_name):
+                sagemaker.delete_endpoint_config(entry.endpoint_config_name)
+        except Exception as e:
+            entry.status = "Failed"
+            entry.error = f"{type(e).__name__}: {e}"
+            log.error(f"Cleanup of Endpoint {entry.endpoint_name} failed: {e}")
+            return
+        environment_manager.tracker.update(entry.endpoint_name, entry.instance_type, 0)
+        entry.deleted_ms = self.clock.time_ms()
+        entry.status = "Deleted"
+        with self.lock:
+            self.managers.pop(entry.endpoint_name)
+        log.info(
+            f"Retired Endpoint {entry.endpoint_name} deleted after "
+            f"{(entry.deleted_ms - entry.retired_ms) // MILLISECONDS_PER_SECOND}s"
+        )
+
+    def poll(self) -> None:
+        for entry in self.pending():
+            sagemaker = self.managers[entry.endpoint_name].environment_manager
+            try:
+                status = sagemaker.get_endpoint(entry.endpoint_name).endpoint_status
+            except Exception as e:
+                # Runs on the timer thread, so leave it for the next poll.
+                log.warning(f"Could not check Endpoint {entry.endpoint_name}: {e}")
+                continue
+            if status == "NotFound":
+                self._finish(entry)
+            elif status == "Failed":
+                entry.status = "Failed"
+                entry.error = f"Endpoint {entry.endpoint_name} failed to delete"
+                log.error(f"ERROR: {entry.error}")
+        with self.lock:
+            if self.timer is not None and not any(
+                entry.status == "Deleting" for entry in self.entries
+            ):
+                self.timer.stop()
+                self.timer = None
+
+    def drain(self) -> None:
+        """Wait for every retired endpoint to be deleted."""
+        with self.lock:
+            timer = self.timer
+            self.timer = None
+        if timer is not None:
+            timer.stop()
+        for entry in self.pending():
+            sagemaker = self.managers[entry.endpoint_name].environment_manager
+            log.info(f"Waiting for retired Endpoint {entry.endpoint_name}...")
+            try:
+                sagemaker.wait_endpoint_deleted(entry.endpoint_name)
+            except Exception as e:
+                entry.status = "Failed"
+                entry.error = f"{type(e).__name__}: {e}"
+                continue
+            self._finish(entry)
+        failed = [entry for entry in self.entries if entry.status == "Failed"]
+        if failed:
+            raise RuntimeError(
+                f"ERROR: Cleanup failed for "
+                f"{', '.join(entry.endpoint_name for entry in failed)}, "
+                f"delete them by hand: {failed}"
+            )
+
+
+class RetiringEnvironmentManager(EnvironmentManager):
+    """Wrap a MeteredEnvironmentManager so teardown does not wait for deletion.
+
+    Teardown asks SageMaker to delete the endpoint and returns, leaving the
+    rest to the CleanupLedger. A setup that changes the instance type or
+    count of the endpoint retires it the same way instead of waiting for it.
+    Since the old name is taken until it is gone, the next setup deploys under
+    fresh names, kept in the ledger. RetiringLoadManager and
+    RetiringResultManager look them up, so the plan's configs keep their
+    names. A setup without a teardown before it keeps the name, so an
+    endpoint already set up right is still reused.
+    """
+
+    def __init__(
+        self, environment_manager: MeteredEnvironmentManager, ledger: CleanupLedger
+    ):
+        self.environment_manager = environment_manager
+        self.ledger = ledger
+
+    def __repr__(self) -> str:
+        return (
+            f"RetiringEnvironmentManager(environment_manager="
+            f"{self.environment_manager}, ledger={self.ledger})"
+        )
+
+    def setup(self, config: Config) -> None:
+        deployed = self.ledger.deployed(config)
+        endpoint_name = deployed.parameters[Parameter.endpoint_name]
+        sagemaker = self.environment_manager.environment_manager
+        actual = sagemaker.get_status(endpoint_name)
+        if actual.endpoint_status in RETIRABLE_STATUSES and actual != (
+            sagemaker.expected_status(deployed)
+        ):
+            # Changing it in place would wait for it to be deleted first.
+            self._retire(deployed)
+        if self.ledger.retired(endpoint_name):
+            deployed = self.ledger.rename(config)
+            log.info(
+                f"Endpoint {endpoint_name} is retired, setting up "
+                f"{deployed.parameters[Parameter.endpoint_name]} instead"
+            )
+        self.environment_manager.setup(deployed)
+
+    def teardown(self, config: Config) -> None:
+        self._retire(self.ledger.deployed(config))
+
+    def _retire(self, deployed: Config) -> None:
+        endpoint_name = deployed.parameters[Parameter.endpoint_name]
+        sagemaker = self.environment_manager.environment_manager
+        actual = sagemaker.get_status(endpoint_name)
+        if actual.endpoint_status not in RETIRABLE_STATUSES:
+            self.environment_manager.teardown(deployed)
+            return
+        # Keeps billing until the ledger sees it deleted, at the type it runs,
+        # which differs from the config when setup is changing the type.
+        instance_type = (
+            actual.instance_type or deployed.parameters[Parameter.instance_type]
+        )
+        self.environment_manager.observe(
+            Config(
+                parameters={
+                    **deployed.parameters,
+                    Parameter.instance_type: instance_type,
+                },
+                requirements=deployed.requirements,
+            )
+        )
+        sagemaker.delete_auto_scaling(endpoint_name)
+        sagemaker.request_delete_endpoint(endpoint_name)
+        self.ledger.add(
+            RetiredEndpoint(
+                endpoint_name=endpoint_name,
+                endpoint_config_name=actual.endpoint_config_name
+                or deployed.parameters[Parameter.endpoint_config_name],
+                instance_type=instance_type,
+                retired_ms=self.ledger.clock.time_ms(),
+            ),
+            self.environment_manager,
+        )
+        log.info(f"Endpoint {endpoint_name} retired, deleting in the background")
+
+
+class RetiringLoadManager(LoadManager):
+    """Wrap a load manager to send to the endpoint deployed for each config."""
+
+    def __init__(self, load_manager: LoadManager, ledger: CleanupLedger):
+        self.load_manager = load_manager
+        self.ledger = ledger
+
+    def __repr__(self) -> str:
+        return f"RetiringLoadManager(load_manager={self.load_manager})"
+
+    def send(self, config: Config) -> Run:
+        return self.load_manager.send(self.ledger.deployed(config))
+
+
+class RetiringResultManager(ResultManager):
+    """Wrap a result manager that looks at the endpoint deployed for each
+    config, like SpendResultManager."""
+
+    def __init__(self, result_manager: ResultManager, ledger: CleanupLedger):
+        self.result_manager = result_manager
+        self.ledger = ledger
+
+    def __repr__(self) -> str:
+        return f"RetiringResultManager(result_manager={self.result_manager})"
+
+    def query(self, config: Config, run: Run) -> None:
+        self.result_manager.query(self.ledger.deployed(config), run)
@@ -2,9 +2,17 @@ import boto3
 from botocore.exceptions import ClientError
 import logging.config
 from perfsize.perfsize import Config, EnvironmentManager
+from perfsizesagemaker.clock import Clock, MILLISECONDS_PER_SECOND
 from perfsizesagemaker.constants import Parameter
 from perfsizesagemaker.credentials import CredentialsManager
-from typing import Optional
+from perfsizesagemaker.environment.ledger import (
+    ENDPOINT,
+    ENDPOINT_CONFIG,
+    SCALABLE_TARGET,
+    ResourceLedger,
+)
+from perfsizesagemaker.tracing import Tracer, traced
+from typing import Any, Dict, Optional, Tuple
 import yaml
 
 log = logging.getLogger(__name__)
@@ -29,6 +37,10 @@ log = logging.getLogger(__name__)
 # - Each Endpoint has exactly one EndpointConfig.
 # - Each Endpoint has exactly one ProductionVariant.
 # - Each EndpointConfig has exactly one ProductionVariant.
+#   Except comparison endpoints with one variant per instance type, see
+#   perfsizesagemaker/environment/variants.py. Those are described with
+#   variant names and instance types joined by commas and counts summed, so
+#   they never match the expected state of a single variant setup.
 # - Each Endpoint has at most one ScalableTarget and at most one ScalingPolicy.
 # - ScalableTarget would define a DesiredInstanceCount with a min and max.
 # - ScalingPolicy would be based on SageMakerVariantInvocationsPerInstance.
@@ -339,14 +351,138 @@ class CombinedStatus:
 # }
 
 
+def parse_endpoint(endpoint_name: str, response: Dict[str, Any]) -> Endpoint:
+    assert response["EndpointName"] == endpoint_name
+    endpoint_config_name = None
+    variant_name = None
+    current_instance_count = None
+    desired_instance_count = None
+    if "EndpointConfigName" in response:
+        endpoint_config_name = response["EndpointConfigName"]
+    if "ProductionVariants" in response:
+        # Some states like "Creating" do not have ProductionVariants yet
+        variants = response["ProductionVariants"]
+        assert variants
+        variant_name = ",".join(variant["VariantName"] for variant in variants)
+        current_instance_count = sum(
+            variant["CurrentInstanceCount"] for variant in variants
+        )
+        desired_instance_count = sum(
+            variant["DesiredInstanceCount"] for variant in variants
+        )
+    endpoint_status = response["EndpointStatus"]
+    return Endpoint(
+        endpoint_name=endpoint_name,
+        endpoint_status=endpoint_status,
+        endpoint_config_name=endpoint_config_name,
+        variant_name=variant_name,
+        current_instance_count=current_instance_count,
+        desired_instance_count=desired_instance_count,
+    )
+
+
+def parse_endpoint_config(
+    endpoint_config_name: str, response: Dict[str, Any]
+) -> EndpointConfig:
+    assert response["EndpointConfigName"] == endpoint_config_name
+    variants = response["ProductionVariants"]
+    assert variants
+    model_name = ",".join(sorted({variant["ModelName"] for variant in variants}))
+    instance_type = ",".join(variant["InstanceType"] for variant in variants)
+    initial_instance_count = sum(
+        variant["InitialInstanceCount"] for variant in variants
+    )
+    return EndpointConfig(
+        endpoint_config_name=endpoint_config_name,
+        model_name=model_name,
+        instance_type=instance_type,
+        initial_instance_count=initial_instance_count,
+    )
+
+
+def parse_scalable_target(target: Dict[str, Any]) -> ScalableTarget:
+    return ScalableTarget(
+        scaling_min_instance_count=target["MinCapacity"],
+        scaling_max_instance_count=target["MaxCapacity"],
+    )
+
+
+def parse_scaling_policy(policy: Dict[str, Any]) -> ScalingPolicy:
+    return ScalingPolicy(
+        scaling_metric=policy["TargetTrackingScalingPolicyConfiguration"][
+            "PredefinedMetricSpecification"
+        ]["PredefinedMetricType"],
+        scaling_target=policy["TargetTrackingScalingPolicyConfiguration"][
+            "TargetValue"
+        ],
+    )
+
+
+def combine_status(
+    endpoint: Endpoint,
+    endpoint_config: Optional[EndpointConfig],
+    target: Optional[ScalableTarget],
+    policy: Optional[ScalingPolicy],
+) -> CombinedStatus:
+    """CombinedStatus from the described parts of one endpoint."""
+    endpoint_name = endpoint.endpoint_name
+    if endpoint.endpoint_status == "NotFound":
+        return CombinedStatus(
+            endpoint_name=endpoint_name,
+            endpoint_status="NotFound",
+        )
+    if endpoint_config is None:
+        raise RuntimeError(
+            f"ERROR: Endpoint {endpoint_name} is pointing to EndpointConfig {endpoint.endpoint_config_name}, but the config cannot be found."
+        )
+
+    # Check auto scale settings. Default is off.
+    scaling_enabled = False
+    scaling_min_instance_count = None
+    scaling_max_instance_count = None
+    scaling_metric = None
+    scaling_target = None
+    if target:
+        scaling_enabled = True
+        scaling_min_instance_count = target.scaling_min_instance_count
+        scaling_max_instance_count = target.scaling_max_instance_count
+    if policy:
+        scaling_enabled = True
+        scaling_metric = policy.scaling_metric
+        scaling_target = policy.scaling_target
+
+    return CombinedStatus(
+        endpoint_name=endpoint_name,
+        endpoint_status=endpoint.endpoint_status,
+        endpoint_config_name=endpoint.endpoint_config_name,
+        variant_name=endpoint.variant_name,
+        model_name=endpoint_config.model_name,
+        instance_type=endpoint_config.instance_type,
+        initial_instance_count=endpoint_config.initial_instance_count,
+        current_instance_count=endpoint.current_instance_count,
+        desired_instance_count=endpoint.desired_instance_count,
+        scaling_enabled=scaling_enabled,
+        scaling_min_instance_count=scaling_min_instance_count,
+        scaling_max_instance_count=scaling_max_instance_count,
+        scaling_metric=scaling_metric,
+        scaling_target=scaling_target,
+    )
+
+
 class SageMakerEnvironmentManager(EnvironmentManager):
     def __init__(
         self,
         iam_role_arn: Optional[str] = None,
         region: Optional[str] = None,
+        clock: Optional[Clock] = None,
+        tracer: Optional[Tracer] = None,
+        ledger: Optional[ResourceLedger] = None,
     ):
         self.credentials_manager = CredentialsManager(iam_role_arn, region)
         self.region = region
+        self.clock = clock if clock is not None else Clock()
+        self.tracer = tracer if tracer is not None else Tracer(self.clock)
+        self.ledger = ledger
 
     def _client(self, service_name: str) -> boto3.session.Session.client:
         (
@@ -362,6 +498,18 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             aws_session_token=aws_session_token,
         )
 
+    def _created(self, kind: str, name: str) -> None:
+        # Recorded before the create call, so a crash during it still leaves
+        # a row for the reaper.
+        if self.ledger is not None:
+            self.ledger.created(
+                kind, name, self.region, self.credentials_manager.iam_role_arn
+            )
+
+    def _deleted(self, kind: str, name: str) -> None:
+        if self.ledger is not None:
+            self.ledger.deleted(kind, name, self.region)
+
     def _sagemaker_client(self) -> boto3.session.Session.client:
         return self._client("sagemaker")
 
@@ -369,9 +517,12 @@ class SageMakerEnvironmentManager(EnvironmentManager):
         return self._client("application-autoscaling")
 
     def get_endpoint_config(
-        self, endpoint_config_name: str
+        self,
+        endpoint_config_name: str,
+        sagemaker: Optional[boto3.session.Session.client] = None,
     ) -> Optional[EndpointConfig]:
-        sagemaker = self._sagemaker_client()
+        if sagemaker is None:
+            sagemaker = self._sagemaker_client()
         try:
             response = sagemaker.describe_endpoint_config(
                 EndpointConfigName=endpoint_config_name
@@ -383,21 +534,15 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             else:
                 raise err
         log.debug(f"EndpointConfig {endpoint_config_name} description: {response}")
-        assert response["EndpointConfigName"] == endpoint_config_name
-        assert len(response["ProductionVariants"]) == 1
-        variant = response["ProductionVariants"][0]
-        model_name = variant["ModelName"]
-        instance_type = variant["InstanceType"]
-        initial_instance_count = variant["InitialInstanceCount"]
-        return EndpointConfig(
-            endpoint_config_name=endpoint_config_name,
-            model_name=model_name,
-            instance_type=instance_type,
-            initial_instance_count=initial_instance_count,
-        )
+        return parse_endpoint_config(endpoint_config_name, response)
 
-    def get_endpoint(self, endpoint_name: str) -> Endpoint:
-        sagemaker = self._sagemaker_client()
+    def get_endpoint(
+        self,
+        endpoint_name: str,
+        sagemaker: Optional[boto3.session.Session.client] = None,
+    ) -> Endpoint:
+        if sagemaker is None:
+            sagemaker = self._sagemaker_client()
         try:
             response = sagemaker.describe_endpoint(EndpointName=endpoint_name)
         except ClientError as err:
@@ -409,29 +554,23 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             else:
                 raise (err)
         log.debug(f"Endpoint {endpoint_name} description: {response}")
-        assert response["EndpointName"] == endpoint_name
-        endpoint_config_name = None
-        variant_name = None
-        current_instance_count = None
-        desired_instance_count = None
-        if "EndpointConfigName" in response:
-            endpoint_config_name = response["EndpointConfigName"]
-        if "ProductionVariants" in response:
-            # Some states like "Creating" do not have ProductionVariants yet
-            assert len(response["ProductionVariants"]) == 1
-            variant = response["ProductionVariants"][0]
-            variant_name = variant["VariantName"]
-            current_instance_count = variant["CurrentInstanceCount"]
-            desired_instance_count = variant["DesiredInstanceCount"]
-        endpoint_status = response["EndpointStatus"]
-        return Endpoint(
-            endpoint_name=endpoint_name,
-            endpoint_status=endpoint_status,
-            endpoint_config_name=endpoint_config_name,
-            variant_name=variant_name,
-            current_instance_count=current_instance_count,
-            desired_instance_count=desired_instance_count,
-        )
+        return parse_endpoint(endpoint_name, response)
+
+    def get_variant_instance_counts(self, endpoint_name: str) -> Dict[str, int]:
+        """Current instance count per variant, empty if not found or still
+        Creating."""
+        sagemaker = self._sagemaker_client()
+        try:
+            response = sagemaker.describe_endpoint(EndpointName=endpoint_name)
+        except ClientError as err:
+            if err.args and "Could not find endpoint" in err.args[0]:
+                return {}
+            else:
+                raise (err)
+        return {
+            variant["VariantName"]: variant["CurrentInstanceCount"]
+            for variant in response.get("ProductionVariants", [])
+        }
 
     def get_scalable_target(self, resource_id: str) -> Optional[ScalableTarget]:
         autoscaling = self._autoscaling_client()
@@ -443,10 +582,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             assert len(response["ScalableTargets"]) == 1
             target = response["ScalableTargets"][0]
             assert target["ResourceId"] == resource_id
-            return ScalableTarget(
-                scaling_min_instance_count=target["MinCapacity"],
-                scaling_max_instance_count=target["MaxCapacity"],
-            )
+            return parse_scalable_target(target)
         return None
 
     def get_scaling_policy(self, resource_id: str) -> Optional[ScalingPolicy]:
@@ -459,27 +595,17 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             assert len(response["ScalingPolicies"]) == 1
             policy = response["ScalingPolicies"][0]
             assert policy["ResourceId"] == resource_id
-            return ScalingPolicy(
-                scaling_metric=policy["TargetTrackingScalingPolicyConfiguration"][
-                    "PredefinedMetricSpecification"
-                ]["PredefinedMetricType"],
-                scaling_target=policy["TargetTrackingScalingPolicyConfiguration"][
-                    "TargetValue"
-                ],
-            )
+            return parse_scaling_policy(policy)
         return None
 
     def _resource_id(self, endpoint_name: str, variant_name: str) -> str:
         return f"endpoint/{endpoint_name}/variant/{variant_name}"
 
-    def get_status(self, endpoint_name: str) -> CombinedStatus:
+    def _get_status(self, endpoint_name: str) -> CombinedStatus:
         # Check Endpoint
         endpoint = self.get_endpoint(endpoint_name)
         if endpoint.endpoint_status == "NotFound":
-            return CombinedStatus(
-                endpoint_name=endpoint_name,
-                endpoint_status="NotFound",
-            )
+            return combine_status(endpoint, None, None, None)
         endpoint_config_name = endpoint.endpoint_config_name
         if not endpoint_config_name:
             raise RuntimeError(
@@ -491,51 +617,21 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             )
         resource_id = self._resource_id(endpoint_name, endpoint.variant_name)
 
-        # Check EndpointConfig
-        endpoint_config = self.get_endpoint_config(endpoint_config_name)
-        if endpoint_config is None:
-            raise RuntimeError(
-                f"ERROR: Endpoint {endpoint_name} is pointing to EndpointConfig {endpoint_config_name}, but the config cannot be found."
-            )
-
-        # Check auto scale settings. Default is off.
-        scaling_enabled = False
-        scaling_min_instance_count = None
-        scaling_max_instance_count = None
-        scaling_metric = None
-        scaling_target = None
-
-        # Check ScalableTargets
-        target = self.get_scalable_target(resource_id)
-        if target:
-            scaling_enabled = True
-            scaling_min_instance_count = target.scaling_min_instance_count
-            scaling_max_instance_count = target.scaling_max_instance_count
-
-        # Check ScalingPolicies
-        policy = self.get_scaling_policy(resource_id)
-        if policy:
-            scaling_enabled = True
-            scaling_metric = policy.scaling_metric
-            scaling_target = policy.scaling_target
-
-        return CombinedStatus(
-            endpoint_name=endpoint_name,
-            endpoint_status=endpoint.endpoint_status,
-            endpoint_config_name=endpoint_config_name,
-            variant_name=endpoint.variant_name,
-            model_name=endpoint_config.model_name,
-            instance_type=endpoint_config.instance_type,
-            initial_instance_count=endpoint_config.initial_instance_count,
-            current_instance_count=endpoint.current_instance_count,
-            desired_instance_count=endpoint.desired_instance_count,
-            scaling_enabled=scaling_enabled,
-            scaling_min_instance_count=scaling_min_instance_count,
-            scaling_max_instance_count=scaling_max_instance_count,
-            scaling_metric=scaling_metric,
-            scaling_target=scaling_target,
+        # Check EndpointConfig, ScalableTargets, and ScalingPolicies
+        return combine_status(
+            endpoint,
+            self.get_endpoint_config(endpoint_config_name),
+            self.get_scalable_target(resource_id),
+            self.get_scaling_policy(resource_id),
         )
 
+    def get_status(self, endpoint_name: str) -> CombinedStatus:
+        with self.tracer.span("get status", endpoint_name=endpoint_name) as span:
+            status = self._get_status(endpoint_name)
+            span.attributes["endpoint_status"] = f"{status.endpoint_status}"
+            return status
+
+    @traced("delete auto scaling", "endpoint_name")
     def delete_auto_scaling(self, endpoint_name: str) -> None:
         log.debug(
             f"About to delete auto scaling settings for Endpoint {endpoint_name}..."
@@ -577,32 +673,46 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             log.debug(f"Removed scaling policy for resource {resource_id}: {response}")
         else:
             log.debug(f"No scaling policy found for resource {resource_id}")
+        self._deleted(SCALABLE_TARGET, resource_id)
 
+    @traced("wait endpoint deleted", "endpoint_name")
     def wait_endpoint_deleted(self, endpoint_name: str) -> None:
         log.debug(f"About to wait for Endpoint {endpoint_name} to be deleted...")
         client = self._sagemaker_client()
         waiter = client.get_waiter("endpoint_deleted")
+        start = self.clock.time_ms()
         waiter.wait(
             EndpointName=endpoint_name, WaiterConfig={"Delay": 30, "MaxAttempts": 60}
         )
-        log.debug(f"Endpoint {endpoint_name} should be deleted now")
+        seconds = (self.clock.time_ms() - start) // MILLISECONDS_PER_SECOND
+        log.debug(f"Endpoint {endpoint_name} should be deleted now after {seconds}s")
 
-    def delete_endpoint(self, endpoint_name: str) -> None:
+    @traced("request delete endpoint", "endpoint_name")
+    def request_delete_endpoint(self, endpoint_name: str) -> None:
         log.debug(f"About to delete Endpoint {endpoint_name}...")
         client = self._sagemaker_client()
         response = client.delete_endpoint(EndpointName=endpoint_name)
         log.debug(f"Endpoint {endpoint_name} delete response {response}")
+        self._deleted(ENDPOINT, endpoint_name)
+
+    @traced("delete endpoint", "endpoint_name")
+    def delete_endpoint(self, endpoint_name: str) -> None:
+        self.request_delete_endpoint(endpoint_name)
         self.wait_endpoint_deleted(endpoint_name)
 
+    @traced("wait endpoint in service", "endpoint_name")
     def wait_endpoint_in_service(self, endpoint_name: str) -> None:
         log.debug(f"About to wait for Endpoint {endpoint_name} to be InService")
         client = self._sagemaker_client()
         waiter = client.get_waiter("endpoint_in_service")
+        start = self.clock.time_ms()
         waiter.wait(
             EndpointName=endpoint_name, WaiterConfig={"Delay": 30, "MaxAttempts": 120}
         )
-        log.debug(f"Endpoint {endpoint_name} should be InService now")
+        seconds = (self.clock.time_ms() - start) // MILLISECONDS_PER_SECOND
+        log.debug(f"Endpoint {endpoint_name} should be InService now after {seconds}s")
 
+    @traced("delete endpoint config", "endpoint_config_name")
     def delete_endpoint_config(self, endpoint_config_name: str) -> None:
         log.debug(f"About to delete EndpointConfig {endpoint_config_name}...")
         client = self._sagemaker_client()
@@ -610,7 +720,14 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             EndpointConfigName=endpoint_config_name
         )
         log.debug(f"EndpointConfig {endpoint_config_name} delete response {response}")
+        self._deleted(ENDPOINT_CONFIG, endpoint_config_name)
 
+    @traced(
+        "create endpoint config",
+        "endpoint_config_name",
+        "instance_type",
+        "initial_instance_count",
+    )
     def create_endpoint_config(
         self,
         endpoint_config_name: str,
@@ -619,6 +736,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
         initial_instance_count: int,
         instance_type: str,
     ) -> None:
+        self._created(ENDPOINT_CONFIG, endpoint_config_name)
         client = self._sagemaker_client()
         response = client.create_endpoint_config(
             EndpointConfigName=endpoint_config_name,
@@ -633,6 +751,41 @@ class SageMakerEnvironmentManager(EnvironmentManager):
         )
         log.debug(f"EndpointConfig {endpoint_config_name} creation response {response}")
 
+    @traced(
+        "create endpoint config",
+        "endpoint_config_name",
+        instance_type=lambda arguments: ",".join(
+            instance_type for instance_type, _ in arguments["variants"].values()
+        ),
+    )
+    def create_variants_endpoint_config(
+        self,
+        endpoint_config_name: str,
+        model_name: str,
+        variants: Dict[str, Tuple[str, int]],
+    ) -> None:
+        """EndpointConfig with one variant per entry of variant name to
+        instance type and count, all with the same weight."""
+        self._created(ENDPOINT_CONFIG, endpoint_config_name)
+        client = self._sagemaker_client()
+        response = client.create_endpoint_config(
+            EndpointConfigName=endpoint_config_name,
+            ProductionVariants=[
+                {
+                    "VariantName": variant_name,
+                    "ModelName": model_name,
+                    "InitialInstanceCount": initial_instance_count,
+                    "InstanceType": instance_type,
+                    "InitialVariantWeight": 1,
+                }
+                for variant_name, (
+                    instance_type,
+                    initial_instance_count,
+                ) in variants.items()
+            ],
+        )
+        log.debug(f"EndpointConfig {endpoint_config_name} creation response {response}")
+
     # create_endpoint()
     # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sagemaker.html#SageMaker.Client.create_endpoint
     # You must not delete an EndpointConfig that is in use by an endpoint or while
@@ -641,6 +794,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
     # Call DescribeEndpointConfig before calling CreateEndpoint to minimize the
     # potential impact of an eventually consistent read.
     # To check the status of an endpoint, use the DescribeEndpoint API.
+    @traced("create endpoint", "endpoint_name")
     def create_endpoint(self, endpoint_name: str, endpoint_config_name: str) -> None:
         endpoint_config = self.get_endpoint_config(endpoint_config_name)
         if endpoint_config is None:
@@ -648,6 +802,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
                 f"ERROR: Endpoint {endpoint_name} cannot be created if EndpointConfig {endpoint_config_name} is not found."
             )
 
+        self._created(ENDPOINT, endpoint_name)
         client = self._sagemaker_client()
         response = client.create_endpoint(
             EndpointName=endpoint_name,
@@ -656,6 +811,13 @@ class SageMakerEnvironmentManager(EnvironmentManager):
         log.debug(f"Endpoint {endpoint_name} creation response {response}")
         self.wait_endpoint_in_service(endpoint_name)
 
+    @traced(
+        "create auto scaling",
+        "endpoint_name",
+        "scaling_min_instance_count",
+        "scaling_max_instance_count",
+        "scaling_target",
+    )
     def create_auto_scaling(
         self,
         endpoint_name: str,
@@ -686,6 +848,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             raise RuntimeError(
                 f"ERROR: Endpoint {endpoint_name} already has scalable target."
             )
+        self._created(SCALABLE_TARGET, resource_id)
         response = autoscaling.register_scalable_target(
             ServiceNamespace="sagemaker",
             ResourceId=resource_id,
@@ -756,6 +919,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             self.wait_endpoint_deleted(endpoint_name)
         elif endpoint_status == "NotFound":
             log.info(f"Endpoint {endpoint_name} not found.")
+            self._deleted(ENDPOINT, endpoint_name)
         else:
             raise RuntimeError(
                 f"ERROR: Endpoint {endpoint_name} has unrecognized status "
@@ -775,8 +939,10 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             log.info(f"EndpointConfig {endpoint_config_name} deleted.")
         else:
             log.info(f"EndpointConfig {endpoint_config_name} not found.")
+            self._deleted(ENDPOINT_CONFIG, endpoint_config_name)
 
-    def setup(self, config: Config) -> None:
+    def expected_status(self, config: Config) -> CombinedStatus:
+        """State setup leaves the endpoint of config in."""
         endpoint_name = config.parameters[Parameter.endpoint_name]
         endpoint_config_name = config.parameters[Parameter.endpoint_config_name]
         variant_name = config.parameters[Parameter.variant_name]
@@ -816,8 +982,7 @@ class SageMakerEnvironmentManager(EnvironmentManager):
                 config.parameters[Parameter.initial_instance_count]
             )
 
-        # Check if current state already set correctly
-        expected = CombinedStatus(
+        return CombinedStatus(
             endpoint_name=endpoint_name,
             endpoint_status="InService",
             endpoint_config_name=endpoint_config_name,
@@ -833,23 +998,35 @@ class SageMakerEnvironmentManager(EnvironmentManager):
             scaling_metric=scaling_metric,
             scaling_target=scaling_target,
         )
+
+    def setup(self, config: Config) -> None:
+        endpoint_name = config.parameters[Parameter.endpoint_name]
+        endpoint_config_name = config.parameters[Parameter.endpoint_config_name]
+
+        # Check if current state already set correctly
+        expected = self.expected_status(config)
         actual = self.get_status(endpoint_name)
         if actual == expected:
             log.info(f"No environment update needed: {actual}")
             return
 
         self.teardown(config)
+        initial_instance_count = expected.initial_instance_count
+        assert isinstance(initial_instance_count, int)  # help mypy
         self.create_endpoint_config(
             endpoint_config_name=endpoint_config_name,
-            variant_name=variant_name,
-            model_name=model_name,
+            variant_name=config.parameters[Parameter.variant_name],
+            model_name=config.parameters[Parameter.model_name],
             initial_instance_count=initial_instance_count,
-            instance_type=instance_type,
+            instance_type=config.parameters[Parameter.instance_type],
         )
         self.create_endpoint(
             endpoint_name=endpoint_name, endpoint_config_name=endpoint_config_name
         )
-        if scaling_enabled:
+        if expected.scaling_enabled:
+            scaling_min_instance_count = expected.scaling_min_instance_count
+            scaling_max_instance_count = expected.scaling_max_instance_count
+            scaling_target = expected.scaling_target
             if not scaling_min_instance_count:
                 raise RuntimeError(
                     f"ERROR: scaling_enabled so scaling_min_instance_count={scaling_min_instance_count} must be greater than 0."
@@ -0,0 +1,226 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging.config
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND
+from perfsizesagemaker.environment.sagemaker import (
+    CombinedStatus,
+    Endpoint,
+    EndpointConfig,
+    SageMakerEnvironmentManager,
+    ScalableTarget,
+    ScalingPolicy,
+    combine_status,
+    parse_scalable_target,
+    parse_scaling_policy,
+)
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+# How long a snapshot is used before the endpoint is described again.
+DEFAULT_TTL_SECONDS = 10
+
+# Most describe_endpoint calls in flight at once.
+DEFAULT_MAX_WORKERS = 8
+
+# describe_scalable_targets takes at most 50 ResourceIds per call.
+RESOURCE_IDS_PER_CALL = 50
+
+
+class StatusService:
+    """CombinedStatus snapshots of many endpoints from one polling loop.
+
+    Every endpoint asked about is watched. When any watched snapshot is older
+    than the TTL, all the watched ones are refreshed together: endpoints and
+    endpoint configs are described concurrently on one client, and auto scale
+    settings come from describe_scalable_targets and describe_scaling_policies
+    calls covering all the endpoints at once, instead of four calls with new
+    clients per endpoint like SageMakerEnvironmentManager.get_status.
+
+    Callers that ask while a refresh is running wait for it and share the
+    result, so many workflows can poll through one service. An endpoint that
+    cannot be described only fails the callers asking about it.
+    """
+
+    def __init__(
+        self,
+        environment_manager: SageMakerEnvironmentManager,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        if max_workers < 1:
+            raise RuntimeError(
+                f"ERROR: max_workers must be positive, got: {max_workers}"
+            )
+        self.environment_manager = environment_manager
+        self.clock = environment_manager.clock
+        self.ttl_ms = int(ttl_seconds * MILLISECONDS_PER_SECOND)
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.watched: Set[str] = set()
+        # endpoint name -> (time_ms described, status or why there is none)
+        self.snapshots: Dict[str, Tuple[int, Union[CombinedStatus, RuntimeError]]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"StatusService(environment_manager={self.environment_manager}, "
+            f"ttl_ms={self.ttl_ms}, watched={sorted(self.watched)})"
+        )
+
+    def _stale(self, now: int) -> List[str]:
+        # Refreshing everything at once keeps the snapshots in step, so the
+        # next refresh covers them all again.
+        if all(
+            name in self.snapshots and now - self.snapshots[name][0] < self.ttl_ms
+            for name in self.watched
+        ):
+            return []
+        return sorted(self.watched)
+
+    def statuses(self, endpoint_names: Iterable[str]) -> Dict[str, CombinedStatus]:
+        names = list(endpoint_names)
+        with self.lock:
+            self.watched.update(names)
+            now = self.clock.time_ms()
+            stale = self._stale(now)
+            if stale:
+                for name, status in self._describe(stale).items():
+                    self.snapshots[name] = (now, status)
+            statuses: Dict[str, CombinedStatus] = {}
+            for name in names:
+                snapshot = self.snapshots[name][1]
+                if isinstance(snapshot, RuntimeError):
+                    raise snapshot
+                statuses[name] = snapshot
+            return statuses
+
+    def status(self, endpoint_name: str) -> CombinedStatus:
+        return self.statuses([endpoint_name])[endpoint_name]
+
+    def invalidate(self, endpoint_name: Optional[str] = None) -> None:
+        """Drop snapshots and stop watching, for one endpoint or all. Call
+        after changing an endpoint, so the next status is described fresh."""
+        with self.lock:
+            if endpoint_name is None:
+                self.watched.clear()
+                self.snapshots.clear()
+            else:
+                self.watched.discard(endpoint_name)
+                self.snapshots.pop(endpoint_name, None)
+
+    def _describe(
+        self, endpoint_names: List[str]
+    ) -> Dict[str, Union[CombinedStatus, RuntimeError]]:
+        log.debug(f"Describing {len(endpoint_names)} endpoints: {endpoint_names}")
+        manager = self.environment_manager
+        sagemaker = manager._sagemaker_client()
+        workers = min(self.max_workers, len(endpoint_names))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            endpoints: Dict[str, Endpoint] = dict(
+                zip(
+                    endpoint_names,
+                    executor.map(
+                        lambda name: manager.get_endpoint(name, sagemaker),
+                        endpoint_names,
+                    ),
+                )
+            )
+            statuses: Dict[str, Union[CombinedStatus, RuntimeError]] = {}
+            resource_ids: Dict[str, str] = {}
+            config_names: List[str] = []
+            for name, endpoint in endpoints.items():
+                if endpoint.endpoint_status == "NotFound":
+                    continue
+                if not endpoint.endpoint_config_name:
+                    statuses[name] = RuntimeError(
+                        f"ERROR: Endpoint {name} has endpoint_config_name={endpoint.endpoint_config_name}"
+                    )
+                    continue
+                if not endpoint.variant_name:
+                    statuses[name] = RuntimeError(
+                        f"ERROR: Endpoint {name} has variant_name={endpoint.variant_name}"
+                    )
+                    continue
+                resource_ids[name] = manager._resource_id(name, endpoint.variant_name)
+                if endpoint.endpoint_config_name not in config_names:
+                    config_names.append(endpoint.endpoint_config_name)
+            endpoint_configs: Dict[str, Optional[EndpointConfig]] = dict(
+                zip(
+                    config_names,
+                    executor.map(
+                        lambda name: manager.get_endpoint_config(name, sagemaker),
+                        config_names,
+                    ),
+                )
+            )
+
+        targets: Dict[str, ScalableTarget] = {}
+        policies: Dict[str, ScalingPolicy] = {}
+        if resource_ids:
+            autoscaling = manager._autoscaling_client()
+            targets = self._scalable_targets(autoscaling, list(resource_ids.values()))
+            policies = self._scaling_policies(autoscaling, set(resource_ids.values()))
+
+        for name, endpoint in endpoints.items():
+            if name in statuses:
+                continue
+            endpoint_config = None
+            target = None
+            policy = None
+            if name in resource_ids:
+                assert endpoint.endpoint_config_name
+                endpoint_config = endpoint_configs[endpoint.endpoint_config_name]
+                target = targets.get(resource_ids[name])
+                policy = policies.get(resource_ids[name])
+            try:
+                statuses[name] = combine_status(
+                    endpoint, endpoint_config, target, policy
+                )
+            except RuntimeError as err:
+                statuses[name] = err
+        return statuses
+
+    def _scalable_targets(
+        self, autoscaling: Any, resource_ids: List[str]
+    ) -> Dict[str, ScalableTarget]:
+        targets: Dict[str, ScalableTarget] = {}
+        for i in range(0, len(resource_ids), RESOURCE_IDS_PER_CALL):
+            chunk = resource_ids[i : i + RESOURCE_IDS_PER_CALL]
+            next_token: Optional[str] = None
+            while True:
+                kwargs: Dict[str, Any] = {}
+                if next_token:
+                    kwargs["NextToken"] = next_token
+                response = autoscaling.describe_scalable_targets(
+                    ServiceNamespace="sagemaker", ResourceIds=chunk, **kwargs
+                )
+                for target in response["ScalableTargets"]:
+                    targets[target["ResourceId"]] = parse_scalable_target(target)
+                next_token = response.get("NextToken")
+                if not next_token:
+                    break
+        return targets
+
+    def _scaling_policies(
+        self, autoscaling: Any, resource_ids: Set[str]
+    ) -> Dict[str, ScalingPolicy]:
+        # describe_scaling_policies takes one ResourceId at most, so list the
+        # whole namespace and keep the policies of the endpoints asked about.
+        policies: Dict[str, ScalingPolicy] = {}
+        next_token: Optional[str] = None
+        while True:
+            kwargs: Dict[str, Any] = {}
+            if next_token:
+                kwargs["NextToken"] = next_token
+            response = autoscaling.describe_scaling_policies(
+                ServiceNamespace="sagemaker", **kwargs
+            )
+            for policy in response["ScalingPolicies"]:
+                resource_id = policy["ResourceId"]
+                if resource_id in resource_ids:
+                    assert resource_id not in policies
+                    policies[resource_id] = parse_scaling_policy(policy)
+            next_token = response.get("NextToken")
+            if not next_token:
+                break
+        return policies
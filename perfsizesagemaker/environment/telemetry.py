@@ -0,0 +1,128 @@
+import logging.config
+from perfsizesagemaker.clock import Timer
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+# Only for types, so perfsizesagemaker.main can read DEFAULT_SAMPLE_SECONDS
+# without importing boto3.
+if TYPE_CHECKING:
+    from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
+
+log = logging.getLogger(__name__)
+
+# How often instance counts are sampled during a run.
+DEFAULT_SAMPLE_SECONDS = 10
+
+
+class InstanceCountSample:
+    """Instance counts of an endpoint at one point in time. Counts are None
+    while the endpoint has no variants yet, or was not found."""
+
+    def __init__(
+        self,
+        time_ms: int,
+        current_instance_count: Optional[int],
+        desired_instance_count: Optional[int],
+    ):
+        self.time_ms = time_ms
+        self.current_instance_count = current_instance_count
+        self.desired_instance_count = desired_instance_count
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceCountSample(time_ms={self.time_ms}, "
+            f"current_instance_count={self.current_instance_count}, "
+            f"desired_instance_count={self.desired_instance_count})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, InstanceCountSample):
+            return NotImplemented
+        return (
+            self.time_ms == other.time_ms
+            and self.current_instance_count == other.current_instance_count
+            and self.desired_instance_count == other.desired_instance_count
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "time_ms": self.time_ms,
+            "current_instance_count": self.current_instance_count,
+            "desired_instance_count": self.desired_instance_count,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "InstanceCountSample":
+        return InstanceCountSample(
+            time_ms=int(data["time_ms"]),
+            current_instance_count=data["current_instance_count"],
+            desired_instance_count=data["desired_instance_count"],
+        )
+
+
+class InstanceCountSampler:
+    """Sample CurrentInstanceCount and DesiredInstanceCount of an endpoint at
+    a fixed interval in the background, between start and stop.
+
+    The interval runs on the environment manager's clock: a thread on a real
+    Clock, or timers fired as a VirtualClock is advanced by local runs. A
+    sample is also taken right at start and stop, so short runs still get
+    both ends. Failed samples are logged and skipped, so a throttled describe
+    call does not end the run.
+    """
+
+    def __init__(
+        self,
+        environment_manager: "SageMakerEnvironmentManager",
+        interval_seconds: float = DEFAULT_SAMPLE_SECONDS,
+    ):
+        self.environment_manager = environment_manager
+        self.clock = environment_manager.clock
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()
+        self.endpoint_name: Optional[str] = None
+        self.samples: List[InstanceCountSample] = []
+        self.timer: Optional[Timer] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceCountSampler(environment_manager="
+            f"{self.environment_manager}, interval_seconds={self.interval_seconds})"
+        )
+
+    def sample(self) -> None:
+        assert self.endpoint_name is not None  # help mypy
+        time_ms = self.clock.time_ms()
+        try:
+            endpoint = self.environment_manager.get_endpoint(self.endpoint_name)
+        except Exception as err:
+            log.warning(
+                f"Skipping instance count sample of {self.endpoint_name}: {err}"
+            )
+            return
+        with self.lock:
+            self.samples.append(
+                InstanceCountSample(
+                    time_ms=time_ms,
+                    current_instance_count=endpoint.current_instance_count,
+                    desired_instance_count=endpoint.desired_instance_count,
+                )
+            )
+
+    def start(self, endpoint_name: str) -> None:
+        if self.timer is not None:
+            raise RuntimeError(f"ERROR: {self} already sampling {self.endpoint_name}")
+        self.endpoint_name = endpoint_name
+        self.samples = []
+        self.sample()
+        self.timer = self.clock.every(self.interval_seconds, self.sample)
+
+    def stop(self) -> List[InstanceCountSample]:
+        """Stop sampling and return the samples in time order."""
+        if self.timer is None:
+            raise RuntimeError(f"ERROR: {self} was not started")
+        self.timer.stop()
+        self.timer = None
+        self.sample()
+        with self.lock:
+            return sorted(self.samples, key=lambda sample: sample.time_ms)
@@ -0,0 +1,105 @@
+import itertools
+import logging.config
+from perfsize.perfsize import Config, Plan
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
+from typing import Dict, Tuple
+
+log = logging.getLogger(__name__)
+
+
+def variant_name(parameters: Dict[str, str]) -> str:
+    """Name of the comparison variant for a config's instance type and count.
+    Variant names only allow letters, digits, and dashes."""
+    instance_type = parameters[Parameter.instance_type].replace(".", "-")
+    count = parameters[Parameter.initial_instance_count]
+    return f"{parameters[Parameter.variant_name]}-{instance_type}-{count}"
+
+
+class VariantsEnvironmentManager(MeteredEnvironmentManager):
+    """Deploy every instance type and count of a plan as production variants
+    of one endpoint, so they can be tested side by side under the same
+    conditions.
+
+    The first setup creates the endpoint with all the variants, and later
+    setups for other configs of the plan find it already there. Teardown
+    removes the endpoint and its config. Test spend is metered per variant.
+    """
+
+    def __init__(
+        self,
+        environment_manager: SageMakerEnvironmentManager,
+        tracker: SpendTracker,
+        plan: Plan,
+    ):
+        super().__init__(environment_manager, tracker)
+        # variant name -> (instance type, count)
+        self.variants: Dict[str, Tuple[str, int]] = {}
+        # From the parameter lists, as a LazyPlan only has the configs visited.
+        for variant, instance_type, count in itertools.product(
+            plan.parameter_lists[Parameter.variant_name],
+            plan.parameter_lists[Parameter.instance_type],
+            plan.parameter_lists[Parameter.initial_instance_count],
+        ):
+            name = variant_name(
+                {
+                    Parameter.variant_name: variant,
+                    Parameter.instance_type: instance_type,
+                    Parameter.initial_instance_count: count,
+                }
+            )
+            self.variants[name] = (instance_type, int(count))
+        self.deployed = False
+
+    def __repr__(self) -> str:
+        return (
+            f"VariantsEnvironmentManager(environment_manager="
+            f"{self.environment_manager}, variants={self.variants})"
+        )
+
+    def _update(self, endpoint_name: str, counts: Dict[str, int]) -> None:
+        for name, (instance_type, _) in self.variants.items():
+            self.tracker.update(
+                f"{endpoint_name}/{name}", instance_type, counts.get(name, 0)
+            )
+
+    def observe(self, config: Config) -> None:
+        endpoint_name = config.parameters[Parameter.endpoint_name]
+        self._update(
+            endpoint_name,
+            self.environment_manager.get_variant_instance_counts(endpoint_name),
+        )
+
+    def setup(self, config: Config) -> None:
+        if self.deployed:
+            return
+        endpoint_name = config.parameters[Parameter.endpoint_name]
+        endpoint_config_name = config.parameters[Parameter.endpoint_config_name]
+        # Start clean, whatever was left on this endpoint before.
+        self.environment_manager.teardown(config)
+        self.environment_manager.create_variants_endpoint_config(
+            endpoint_config_name=endpoint_config_name,
+            model_name=config.parameters[Parameter.model_name],
+            variants=self.variants,
+        )
+        self._update(
+            endpoint_name, {name: count for name, (_, count) in self.variants.items()}
+        )
+        self.environment_manager.create_endpoint(
+            endpoint_name=endpoint_name, endpoint_config_name=endpoint_config_name
+        )
+        self.deployed = True
+        self.observe(config)
+        log.info(
+            f"Endpoint {endpoint_name} in service with variants {self.variants}. "
+            f"Test spend so far: ${self.tracker.total():.2f}"
+        )
+
+    def teardown(self, config: Config) -> None:
+        self.observe(config)
+        self.environment_manager.teardown(config)
+        self._update(config.parameters[Parameter.endpoint_name], {})
+        self.deployed = False
+        log.info(f"Test spend so far: ${self.tracker.total():.2f}")
@@ -0,0 +1,520 @@
+from datetime import datetime
+from decimal import Decimal
+import logging.config
+import math
+import os
+from perfsize.perfsize import Config, LoadManager, Run
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND
+from perfsizesagemaker.environment.local import LocalSageMaker
+from perfsizesagemaker.load.payload import Payload
+from perfsizesagemaker.load.replay import GATLING_VERSION, TraceReader
+from perfsizesagemaker.load.sagemaker import run_tag as sagemaker_run_tag
+from perfsizesagemaker.result.histogram import RunHistogram
+import random
+from statistics import NormalDist
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+log = logging.getLogger(__name__)
+
+LOCAL_SCENARIO = "LocalSageMakerScenario"
+
+# Requests that cannot even queue are rejected quickly, like a throttled call.
+REJECTED_LATENCY_MS = 5
+
+# Service time quantiles per second used by EndpointSimulator.histogram.
+LATENCY_QUANTILES = 16
+
+
+class InstanceProfile:
+    """Runtime behavior of one instance of a given type.
+
+    capacity_tps: requests per second one instance can complete.
+    latency_median_ms, latency_sigma: lognormal service time when idle.
+    concurrency: requests one instance works on in parallel, used for the
+    queueing delay below capacity.
+    latency_ms_per_kb: service time added per KiB of request payload.
+    """
+
+    def __init__(
+        self,
+        capacity_tps: float,
+        latency_median_ms: float,
+        latency_sigma: float,
+        concurrency: int = 1,
+        latency_ms_per_kb: float = 0.0,
+    ):
+        self.capacity_tps = capacity_tps
+        self.latency_median_ms = latency_median_ms
+        self.latency_sigma = latency_sigma
+        self.concurrency = concurrency
+        self.latency_ms_per_kb = latency_ms_per_kb
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceProfile(capacity_tps={self.capacity_tps}, "
+            f"latency_median_ms={self.latency_median_ms}, "
+            f"latency_sigma={self.latency_sigma}, "
+            f"concurrency={self.concurrency}, "
+            f"latency_ms_per_kb={self.latency_ms_per_kb})"
+        )
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "InstanceProfile":
+        return InstanceProfile(
+            capacity_tps=data["capacity_tps"],
+            latency_median_ms=data["latency_median_ms"],
+            latency_sigma=data.get("latency_sigma", 0.25),
+            concurrency=data.get("concurrency", 1),
+            latency_ms_per_kb=data.get("latency_ms_per_kb", 0.0),
+        )
+
+
+class SimulatedSecond:
+    """Endpoint state during one simulated second of load."""
+
+    def __init__(
+        self,
+        start: int,
+        arrivals: int,
+        accepted: int,
+        instances: int,
+        capacity: float,
+        backlog: float,
+        contention: float,
+    ):
+        self.start = start
+        self.arrivals = arrivals
+        self.accepted = accepted
+        self.instances = instances
+        self.capacity = capacity
+        self.backlog = backlog
+        self.contention = contention
+
+    def __repr__(self) -> str:
+        return (
+            f"SimulatedSecond(start={self.start}, arrivals={self.arrivals}, "
+            f"accepted={self.accepted}, instances={self.instances})"
+        )
+
+    def delay(self, i: int) -> float:
+        """Milliseconds the i-th accepted request of this second waits, on top
+        of its own service time."""
+        # Position in line, less what was served since the second began.
+        waiting = max(0.0, self.backlog + i - self.capacity * i / self.arrivals)
+        return self.contention + waiting / self.capacity * MILLISECONDS_PER_SECOND
+
+
+class EndpointSimulator:
+    """Runtime model of an endpoint in a LocalSageMaker account.
+
+    Steps through simulated time one second at a time. Below capacity, latency
+    is the lognormal service time plus an M/M/c style queueing delay
+    (Sakasegawa approximation). Above capacity, the extra requests build a
+    backlog that adds wait time, and once the backlog is longer than
+    queue_limit_seconds of work, new requests are rejected with 503. Capacity
+    follows the instances currently in service, so cold start of new
+    instances added by auto scaling shows up in the results.
+
+    With more than one payload, requests cycle through them by weight and
+    are named SageMaker-<endpoint>-<payload name>, like a Gatling scenario
+    that tags requests by payload.
+    """
+
+    def __init__(
+        self,
+        account: LocalSageMaker,
+        seed: Optional[int] = None,
+        payloads: Optional[List[Payload]] = None,
+    ):
+        self.account = account
+        self.payloads = payloads or []
+        self.profiles = {
+            instance_type: InstanceProfile.from_dict(profile)
+            for instance_type, profile in account.settings["instance_types"].items()
+        }
+        self.queue_limit_seconds = account.settings.get("queue_limit_seconds", 2)
+        self.random = random.Random(
+            account.settings.get("seed") if seed is None else seed
+        )
+
+    def __repr__(self) -> str:
+        return f"EndpointSimulator(profiles={self.profiles})"
+
+    def request_kinds(
+        self, endpoint_name: str, profile: InstanceProfile
+    ) -> List[Tuple[str, int, float]]:
+        # (request name, weight, extra service time ms) per payload sent.
+        if len(self.payloads) < 2:
+            size = self.payloads[0].size if self.payloads else 0
+            return [
+                (
+                    f"SageMaker-{endpoint_name}",
+                    100,
+                    profile.latency_ms_per_kb * size / 1024,
+                )
+            ]
+        return [
+            (
+                f"SageMaker-{endpoint_name}-{payload.name}",
+                payload.weight,
+                profile.latency_ms_per_kb * payload.size / 1024,
+            )
+            for payload in self.payloads
+        ]
+
+    def profile(
+        self, endpoint_name: str, variant_name: Optional[str] = None
+    ) -> InstanceProfile:
+        endpoint = self.account.endpoints.get(endpoint_name)
+        if endpoint is None:
+            raise RuntimeError(f"ERROR: Endpoint {endpoint_name} not found")
+        instance_type = endpoint.instance_type
+        if variant_name is not None:
+            instance_type = endpoint.variant(variant_name)[0]
+        if instance_type not in self.profiles:
+            raise RuntimeError(
+                f"ERROR: No local instance profile for type {instance_type}"
+            )
+        return self.profiles[instance_type]
+
+    def seconds(
+        self,
+        endpoint_name: str,
+        arrivals_per_second: Iterator[int],
+        variant_name: Optional[str] = None,
+    ) -> Iterator[SimulatedSecond]:
+        """Step the endpoint through simulated time, one second per arrival
+        count, yielding the state of each second before time moves on.
+
+        With variant_name, only that variant of a comparison endpoint gets the
+        load, and the clock is left for the caller to advance once all the
+        variants have had the same seconds."""
+        profile = self.profile(endpoint_name, variant_name)
+        backlog = 0.0
+        start = self.account.now
+        for elapsed, arrivals in enumerate(arrivals_per_second):
+            if variant_name is None:
+                instances = self.account.in_service_instance_count(endpoint_name)
+            else:
+                self.account.refresh()
+                endpoint = self.account.endpoints[endpoint_name]
+                instances = endpoint.variant(variant_name)[1]
+            capacity = profile.capacity_tps * instances
+            servers = profile.concurrency * instances
+            if capacity > 0:
+                room = capacity * (1 + self.queue_limit_seconds) - backlog
+                accepted = min(arrivals, max(0, int(room)))
+                utilization = min((backlog + accepted) / capacity, 0.99)
+                contention = (
+                    profile.latency_median_ms
+                    * utilization ** (math.sqrt(2 * (servers + 1)) - 1)
+                    / (servers * (1 - utilization))
+                )
+            else:
+                accepted = 0
+                contention = 0.0
+            yield SimulatedSecond(
+                start=start + elapsed * MILLISECONDS_PER_SECOND,
+                arrivals=arrivals,
+                accepted=accepted,
+                instances=instances,
+                capacity=capacity,
+                backlog=backlog,
+                contention=contention,
+            )
+            backlog = max(0.0, backlog + accepted - capacity)
+            if variant_name is None:
+                self.account.record_invocations(endpoint_name, accepted)
+                self.account.advance(MILLISECONDS_PER_SECOND)
+
+    def simulate(
+        self,
+        endpoint_name: str,
+        arrivals_per_second: Iterator[int],
+        out: TextIO,
+        variant_name: Optional[str] = None,
+    ) -> int:
+        """Send arrivals to the endpoint, write Gatling REQUEST lines to out,
+        and advance simulated time. Returns the number of requests sent."""
+        profile = self.profile(endpoint_name, variant_name)
+        mu = math.log(profile.latency_median_ms)
+        sigma = profile.latency_sigma
+        kinds = self.request_kinds(endpoint_name, profile)
+        cycle = weighted_cycle([weight for _, weight, _ in kinds])
+        user = 0
+        for second in self.seconds(endpoint_name, arrivals_per_second, variant_name):
+            for i in range(second.arrivals):
+                request_name, _, extra = kinds[cycle[user % len(cycle)]]
+                user = user + 1
+                start = second.start + i * MILLISECONDS_PER_SECOND // second.arrivals
+                if i < second.accepted:
+                    latency = (
+                        self.random.lognormvariate(mu, sigma) + extra + second.delay(i)
+                    )
+                    out.write(
+                        f"REQUEST\t{user}\t\t{request_name}\t{start}\t"
+                        f"{start + int(latency)}\tOK\t \n"
+                    )
+                else:
+                    status = 503 if second.instances else 400
+                    out.write(
+                        f"REQUEST\t{user}\t\t{request_name}\t{start}\t"
+                        f"{start + REJECTED_LATENCY_MS}\tKO\t"
+                        f"status.find.is(200), but actually found {status}\n"
+                    )
+        return user
+
+    def histogram(
+        self,
+        endpoint_name: str,
+        arrivals_per_second: Iterator[int],
+        variant_name: Optional[str] = None,
+    ) -> RunHistogram:
+        """Same model as simulate, but count latencies straight into a
+        RunHistogram instead of writing one line per request.
+
+        Service time is taken from fixed lognormal quantiles instead of random
+        draws, and queueing delay is taken at the middle of each second's
+        line, so the cost per simulated second does not grow with TPS.
+        """
+        profile = self.profile(endpoint_name, variant_name)
+        service = [
+            math.exp(
+                math.log(profile.latency_median_ms)
+                + profile.latency_sigma
+                * NormalDist().inv_cdf((k + 0.5) / LATENCY_QUANTILES)
+            )
+            for k in range(LATENCY_QUANTILES)
+        ]
+        kinds = self.request_kinds(endpoint_name, profile)
+        weights = [weight for _, weight, _ in kinds]
+        success: List[Dict[int, int]] = [{} for _ in kinds]
+        fail = [0 for _ in kinds]
+        # Seconds at the same load get the same delay, so reuse latencies.
+        latencies_by_delay: Dict[Tuple[int, int], List[int]] = {}
+        start = self.account.now
+        end = start
+        for second in self.seconds(endpoint_name, arrivals_per_second, variant_name):
+            end = second.start + MILLISECONDS_PER_SECOND
+            if second.accepted:
+                delay = int(second.delay(second.accepted // 2))
+                for j, accepted in enumerate(split(second.accepted, weights)):
+                    latencies = latencies_by_delay.get((j, delay))
+                    if latencies is None:
+                        latencies = [
+                            int(value + kinds[j][2]) + delay for value in service
+                        ]
+                        latencies_by_delay[(j, delay)] = latencies
+                    counts = split(accepted, [1] * LATENCY_QUANTILES)
+                    for latency, count in zip(latencies, counts):
+                        if count:
+                            success[j][latency] = success[j].get(latency, 0) + count
+            for j, count in enumerate(
+                split(second.arrivals - second.accepted, weights)
+            ):
+                fail[j] = fail[j] + count
+        run_histogram = RunHistogram()
+        for j, (request_name, _, _) in enumerate(kinds):
+            for latency, count in success[j].items():
+                run_histogram.record(request_name, start, start + latency, "OK", count)
+            if fail[j]:
+                run_histogram.record(
+                    request_name, start, start + REJECTED_LATENCY_MS, "KO", fail[j]
+                )
+        run_histogram.simulation_start = start
+        run_histogram.simulation_end = end
+        return run_histogram
+
+
+def split(count: int, weights: List[int]) -> List[int]:
+    """Split count into parts in proportion to weights, rounding so that
+    the parts add up to count."""
+    total = sum(weights)
+    parts = []
+    cumulative = 0
+    for weight in weights:
+        parts.append(
+            (count * (cumulative + weight)) // total - (count * cumulative) // total
+        )
+        cumulative = cumulative + weight
+    return parts
+
+
+def weighted_cycle(weights: List[int]) -> List[int]:
+    """Indexes of weights in a repeating order that sends each index its
+    share of every window, spread out rather than in runs (smooth weighted
+    round robin)."""
+    total = sum(weights)
+    current = [0] * len(weights)
+    cycle = []
+    for _ in range(total):
+        for i, weight in enumerate(weights):
+            current[i] = current[i] + weight
+        best = current.index(max(current))
+        current[best] = current[best] - total
+        cycle.append(best)
+    return cycle
+
+
+def ramp_arrivals(
+    ramp_start_tps: Decimal,
+    ramp_minutes: Decimal,
+    steady_state_tps: Decimal,
+    steady_state_minutes: Decimal,
+) -> Iterator[int]:
+    """Requests per second for a linear ramp followed by a steady state, the
+    same shape sagemaker-gatling sends."""
+    ramp_seconds = int(ramp_minutes * 60)
+    steady_state_seconds = int(steady_state_minutes * 60)
+    credit = Decimal("0")
+    for second in range(ramp_seconds + steady_state_seconds):
+        if second < ramp_seconds:
+            rate = (
+                ramp_start_tps
+                + (steady_state_tps - ramp_start_tps)
+                * (second + Decimal("0.5"))
+                / ramp_seconds
+            )
+        else:
+            rate = steady_state_tps
+        credit = credit + rate
+        count = int(credit)
+        credit = credit - count
+        yield count
+
+
+class _Counted:
+    """Iterable that counts the items taken from it."""
+
+    def __init__(self, items: Iterator[int]):
+        self.items = items
+        self.count = 0
+
+    def __iter__(self) -> Iterator[int]:
+        for item in self.items:
+            self.count = self.count + 1
+            yield item
+
+
+def trace_arrivals(trace: TraceReader) -> Iterator[int]:
+    """Requests per second from a traffic trace, streamed."""
+    second = 0
+    count = 0
+    for offset in trace:
+        while offset >= (second + 1) * MILLISECONDS_PER_SECOND:
+            yield count
+            second = second + 1
+            count = 0
+        count = count + 1
+    yield count
+
+
+class LocalLoadManager(LoadManager):
+    """Load manager for LocalSageMaker, writing Gatling format results.
+
+    Runs take simulated time only, so a 30 minute endurance step finishes in
+    well under a second of real time. With write_logs False, no run directory
+    is written and each run keeps only a RunHistogram in memory, for
+    LocalResultManager to read. That skips both writing and parsing one line
+    per request, which is what benchmarks of many full jobs need.
+    """
+
+    def __init__(
+        self,
+        account: LocalSageMaker,
+        results_path: str,
+        trace: Optional[TraceReader] = None,
+        seed: Optional[int] = None,
+        write_logs: bool = True,
+        payloads: Optional[List[Payload]] = None,
+    ):
+        self.account = account
+        self.results_path = results_path
+        self.trace = trace
+        self.simulator = EndpointSimulator(account, seed, payloads)
+        self.write_logs = write_logs
+        self.histograms: Dict[str, RunHistogram] = {}
+
+    def _arrivals(self, config: Config) -> Tuple[Iterator[int], str]:
+        if self.trace:
+            return trace_arrivals(self.trace), f"replay{self.trace.scale}x"
+        steady_state_tps = Decimal(config.parameters[Parameter.steady_state_tps])
+        arrivals = ramp_arrivals(
+            ramp_start_tps=Decimal(config.parameters[Parameter.ramp_start_tps]),
+            ramp_minutes=Decimal(config.parameters[Parameter.ramp_minutes]),
+            steady_state_tps=steady_state_tps,
+            steady_state_minutes=Decimal(
+                config.parameters[Parameter.steady_state_minutes]
+            ),
+        )
+        return arrivals, f"{steady_state_tps}TPS"
+
+    def _run(
+        self,
+        config: Config,
+        arrivals: Iterator[int],
+        load: str,
+        variant_name: Optional[str] = None,
+    ) -> Run:
+        # Simulate one run starting at the current simulated time. With
+        # variant_name the clock is not advanced, see EndpointSimulator.seconds.
+        endpoint_name = config.parameters[Parameter.endpoint_name]
+        clock = self.account.clock
+        start = clock.now()
+        start_ms = clock.time_ms()
+        run_tag = sagemaker_run_tag(config, start_ms // MILLISECONDS_PER_SECOND, load)
+        if not self.write_logs:
+            run_histogram = self.simulator.histogram(
+                endpoint_name, arrivals, variant_name
+            )
+            self.histograms[run_tag] = run_histogram
+            log.debug(f"Simulated {run_histogram} for {run_tag}")
+            end = run_histogram.simulation_end or start_ms
+        else:
+            run_dir = (
+                self.results_path
+                + os.sep
+                + f"{run_tag}-{start.strftime('%Y%m%d%H%M%S%f')[:-3]}"
+            )
+            os.makedirs(run_dir)
+            with open(run_dir + os.sep + "simulation.log", "w") as out:
+                out.write(
+                    f"RUN\t{LOCAL_SCENARIO}\t{run_tag}\t{start_ms}\t \t"
+                    f"{GATLING_VERSION}\n"
+                )
+                counted = _Counted(arrivals)
+                sent = self.simulator.simulate(
+                    endpoint_name, iter(counted), out, variant_name
+                )
+            log.debug(f"Simulated {sent} requests to {run_dir}")
+            end = start_ms + counted.count * MILLISECONDS_PER_SECOND
+        return Run(
+            id=run_tag,
+            start=start,
+            end=datetime.utcfromtimestamp(end / MILLISECONDS_PER_SECOND),
+            results=[],
+        )
+
+    def send(self, config: Config) -> Run:
+        log.debug(f"LocalLoadManager will send load per config {config}")
+        arrivals, load = self._arrivals(config)
+        return self._run(config, arrivals, load)
+
+    def send_variants(
+        self, config: Config, variants: Dict[str, Config]
+    ) -> Dict[str, Run]:
+        """Send the load of config to every variant of a comparison endpoint
+        over the same simulated seconds. variants maps variant name to the
+        config of its instance type and count. Returns a run per variant."""
+        log.debug(f"LocalLoadManager will send load to {list(variants)} per {config}")
+        runs: Dict[str, Run] = {}
+        for name, variant_config in variants.items():
+            arrivals, load = self._arrivals(config)
+            runs[name] = self._run(variant_config, arrivals, load, name)
+        end = max(run.end for run in runs.values())
+        self.account.advance(
+            int((end - self.account.clock.now()).total_seconds())
+            * MILLISECONDS_PER_SECOND
+        )
+        return runs
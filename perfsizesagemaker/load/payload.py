@@ -0,0 +1,179 @@
+from decimal import Decimal
+import hashlib
+import json
+import logging.config
+import os
+import pathlib
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Encoding assumed for payload files unless an item sets "encoding".
+DEFAULT_ENCODING = "utf-8"
+
+# Name of the manifest written into the bundle directory.
+MANIFEST_FILE = "bundle.json"
+
+
+class Payload:
+    """One scenario request file. name defaults to the file name without its
+    last suffix, and tags the requests sent with it when name_given."""
+
+    def __init__(
+        self,
+        path: str,
+        weight: int,
+        content: bytes,
+        encoding: str,
+        sha256: str,
+        name: Optional[str] = None,
+    ):
+        self.path = path
+        self.weight = weight
+        self.content = content
+        self.encoding = encoding
+        self.sha256 = sha256
+        self.name = name if name is not None else pathlib.Path(path).stem
+        self.name_given = name is not None
+
+    def __repr__(self) -> str:
+        return (
+            f"Payload(path={self.path}, weight={self.weight}, size={self.size}, "
+            f"encoding={self.encoding}, sha256={self.sha256}, name={self.name})"
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+
+class PayloadBundle:
+    """Scenario request payloads loaded and validated once per job.
+
+    Takes the same json array as --scenario_requests, for example:
+    [{"path": "bodies/status-200.input.json", "weight": 100}]
+    Items may also set "encoding" (default utf-8) and "name", passed on to
+    the load generator to tag the requests sent with that file, so metrics
+    can be split by payload. Every file is read once,
+    decoded with its encoding, parsed if it is a .json file, and hashed. The
+    bundle is then written to the job directory as content-addressed copies,
+    so the load generator reads a stable, already validated snapshot.
+    """
+
+    def __init__(self, scenario_requests: str):
+        items = json.loads(scenario_requests)
+        if not items:
+            raise RuntimeError("ERROR: scenario must contain at least one element")
+        self.payloads: List[Payload] = []
+        sum_of_weights = 0
+        for item in items:
+            path = item["path"]
+            if not pathlib.Path(path).exists():
+                raise RuntimeError(f"ERROR: file {path} does not exist")
+            weight = item["weight"]
+            if weight < 0:
+                raise RuntimeError(f"ERROR: file {path} had negative weight: {weight}")
+            sum_of_weights = sum_of_weights + weight
+            encoding = item.get("encoding", DEFAULT_ENCODING)
+            with open(path, "rb") as f:
+                content = f.read()
+            self.validate(path, content, encoding)
+            sha256 = hashlib.sha256(content).hexdigest()
+            self.payloads.append(
+                Payload(path, weight, content, encoding, sha256, item.get("name"))
+            )
+        names = [payload.name for payload in self.payloads if payload.name_given]
+        for name in names:
+            if names.count(name) > 1:
+                raise RuntimeError(
+                    f"ERROR: payload name {name} is used more than once, "
+                    f'set a unique "name" for each item'
+                )
+        if sum_of_weights != 100:
+            raise RuntimeError(
+                f"ERROR: expected sum_of_weights=100, got: {sum_of_weights}"
+            )
+
+    def __repr__(self) -> str:
+        return f"PayloadBundle(payloads={self.payloads})"
+
+    def validate(self, path: str, content: bytes, encoding: str) -> None:
+        if not content:
+            raise RuntimeError(f"ERROR: file {path} is empty")
+        try:
+            text = content.decode(encoding)
+        except (UnicodeDecodeError, LookupError) as err:
+            raise RuntimeError(f"ERROR: file {path} is not valid {encoding}: {err}")
+        if path.endswith(".json"):
+            try:
+                json.loads(text)
+            except ValueError as err:
+                raise RuntimeError(f"ERROR: file {path} is not valid json: {err}")
+
+    def match(self, request_name: str) -> Optional[Payload]:
+        """Payload whose name is the request name, or ends it after a dash,
+        like SageMaker-<endpoint>-<name>. None if no payload matches."""
+        matches = [
+            payload
+            for payload in self.payloads
+            if request_name == payload.name or request_name.endswith(f"-{payload.name}")
+        ]
+        if not matches:
+            return None
+        return max(matches, key=lambda payload: len(payload.name))
+
+    def profile(self) -> Dict[str, str]:
+        """Payload size distribution, weighted by how often each is sent."""
+        sizes = sorted(self.payloads, key=lambda payload: payload.size)
+        total_weight = sum(payload.weight for payload in sizes)
+        weighted_mean = (
+            Decimal(sum(payload.size * payload.weight for payload in sizes))
+            / total_weight
+        )
+        p50 = sizes[-1].size
+        cumulative = 0
+        for payload in sizes:
+            cumulative = cumulative + payload.weight
+            if cumulative * 2 >= total_weight:
+                p50 = payload.size
+                break
+        profile: Dict[str, str] = {}
+        profile["payload_count"] = f"{len(self.payloads)}"
+        profile["payload_unique"] = f"{len({p.sha256 for p in self.payloads})}"
+        profile["payload_bytes_min"] = f"{sizes[0].size}"
+        profile["payload_bytes_p50"] = f"{p50}"
+        profile["payload_bytes_max"] = f"{sizes[-1].size}"
+        profile["payload_bytes_weighted_mean"] = f"{weighted_mean:.1f}"
+        return profile
+
+    def write(self, bundle_dir: str) -> str:
+        """Save payload copies named by hash and return scenario_requests json
+        pointing at them, to pass to the load generator."""
+        os.makedirs(bundle_dir, exist_ok=True)
+        items: List[Dict[str, Any]] = []
+        manifest: List[Dict[str, Any]] = []
+        for payload in self.payloads:
+            suffix = pathlib.Path(payload.path).suffix
+            bundle_path = os.path.join(bundle_dir, f"{payload.sha256}{suffix}")
+            if not os.path.exists(bundle_path):
+                with open(bundle_path, "wb") as f:
+                    f.write(payload.content)
+            item: Dict[str, Any] = {"path": bundle_path, "weight": payload.weight}
+            if payload.name_given:
+                item["name"] = payload.name
+            items.append(item)
+            manifest.append(
+                {
+                    "source": payload.path,
+                    "name": payload.name,
+                    "path": bundle_path,
+                    "weight": payload.weight,
+                    "size": payload.size,
+                    "encoding": payload.encoding,
+                    "sha256": payload.sha256,
+                }
+            )
+        with open(os.path.join(bundle_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        log.debug(f"Wrote payload bundle to {bundle_dir}: {self.profile()}")
+        return json.dumps(items)
@@ -0,0 +1,337 @@
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import json
+import logging.config
+import os
+from perfsize.perfsize import Config, LoadManager, Run
+from perfsizesagemaker.clock import Clock, MILLISECONDS_PER_SECOND
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.credentials import CredentialsManager
+from perfsizesagemaker.load.payload import Payload, PayloadBundle
+from perfsizesagemaker.load.sagemaker import run_tag as sagemaker_run_tag
+import random
+import threading
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+log = logging.getLogger(__name__)
+
+# Replay runs write a simulation.log in the same format as sagemaker-gatling,
+# so GatlingResultManager and HistogramResultManager work without changes.
+REPLAY_SCENARIO = "ReplaySageMakerScenario"
+GATLING_VERSION = "3.2.0"
+
+# Upper bound on requests in flight. When reached, new arrivals wait for a
+# free slot, and the wait is counted in their latency (see InvocationSender).
+DEFAULT_MAX_IN_FLIGHT = 200
+
+# Assumed role credentials expire after an hour, so long replays get a fresh
+# client every so often.
+CREDENTIALS_REFRESH_SECONDS = 15 * 60
+
+
+def _to_milliseconds(seconds: str) -> int:
+    return int(Decimal(seconds) * MILLISECONDS_PER_SECOND)
+
+
+def _inference_time_milliseconds(line: str) -> int:
+    # SageMaker data capture record, one json object per line, like:
+    # {"captureData": {...}, "eventMetadata": {"eventId": "...",
+    #  "inferenceTime": "2021-08-11T10:08:51Z"}, "eventVersion": "0"}
+    record = json.loads(line)
+    inference_time = record["eventMetadata"]["inferenceTime"]
+    if inference_time.endswith("Z"):
+        inference_time = inference_time[:-1] + "+00:00"
+    timestamp = datetime.fromisoformat(inference_time)
+    if timestamp.tzinfo is None:
+        raise ValueError(f"inferenceTime has no time zone: {inference_time}")
+    return int(timestamp.timestamp() * MILLISECONDS_PER_SECOND)
+
+
+class TraceReader:
+    """Stream arrival times from a captured traffic trace.
+
+    Supported line formats, detected per line:
+    - "<seconds>": one request at this timestamp, like 1628676533.646
+    - "<second>,<count>": count requests spread evenly over that second
+    - "{...}": SageMaker data capture record, uses eventMetadata.inferenceTime
+    Blank lines, "#" comments, and a header in the first row are skipped. Times
+    may be absolute or relative but must not go backwards.
+
+    Iterating yields arrival offsets in milliseconds from the first arrival.
+    With scale 2, every arrival is sent twice. With scale 0.5, every second
+    arrival is sent. The original gaps between arrivals are kept either way.
+    The file is read lazily, so traces of any length use constant memory.
+    """
+
+    def __init__(self, trace_path: str, scale: Decimal = Decimal("1")):
+        if not os.path.isfile(trace_path):
+            raise RuntimeError(f"ERROR: trace file {trace_path} does not exist")
+        if scale <= 0:
+            raise RuntimeError(f"ERROR: trace scale must be positive, got: {scale}")
+        self.trace_path = trace_path
+        self.scale = scale
+
+    def __repr__(self) -> str:
+        return f"TraceReader(trace_path={self.trace_path}, scale={self.scale})"
+
+    def arrivals(self) -> Iterator[int]:
+        """Yield absolute arrival times in milliseconds, before scaling."""
+        previous: Optional[int] = None
+        first_row = True
+        with open(self.trace_path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                header_allowed = first_row
+                first_row = False
+                try:
+                    if line.startswith("{"):
+                        times = [_inference_time_milliseconds(line)]
+                    else:
+                        tokens = [token.strip() for token in line.split(",")]
+                        if len(tokens) == 1:
+                            times = [_to_milliseconds(tokens[0])]
+                        elif len(tokens) == 2:
+                            second = _to_milliseconds(tokens[0])
+                            count = int(tokens[1])
+                            if count < 0:
+                                raise ValueError(f"negative count {count}")
+                            times = [
+                                second + i * MILLISECONDS_PER_SECOND // count
+                                for i in range(count)
+                            ]
+                        else:
+                            raise ValueError("expected 1 or 2 columns")
+                except (ValueError, KeyError, TypeError, InvalidOperation) as err:
+                    if header_allowed and not line.startswith("{"):
+                        # Header row, like "timestamp" or "second,count"
+                        continue
+                    raise RuntimeError(
+                        f"ERROR: {self.trace_path} line {line_number}: "
+                        f"unable to parse {line!r}: {err}"
+                    )
+                for time_ms in times:
+                    if previous is not None and time_ms < previous:
+                        raise RuntimeError(
+                            f"ERROR: {self.trace_path} line {line_number}: "
+                            f"trace must be sorted by time"
+                        )
+                    previous = time_ms
+                    yield time_ms
+
+    def __iter__(self) -> Iterator[int]:
+        first: Optional[int] = None
+        credit = Decimal("0")
+        for time_ms in self.arrivals():
+            if first is None:
+                first = time_ms
+            credit = credit + self.scale
+            copies = int(credit)
+            credit = credit - copies
+            for _ in range(copies):
+                yield time_ms - first
+
+    def profile(self) -> Dict[str, str]:
+        """Summary of the scaled trace, from one streaming pass."""
+        count = 0
+        last = 0
+        second = -1
+        second_count = 0
+        peak_tps = 0
+        for offset in self:
+            count = count + 1
+            last = offset
+            if offset // MILLISECONDS_PER_SECOND != second:
+                second = offset // MILLISECONDS_PER_SECOND
+                second_count = 0
+            second_count = second_count + 1
+            peak_tps = max(peak_tps, second_count)
+        if not count:
+            raise RuntimeError(f"ERROR: trace {self.trace_path} has no requests")
+        duration_seconds = Decimal(last // MILLISECONDS_PER_SECOND + 1)
+        profile: Dict[str, str] = {}
+        profile["trace_requests"] = f"{count}"
+        profile["trace_duration_minutes"] = f"{duration_seconds / 60:.2f}"
+        profile["trace_mean_tps"] = f"{count / duration_seconds:.2f}"
+        profile["trace_peak_tps"] = f"{peak_tps}"
+        return profile
+
+
+def runtime_client(
+    credentials_manager: CredentialsManager,
+    region: Optional[str],
+    max_in_flight: int,
+) -> boto3.session.Session.client:
+    (
+        aws_access_key_id,
+        aws_secret_access_key,
+        aws_session_token,
+    ) = credentials_manager.refresh()
+    return boto3.client(
+        service_name="sagemaker-runtime",
+        region_name=region,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        aws_session_token=aws_session_token,
+        config=BotoConfig(max_pool_connections=max_in_flight),
+    )
+
+
+class InvocationSender:
+    """Send requests to a SageMaker endpoint at given arrival times.
+
+    Requests go through a bounded thread pool and each result is written as a
+    Gatling REQUEST line. Start time is the scheduled arrival time, not the
+    time a worker picked the request up, so any client side backlog shows up
+    as latency instead of silently lowering the offered load.
+    """
+
+    def __init__(
+        self,
+        client_factory: Any,
+        endpoint_name: str,
+        payloads: List[Payload],
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        content_type: str = "application/json",
+        seed: Optional[int] = None,
+        clock: Optional[Clock] = None,
+        target_variant: Optional[str] = None,
+    ):
+        self.client_factory = client_factory
+        self.clock = clock if clock is not None else Clock()
+        self.endpoint_name = endpoint_name
+        self.payloads = payloads
+        self.weights = [payload.weight for payload in payloads]
+        self.max_in_flight = max_in_flight
+        self.content_type = content_type
+        self.random = random.Random(seed)
+        self.target_variant = target_variant
+        self.request_name = f"SageMaker-{endpoint_name}"
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.sent = 0
+        self.failed = 0
+
+    def invoke(self, client: Any, payload: Payload) -> Tuple[str, str]:
+        kwargs = {}
+        if self.target_variant:
+            kwargs["TargetVariant"] = self.target_variant
+        try:
+            response = client.invoke_endpoint(
+                EndpointName=self.endpoint_name,
+                Body=payload.content,
+                ContentType=self.content_type,
+                **kwargs,
+            )
+            response["Body"].read()
+            return "OK", " "
+        except ClientError as err:
+            status = err.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            return "KO", f"status.find.is(200), but actually found {status}"
+        except Exception as err:
+            return "KO", f"{type(err).__name__}: {err}"
+
+    def _send_one(
+        self, client: Any, payload: Payload, user: int, start: int, out: TextIO
+    ) -> None:
+        try:
+            status, message = self.invoke(client, payload)
+            end = self.clock.time_ms()
+            with self.lock:
+                out.write(
+                    f"REQUEST\t{user}\t\t{self.request_name}\t{start}\t{end}\t"
+                    f"{status}\t{message}\n"
+                )
+                self.sent = self.sent + 1
+                if status != "OK":
+                    self.failed = self.failed + 1
+        finally:
+            self.slots.release()
+
+    def send(self, arrivals: Iterator[int], out: TextIO) -> None:
+        """Replay arrival offsets (milliseconds) starting now, writing to out."""
+        origin = self.clock.time_ms()
+        client = self.client_factory()
+        client_created = origin
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for user, offset in enumerate(arrivals, start=1):
+                scheduled = origin + offset
+                delay = scheduled - self.clock.time_ms()
+                if delay > 0:
+                    self.clock.sleep(delay / MILLISECONDS_PER_SECOND)
+                if (
+                    scheduled - client_created
+                    > CREDENTIALS_REFRESH_SECONDS * MILLISECONDS_PER_SECOND
+                ):
+                    client = self.client_factory()
+                    client_created = scheduled
+                payload = self.random.choices(self.payloads, self.weights)[0]
+                self.slots.acquire()
+                executor.submit(self._send_one, client, payload, user, scheduled, out)
+
+
+class ReplayLoadManager(LoadManager):
+    """Send load by replaying a traffic trace instead of a ramp and steady state.
+
+    Used in place of SageMakerLoadManager. Results are saved in the same
+    folder layout as Gatling runs, so the same result managers apply.
+    """
+
+    def __init__(
+        self,
+        scenario_requests: str,
+        trace_path: str,
+        results_path: str,
+        scale: Decimal = Decimal("1"),
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        iam_role_arn: Optional[str] = None,
+        region: Optional[str] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.payloads = PayloadBundle(scenario_requests)
+        self.trace = TraceReader(trace_path, scale)
+        self.results_path = results_path
+        self.max_in_flight = max_in_flight
+        self.credentials_manager = CredentialsManager(iam_role_arn, region)
+        self.region = region
+        self.clock = clock if clock is not None else Clock()
+
+    def _client(self) -> boto3.session.Session.client:
+        return runtime_client(self.credentials_manager, self.region, self.max_in_flight)
+
+    def send(self, config: Config) -> Run:
+        log.debug(f"ReplayLoadManager will replay {self.trace} per config {config}")
+        start = self.clock.now()
+        run_tag = sagemaker_run_tag(
+            config, int(start.timestamp()), f"replay{self.trace.scale}x"
+        )
+        run_dir = (
+            self.results_path
+            + os.sep
+            + f"{run_tag}-{start.strftime('%Y%m%d%H%M%S%f')[:-3]}"
+        )
+        os.makedirs(run_dir)
+        sender = InvocationSender(
+            client_factory=self._client,
+            endpoint_name=config.parameters[Parameter.endpoint_name],
+            payloads=self.payloads.payloads,
+            max_in_flight=self.max_in_flight,
+            clock=self.clock,
+        )
+        with open(run_dir + os.sep + "simulation.log", "w") as out:
+            out.write(
+                f"RUN\t{REPLAY_SCENARIO}\t{run_tag}\t"
+                f"{self.clock.time_ms()}\t \t"
+                f"{GATLING_VERSION}\n"
+            )
+            sender.send(iter(self.trace), out)
+        end = self.clock.now()
+        log.info(
+            f"Replayed {sender.sent} requests ({sender.failed} failed) to {run_dir}"
+        )
+        return Run(id=run_tag, start=start, end=end, results=[])
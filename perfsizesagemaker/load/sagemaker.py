@@ -1,7 +1,7 @@
-from datetime import datetime
 from decimal import Decimal
 import logging.config
 from perfsize.perfsize import Config, LoadManager, Run
+from perfsizesagemaker.clock import Clock
 from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
 from perfsizesagemaker.constants import Parameter
 from perfsizesagemaker.credentials import CredentialsManager
@@ -12,6 +12,23 @@ import yaml
 log = logging.getLogger(__name__)
 
 
+def run_tag(config: Config, timestamp: int, load: str) -> str:
+    # Unique name for a run, used as prefix of its results folder, like
+    # 1628680814-ml.m5.large-1-100TPS or 1628680814-ml.m5.large-min1-max4-100TPS
+    tag = f"{timestamp}-{config.parameters[Parameter.instance_type]}-"
+    if (
+        Parameter.scaling_enabled in config.parameters
+        and config.parameters[Parameter.scaling_enabled] == "True"
+    ):
+        tag += (
+            f"min{config.parameters[Parameter.scaling_min_instance_count]}-"
+            f"max{config.parameters[Parameter.scaling_max_instance_count]}-"
+        )
+    else:
+        tag += f"{config.parameters[Parameter.initial_instance_count]}-"
+    return tag + load
+
+
 class SageMakerLoadManager(LoadManager):
     def __init__(
         self,
@@ -21,12 +38,14 @@ class SageMakerLoadManager(LoadManager):
         gatling_results_path: str,
         iam_role_arn: Optional[str] = None,
         region: Optional[str] = None,
+        clock: Optional[Clock] = None,
     ):
         self.scenario_requests = scenario_requests
         self.gatling_jar_path = gatling_jar_path
         self.gatling_scenario = gatling_scenario
         self.gatling_results_path = gatling_results_path
         self.credentials_manager = CredentialsManager(iam_role_arn, region)
+        self.clock = clock if clock is not None else Clock()
 
     def send(self, config: Config) -> Run:
         log.debug(f"SageMakerLoadManager will send load per config {config}")
@@ -41,22 +60,10 @@ class SageMakerLoadManager(LoadManager):
         scenario_steady_state_minutes = Decimal(
             config.parameters[Parameter.steady_state_minutes]
         )
-        start = datetime.utcnow()
-        gatling_run_tag = (
-            f"{int(start.timestamp())}-"
-            f"{config.parameters[Parameter.instance_type]}-"
+        start = self.clock.now()
+        gatling_run_tag = run_tag(
+            config, int(start.timestamp()), f"{scenario_steady_state_tps}TPS"
         )
-        if (
-            Parameter.scaling_enabled in config.parameters
-            and config.parameters[Parameter.scaling_enabled] == "True"
-        ):
-            gatling_run_tag += (
-                f"min{config.parameters[Parameter.scaling_min_instance_count]}-"
-                f"max{config.parameters[Parameter.scaling_max_instance_count]}-"
-            )
-        else:
-            gatling_run_tag += f"{config.parameters[Parameter.initial_instance_count]}-"
-        gatling_run_tag += f"{scenario_steady_state_tps}TPS"
         (
             aws_access_key_id,
             aws_secret_access_key,
@@ -86,7 +93,7 @@ class SageMakerLoadManager(LoadManager):
             ]
         )
         completed.check_returncode()
-        end = datetime.utcnow()
+        end = self.clock.now()
         return Run(id=gatling_run_tag, start=start, end=end, results=[])
 
 
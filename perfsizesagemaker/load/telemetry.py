@@ -0,0 +1,36 @@
+import logging.config
+from perfsize.perfsize import Config, LoadManager, Run
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.telemetry import (
+    InstanceCountSample,
+    InstanceCountSampler,
+)
+from typing import Dict, List
+
+log = logging.getLogger(__name__)
+
+
+class TelemetryLoadManager(LoadManager):
+    """Wrap a load manager to sample endpoint instance counts while each run
+    is sent, keeping the samples by run id for TelemetryResultManager."""
+
+    def __init__(self, load_manager: LoadManager, sampler: InstanceCountSampler):
+        self.load_manager = load_manager
+        self.sampler = sampler
+        self.samples: Dict[str, List[InstanceCountSample]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"TelemetryLoadManager(load_manager={self.load_manager}, "
+            f"sampler={self.sampler})"
+        )
+
+    def send(self, config: Config) -> Run:
+        self.sampler.start(config.parameters[Parameter.endpoint_name])
+        try:
+            run = self.load_manager.send(config)
+        finally:
+            samples = self.sampler.stop()
+        log.debug(f"Sampled {len(samples)} instance counts during {run.id}")
+        self.samples[run.id] = samples
+        return run
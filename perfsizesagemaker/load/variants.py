@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import logging.config
+import os
+from perfsize.perfsize import Config, LoadManager, Run
+from perfsizesagemaker.clock import Clock, MILLISECONDS_PER_SECOND
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.credentials import CredentialsManager
+from perfsizesagemaker.environment.variants import variant_name
+from perfsizesagemaker.load.local import LocalLoadManager, ramp_arrivals
+from perfsizesagemaker.load.payload import PayloadBundle
+from perfsizesagemaker.load.replay import (
+    DEFAULT_MAX_IN_FLIGHT,
+    GATLING_VERSION,
+    InvocationSender,
+    runtime_client,
+)
+from perfsizesagemaker.load.sagemaker import run_tag as sagemaker_run_tag
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+VARIANTS_SCENARIO = "VariantsSageMakerScenario"
+
+
+def arrival_offsets(arrivals_per_second: Iterator[int]) -> Iterator[int]:
+    """Millisecond offsets for per second request counts, spread evenly
+    within each second."""
+    for second, count in enumerate(arrivals_per_second):
+        for i in range(count):
+            yield second * MILLISECONDS_PER_SECOND + i * MILLISECONDS_PER_SECOND // count
+
+
+def load_key(config: Config) -> Tuple[str, ...]:
+    return tuple(
+        config.parameters[parameter]
+        for parameter in [
+            Parameter.ramp_start_tps,
+            Parameter.ramp_minutes,
+            Parameter.steady_state_tps,
+            Parameter.steady_state_minutes,
+        ]
+    )
+
+
+class SageMakerVariantsSender:
+    """Send the same ramp and steady state to every variant of a comparison
+    endpoint at once, with TargetVariant, writing one Gatling format run
+    folder per variant."""
+
+    def __init__(
+        self,
+        scenario_requests: str,
+        results_path: str,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        iam_role_arn: Optional[str] = None,
+        region: Optional[str] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.payloads = PayloadBundle(scenario_requests)
+        self.results_path = results_path
+        self.max_in_flight = max_in_flight
+        self.credentials_manager = CredentialsManager(iam_role_arn, region)
+        self.region = region
+        self.clock = clock if clock is not None else Clock()
+
+    def __repr__(self) -> str:
+        return f"SageMakerVariantsSender(results_path={self.results_path})"
+
+    def _client(self) -> Any:
+        return runtime_client(self.credentials_manager, self.region, self.max_in_flight)
+
+    def _send_variant(self, config: Config, variant_config: Config, name: str) -> Run:
+        start = self.clock.now()
+        steady_state_tps = Decimal(config.parameters[Parameter.steady_state_tps])
+        run_tag = sagemaker_run_tag(
+            variant_config, int(start.timestamp()), f"{steady_state_tps}TPS"
+        )
+        run_dir = (
+            self.results_path
+            + os.sep
+            + f"{run_tag}-{start.strftime('%Y%m%d%H%M%S%f')[:-3]}"
+        )
+        os.makedirs(run_dir)
+        sender = InvocationSender(
+            client_factory=self._client,
+            endpoint_name=config.parameters[Parameter.endpoint_name],
+            payloads=self.payloads.payloads,
+            max_in_flight=self.max_in_flight,
+            clock=self.clock,
+            target_variant=name,
+        )
+        arrivals = ramp_arrivals(
+            ramp_start_tps=Decimal(config.parameters[Parameter.ramp_start_tps]),
+            ramp_minutes=Decimal(config.parameters[Parameter.ramp_minutes]),
+            steady_state_tps=steady_state_tps,
+            steady_state_minutes=Decimal(
+                config.parameters[Parameter.steady_state_minutes]
+            ),
+        )
+        with open(run_dir + os.sep + "simulation.log", "w") as out:
+            out.write(
+                f"RUN\t{VARIANTS_SCENARIO}\t{run_tag}\t"
+                f"{self.clock.time_ms()}\t \t"
+                f"{GATLING_VERSION}\n"
+            )
+            sender.send(arrival_offsets(arrivals), out)
+        log.info(
+            f"Sent {sender.sent} requests ({sender.failed} failed) to variant "
+            f"{name} in {run_dir}"
+        )
+        return Run(id=run_tag, start=start, end=self.clock.now(), results=[])
+
+    def send_variants(
+        self, config: Config, variants: Dict[str, Config]
+    ) -> Dict[str, Run]:
+        with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+            futures = {
+                name: executor.submit(self._send_variant, config, variant_config, name)
+                for name, variant_config in variants.items()
+            }
+        return {name: future.result() for name, future in futures.items()}
+
+
+class VariantsLoadManager(LoadManager):
+    """Load manager for a comparison endpoint from VariantsEnvironmentManager.
+
+    Each new load level is sent to all variants at the same time. A config
+    gets the run of its own variant, and configs for the other variants at
+    the same level get theirs without sending again. So walking through the
+    instance types of a plan takes one load run per level instead of one per
+    type and level.
+    """
+
+    def __init__(
+        self,
+        sender: Union[SageMakerVariantsSender, LocalLoadManager],
+        variants: Dict[str, Tuple[str, int]],
+    ):
+        self.sender = sender
+        self.variants = variants
+        # load level -> variant name -> run not yet handed out
+        self.runs: Dict[Tuple[str, ...], Dict[str, Run]] = {}
+
+    def __repr__(self) -> str:
+        return f"VariantsLoadManager(sender={self.sender}, variants={self.variants})"
+
+    def send(self, config: Config) -> Run:
+        key = load_key(config)
+        name = variant_name(config.parameters)
+        if name not in self.variants:
+            raise RuntimeError(f"ERROR: No variant {name} deployed for {config}")
+        if name not in self.runs.get(key, {}):
+            variant_configs: Dict[str, Config] = {}
+            for variant, (instance_type, count) in self.variants.items():
+                parameters = dict(config.parameters)
+                parameters[Parameter.instance_type] = instance_type
+                parameters[Parameter.initial_instance_count] = f"{count}"
+                variant_configs[variant] = Config(parameters, config.requirements)
+            log.info(f"Sending load {key} to variants {list(self.variants)}")
+            self.runs[key] = self.sender.send_variants(config, variant_configs)
+        else:
+            log.info(f"Using run of variant {name} from load {key} sent to all")
+        return self.runs[key].pop(name)
@@ -1,33 +1,53 @@
 import argparse
 from datetime import datetime
 from decimal import Decimal
-import json
-import logging
+import logging.config
 import math
 import os
 import pathlib
 from perfsize.perfsize import (
-    lt,
-    gte,
-    Condition,
+    EnvironmentManager,
+    LoadManager,
     Plan,
+    Reporter,
+    ResultManager,
+    StepManager,
     Workflow,
 )
 from perfsize.reporter.mock import MockReporter
-from perfsize.result.gatling import GatlingResultManager, Metric
-from perfsizesagemaker.cost import CostEstimator
-from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
-from perfsizesagemaker.load.sagemaker import SageMakerLoadManager
-from perfsizesagemaker.reporter.html import HTMLReporter
+from perfsizesagemaker.clock import Clock
+from perfsizesagemaker.cost import CostEstimator, SpendTracker
+from perfsizesagemaker.load.payload import PayloadBundle
+from perfsizesagemaker.plan import LazyPlan
+from perfsizesagemaker.result.timeline import TimelineSecond
+from perfsizesagemaker.step.budget import BudgetStepManager
+from perfsizesagemaker.spec import FIELDS, JobSpec, load_job_spec
 from perfsizesagemaker.step.sagemaker import (
-    FirstSuccessStepManager,
-    AutoScaleMinFinderStepManager,
+    STRATEGIES,
+    AutoScaleTargetFinderStepManager,
+    average_instance_count,
 )
+from perfsizesagemaker.tracing import JsonLinesSpanExporter, Tracer, trace_workflow
 from perfsizesagemaker.constants import Parameter, SageMaker
 from pprint import pformat
 import sys
-from typing import Dict, Optional
-import yaml
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, Union
+
+# Modules that import boto3, pandas, yaml or yattag are imported where they
+# are used instead, so --help, argument errors and --validate_only do not wait
+# for them. See perfsizesagemaker/startup.py.
+if TYPE_CHECKING:
+    from perfsizesagemaker.environment.ledger import ResourceLedger
+    from perfsizesagemaker.environment.local import LocalSageMaker
+    from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+    from perfsizesagemaker.environment.quota import InstanceQuota
+    from perfsizesagemaker.environment.retiring import CleanupLedger
+    from perfsizesagemaker.environment.status import StatusService
+    from perfsizesagemaker.environment.variants import VariantsEnvironmentManager
+    from perfsizesagemaker.load.variants import VariantsLoadManager
+    from perfsizesagemaker.metrics import JobMetrics, MetricsServer
+    from perfsizesagemaker.reporter.html import HTMLReporter
+    from perfsizesagemaker.reporter.incremental import IncrementalReporter
 
 log = logging.getLogger(__name__)
 
@@ -39,263 +59,493 @@ def get_timestamp_utc() -> str:
 
 def validate_scenario_requests(input: str) -> None:
     """Confirm request payload files are valid and weights sum to 100."""
-    # TODO: See how to handle different file encoding types.
-    items = json.loads(input)
-    if not items:
-        raise RuntimeError("ERROR: scenario must contain at least one element")
-    sum_of_weights = 0
-    for item in items:
-        path = item["path"]
-        if not pathlib.Path(path).exists():
-            raise RuntimeError(f"ERROR: file {path} does not exist")
-        weight = item["weight"]
-        if weight < 0:
-            raise RuntimeError(f"ERROR: file {path} had negative weight: {weight}")
-        sum_of_weights = sum_of_weights + weight
-    if sum_of_weights != 100:
-        raise RuntimeError(f"ERROR: expected sum_of_weights=100, got: {sum_of_weights}")
+    PayloadBundle(input)
 
 
 class Main:
-    def __init__(self) -> None:
+    def __init__(self, argv: Optional[List[str]] = None) -> None:
         parser = argparse.ArgumentParser()
         parser.add_argument(
-            "--iam_role_arn",
-            help="role to assume to get credentials, otherwise will get credentials from environment",
+            "--job_spec",
+            help="yaml or json file with any of the arguments below, without the dashes, as keys. Arguments given on the command line override it",
             required=False,
         )
-        parser.add_argument(
-            "--host",
-            help="SageMaker runtime host",
-            required=True,
-        )
-        parser.add_argument(
-            "--region",
-            help="region name for boto3 and cost lookup",
-            required=True,
-        )
-        parser.add_argument(
-            "--endpoint_name", help="name of SageMaker Endpoint", required=True
-        )
-        parser.add_argument(
-            "--endpoint_config_name",
-            help="name of SageMaker EndpointConfig",
-            required=True,
-        )
-        parser.add_argument(
-            "--variant_name",
-            help="name of SageMaker Endpoint Variant",
-            default="variant-name-1",
-        )
-        parser.add_argument(
-            "--model_name", help="name of SageMaker Model", required=True
-        )
-        parser.add_argument(
-            "--scenario_requests",
-            help="json array of request file paths and weights",
-            required=True,
-        )
-        parser.add_argument("--peak_tps", help="required highest TPS", required=True)
-        parser.add_argument(
-            "--latency_success_p99", help="allowed p99 latency", required=True
-        )
-        parser.add_argument(
-            "--percent_fail", help="allowed failure percentage", required=True
-        )
-        parser.add_argument(
-            "--type_walk",
-            help="comma separated instance types to test",
-            required=True,
-        )
-        parser.add_argument(
-            "--count_walk", help="comma separated counts to test", required=True
-        )
-        parser.add_argument(
-            "--tps_walk", help="comma separated TPS values to test", required=True
-        )
-        parser.add_argument(
-            "--duration_minutes", help="duration in minutes for type tests", default=3
-        )
-        parser.add_argument(
-            "--endurance_ramp_start_tps",
-            help="TPS at start of endurance test ramp",
-            default=0,
-        )
-        parser.add_argument(
-            "--endurance_ramp_minutes",
-            help="duration in minutes for endurance test ramp",
-            default=0,
-        )
-        parser.add_argument(
-            "--endurance_steady_state_minutes",
-            help="duration in minutes for endurance steady state",
-            default=30,
-        )
-        parser.add_argument(
-            "--endurance_retries",
-            help="number of times to retry endurance test",
-            default=3,
-        )
-        parser.add_argument(
-            "--perfsize_results_dir",
-            help="directory for saving test results",
-            default="perfsize-results-dir",
-        )
-        parser.add_argument(
-            "--cost_file",
-            help="path to file mapping instance type to hourly rate",
-            default="resources/configs/cost/us-west-2.json",
-        )
-        parser.add_argument(
-            "--jar_file",
-            help="path to sagmaker-gatling.jar file",
-            default="sagemaker-gatling.jar",
-        )
-        parser.add_argument(
-            "--logging_config",
-            help="path to logging.yml file",
-            default="resources/configs/logging/logging.yml",
-        )
-        args = parser.parse_args()
-
-        # Tried setting type checking directly in add_argument but the error message
-        # result was not specific enough and only showed a stacktrace on parse_args.
-        # Do additional validation.
-        self.iam_role_arn = args.iam_role_arn
-        self.host = args.host
-        self.region = args.region
-        self.endpoint_name = args.endpoint_name
-        self.endpoint_config_name = args.endpoint_config_name
-        self.variant_name = args.variant_name
-        self.model_name = args.model_name
-        self.scenario_requests = args.scenario_requests
+        for field in FIELDS:
+            if field.flag:
+                parser.add_argument(
+                    f"--{field.name}",
+                    help=field.help,
+                    action="store_true",
+                    default=None,
+                )
+            else:
+                parser.add_argument(
+                    f"--{field.name}",
+                    help=f"{field.help} (required, here or in --job_spec)"
+                    if field.required
+                    else field.help,
+                )
+        args = parser.parse_args(argv)
+
+        # Check every argument against the schema in one pass, with values
+        # converted to their types once, see perfsizesagemaker/spec.py.
+        self.job_spec = args.job_spec
+        spec_values: Dict[str, Any] = {}
+        if self.job_spec:
+            try:
+                spec_values = load_job_spec(self.job_spec)
+            except:
+                error = sys.exc_info()[0]
+                description = sys.exc_info()[1]
+                parser.error(f"argument --job_spec: got error {error}: {description}")
+        spec = JobSpec(vars(args), spec_values, f"{self.job_spec}")
+        if spec.errors:
+            parser.error("; ".join(spec.errors))
+        values = spec.values
+        self.iam_role_arn: Optional[str] = values["iam_role_arn"]
+        self.host: str = values["host"]
+        self.region: str = values["region"]
+        self.endpoint_name: str = values["endpoint_name"]
+        self.endpoint_config_name: str = values["endpoint_config_name"]
+        self.variant_name: str = values["variant_name"]
+        self.model_name: str = values["model_name"]
+        self.scenario_requests: str = values["scenario_requests"]
         try:
-            json.loads(self.scenario_requests)
-            validate_scenario_requests(self.scenario_requests)
+            self.payloads = PayloadBundle(self.scenario_requests)
         except:
             error = sys.exc_info()[0]
             description = sys.exc_info()[1]
             parser.error(
                 f"argument --scenario_requests: got error {error}: {description}"
             )
-        try:
-            self.peak_tps = Decimal(args.peak_tps)
-        except:
-            parser.error(
-                f"argument --peak_tps: expected a number but got: {args.peak_tps}"
-            )
-        try:
-            self.latency_success_p99 = Decimal(args.latency_success_p99)
-        except:
-            parser.error(
-                f"argument --latency_success_p99: expected a number but got: {args.latency_success_p99}"
-            )
-        try:
-            self.percent_fail = Decimal(args.percent_fail)
-        except:
-            parser.error(
-                f"argument --percent_fail: expected a number but got: {args.percent_fail}"
-            )
-        try:
-            self.type_walk = args.type_walk.split(",")
-        except:
-            parser.error(
-                f"argument --type_walk: expected a comma separated list of strings but got: {args.type_walk}"
-            )
-        try:
-            self.count_walk = list(map(int, args.count_walk.split(",")))
-        except:
-            parser.error(
-                f"argument --count_walk: expected a comma separated list of integers but got: {args.count_walk}"
-            )
-        try:
-            self.tps_walk = list(map(Decimal, args.tps_walk.split(",")))
-        except:
-            parser.error(
-                f"argument --tps_walk: expected a comma separated list of numbers but got: {args.tps_walk}"
-            )
-        try:
-            self.duration_minutes = Decimal(args.duration_minutes)
-        except:
-            parser.error(
-                f"argument --duration_minutes: expected a number but got: {args.duration_minutes}"
-            )
-        try:
-            self.endurance_ramp_start_tps = Decimal(args.endurance_ramp_start_tps)
-        except:
-            parser.error(
-                f"argument --endurance_ramp_start_tps: expected a number but got: {args.endurance_ramp_start_tps}"
-            )
-        try:
-            self.endurance_ramp_minutes = Decimal(args.endurance_ramp_minutes)
-        except:
-            parser.error(
-                f"argument --endurance_ramp_minutes: expected a number but got: {args.endurance_ramp_minutes}"
-            )
-        try:
-            self.endurance_steady_state_minutes = Decimal(
-                args.endurance_steady_state_minutes
-            )
-        except:
-            parser.error(
-                f"argument --endurance_steady_state_minutes: expected a number but got: {args.endurance_steady_state_minutes}"
-            )
-        try:
-            self.endurance_retries = int(args.endurance_retries)
-        except:
-            parser.error(
-                f"argument --endurance_retries: expected an integer but got: {args.endurance_retries}"
-            )
-        self.perfsize_results_dir = args.perfsize_results_dir
-        if not os.path.isdir(self.perfsize_results_dir):
-            os.mkdir(self.perfsize_results_dir)
+        self.peak_tps: Decimal = values["peak_tps"]
+        self.latency_success_p99: Optional[Decimal] = values["latency_success_p99"]
+        self.percent_fail: Optional[Decimal] = values["percent_fail"]
+        self.type_walk: List[str] = values["type_walk"]
+        self.count_walk: List[int] = values["count_walk"]
+        self.tps_walk: List[Decimal] = values["tps_walk"]
+        self.duration_minutes: Decimal = values["duration_minutes"]
+        self.endurance_ramp_start_tps: Decimal = values["endurance_ramp_start_tps"]
+        self.endurance_ramp_minutes: Decimal = values["endurance_ramp_minutes"]
+        self.endurance_steady_state_minutes: Decimal = values[
+            "endurance_steady_state_minutes"
+        ]
+        self.endurance_retries: int = values["endurance_retries"]
+        self.phases = spec.phases
+        self.strategy: str = values["strategy"]
+        self.perfsize_results_dir: str = values["perfsize_results_dir"]
         job_id = f"job-{get_timestamp_utc()}-{self.model_name}"
         self.job_id_dir = self.perfsize_results_dir + os.sep + job_id
-        if not os.path.isdir(self.job_id_dir):
-            os.mkdir(self.job_id_dir)
+        self.cost_file: str = values["cost_file"]
         try:
-            self.cost_file = args.cost_file
             self.cost = CostEstimator(self.cost_file)
         except:
-            parser.error(f"argument --cost_file: error loading {args.cost_file}")
-        self.jar_file = args.jar_file
-        if not pathlib.Path(self.jar_file).exists():
+            parser.error(f"argument --cost_file: error loading {self.cost_file}")
+        self.local_config: Optional[str] = values["local_config"]
+        self.local_account: Optional["LocalSageMaker"] = None
+        if self.local_config:
+            from perfsizesagemaker.environment.local import LocalSageMaker
+
+            try:
+                self.local_account = LocalSageMaker.from_file(self.local_config)
+            except:
+                parser.error(
+                    f"argument --local_config: error loading {self.local_config}"
+                )
+        # Everything waits and timestamps through one clock, so a local run
+        # moves in simulated time only.
+        self.clock = self.local_account.clock if self.local_account else Clock()
+        # Local runs can skip writing simulation.log files and keep results in
+        # memory instead. The benchmark harness turns this off.
+        self.write_logs = True
+        self.spend = SpendTracker(self.cost.rates, self.clock)
+        # Spans of each phase, step, setup, teardown, load run and result
+        # query, exported to the job dir once it exists.
+        self.tracer = Tracer(self.clock)
+        self.metrics_port: Optional[int] = values["metrics_port"]
+        self.metrics_textfile: Optional[str] = values["metrics_textfile"]
+        self.max_test_budget_usd: Optional[Decimal] = values["max_test_budget_usd"]
+        self.scaling_telemetry_seconds: Decimal = values["scaling_telemetry_seconds"]
+        self.optimize_scaling_target = "target" in self.phases
+        self.compare_types: bool = values["compare_types"]
+        self.instance_quotas: Optional[str] = values["instance_quotas"]
+        self.quota_db: Optional[str] = values["quota_db"]
+        self.type_limits: Dict[str, int] = {}
+        if self.instance_quotas:
+            from perfsizesagemaker.environment.quota import load_type_limits
+
+            try:
+                self.type_limits = load_type_limits(self.instance_quotas)
+            except:
+                parser.error(
+                    f"argument --instance_quotas: error loading {self.instance_quotas}"
+                )
+        elif self.quota_db:
+            parser.error("argument --quota_db: requires --instance_quotas")
+        self.quota: Optional["InstanceQuota"] = None
+        if self.type_limits:
+            from perfsizesagemaker.environment.quota import (
+                InstanceQuota,
+                SharedInstanceQuota,
+            )
+
+            try:
+                if self.quota_db:
+                    self.quota = SharedInstanceQuota(
+                        self.quota_db, type_limits=self.type_limits, clock=self.clock
+                    )
+                else:
+                    self.quota = InstanceQuota(type_limits=self.type_limits)
+            except:
+                error = sys.exc_info()[0]
+                description = sys.exc_info()[1]
+                parser.error(
+                    f"argument --instance_quotas: got error {error}: {description}"
+                )
+        self.async_teardown: bool = values["async_teardown"]
+        # Endpoints retired by --async_teardown, all deleted before main returns.
+        self.cleanup: Optional["CleanupLedger"] = None
+        # Batch runs share one across jobs, see perfsizesagemaker/batch.py.
+        self.status_service: Optional["StatusService"] = None
+        self.jar_file: str = values["jar_file"]
+        if not self.local_account and not pathlib.Path(self.jar_file).exists():
             parser.error(f"argument --jar_file not found: {self.jar_file}")
-        self.logging_config = args.logging_config
+        self.logging_config: str = values["logging_config"]
         if not pathlib.Path(self.logging_config).exists():
             parser.error(f"argument --logging_config not found: {self.logging_config}")
+        self.archive_results: bool = values["archive_results"]
+        self.traffic_trace: Optional[str] = values["traffic_trace"]
+        self.traffic_scale: Decimal = values["traffic_scale"]
+        self.traffic_profile: Dict[str, str] = {}
+        if self.traffic_trace:
+            from perfsizesagemaker.load.replay import TraceReader
 
-        # Initialize logger if config file exists
-        with open(self.logging_config, "r") as stream:
-            config = yaml.safe_load(stream)
-        logging.config.dictConfig(config)
-        for name in logging.root.manager.loggerDict:  # type: ignore
-            if name.startswith("perfsize"):
-                logging.getLogger(name).setLevel(logging.DEBUG)
-
-        # TODO: Make arg parsing more generic. For now, only handling latency_success_p99 and percent_fail.
-        self.requirements = {
-            Metric.latency_success_p99: [
-                Condition(
-                    lt(self.latency_success_p99),
-                    f"latency_success_p99 < {self.latency_success_p99}",
-                ),
-                Condition(gte(Decimal("0")), "latency_success_p99 >= 0"),
-            ],
-            Metric.percent_fail: [
-                Condition(lt(self.percent_fail), f"percent_fail < {self.percent_fail}"),
-                Condition(gte(Decimal("0")), "percent_fail >= 0"),
-            ],
-        }
+            try:
+                self.traffic_profile = TraceReader(
+                    self.traffic_trace, self.traffic_scale
+                ).profile()
+            except:
+                error = sys.exc_info()[0]
+                description = sys.exc_info()[1]
+                parser.error(
+                    f"argument --traffic_trace: got error {error}: {description}"
+                )
+        # Only set up the job once the arguments are valid, and not at all for
+        # --validate_only, which also skips importing yaml for the logger.
+        self.validate_only: bool = values["validate_only"]
+        self.bundled_scenario_requests = ""
+        self.resource_ledger: Optional["ResourceLedger"] = None
+        if not self.validate_only:
+            if not os.path.isdir(self.perfsize_results_dir):
+                os.mkdir(self.perfsize_results_dir)
+            if not os.path.isdir(self.job_id_dir):
+                os.mkdir(self.job_id_dir)
+            # Load generator reads validated copies of payloads saved with the job.
+            self.bundled_scenario_requests = self.payloads.write(
+                self.job_id_dir + os.sep + "payloads"
+            )
+            self.tracer.exporter = JsonLinesSpanExporter(
+                self.job_id_dir + os.sep + "spans.jsonl"
+            )
+            # Every resource the job creates is recorded, so ones left behind
+            # by a crash can be deleted later. Local runs cannot leak any.
+            if not self.local_account:
+                from perfsizesagemaker.environment.ledger import (
+                    LEDGER_FILE,
+                    ResourceLedger,
+                )
+
+                self.resource_ledger = ResourceLedger(
+                    self.perfsize_results_dir + os.sep + LEDGER_FILE,
+                    owner=job_id,
+                    clock=self.clock,
+                )
+
+            # Initialize logger if config file exists
+            import yaml
+
+            with open(self.logging_config, "r") as stream:
+                config = yaml.safe_load(stream)
+            logging.config.dictConfig(config)
+            for name in logging.root.manager.loggerDict:  # type: ignore
+                if name.startswith("perfsize"):
+                    logging.getLogger(name).setLevel(logging.DEBUG)
+
+        # Live progress for dashboards, fed by the spans and run results.
+        self.metrics: Optional["JobMetrics"] = None
+        if not self.validate_only and (
+            self.metrics_port is not None or self.metrics_textfile
+        ):
+            from perfsizesagemaker.metrics import JobMetrics
+
+            self.metrics = JobMetrics(
+                job_id,
+                self.model_name,
+                self.spend,
+                textfile=self.metrics_textfile,
+            )
+            self.tracer.listeners.append(self.metrics)
+
+        self.requirements = spec.requirements
         log.info(f"Starting perfsize with requirements: {self.requirements}")
+        log.info(f"Scenario payload sizes: {self.payloads.profile()}")
 
         # Track findings for each testing phase
         self.type_plan: Optional[Plan] = None
         self.max_count_plan: Optional[Plan] = None
         self.min_count_plan: Optional[Plan] = None
+        self.target_plan: Optional[Plan] = None
+        # Load per second of endurance runs, with instance counts for auto
+        # scale runs, by run id.
+        self.timelines: Dict[str, List[TimelineSecond]] = {}
         self.recommend_type: Optional[Dict[str, str]] = None
         self.recommend_max: Optional[Dict[str, str]] = None
         self.recommend_min: Optional[Dict[str, str]] = None
+        self.recommend_target: Optional[Dict[str, str]] = None
+        # Job report, rewritten after every run once main starts the job.
+        self.reporter: Optional["HTMLReporter"] = None
+        self.report: Optional["IncrementalReporter"] = None
+
+        # Search strategy for each phase. The benchmark harness swaps these to
+        # compare strategies.
+        self.type_step_manager: Type[StepManager]
+        self.max_step_manager: Type[StepManager]
+        self.min_step_manager: Type[StepManager]
+        (
+            self.type_step_manager,
+            self.max_step_manager,
+            self.min_step_manager,
+        ) = STRATEGIES[self.strategy]
+        self.target_step_manager: Type[StepManager] = AutoScaleTargetFinderStepManager
+
+    def _environment_manager(self) -> "MeteredEnvironmentManager":
+        from perfsizesagemaker.environment.local import (
+            LocalSageMakerEnvironmentManager,
+        )
+        from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+        from perfsizesagemaker.environment.sagemaker import (
+            SageMakerEnvironmentManager,
+        )
+
+        environment_manager: SageMakerEnvironmentManager
+        if self.local_account:
+            environment_manager = LocalSageMakerEnvironmentManager(
+                self.local_account, tracer=self.tracer
+            )
+        else:
+            environment_manager = SageMakerEnvironmentManager(
+                self.iam_role_arn,
+                self.region,
+                clock=self.clock,
+                tracer=self.tracer,
+                ledger=self.resource_ledger,
+            )
+        return MeteredEnvironmentManager(
+            environment_manager, self.spend, self.status_service
+        )
+
+    def _scheduled(self, environment_manager: EnvironmentManager) -> EnvironmentManager:
+        # Hold each setup until the account has room for its instances. Batch
+        # runs override this to order waiting jobs, see perfsizesagemaker/batch.py.
+        if self.quota is None:
+            return environment_manager
+        from perfsizesagemaker.environment.quota import QuotaEnvironmentManager
+
+        return QuotaEnvironmentManager(
+            environment_manager=environment_manager,
+            quota=self.quota,
+            owner=self.endpoint_name,
+            priority=lambda: Decimal("0"),
+            clock=self.clock,
+        )
+
+    def _retiring(
+        self, environment_manager: "MeteredEnvironmentManager"
+    ) -> EnvironmentManager:
+        # Let the next setup go ahead under fresh names while the endpoint
+        # torn down is deleted in the background.
+        if not self.async_teardown:
+            return environment_manager
+        from perfsizesagemaker.environment.retiring import RetiringEnvironmentManager
+
+        return RetiringEnvironmentManager(environment_manager, self._cleanup())
+
+    def _retiring_load_manager(self, load_manager: LoadManager) -> LoadManager:
+        # Send to the fresh names the plan's configs do not carry.
+        if not self.async_teardown:
+            return load_manager
+        from perfsizesagemaker.environment.retiring import RetiringLoadManager
+
+        return RetiringLoadManager(load_manager, self._cleanup())
+
+    def _cleanup(self) -> "CleanupLedger":
+        from perfsizesagemaker.environment.retiring import CleanupLedger
+
+        if self.cleanup is None:
+            self.cleanup = CleanupLedger(self.clock)
+        return self.cleanup
+
+    def _step_manager(
+        self, step_manager_type: Type[StepManager], plan: Plan
+    ) -> StepManager:
+        step_manager = step_manager_type(plan)
+        if self.max_test_budget_usd is None:
+            return step_manager
+        return BudgetStepManager(step_manager, self.spend, self.max_test_budget_usd)
+
+    def _load_manager(self, replay: bool = False) -> LoadManager:
+        # With replay, send the captured traffic trace instead of ramp and
+        # steady state TPS from each config.
+        from perfsizesagemaker.load.local import LocalLoadManager
+        from perfsizesagemaker.load.replay import ReplayLoadManager, TraceReader
+        from perfsizesagemaker.load.sagemaker import SageMakerLoadManager
+
+        if self.local_account:
+            return LocalLoadManager(
+                account=self.local_account,
+                results_path=self.job_id_dir,
+                trace=(
+                    TraceReader(self.traffic_trace, self.traffic_scale)
+                    if replay and self.traffic_trace
+                    else None
+                ),
+                write_logs=self.write_logs,
+                payloads=self.payloads.payloads,
+            )
+        if replay and self.traffic_trace:
+            return ReplayLoadManager(
+                scenario_requests=self.bundled_scenario_requests,
+                trace_path=self.traffic_trace,
+                results_path=self.job_id_dir,
+                scale=self.traffic_scale,
+                iam_role_arn=self.iam_role_arn,
+                region=self.region,
+                clock=self.clock,
+            )
+        return SageMakerLoadManager(
+            scenario_requests=self.bundled_scenario_requests,
+            gatling_jar_path=self.jar_file,
+            gatling_scenario="GenericSageMakerScenario",
+            gatling_results_path=self.job_id_dir,
+            iam_role_arn=self.iam_role_arn,
+            region=self.region,
+            clock=self.clock,
+        )
+
+    def _variants_load_manager(
+        self, environment_manager: "VariantsEnvironmentManager"
+    ) -> "VariantsLoadManager":
+        from perfsizesagemaker.load.local import LocalLoadManager
+        from perfsizesagemaker.load.variants import (
+            SageMakerVariantsSender,
+            VariantsLoadManager,
+        )
+
+        sender: Union[SageMakerVariantsSender, LocalLoadManager]
+        if self.local_account:
+            sender = LocalLoadManager(
+                account=self.local_account,
+                results_path=self.job_id_dir,
+                write_logs=self.write_logs,
+                payloads=self.payloads.payloads,
+            )
+        else:
+            sender = SageMakerVariantsSender(
+                scenario_requests=self.bundled_scenario_requests,
+                results_path=self.job_id_dir,
+                iam_role_arn=self.iam_role_arn,
+                region=self.region,
+                clock=self.clock,
+            )
+        return VariantsLoadManager(sender, environment_manager.variants)
+
+    def _result_managers(
+        self,
+        environment_manager: "MeteredEnvironmentManager",
+        load_manager: LoadManager,
+        load_timelines: bool = False,
+    ) -> List[ResultManager]:
+        # With load_timelines, also keep per second load of runs that have
+        # no instance count samples, for the report.
+        from perfsize.result.gatling import GatlingResultManager
+        from perfsizesagemaker.load.local import LocalLoadManager
+        from perfsizesagemaker.load.telemetry import TelemetryLoadManager
+        from perfsizesagemaker.load.variants import VariantsLoadManager
+        from perfsizesagemaker.result.histogram import HistogramResultManager
+        from perfsizesagemaker.result.local import LocalResultManager
+        from perfsizesagemaker.result.spend import SpendResultManager
+        from perfsizesagemaker.result.telemetry import (
+            LoadTimelineResultManager,
+            TelemetryResultManager,
+        )
+
+        result_managers: List[ResultManager]
+        telemetry: Optional[TelemetryLoadManager] = None
+        if isinstance(load_manager, TelemetryLoadManager):
+            telemetry = load_manager
+            load_manager = load_manager.load_manager
+        if isinstance(load_manager, VariantsLoadManager) and isinstance(
+            load_manager.sender, LocalLoadManager
+        ):
+            load_manager = load_manager.sender
+        in_memory = (
+            isinstance(load_manager, LocalLoadManager) and not load_manager.write_logs
+        )
+        if isinstance(load_manager, LocalLoadManager) and in_memory:
+            result_managers = [LocalResultManager(load_manager)]
+        else:
+            result_managers = [
+                GatlingResultManager(results_path=self.job_id_dir),
+                HistogramResultManager(results_path=self.job_id_dir),
+            ]
+        if telemetry is not None:
+            result_managers.append(
+                TelemetryResultManager(
+                    telemetry,
+                    results_path=None if in_memory else self.job_id_dir,
+                    timelines=self.timelines,
+                )
+            )
+        elif load_timelines and not in_memory:
+            result_managers.append(
+                LoadTimelineResultManager(self.job_id_dir, timelines=self.timelines)
+            )
+        spend: ResultManager = SpendResultManager(environment_manager)
+        if self.async_teardown:
+            from perfsizesagemaker.environment.retiring import RetiringResultManager
+
+            spend = RetiringResultManager(spend, self._cleanup())
+        result_managers.append(spend)
+        if self.metrics is not None:
+            from perfsizesagemaker.result.metrics import MetricsResultManager
+
+            result_managers.append(MetricsResultManager(self.metrics))
+        if self.report is not None:
+            # Last, so the report sees every result of the run.
+            result_managers.append(self.report)
+        return result_managers
+
+    def _reporters(self) -> List[Reporter]:
+        if self.report is None:
+            return [MockReporter()]
+        return [self.report]
+
+    def _telemetry_load_manager(
+        self,
+        environment_manager: "MeteredEnvironmentManager",
+        load_manager: LoadManager,
+    ) -> LoadManager:
+        # Sample instance counts in the background during each run.
+        if not self.scaling_telemetry_seconds:
+            return load_manager
+        from perfsizesagemaker.environment.telemetry import InstanceCountSampler
+        from perfsizesagemaker.load.telemetry import TelemetryLoadManager
+
+        sampler = InstanceCountSampler(
+            environment_manager.environment_manager,
+            interval_seconds=float(self.scaling_telemetry_seconds),
+        )
+        return TelemetryLoadManager(load_manager, sampler)
 
     def test_type(self) -> Optional[Dict[str, str]]:
         # Phase 1: Find working instance type.
@@ -304,7 +554,7 @@ class Main:
         # The count should default to 1, but user might override with a list of
         # higher counts. Final TPS per instance would just need to be calculated
         # accordingly.
-        self.type_plan = Plan(
+        self.type_plan = LazyPlan(
             parameter_lists={
                 Parameter.host: [self.host],
                 Parameter.region: [self.region],
@@ -323,24 +573,37 @@ class Main:
         )
         log.info(f"Testing instance type with plan: {self.type_plan}")
 
-        type_workflow = Workflow(
-            plan=self.type_plan,
-            step_manager=FirstSuccessStepManager(self.type_plan),
-            environment_manager=SageMakerEnvironmentManager(
-                self.iam_role_arn, self.region
-            ),
-            load_manager=SageMakerLoadManager(
-                scenario_requests=self.scenario_requests,
-                gatling_jar_path=self.jar_file,
-                gatling_scenario="GenericSageMakerScenario",
-                gatling_results_path=self.job_id_dir,
-                iam_role_arn=self.iam_role_arn,
-                region=self.region,
+        environment_manager = self._environment_manager()
+        load_manager = self._load_manager()
+        scheduled = self._scheduled(self._retiring(environment_manager))
+        sending = self._retiring_load_manager(load_manager)
+        if self.compare_types:
+            from perfsizesagemaker.environment.variants import (
+                VariantsEnvironmentManager,
+            )
+
+            # One endpoint with a variant per type and count, so the quota
+            # scheduling of single variant setups does not apply.
+            environment_manager = VariantsEnvironmentManager(
+                environment_manager.environment_manager, self.spend, self.type_plan
+            )
+            load_manager = self._variants_load_manager(environment_manager)
+            scheduled = environment_manager
+            sending = load_manager
+        type_workflow = trace_workflow(
+            Workflow(
+                plan=self.type_plan,
+                step_manager=self._step_manager(self.type_step_manager, self.type_plan),
+                environment_manager=scheduled,
+                load_manager=sending,
+                result_managers=self._result_managers(
+                    environment_manager, load_manager
+                ),
+                reporters=self._reporters(),
+                teardown_between_steps=False,
+                teardown_at_end=True,
             ),
-            result_managers=[GatlingResultManager(results_path=self.job_id_dir)],
-            reporters=[MockReporter()],
-            teardown_between_steps=False,
-            teardown_at_end=True,
+            self.tracer,
         )
         type_recommendation = type_workflow.run()
         log.debug(
@@ -381,7 +644,7 @@ class Main:
         # assuming linear extrapolation. But just in case it fails,
         # the test plan includes some endurance_retries.
 
-        self.max_count_plan = Plan(
+        self.max_count_plan = LazyPlan(
             parameter_lists={
                 Parameter.host: [self.host],
                 Parameter.region: [self.region],
@@ -410,24 +673,26 @@ class Main:
         )
         log.info(f"Testing instance count with plan: {self.max_count_plan}")
 
-        max_count_workflow = Workflow(
-            plan=self.max_count_plan,
-            step_manager=FirstSuccessStepManager(self.max_count_plan),
-            environment_manager=SageMakerEnvironmentManager(
-                self.iam_role_arn, self.region
-            ),
-            load_manager=SageMakerLoadManager(
-                scenario_requests=self.scenario_requests,
-                gatling_jar_path=self.jar_file,
-                gatling_scenario="GenericSageMakerScenario",
-                gatling_results_path=self.job_id_dir,
-                iam_role_arn=self.iam_role_arn,
-                region=self.region,
+        environment_manager = self._environment_manager()
+        load_manager = self._load_manager()
+        max_count_workflow = trace_workflow(
+            Workflow(
+                plan=self.max_count_plan,
+                step_manager=self._step_manager(
+                    self.max_step_manager, self.max_count_plan
+                ),
+                environment_manager=self._scheduled(
+                    self._retiring(environment_manager)
+                ),
+                load_manager=self._retiring_load_manager(load_manager),
+                result_managers=self._result_managers(
+                    environment_manager, load_manager, load_timelines=True
+                ),
+                reporters=self._reporters(),
+                teardown_between_steps=True,
+                teardown_at_end=True,
             ),
-            result_managers=[GatlingResultManager(results_path=self.job_id_dir)],
-            reporters=[MockReporter()],
-            teardown_between_steps=True,
-            teardown_at_end=True,
+            self.tracer,
         )
         max_count_recommendation = max_count_workflow.run()
         log.debug(
@@ -461,9 +726,44 @@ class Main:
             f"= int({max_tps_per_instance} * 60 * {SageMaker.SAFETY_FACTOR})\n"
             f"= {invocations_target} invocations / instance / minute"
         )
+        capacity_model_file = self.save_capacity_model(
+            instance_type, max_tps_per_instance, max_count_recommendation
+        )
+        if capacity_model_file:
+            recommend_max["capacity_model"] = capacity_model_file
         log.info(f"recommend_max: {pformat(recommend_max)}")
         return recommend_max
 
+    def save_capacity_model(
+        self,
+        instance_type: str,
+        max_tps_per_instance: Decimal,
+        recommendation: Dict[str, str],
+    ) -> Optional[str]:
+        # Fit service time per payload from the last green run, so a different
+        # payload mix can be sized later with perfsizesagemaker.capacity.
+        assert self.max_count_plan is not None  # help mypy
+        runs = [
+            run
+            for config in self.max_count_plan.history
+            if config.parameters == recommendation
+            for run in config.runs
+            if run.status
+        ]
+        if not runs:
+            return None
+        from perfsizesagemaker.capacity import CAPACITY_MODEL_FILE, CapacityModel
+
+        model = CapacityModel.from_run(
+            instance_type, max_tps_per_instance, runs[-1], self.payloads
+        )
+        if model is None:
+            return None
+        capacity_model_file = f"{self.job_id_dir}/{CAPACITY_MODEL_FILE}"
+        model.save(capacity_model_file)
+        log.info(f"Saved {model} to {capacity_model_file}")
+        return capacity_model_file
+
     def test_min(
         self, instance_type: str, max_instance_count: int, invocations_target: int
     ) -> Optional[Dict[str, str]]:
@@ -477,7 +777,7 @@ class Main:
             log.info(f"No need for auto scale, 1 instance enough for peak TPS.")
             return None
 
-        self.min_count_plan = Plan(
+        self.min_count_plan = LazyPlan(
             parameter_lists={
                 Parameter.host: [self.host],
                 Parameter.region: [self.region],
@@ -508,24 +808,28 @@ class Main:
         )
         log.info(f"Testing auto scale with plan: {self.min_count_plan}")
 
-        min_count_workflow = Workflow(
-            plan=self.min_count_plan,
-            step_manager=AutoScaleMinFinderStepManager(self.min_count_plan),
-            environment_manager=SageMakerEnvironmentManager(
-                self.iam_role_arn, self.region
-            ),
-            load_manager=SageMakerLoadManager(
-                scenario_requests=self.scenario_requests,
-                gatling_jar_path=self.jar_file,
-                gatling_scenario="GenericSageMakerScenario",
-                gatling_results_path=self.job_id_dir,
-                iam_role_arn=self.iam_role_arn,
-                region=self.region,
+        environment_manager = self._environment_manager()
+        load_manager = self._telemetry_load_manager(
+            environment_manager, self._load_manager(replay=bool(self.traffic_trace))
+        )
+        min_count_workflow = trace_workflow(
+            Workflow(
+                plan=self.min_count_plan,
+                step_manager=self._step_manager(
+                    self.min_step_manager, self.min_count_plan
+                ),
+                environment_manager=self._scheduled(
+                    self._retiring(environment_manager)
+                ),
+                load_manager=self._retiring_load_manager(load_manager),
+                result_managers=self._result_managers(
+                    environment_manager, load_manager
+                ),
+                reporters=self._reporters(),
+                teardown_between_steps=True,
+                teardown_at_end=True,
             ),
-            result_managers=[GatlingResultManager(results_path=self.job_id_dir)],
-            reporters=[MockReporter()],
-            teardown_between_steps=True,
-            teardown_at_end=True,
+            self.tracer,
         )
         min_count_recommendation = min_count_workflow.run()
         log.debug(
@@ -549,16 +853,271 @@ class Main:
         recommend_min: Dict[str, str] = {}
         recommend_min["min_instance_count"] = str(min_instance_count)
         recommend_min["min_cost"] = self.cost.explain(instance_type, min_instance_count)
+        traffic = f"Traffic was {ramp_start_tps} TPS ramped over {ramp_minutes} minutes to {steady_state_tps} TPS, and then run for {steady_state_minutes} minutes.\n"
+        if self.traffic_trace:
+            traffic = (
+                f"Traffic was replayed from {self.traffic_trace} at {self.traffic_scale}x, "
+                f"peak {self.traffic_profile['trace_peak_tps']} TPS over {self.traffic_profile['trace_duration_minutes']} minutes.\n"
+            )
         recommend_min["explanation"] = (
-            f"Traffic was {ramp_start_tps} TPS ramped over {ramp_minutes} minutes to {steady_state_tps} TPS, and then run for {steady_state_minutes} minutes.\n"
-            f"Last green run was auto scale configuration with minimum {min_instance_count}, maximum {max_instance_count} instances of type {instance_type},\n"
+            traffic
+            + f"Last green run was auto scale configuration with minimum {min_instance_count}, maximum {max_instance_count} instances of type {instance_type},\n"
             f"with scaling metric {scaling_metric} at {scaling_target} as calculated earlier.\n"
         )
         log.info(f"recommend_min: {pformat(recommend_min)}")
         return recommend_min
 
+    def test_target(
+        self,
+        instance_type: str,
+        max_instance_count: int,
+        min_instance_count: int,
+        max_tps_per_instance: Decimal,
+    ) -> Optional[Dict[str, str]]:
+        # Phase 4 (optional): Find highest scaling target that still supports
+        # given ramp. The safety factor target keeps each instance at half its
+        # measured max TPS, so steady state runs on about twice the instances
+        # needed. Try higher targets together with higher min counts, and keep
+        # whichever setup passes with the fewest instances at steady state.
+        factors = []
+        factor = SageMaker.SAFETY_FACTOR
+        while factor <= SageMaker.MAX_TARGET_FACTOR:
+            factors.append(factor)
+            factor = factor + SageMaker.TARGET_FACTOR_STEP
+        targets = sorted(
+            {int(max_tps_per_instance * 60 * factor) for factor in factors} - {0}
+        )
+        if len(targets) < 2:
+            log.info(f"No higher scaling target to try than {targets}.")
+            return None
+
+        self.target_plan = LazyPlan(
+            parameter_lists={
+                Parameter.host: [self.host],
+                Parameter.region: [self.region],
+                Parameter.endpoint_name: [self.endpoint_name],
+                Parameter.endpoint_config_name: [self.endpoint_config_name],
+                Parameter.variant_name: [self.variant_name],
+                Parameter.model_name: [self.model_name],
+                Parameter.instance_type: [instance_type],
+                # omitting Parameter.initial_instance_count
+                Parameter.scaling_enabled: ["True"],
+                Parameter.scaling_min_instance_count: list(
+                    map(
+                        str,
+                        range(min_instance_count, max_instance_count + 1),
+                    )
+                ),
+                Parameter.scaling_max_instance_count: [str(max_instance_count)],
+                Parameter.scaling_metric: ["SageMakerVariantInvocationsPerInstance"],
+                Parameter.scaling_target: list(map(str, targets)),
+                Parameter.ramp_start_tps: [str(self.endurance_ramp_start_tps)],
+                Parameter.ramp_minutes: [str(self.endurance_ramp_minutes)],
+                Parameter.steady_state_tps: [str(self.peak_tps)],
+                Parameter.steady_state_minutes: [
+                    str(self.endurance_steady_state_minutes)
+                ],
+            },
+            requirements=self.requirements,
+        )
+        log.info(f"Testing scaling targets with plan: {self.target_plan}")
+
+        environment_manager = self._environment_manager()
+        load_manager = self._telemetry_load_manager(
+            environment_manager, self._load_manager(replay=bool(self.traffic_trace))
+        )
+        target_workflow = trace_workflow(
+            Workflow(
+                plan=self.target_plan,
+                step_manager=self._step_manager(
+                    self.target_step_manager, self.target_plan
+                ),
+                environment_manager=self._scheduled(
+                    self._retiring(environment_manager)
+                ),
+                load_manager=self._retiring_load_manager(load_manager),
+                result_managers=self._result_managers(
+                    environment_manager, load_manager
+                ),
+                reporters=self._reporters(),
+                teardown_between_steps=True,
+                teardown_at_end=True,
+            ),
+            self.tracer,
+        )
+        target_recommendation = target_workflow.run()
+        log.debug(
+            f"Test for scaling target got recommendation: {pformat(target_recommendation)}"
+        )
+        if not target_recommendation:
+            log.error(f"Test failed to find a working scaling target.")
+            return None
+
+        scaling_target = target_recommendation[Parameter.scaling_target]
+        min_count = target_recommendation[Parameter.scaling_min_instance_count]
+        average_count = average_instance_count(target_recommendation)
+        # Setup found by the min count test, at the safety factor target.
+        baseline = dict(target_recommendation)
+        baseline[Parameter.scaling_target] = str(targets[0])
+        baseline[Parameter.scaling_min_instance_count] = str(min_instance_count)
+        baseline_count = average_instance_count(baseline)
+        recommend_target: Dict[str, str] = {}
+        recommend_target["invocations_target"] = scaling_target
+        recommend_target["min_instance_count"] = min_count
+        recommend_target["min_cost"] = self.cost.explain(instance_type, int(min_count))
+        recommend_target["average_instance_count"] = f"{average_count:.2f}"
+        recommend_target["explanation"] = (
+            f"Tried targets {', '.join(map(str, targets))} invocations / instance / minute,\n"
+            f"from {SageMaker.SAFETY_FACTOR} to {SageMaker.MAX_TARGET_FACTOR} of max_tps_per_instance {max_tps_per_instance} * 60,\n"
+            f"with minimum instance counts from {min_instance_count} up to {max_instance_count}.\n"
+            f"Each minute of the traffic pattern needs\n"
+            f"= min(max_instance_count, max(min_instance_count, ceil(TPS * 60 / target))) instances.\n"
+            f"Passing setup with fewest instances on average was target {scaling_target} with minimum {min_count},\n"
+            f"averaging {average_count:.2f} instances, compared to {baseline_count:.2f} at target {targets[0]} from the safety factor."
+        )
+        log.info(f"recommend_target: {pformat(recommend_target)}")
+        return recommend_target
+
+    def run(self) -> None:
+        """Run the test phases in order, each one only if the previous found
+        a recommendation."""
+        with self.tracer.span("test_type", type_walk=",".join(self.type_walk)):
+            self.recommend_type = self.test_type()
+
+        # Only continue with max count test if type test successful and endurance enabled
+        if (
+            self.recommend_type
+            and "max" in self.phases
+            and self.endurance_steady_state_minutes > 0
+        ):
+            instance_type = self.recommend_type[Parameter.instance_type]
+            instance_count_needed = int(self.recommend_type["instance_count_needed"])
+            with self.tracer.span(
+                "test_max",
+                instance_type=instance_type,
+                instance_count_needed=instance_count_needed,
+            ):
+                self.recommend_max = self.test_max(
+                    instance_type=instance_type,
+                    instance_count_needed=instance_count_needed,
+                )
+
+            # Only continue with min count test if max count test successful and ramp or trace exists
+            if (
+                self.recommend_max
+                and "min" in self.phases
+                and (self.endurance_ramp_minutes > 0 or self.traffic_trace)
+            ):
+                max_instance_count = int(self.recommend_max["max_instance_count"])
+                invocations_target = int(self.recommend_max["invocations_target"])
+                with self.tracer.span(
+                    "test_min",
+                    instance_type=instance_type,
+                    max_instance_count=max_instance_count,
+                    invocations_target=invocations_target,
+                ):
+                    self.recommend_min = self.test_min(
+                        instance_type=instance_type,
+                        max_instance_count=max_instance_count,
+                        invocations_target=invocations_target,
+                    )
+
+                # Only search targets if asked and a min count was found
+                if self.recommend_min and self.optimize_scaling_target:
+                    min_instance_count = int(self.recommend_min["min_instance_count"])
+                    with self.tracer.span(
+                        "test_target",
+                        instance_type=instance_type,
+                        max_instance_count=max_instance_count,
+                        min_instance_count=min_instance_count,
+                    ):
+                        self.recommend_target = self.test_target(
+                            instance_type=instance_type,
+                            max_instance_count=max_instance_count,
+                            min_instance_count=min_instance_count,
+                            max_tps_per_instance=Decimal(
+                                self.recommend_max["max_tps_per_instance"]
+                            ),
+                        )
+                if self.recommend_min and self.recommend_target:
+                    # Recommend the optimized target in place of safety factor.
+                    self.recommend_max["invocations_target"] = self.recommend_target[
+                        "invocations_target"
+                    ]
+                    self.recommend_min["min_instance_count"] = self.recommend_target[
+                        "min_instance_count"
+                    ]
+                    self.recommend_min["min_cost"] = self.recommend_target["min_cost"]
+                    self.recommend_min["explanation"] = (
+                        self.recommend_min["explanation"]
+                        + f"Scaling target search then found minimum {self.recommend_target['min_instance_count']} "
+                        f"with scaling target {self.recommend_target['invocations_target']}, see Optimize Scaling Target.\n"
+                    )
+
+    def reclaim_orphans(self) -> None:
+        """Delete what crashed jobs left in this account before testing,
+        from any host. Ones in other accounts are only listed."""
+        assert self.resource_ledger is not None
+        from perfsizesagemaker.reaper import reap
+
+        orphans = self.resource_ledger.orphans()
+        others = [
+            resource
+            for resource in orphans
+            if (resource.region, resource.iam_role_arn)
+            != (self.region, self.iam_role_arn)
+        ]
+        if others:
+            log.warning(
+                f"Found {len(others)} resources left by crashed jobs in other "
+                f"accounts, run python -m perfsizesagemaker.reaper "
+                f"--perfsize_results_dir {self.perfsize_results_dir} to delete "
+                f"them: {others}"
+            )
+        orphans = [resource for resource in orphans if resource not in others]
+        if not orphans:
+            return
+        log.warning(f"Deleting {len(orphans)} resources left by crashed jobs")
+        environment_manager = self._environment_manager().environment_manager
+        failed = reap(
+            self.resource_ledger, orphans, lambda resource: environment_manager
+        )
+        if failed:
+            log.error(f"Could not delete resources left by crashed jobs: {failed}")
+
+    def render_report(self) -> str:
+        # Same reporter every time, so it can reuse plan sections that did
+        # not change since the last run.
+        if self.reporter is None:
+            from perfsizesagemaker.reporter.html import HTMLReporter
+
+            self.reporter = HTMLReporter()
+        self.reporter.type_plan = self.type_plan
+        self.reporter.max_count_plan = self.max_count_plan
+        self.reporter.min_count_plan = self.min_count_plan
+        self.reporter.target_plan = self.target_plan
+        self.reporter.recommend_type = self.recommend_type
+        self.reporter.recommend_max = self.recommend_max
+        self.reporter.recommend_min = self.recommend_min
+        self.reporter.recommend_target = self.recommend_target
+        self.reporter.test_spend = f"{self.spend.total():.2f}"
+        self.reporter.max_test_budget = (
+            None if self.max_test_budget_usd is None else f"{self.max_test_budget_usd}"
+        )
+        self.reporter.timelines = self.timelines
+        self.reporter.time_breakdown = self.tracer.breakdown()
+        return self.reporter.render()
+
     def main(self) -> None:
+        if self.validate_only:
+            print(f"Arguments are valid for job {self.job_id_dir}")
+            return
+        from perfsizesagemaker.reporter.html import HTMLReporter
+        from perfsizesagemaker.reporter.incremental import IncrementalReporter
+        from perfsizesagemaker.result.archive import archive_job
+
         inputs: Dict[str, str] = {}
+        inputs["job_spec"] = f"{self.job_spec}"
         inputs["iam_role_arn"] = f"{self.iam_role_arn}"
         inputs["host"] = f"{self.host}"
         inputs["region"] = f"{self.region}"
@@ -567,9 +1126,11 @@ class Main:
         inputs["variant_name"] = f"{self.variant_name}"
         inputs["model_name"] = f"{self.model_name}"
         inputs["scenario_requests"] = f"{self.scenario_requests}"
+        inputs.update(self.payloads.profile())
         inputs["peak_tps"] = f"{self.peak_tps}"
         inputs["latency_success_p99"] = f"{self.latency_success_p99}"
         inputs["percent_fail"] = f"{self.percent_fail}"
+        inputs["requirements"] = f"{self.requirements}"
         inputs["type_walk"] = f"{self.type_walk}"
         inputs["count_walk"] = f"{self.count_walk}"
         inputs["tps_walk"] = f"{self.tps_walk}"
@@ -580,47 +1141,64 @@ class Main:
             "endurance_steady_state_minutes"
         ] = f"{self.endurance_steady_state_minutes}"
         inputs["endurance_retries"] = f"{self.endurance_retries}"
+        inputs["phases"] = f"{self.phases}"
+        inputs["strategy"] = f"{self.strategy}"
         inputs["perfsize_results_dir"] = f"{self.perfsize_results_dir}"
         inputs["job_id_dir"] = f"{self.job_id_dir}"
         inputs["cost_file"] = f"{self.cost_file}"
         inputs["jar_file"] = f"{self.jar_file}"
         inputs["logging_config"] = f"{self.logging_config}"
+        inputs["archive_results"] = f"{self.archive_results}"
+        inputs["traffic_trace"] = f"{self.traffic_trace}"
+        inputs["local_config"] = f"{self.local_config}"
+        inputs["max_test_budget_usd"] = f"{self.max_test_budget_usd}"
+        inputs["scaling_telemetry_seconds"] = f"{self.scaling_telemetry_seconds}"
+        inputs["optimize_scaling_target"] = f"{self.optimize_scaling_target}"
+        inputs["compare_types"] = f"{self.compare_types}"
+        inputs["instance_quotas"] = f"{self.instance_quotas}"
+        inputs["quota_db"] = f"{self.quota_db}"
+        inputs["async_teardown"] = f"{self.async_teardown}"
+        inputs["metrics_port"] = f"{self.metrics_port}"
+        inputs["metrics_textfile"] = f"{self.metrics_textfile}"
+        inputs["validate_only"] = f"{self.validate_only}"
+        inputs["traffic_scale"] = f"{self.traffic_scale}"
+        inputs.update(self.traffic_profile)
         log.debug(f"inputs: {pformat(inputs)}")
 
-        self.recommend_type = self.test_type()
+        self.reporter = HTMLReporter(inputs=inputs)
+        report_file = f"{self.job_id_dir}/Final_Job_Report.html"
+        self.report = IncrementalReporter(self.render_report, report_file)
+        self.report.write()
 
-        # Only continue with max count test if type test successful and endurance enabled
-        if self.recommend_type and self.endurance_steady_state_minutes > 0:
-            instance_type = self.recommend_type[Parameter.instance_type]
-            instance_count_needed = int(self.recommend_type["instance_count_needed"])
-            self.recommend_max = self.test_max(
-                instance_type=instance_type, instance_count_needed=instance_count_needed
-            )
+        server: Optional["MetricsServer"] = None
+        if self.metrics is not None and self.metrics_port is not None:
+            from perfsizesagemaker.metrics import MetricsServer
 
-            # Only continue with min count test if max count test successful and ramp exists
-            if self.recommend_max and self.endurance_ramp_minutes > 0:
-                max_instance_count = int(self.recommend_max["max_instance_count"])
-                invocations_target = int(self.recommend_max["invocations_target"])
-                self.recommend_min = self.test_min(
-                    instance_type=instance_type,
-                    max_instance_count=max_instance_count,
-                    invocations_target=invocations_target,
-                )
+            server = MetricsServer(self.metrics, self.metrics_port)
+            server.start()
+        try:
+            with self.tracer.span("job", model_name=self.model_name):
+                try:
+                    if self.resource_ledger is not None:
+                        with self.tracer.span("reclaim orphans"):
+                            self.reclaim_orphans()
+                    self.run()
+                finally:
+                    # Retired endpoints keep billing until they are deleted.
+                    if self.cleanup is not None:
+                        with self.tracer.span("drain cleanup"):
+                            self.cleanup.drain()
+                    if self.resource_ledger is not None:
+                        self.resource_ledger.close()
+        finally:
+            if server is not None:
+                server.stop()
 
-        # Generate final report...
-        reporter = HTMLReporter(
-            inputs=inputs,
-            type_plan=self.type_plan,
-            max_count_plan=self.max_count_plan,
-            min_count_plan=self.min_count_plan,
-            recommend_type=self.recommend_type,
-            recommend_max=self.recommend_max,
-            recommend_min=self.recommend_min,
-        )
-        content = reporter.render()
-        report_file = f"{self.job_id_dir}/Final_Job_Report.html"
-        with open(report_file, "w") as file:
-            file.write(content)
+        # Write final report with the recommendations of the last phase...
+        self.report.write()
+
+        if self.archive_results:
+            archive_job(self.job_id_dir)
 
         # TODO: Add flag to save files to S3...
 
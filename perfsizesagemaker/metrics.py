@@ -0,0 +1,313 @@
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging.config
+import os
+from perfsize.perfsize import Run
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.tracing import Span, SpanListener, TRACED_PARAMETERS
+import threading
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# https://github.com/OpenObservability/OpenMetrics/blob/main/specification/OpenMetrics.md
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+PHASES = ["test_type", "test_max", "test_min", "test_target"]
+
+# EndpointStatus values, plus NotFound for no endpoint.
+ENDPOINT_STATUSES = [
+    "NotFound",
+    "Creating",
+    "Updating",
+    "SystemUpdating",
+    "RollingBack",
+    "InService",
+    "OutOfService",
+    "Deleting",
+    "Failed",
+]
+
+# Endpoint status while an operation runs, and once it succeeds.
+ENDPOINT_OPERATIONS = {
+    "create endpoint": ("Creating", "InService"),
+    "delete endpoint": ("Deleting", "NotFound"),
+    "request delete endpoint": ("Deleting", "Deleting"),
+}
+
+# Results of a run shown as gauges, by metric.
+RUN_GAUGES = {
+    "latency_success_p99": "perfsize_run_latency_success_p99_milliseconds",
+    "percent_fail": "perfsize_run_percent_fail",
+}
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(**values: str) -> str:
+    return ",".join(f'{name}="{escape(value)}"' for name, value in values.items())
+
+
+class JobMetrics(SpanListener):
+    """Live progress of one job, in the OpenMetrics text format.
+
+    Follows the job's spans for the current phase, step and endpoint
+    operations, and gets run results from MetricsResultManager. An operation
+    that stalls, like waiting for an endpoint to be InService, stays listed
+    with its start time until it ends. With a textfile, the metrics are
+    rewritten there on every change, for the node exporter textfile
+    collector; MetricsServer serves them over http instead.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        model_name: str,
+        spend: SpendTracker,
+        textfile: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.model_name = model_name
+        self.spend = spend
+        self.textfile = textfile
+        self.lock = threading.Lock()
+        # Spans end on timer threads too, so writes of the textfile take turns.
+        self.textfile_lock = threading.Lock()
+        self.running = False
+        self.phase: Optional[str] = None
+        self.step: Dict[str, str] = {}
+        self.steps_completed = 0
+        self.steps_remaining = 0
+        # Open operations by span id, as (name, start time).
+        self.operations: Dict[str, Tuple[str, int]] = {}
+        self.runs_completed = 0
+        self.run_tps: Optional[Decimal] = None
+        self.run_results: Dict[str, Decimal] = {}
+        self.endpoint_status: Dict[str, str] = {}
+        self.transitions: Dict[Tuple[str, str, str], int] = {}
+
+    def __repr__(self) -> str:
+        return f"JobMetrics(job_id={self.job_id}, textfile={self.textfile})"
+
+    def _status(self, endpoint_name: str, status: str) -> None:
+        previous = self.endpoint_status.get(endpoint_name)
+        if previous is not None and previous != status:
+            key = (endpoint_name, previous, status)
+            self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.endpoint_status[endpoint_name] = status
+
+    def on_start(self, span: Span) -> None:
+        with self.lock:
+            if span.name == "job":
+                self.running = True
+            elif span.name in PHASES:
+                self.phase = span.name
+            elif span.name == "step":
+                self.step = {
+                    key: value
+                    for key, value in span.attributes.items()
+                    if key in TRACED_PARAMETERS
+                }
+                # Configs of the plan not started yet, which the step
+                # manager may skip.
+                self.steps_remaining = int(span.attributes["untested_configs"])
+            else:
+                self.operations[span.span_id] = (span.name, span.start_ms)
+                endpoint_name = span.attributes.get("endpoint_name")
+                if endpoint_name and span.name in ENDPOINT_OPERATIONS:
+                    self._status(endpoint_name, ENDPOINT_OPERATIONS[span.name][0])
+        self.changed()
+
+    def on_end(self, span: Span) -> None:
+        with self.lock:
+            if span.name == "job":
+                self.running = False
+            elif span.name in PHASES:
+                self.phase = None
+                self.steps_remaining = 0
+            elif span.name == "step":
+                self.step = {}
+                self.steps_completed += 1
+            else:
+                self.operations.pop(span.span_id, None)
+                endpoint_name = span.attributes.get("endpoint_name")
+                status = span.attributes.get("endpoint_status")
+                if span.error is None and span.name in ENDPOINT_OPERATIONS:
+                    status = ENDPOINT_OPERATIONS[span.name][1]
+                if endpoint_name and status:
+                    self._status(endpoint_name, status)
+        self.changed()
+
+    def record_run(self, run: Run) -> None:
+        results = {result.metric: result.value for result in run.results}
+        seconds = Decimal(f"{(run.end - run.start).total_seconds()}")
+        with self.lock:
+            self.runs_completed += 1
+            self.run_tps = (
+                results["count_total"] / seconds
+                if "count_total" in results and seconds > 0
+                else None
+            )
+            self.run_results = {
+                metric: results[metric] for metric in RUN_GAUGES if metric in results
+            }
+        self.changed()
+
+    def render(self) -> str:
+        job = labels(job=self.job_id)
+        lines: List[str] = []
+
+        def family(name: str, typ: str, help: str) -> None:
+            lines.append(f"# TYPE {name} {typ}")
+            lines.append(f"# HELP {name} {help}")
+
+        with self.lock:
+            family("perfsize_job", "info", "Sizing job.")
+            lines.append(
+                f"perfsize_job_info{{{job},{labels(model=self.model_name)}}} 1"
+            )
+            family("perfsize_job_running", "gauge", "1 while the job runs.")
+            lines.append(f"perfsize_job_running{{{job}}} {int(self.running)}")
+            family("perfsize_job_phase", "stateset", "Test phase running.")
+            for phase in PHASES:
+                lines.append(
+                    f"perfsize_job_phase{{{job},{labels(perfsize_job_phase=phase)}}} "
+                    f"{int(phase == self.phase)}"
+                )
+            family("perfsize_job_step", "info", "Config of the step running.")
+            if self.step:
+                lines.append(f"perfsize_job_step_info{{{job},{labels(**self.step)}}} 1")
+            family("perfsize_job_steps_completed", "counter", "Steps completed.")
+            lines.append(
+                f"perfsize_job_steps_completed_total{{{job}}} {self.steps_completed}"
+            )
+            family(
+                "perfsize_job_steps_remaining",
+                "gauge",
+                "Most steps left in the current phase.",
+            )
+            lines.append(
+                f"perfsize_job_steps_remaining{{{job}}} {self.steps_remaining}"
+            )
+            family(
+                "perfsize_job_operation_started_seconds",
+                "gauge",
+                "Start time of each operation running.",
+            )
+            started: Dict[str, int] = {}
+            for name, start_ms in self.operations.values():
+                started[name] = min(start_ms, started.get(name, start_ms))
+            for name, start_ms in sorted(started.items()):
+                lines.append(
+                    f"perfsize_job_operation_started_seconds{{{job},{labels(operation=name)}}} "
+                    f"{Decimal(start_ms) / MILLISECONDS_PER_SECOND}"
+                )
+            family("perfsize_runs_completed", "counter", "Load runs completed.")
+            lines.append(
+                f"perfsize_runs_completed_total{{{job}}} {self.runs_completed}"
+            )
+            family("perfsize_run_tps", "gauge", "Achieved TPS of the last run.")
+            if self.run_tps is not None:
+                lines.append(f"perfsize_run_tps{{{job}}} {self.run_tps:.3f}")
+            for metric, name in RUN_GAUGES.items():
+                family(name, "gauge", f"{metric} of the last run.")
+                if metric in self.run_results:
+                    lines.append(f"{name}{{{job}}} {self.run_results[metric]}")
+            family("perfsize_endpoint_status", "stateset", "Last seen endpoint status.")
+            for endpoint_name, current in sorted(self.endpoint_status.items()):
+                for status in ENDPOINT_STATUSES:
+                    state = labels(
+                        endpoint=endpoint_name, perfsize_endpoint_status=status
+                    )
+                    lines.append(
+                        f"perfsize_endpoint_status{{{job},{state}}} "
+                        f"{int(status == current)}"
+                    )
+            family(
+                "perfsize_endpoint_status_transitions",
+                "counter",
+                "Endpoint status changes seen.",
+            )
+            for (endpoint_name, before, after), count in sorted(
+                self.transitions.items()
+            ):
+                transition = labels(
+                    endpoint=endpoint_name, **{"from": before, "to": after}
+                )
+                lines.append(
+                    f"perfsize_endpoint_status_transitions_total{{{job},{transition}}} "
+                    f"{count}"
+                )
+            family(
+                "perfsize_test_spend_usd",
+                "gauge",
+                "Cost of endpoint instances used so far.",
+            )
+            lines.append(f"perfsize_test_spend_usd{{{job}}} {self.spend.total():.4f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def changed(self) -> None:
+        if not self.textfile:
+            return
+        # Written aside and renamed, so a collector never reads half a file.
+        temporary = f"{self.textfile}.{os.getpid()}.tmp"
+        try:
+            with self.textfile_lock:
+                with open(temporary, "w") as f:
+                    f.write(self.render())
+                os.replace(temporary, self.textfile)
+        except Exception as e:
+            # Metrics are for watching the job, never a reason to fail it.
+            log.warning(f"Could not write metrics to {self.textfile}: {e}")
+
+
+class MetricsServer:
+    """Serve JobMetrics at /metrics on a background thread. Port 0 picks a
+    free port, see port once started."""
+
+    def __init__(self, metrics: JobMetrics, port: int, host: str = ""):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return f"MetricsServer(host={self.host}, port={self.port})"
+
+    def start(self) -> None:
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                log.debug(format % args)
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        log.info(f"Serving job metrics at http://localhost:{self.port}/metrics")
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+        self.server = None
@@ -0,0 +1,118 @@
+import itertools
+from perfsize.perfsize import Condition, Config, Plan
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    SupportsIndex,
+    Tuple,
+    Union,
+    overload,
+)
+
+
+class Combinations(Sequence[Tuple[str, ...]]):
+    """Every combination of a plan's parameter lists in the order
+    itertools.product gives them, computed by index instead of stored."""
+
+    def __init__(self, parameter_lists: Dict[str, List[str]]):
+        self.values = list(parameter_lists.values())
+
+    def __repr__(self) -> str:
+        return f"Combinations(size={len(self)})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Combinations) and other.values == self.values
+
+    def __len__(self) -> int:
+        size = 1
+        for values in self.values:
+            size = size * len(values)
+        return size
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        return itertools.product(*self.values)
+
+    def __reversed__(self) -> Iterator[Tuple[str, ...]]:
+        return itertools.product(*[list(reversed(values)) for values in self.values])
+
+    def __contains__(self, combination: object) -> bool:
+        return (
+            isinstance(combination, tuple)
+            and len(combination) == len(self.values)
+            and all(value in values for value, values in zip(combination, self.values))
+        )
+
+    @overload
+    def __getitem__(self, index: SupportsIndex) -> Tuple[str, ...]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Tuple[str, ...]]:
+        ...
+
+    def __getitem__(
+        self, index: Union[SupportsIndex, slice]
+    ) -> Union[Tuple[str, ...], List[Tuple[str, ...]]]:
+        size = len(self)
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(size))]
+        i = index.__index__()
+        if i < 0:
+            i = i + size
+        if i < 0 or i >= size:
+            raise IndexError(f"combination index out of range: {index}")
+        # Last parameter varies fastest, as in itertools.product.
+        combination: List[str] = []
+        for values in reversed(self.values):
+            i, j = divmod(i, len(values))
+            combination.append(values[j])
+        return tuple(reversed(combination))
+
+
+class LazyConfigs(Dict[Tuple[str, ...], Config]):
+    """Configs of a plan, created the first time a combination is looked up.
+    Only visited configs are kept, so len and iteration cover just those."""
+
+    def __init__(self, plan: Plan):
+        super().__init__()
+        self.plan = plan
+
+    def __missing__(self, combination: Tuple[str, ...]) -> Config:
+        if combination not in self.plan.combinations:
+            raise KeyError(combination)
+        config = Config(
+            dict(zip(self.plan.parameter_lists.keys(), combination)),
+            self.plan.requirements,
+        )
+        self[combination] = config
+        return config
+
+
+class LazyPlan(Plan):
+    """Plan that does not build a Config for every combination up front.
+
+    Step managers look up plan.configs[combination] for the combinations they
+    visit, which is a small part of a walk over types, counts, and TPS. The
+    grid in the report only needs parameter_lists and history, which are the
+    same as for Plan.
+    """
+
+    def __init__(
+        self,
+        parameter_lists: Dict[str, List[str]],
+        requirements: Dict[str, List[Condition]],
+    ):
+        self.parameter_lists = parameter_lists
+        self.requirements = requirements
+        # Plan declares a list, but step managers only index and iterate it.
+        self.combinations: Sequence[Tuple[str, ...]] = Combinations(  # type: ignore[assignment]
+            parameter_lists
+        )
+        self.configs = LazyConfigs(self)
+        self.history: List[Config] = []
+        self.recommendation: Dict[str, str] = {}
+
+    def __repr__(self) -> str:
+        return f"LazyPlan(parameter_lists={self.parameter_lists},requirements={self.requirements})"
@@ -0,0 +1,14 @@
+import os
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this id is running on this host. Only a hint
+    for rows other hosts or restarted containers may have written, since
+    process ids are reused."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
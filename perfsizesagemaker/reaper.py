@@ -0,0 +1,126 @@
+import argparse
+import logging.config
+import os
+from perfsize.perfsize import Config
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.ledger import (
+    ENDPOINT,
+    KINDS,
+    LEDGER_FILE,
+    SCALABLE_TARGET,
+    Resource,
+    ResourceLedger,
+)
+from perfsizesagemaker.environment.sagemaker import SageMakerEnvironmentManager
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+def account_environment_managers(
+    ledger: ResourceLedger,
+) -> Callable[[Resource], SageMakerEnvironmentManager]:
+    """Environment manager for the region and role each resource was
+    created with, one per account."""
+    managers: Dict[
+        Tuple[Optional[str], Optional[str]], SageMakerEnvironmentManager
+    ] = {}
+
+    def environment_manager(resource: Resource) -> SageMakerEnvironmentManager:
+        account = (resource.iam_role_arn, resource.region)
+        if account not in managers:
+            managers[account] = SageMakerEnvironmentManager(
+                resource.iam_role_arn, resource.region, ledger=ledger
+            )
+        return managers[account]
+
+    return environment_manager
+
+
+def _reap(environment_manager: SageMakerEnvironmentManager, resource: Resource) -> None:
+    if resource.kind == SCALABLE_TARGET:
+        # Named by resource id, endpoint/<endpoint_name>/variant/<variant_name>.
+        environment_manager.delete_auto_scaling(resource.name.split("/")[1])
+    elif resource.kind == ENDPOINT:
+        endpoint = environment_manager.get_endpoint(resource.name)
+        if endpoint.endpoint_status == "NotFound":
+            return
+        # Same as the job's own teardown, waiting out any update in progress.
+        environment_manager.teardown(
+            Config(
+                parameters={
+                    Parameter.endpoint_name: resource.name,
+                    Parameter.endpoint_config_name: f"{endpoint.endpoint_config_name}",
+                },
+                requirements={},
+            )
+        )
+    elif environment_manager.get_endpoint_config(resource.name):
+        environment_manager.delete_endpoint_config(resource.name)
+
+
+def reap(
+    ledger: ResourceLedger,
+    resources: List[Resource],
+    environment_manager: Callable[[Resource], SageMakerEnvironmentManager],
+) -> List[Resource]:
+    """Delete resources left open in the ledger, scalable targets first, then
+    endpoints, then endpoint configs. Ones already gone are just marked
+    deleted. Returns the ones that could not be deleted, which stay open."""
+    failed: List[Resource] = []
+    for resource in sorted(resources, key=lambda resource: KINDS.index(resource.kind)):
+        log.warning(f"Deleting {resource.kind} {resource.name} of {resource.owner}")
+        try:
+            _reap(environment_manager(resource), resource)
+        except Exception as e:
+            log.error(f"Could not delete {resource}: {e}")
+            failed.append(resource)
+            continue
+        ledger.deleted(resource.kind, resource.name, resource.region)
+    return failed
+
+
+def main(argv: Optional[List[str]] = None) -> List[Resource]:
+    parser = argparse.ArgumentParser(
+        description="Delete endpoints, endpoint configs and scalable targets "
+        "left behind by sizing jobs that crashed or were killed."
+    )
+    parser.add_argument(
+        "--perfsize_results_dir",
+        help=f"directory with the {LEDGER_FILE} ledger the jobs wrote",
+        default="perfsize-results-dir",
+    )
+    parser.add_argument(
+        "--include_live",
+        help="also delete resources of jobs whose lease has not expired, only safe if none are running",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dry_run",
+        help="list the orphans without deleting them",
+        action="store_true",
+    )
+    args = parser.parse_args(argv)
+    path = os.path.join(args.perfsize_results_dir, LEDGER_FILE)
+    if not os.path.isfile(path):
+        parser.error(f"argument --perfsize_results_dir: no ledger found at {path}")
+    ledger = ResourceLedger(path)
+    orphans = ledger.orphans(include_live=args.include_live)
+    for resource in orphans:
+        print(
+            f"{resource.kind} {resource.name} in {resource.region} "
+            f"from {resource.owner} (host {resource.host}, pid {resource.pid})"
+        )
+    if args.dry_run or not orphans:
+        return orphans
+    failed = reap(ledger, orphans, account_environment_managers(ledger))
+    if failed:
+        raise RuntimeError(
+            f"ERROR: Could not delete {len(failed)} resources, see log: {failed}"
+        )
+    return orphans
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
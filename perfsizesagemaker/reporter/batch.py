@@ -0,0 +1,58 @@
+from datetime import datetime
+import logging.config
+from perfsizesagemaker.reporter.html import format
+from typing import Dict, List
+from yattag import Doc
+
+log = logging.getLogger(__name__)
+
+COLUMNS = [
+    "model_name",
+    "endpoint_name",
+    "status",
+    "instance_type",
+    "min_instance_count",
+    "max_instance_count",
+    "test_spend_usd",
+    "estimated_minutes",
+    "elapsed_minutes",
+    "report",
+]
+
+
+class BatchReporter:
+    """Index page for a batch, one row per model with a link to its report."""
+
+    def __init__(self, summaries: List[Dict[str, str]]):
+        self.summaries = summaries
+
+    def render(self) -> str:
+        doc, tag, text = Doc().tagtext()
+        done = sum(1 for summary in self.summaries if summary["status"] == "done")
+        with tag("h1"):
+            text("Batch Endpoint Sizing Results")
+        with tag("p"):
+            text(
+                f"{done} of {len(self.summaries)} sizing jobs finished, "
+                f"generated {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}."
+            )
+        with tag(
+            "table", border="1", klass="dataframe table table-hover table-bordered"
+        ):
+            with tag("tr"):
+                for column in COLUMNS:
+                    with tag("th"):
+                        text(column)
+            for summary in self.summaries:
+                with tag("tr"):
+                    for column in COLUMNS:
+                        with tag("td"):
+                            value = summary.get(column, "")
+                            if column == "report" and value:
+                                with tag("a", href=value):
+                                    text("Final_Job_Report")
+                            elif column == "status" and "error" in summary:
+                                text(f"{value}: {summary['error']}")
+                            else:
+                                text(value)
+        return format(doc.getvalue())
@@ -0,0 +1,210 @@
+import argparse
+from datetime import datetime
+from decimal import Decimal
+import json
+import logging.config
+from perfsize.perfsize import Condition, Config, Plan, Result, Run, lt
+from perfsize.result.gatling import Metric
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.reporter.html import HTMLReporter
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Import that each backend adds to process startup.
+BACKEND_IMPORTS = {
+    "yattag": "perfsizesagemaker.reporter.html",
+    "pandas": "pandas",
+}
+
+
+class RenderResult:
+    """Startup and run table render time of one report backend."""
+
+    def __init__(
+        self,
+        backend: str,
+        import_seconds: Optional[Decimal],
+        render_seconds: Optional[Decimal],
+    ):
+        self.backend = backend
+        self.import_seconds = import_seconds
+        self.render_seconds = render_seconds
+
+    def __repr__(self) -> str:
+        return (
+            f"RenderResult(backend={self.backend}, "
+            f"import_seconds={self.import_seconds}, "
+            f"render_seconds={self.render_seconds})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "import_seconds": (
+                None if self.import_seconds is None else f"{self.import_seconds:.3f}"
+            ),
+            "render_seconds": (
+                None if self.render_seconds is None else f"{self.render_seconds:.3f}"
+            ),
+        }
+
+
+def synthetic_plan(runs: int, metrics: int) -> Plan:
+    """Plan with a run per TPS step, each with the given number of extra
+    result columns, like a long job with a wide run table."""
+    requirements = {
+        Metric.percent_fail: [Condition(lt(Decimal("0.01")), "percent_fail < 0.01")]
+    }
+    tps_walk = [f"{tps}" for tps in range(1, runs + 1)]
+    plan = Plan(
+        parameter_lists={
+            Parameter.instance_type: ["ml.m5.large"],
+            Parameter.initial_instance_count: ["1"],
+            Parameter.steady_state_tps: tps_walk,
+        },
+        requirements=requirements,
+    )
+    start = datetime.utcnow()
+    for i, tps in enumerate(tps_walk):
+        config = plan.configs[("ml.m5.large", "1", tps)]
+        results = [
+            Result("simulation_start", Decimal(1600000000000 + i * 60000), []),
+            Result("simulation_end", Decimal(1600000060000 + i * 60000), []),
+            Result(
+                Metric.percent_fail,
+                Decimal(i % 7) / 100,
+                requirements[Metric.percent_fail],
+            ),
+        ]
+        results.extend(
+            Result(f"metric_{m}", Decimal(i * m) / 3, []) for m in range(metrics)
+        )
+        config.runs.append(Run(f"run-{i}", start, start, results))
+        plan.history.append(config)
+    return plan
+
+
+def render_pandas(reporter: HTMLReporter, plan: Plan) -> str:
+    """Run table of plan rendered by a pandas Styler, as reports were before
+    pandas became optional. Raises ImportError without pandas."""
+    import pandas as pd
+
+    results: Dict[str, Dict[str, Any]] = {}
+    styles: Dict[str, Dict[str, str]] = {}
+    cols = ["start_time", "end_time"]
+    for config in plan.history:
+        for run in config.runs:
+            results[run.id] = {}
+            styles[run.id] = reporter.run_styles(plan, run)
+            for result in run.results:
+                results[run.id][result.metric] = result.value
+                if result.metric not in cols:
+                    cols.append(result.metric)
+    data = pd.DataFrame.from_dict(results, orient="index", columns=cols)
+    css = pd.DataFrame.from_dict(styles, orient="index", columns=cols).fillna("")
+    return str(
+        data.style.set_table_attributes(
+            'border="1" class="dataframe table table-hover table-bordered"'
+        )
+        .apply(lambda _: css, axis=None)
+        .to_html()
+    )
+
+
+def import_seconds(module: str) -> Optional[Decimal]:
+    """Time to import module in a new interpreter, or None if it fails."""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        log.info(f"Could not import {module}: {completed.stderr.strip()}")
+        return None
+    return Decimal(completed.stdout.strip())
+
+
+def render_seconds(render: Callable[[], str], repeat: int) -> Decimal:
+    # Best of repeat, to leave out one-off costs like the first import.
+    best: Optional[float] = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return Decimal(f"{best:.6f}")
+
+
+def run_backend(backend: str, plan: Plan, repeat: int) -> RenderResult:
+    if backend not in BACKEND_IMPORTS:
+        raise RuntimeError(
+            f"ERROR: Unknown backend {backend}, expected one of {list(BACKEND_IMPORTS)}"
+        )
+    reporter = HTMLReporter()
+    render: Callable[[], str] = lambda: reporter.render_runs(plan)
+    if backend == "pandas":
+        render = lambda: render_pandas(reporter, plan)
+    try:
+        seconds: Optional[Decimal] = render_seconds(render, repeat)
+    except ImportError as err:
+        log.info(f"Skipping {backend} render: {err}")
+        seconds = None
+    return RenderResult(backend, import_seconds(BACKEND_IMPORTS[backend]), seconds)
+
+
+def main(argv: Optional[List[str]] = None) -> List[RenderResult]:
+    parser = argparse.ArgumentParser(
+        description="Compare startup and run table render time of the report "
+        "with yattag against a pandas Styler."
+    )
+    parser.add_argument(
+        "--backends",
+        help=f"comma separated backends to compare, from {list(BACKEND_IMPORTS)}",
+        default=",".join(BACKEND_IMPORTS),
+    )
+    parser.add_argument("--runs", help="rows in the run table", default="200")
+    parser.add_argument("--metrics", help="extra result columns", default="40")
+    parser.add_argument("--repeat", help="renders to time per backend", default="3")
+    parser.add_argument(
+        "--benchmark_output",
+        help="path to save results as json",
+        required=False,
+    )
+    args = parser.parse_args(argv)
+    try:
+        runs = int(args.runs)
+        metrics = int(args.metrics)
+        repeat = int(args.repeat)
+        if runs < 1 or metrics < 0 or repeat < 1:
+            raise ValueError
+    except ValueError:
+        parser.error(
+            f"arguments --runs, --metrics, --repeat: expected positive integers "
+            f"but got: {args.runs}, {args.metrics}, {args.repeat}"
+        )
+    plan = synthetic_plan(runs, metrics)
+    results = [
+        run_backend(backend, plan, repeat) for backend in args.backends.split(",")
+    ]
+
+    print(f"{'backend':<10}{'import s':>10}{'render s':>10}")
+    for result in results:
+        row = result.to_dict()
+        print(
+            f"{row['backend']:<10}{row['import_seconds'] or '-':>10}"
+            f"{row['render_seconds'] or '-':>10}"
+        )
+    if args.benchmark_output:
+        with open(args.benchmark_output, "w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
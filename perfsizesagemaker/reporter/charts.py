@@ -0,0 +1,252 @@
+from decimal import Decimal
+import json
+from perfsize.perfsize import Plan
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.reporter.timeline import (
+    HEIGHT,
+    MARGIN,
+    TPS_COLOR,
+    WIDTH,
+    Number,
+    downsample,
+    timeline_svg,
+)
+from perfsizesagemaker.result.timeline import TimelineSecond
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from yattag import Doc
+
+P99_COLOR = "#b22222"
+FAIL_COLOR = "#708090"
+
+# Metric names are the same as perfsize.result.gatling.Metric, which imports
+# pandas. (label, metric, color) per line of the latency charts.
+LATENCY_PERCENTILES = [
+    ("p50", "latency_success_p50", "#2e8b57"),
+    ("p95", "latency_success_p95", "#d2691e"),
+    ("p99", "latency_success_p99", P99_COLOR),
+]
+PERCENT_FAIL = "percent_fail"
+
+# Line colors for charts with a line per instance type and count.
+COLORS = ["#4a7ebb", "#2e8b57", "#d2691e", "#b22222", "#6a5acd", "#708090"]
+
+
+def _json_value(value: Optional[Number]) -> Any:
+    if value is None or isinstance(value, int):
+        return value
+    return float(value)
+
+
+def line_chart(
+    title: str,
+    x_label: str,
+    y_label: str,
+    x: Sequence[Number],
+    lines: List[Tuple[str, str, Sequence[Optional[Number]]]],
+    markers: bool = True,
+) -> str:
+    """Inline SVG with a line per (name, color, values) over x, downsampled
+    to MAX_POINTS. The plotted data is embedded as JSON next to the chart,
+    and with markers each point shows its values on hover."""
+    rows = downsample([[x[i]] + [line[2][i] for line in lines] for i in range(len(x))])
+    if not rows:
+        return ""
+    xs = [float(row[0] or 0) for row in rows]
+    x_min, x_max = min(xs), max(xs)
+    ys = [float(value) for row in rows for value in row[1:] if value is not None]
+    y_max = max(ys + [1.0])
+    plot_width = WIDTH - 2 * MARGIN
+    plot_height = HEIGHT - 2 * MARGIN
+
+    def px(value: float) -> float:
+        if x_max == x_min:
+            return MARGIN + plot_width / 2
+        return MARGIN + plot_width * (value - x_min) / (x_max - x_min)
+
+    def py(value: float) -> float:
+        return HEIGHT - MARGIN - plot_height * value / y_max
+
+    doc, tag, text = Doc().tagtext()
+    with tag("div", klass="chart"):
+        with tag(
+            "svg",
+            xmlns="http://www.w3.org/2000/svg",
+            width=WIDTH,
+            height=HEIGHT,
+            viewBox=f"0 0 {WIDTH} {HEIGHT}",
+        ):
+            doc.stag(
+                "rect",
+                x=MARGIN,
+                y=MARGIN,
+                width=plot_width,
+                height=plot_height,
+                fill="none",
+                stroke="#cccccc",
+            )
+            for j, (name, color, _) in enumerate(lines):
+                points = [
+                    (px(xs[i]), py(float(value)), row[0], value)
+                    for i, row in enumerate(rows)
+                    for value in [row[j + 1]]
+                    if value is not None
+                ]
+                if not points:
+                    continue
+                doc.stag(
+                    "polyline",
+                    ("stroke-width", "1.5"),
+                    points=" ".join(f"{x:.1f},{y:.1f}" for x, y, _, _ in points),
+                    fill="none",
+                    stroke=color,
+                )
+                if markers:
+                    for x_pixel, y_pixel, x_value, value in points:
+                        with tag(
+                            "circle",
+                            cx=f"{x_pixel:.1f}",
+                            cy=f"{y_pixel:.1f}",
+                            r="3",
+                            fill=color,
+                        ):
+                            with tag("title"):
+                                text(
+                                    f"{name}: {value} {y_label} at {x_value} {x_label}"
+                                )
+            labels = [
+                (4, MARGIN - 8, "start", f"{y_max:g} {y_label}"),
+                (MARGIN, HEIGHT - MARGIN + 16, "start", f"{x_min:g} {x_label}"),
+                (WIDTH - MARGIN, HEIGHT - MARGIN + 16, "end", f"{x_max:g} {x_label}"),
+                (
+                    WIDTH // 2,
+                    HEIGHT - 8,
+                    "middle",
+                    f"{title}: "
+                    + ", ".join(f"{name} ({color})" for name, color, _ in lines),
+                ),
+            ]
+            for x_pixel, y_pixel, anchor, label in labels:
+                with tag(
+                    "text",
+                    ("text-anchor", anchor),
+                    ("font-size", "11"),
+                    x=x_pixel,
+                    y=y_pixel,
+                    fill="#333333",
+                ):
+                    text(label)
+        data = {
+            "title": title,
+            "x_label": x_label,
+            "y_label": y_label,
+            "x": [_json_value(row[0]) for row in rows],
+            "lines": {
+                name: [_json_value(row[j + 1]) for row in rows]
+                for j, (name, _, _) in enumerate(lines)
+            },
+        }
+        with tag("script", type="application/json", klass="chart-data"):
+            # Escaped so the data cannot close the script tag.
+            doc.asis(json.dumps(data, separators=(",", ":")).replace("</", "<\\/"))
+    return doc.getvalue()
+
+
+def plan_series(plan: Plan) -> Dict[str, List[Tuple[Decimal, Dict[str, Decimal]]]]:
+    """Results of the last run of each config in history, by instance type
+    and count, as (steady state TPS, results by metric) in TPS order."""
+    series: Dict[str, Dict[Decimal, Dict[str, Decimal]]] = {}
+    for config in plan.history:
+        if not config.runs:
+            continue
+        name = (
+            f"{config.parameters[Parameter.instance_type]} x "
+            f"{config.parameters[Parameter.initial_instance_count]}"
+        )
+        tps = Decimal(config.parameters[Parameter.steady_state_tps])
+        series.setdefault(name, {})[tps] = {
+            result.metric: result.value for result in config.runs[-1].results
+        }
+    return {name: sorted(points.items()) for name, points in series.items()}
+
+
+def plan_charts(plan: Optional[Plan]) -> str:
+    """Latency percentiles against TPS for each instance type and count
+    tested, and error rate against TPS for all of them."""
+    if not plan:
+        return ""
+    series = plan_series(plan)
+    doc, tag, text = Doc().tagtext()
+    for name, points in series.items():
+        doc.asis(
+            line_chart(
+                f"{name} latency",
+                "TPS",
+                "ms",
+                [tps for tps, _ in points],
+                [
+                    (label, color, [results.get(metric) for _, results in points])
+                    for label, metric, color in LATENCY_PERCENTILES
+                ],
+            )
+        )
+    # One x axis for all, with a gap where a type was not tested at a TPS.
+    all_tps = sorted({tps for points in series.values() for tps, _ in points})
+    by_tps = {name: dict(points) for name, points in series.items()}
+    if all_tps:
+        doc.asis(
+            line_chart(
+                "Error rate",
+                "TPS",
+                "% fail",
+                all_tps,
+                [
+                    (
+                        name,
+                        COLORS[i % len(COLORS)],
+                        [
+                            by_tps[name].get(tps, {}).get(PERCENT_FAIL)
+                            for tps in all_tps
+                        ],
+                    )
+                    for i, name in enumerate(series)
+                ],
+            )
+        )
+    return doc.getvalue()
+
+
+def timeline_charts(timeline: List[TimelineSecond]) -> str:
+    """Load with instance counts when they were sampled, or else requests
+    and failures per second, then p99 latency per second over a run."""
+    if not timeline:
+        return ""
+    start = timeline[0].time_ms
+    seconds = [(second.time_ms - start) // 1000 for second in timeline]
+    doc, tag, text = Doc().tagtext()
+    if any(second.current_instance_count is not None for second in timeline):
+        doc.asis(timeline_svg(timeline))
+    else:
+        doc.asis(
+            line_chart(
+                "Load",
+                "s",
+                "requests/s",
+                seconds,
+                [
+                    ("requests", TPS_COLOR, [second.requests for second in timeline]),
+                    ("failures", FAIL_COLOR, [second.failures for second in timeline]),
+                ],
+                markers=False,
+            )
+        )
+    doc.asis(
+        line_chart(
+            "Latency",
+            "s",
+            "ms",
+            seconds,
+            [("p99", P99_COLOR, [second.latency_p99_ms for second in timeline])],
+            markers=False,
+        )
+    )
+    return doc.getvalue()
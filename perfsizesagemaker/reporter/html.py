@@ -1,10 +1,12 @@
 from datetime import datetime
 from decimal import Decimal
 import logging.config
-import pandas as pd
-from perfsize.perfsize import Plan
+from perfsize.perfsize import Plan, Run
 from perfsizesagemaker.constants import Parameter
-from typing import Dict, List, Optional, Union
+from perfsizesagemaker.reporter.charts import plan_charts, timeline_charts
+from perfsizesagemaker.result.timeline import SCALE_OUT_LAG_SECONDS, TimelineSecond
+from perfsizesagemaker.tracing import SpanTotal
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from yattag import Doc, indent  # type: ignore[attr-defined]
 
 log = logging.getLogger(__name__)
@@ -25,6 +27,12 @@ class HTMLReporter:
         recommend_type: Optional[Dict[str, str]] = None,
         recommend_max: Optional[Dict[str, str]] = None,
         recommend_min: Optional[Dict[str, str]] = None,
+        target_plan: Optional[Plan] = None,
+        recommend_target: Optional[Dict[str, str]] = None,
+        test_spend: Optional[str] = None,
+        max_test_budget: Optional[str] = None,
+        timelines: Optional[Dict[str, List[TimelineSecond]]] = None,
+        time_breakdown: Optional[List[SpanTotal]] = None,
     ):
         self.inputs = inputs
         self.type_plan = type_plan
@@ -33,18 +41,17 @@ class HTMLReporter:
         self.recommend_type = recommend_type
         self.recommend_max = recommend_max
         self.recommend_min = recommend_min
-
-        # Replace any new line formatting with HTML
-        tables = [
-            table
-            for table in [recommend_type, recommend_max, recommend_min]
-            if table is not None
-        ]
-        for table in tables:
-            for key in table:
-                value = table[key]
-                if "\n" in value:
-                    table[key] = self.strings_to_html(value.split("\n"))
+        self.target_plan = target_plan
+        self.recommend_target = recommend_target
+        self.test_spend = test_spend
+        self.max_test_budget = max_test_budget
+        self.timelines = timelines or {}
+        self.time_breakdown = time_breakdown or []
+
+        # Plan sections already rendered, by section name and plan, with the
+        # plan version they were rendered at. A report written after every run
+        # then only renders the sections of the plan that changed.
+        self.sections: Dict[Tuple[str, int], Tuple[Plan, Tuple[int, int], str]] = {}
 
         # Color Scheme
         self.color = {}
@@ -52,6 +59,39 @@ class HTMLReporter:
         self.color["fail"] = "ffeae5"
         self.color["background"] = "f1f6fb"
 
+    def lines_to_html(
+        self, table: Optional[Dict[str, str]]
+    ) -> Optional[Dict[str, str]]:
+        # Replace any new line formatting with HTML
+        if table is None:
+            return None
+        return {
+            key: self.strings_to_html(value.split("\n")) if "\n" in value else value
+            for key, value in table.items()
+        }
+
+    def plan_version(self, plan: Plan) -> Tuple[int, int]:
+        # Configs only get new runs, and runs get results before the next
+        # step, so history and run counts tell whether a plan changed.
+        return len(plan.history), sum(len(config.runs) for config in plan.history)
+
+    def render_section(
+        self,
+        section: str,
+        render: Callable[[Optional[Plan]], str],
+        plan: Optional[Plan],
+    ) -> str:
+        if plan is None:
+            return render(plan)
+        key = (section, id(plan))
+        version = self.plan_version(plan)
+        cached = self.sections.get(key)
+        if cached is not None and cached[0] is plan and cached[1] == version:
+            return cached[2]
+        content = render(plan)
+        self.sections[key] = (plan, version, content)
+        return content
+
     def format_unix_time(self, seconds: int) -> str:
         return datetime.utcfromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S UTC")
 
@@ -73,35 +113,58 @@ class HTMLReporter:
         # Everything else (including None) is neutral
         return f'color: {self.color["background"]}; background-color: {self.color["background"]}'
 
-    def highlight_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Make a copy so original unchanged
-        df_copy = df.copy()
-        # Set all to default no color
-        df_copy.loc[:, :] = "background-color: "
-        # Not sure how to pass in relevant plan, so need to check each one.
-        # Find corresponding run and highlight selected metrics.
-        plans = [
-            plan
-            for plan in [self.type_plan, self.max_count_plan, self.min_count_plan]
-            if plan is not None
-        ]
-        for runid, row in df_copy.iterrows():
-            for plan in plans:
-                for config in plan.history:
-                    for run in config.runs:
-                        if run.id == runid:
-                            for metric in plan.requirements.keys():
-                                for result in run.results:
-                                    if result.metric == metric:
-                                        status = None
-                                        if result.successes:
-                                            status = True
-                                        if result.failures:
-                                            status = False
-                                        df_copy.loc[
-                                            runid, metric
-                                        ] = self.status_to_html_color(status)
-        return df_copy
+    def run_styles(self, plan: Plan, run: Run) -> Dict[str, str]:
+        # Highlight the metrics with requirements by whether they passed.
+        styles: Dict[str, str] = {}
+        for metric in plan.requirements.keys():
+            for result in run.results:
+                if result.metric == metric:
+                    status = None
+                    if result.successes:
+                        status = True
+                    if result.failures:
+                        status = False
+                    styles[metric] = self.status_to_html_color(status)
+        return styles
+
+    def render_table(
+        self,
+        rows: Dict[str, Dict[str, str]],
+        cols: List[str],
+        styles: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> str:
+        """Table with a column per name in cols and a row per key of rows, with
+        optional CSS per cell from styles by row and column. Cell values are
+        HTML, and cells missing from a row are left empty."""
+        doc, tag, text = Doc().tagtext()
+        styles = styles or {}
+        with tag("p"):
+            with tag(
+                "table", border="1", klass="dataframe table table-hover table-bordered"
+            ):
+                with tag("thead"):
+                    with tag("tr"):
+                        with tag("th", klass="blank level0"):
+                            doc.asis("&nbsp;")
+                        for j, col in enumerate(cols):
+                            with tag("th", klass=f"col_heading level0 col{j}"):
+                                text(col)
+                with tag("tbody"):
+                    for i, (row_name, row) in enumerate(rows.items()):
+                        with tag("tr"):
+                            with tag("th", klass=f"row_heading level0 row{i}"):
+                                text(row_name)
+                            row_styles = styles.get(row_name, {})
+                            for j, col in enumerate(cols):
+                                style = row_styles.get(col)
+                                with tag(
+                                    "td",
+                                    *([("style", style)] if style else []),
+                                    klass=f"data row{i} col{j}",
+                                ):
+                                    doc.asis(row.get(col, ""))
+        # Not indented here, render indents the whole report once.
+        return doc.getvalue()
 
     def render_dict(
         self, dictionary: Optional[Dict[str, str]], keys: Optional[List[str]] = None
@@ -117,13 +180,9 @@ class HTMLReporter:
                 subset[key] = dictionary[key]
         else:
             subset = dictionary
-        dataFrame = pd.DataFrame.from_dict(subset, orient="index", columns=["value"])
-        renderHtmlString = dataFrame.style.set_table_attributes(
-            'border="1" class="dataframe table table-hover table-bordered"'
-        ).render()
-        with tag("p"):
-            doc.asis(renderHtmlString)
-        return format(doc.getvalue())
+        return self.render_table(
+            {key: {"value": value} for key, value in subset.items()}, ["value"]
+        )
 
     def format_plan_row_name_fixed_scale(self, typ: str, count: str) -> str:
         return f"{typ}: {count} instance"
@@ -132,8 +191,10 @@ class HTMLReporter:
         return f"{steady_state_tps} TPS"
 
     def format_plan_row_name_auto_scale(
-        self, typ: str, min_count: str, max_count: str
+        self, typ: str, min_count: str, max_count: str, target: Optional[str] = None
     ) -> str:
+        if target is not None:
+            return f"{typ}: min {min_count}, max {max_count}, target {target}"
         return f"{typ}: min {min_count}, max {max_count}"
 
     def format_plan_col_name_auto_scale(
@@ -220,6 +281,10 @@ class HTMLReporter:
                 with tag("p"):
                     text(f"ERROR: Ramp minutes list was empty")
                 return format(doc.getvalue())
+            # Only name targets in rows when the plan searched over them.
+            target_walk: List[Optional[str]] = [None]
+            if len(plan.parameter_lists[Parameter.scaling_target]) > 1:
+                target_walk = list(plan.parameter_lists[Parameter.scaling_target])
             # Identify column names for data frame.
             col_names: List[str] = []
             for ramp_start_tps in ramp_start_tps_walk:
@@ -234,18 +299,22 @@ class HTMLReporter:
             for typ in type_walk:
                 for min_count in min_count_walk:
                     for max_count in max_count_walk:
-                        row_name = self.format_plan_row_name_auto_scale(
-                            typ, min_count, max_count
-                        )
-                        results[row_name] = {}
-                        for col_name in col_names:
-                            results[row_name][col_name] = None
+                        for target in target_walk:
+                            row_name = self.format_plan_row_name_auto_scale(
+                                typ, min_count, max_count, target
+                            )
+                            results[row_name] = {}
+                            for col_name in col_names:
+                                results[row_name][col_name] = None
             # Update results based on history.
             for config in plan.history:
                 row_name = self.format_plan_row_name_auto_scale(
                     config.parameters[Parameter.instance_type],
                     config.parameters[Parameter.scaling_min_instance_count],
                     config.parameters[Parameter.scaling_max_instance_count],
+                    None
+                    if target_walk == [None]
+                    else config.parameters[Parameter.scaling_target],
                 )
                 col_name = self.format_plan_col_name_auto_scale(
                     config.parameters[Parameter.ramp_start_tps],
@@ -261,17 +330,21 @@ class HTMLReporter:
                 # TODO: How to render a config with multiple runs? For now, just use last one.
                 results[row_name][col_name] = config.runs[-1].status
 
-        dataFrame = pd.DataFrame(results).T
-        renderHtmlString = (
-            dataFrame.style.applymap(self.status_to_html_color)
-            .set_table_attributes(
-                'border="1" class="dataframe table table-hover table-bordered"'
-            )
-            .render()
+        cols = list(next(iter(results.values())))
+        return self.render_table(
+            {
+                row_name: {col: f"{status}" for col, status in row.items()}
+                for row_name, row in results.items()
+            },
+            cols,
+            {
+                row_name: {
+                    col: self.status_to_html_color(status)
+                    for col, status in row.items()
+                }
+                for row_name, row in results.items()
+            },
         )
-        with tag("p"):
-            doc.asis(renderHtmlString)
-        return format(doc.getvalue())
 
     def render_runs(self, plan: Optional[Plan]) -> str:
         doc, tag, text = Doc().tagtext()
@@ -286,11 +359,13 @@ class HTMLReporter:
         # Most result values will be Decimal in current implementation.
         # The str are some additional text labels.
         results: Dict[str, Dict[str, Union[Decimal, str]]] = {}
+        styles: Dict[str, Dict[str, str]] = {}
         cols = ["start_time", "end_time"]  # append remaining cols dynamically
         for config in plan.history:
             for run in config.runs:
                 row_name = run.id
                 results[row_name] = {}
+                styles[row_name] = self.run_styles(plan, run)
                 for result in run.results:
                     col_name = result.metric
                     results[row_name][col_name] = result.value
@@ -307,18 +382,72 @@ class HTMLReporter:
                 results[row_name]["end_time"] = self.format_unix_time(
                     int(end_time / 1000)
                 )
-        dataFrame = pd.DataFrame.from_dict(results, orient="index", columns=cols)
-        renderHtmlString = (
-            dataFrame.style.set_table_attributes(
-                'border="1" class="dataframe table table-hover table-bordered"'
-            )
-            .apply(self.highlight_columns, axis=None)
-            .render()
+        return self.render_table(
+            {
+                row_name: {col: f"{value}" for col, value in row.items()}
+                for row_name, row in results.items()
+            },
+            cols,
+            styles,
         )
-        with tag("p"):
-            doc.asis(renderHtmlString)
+
+    def render_timelines(self, plan: Optional[Plan]) -> str:
+        doc, tag, text = Doc().tagtext()
+        if not plan:
+            return ""
+        for config in plan.history:
+            for run in config.runs:
+                if run.id not in self.timelines:
+                    continue
+                timeline = self.timelines[run.id]
+                lag = None
+                for result in run.results:
+                    if result.metric == SCALE_OUT_LAG_SECONDS:
+                        lag = result.value
+                with tag("p"):
+                    text(f"{run.id}")
+                    if all(
+                        second.current_instance_count is None for second in timeline
+                    ):
+                        # Load only, from runs without instance count samples.
+                        text(":")
+                    elif lag is None:
+                        text(": no scale out during the run.")
+                    else:
+                        text(f": instances took up to {lag} seconds to catch up ")
+                        text("with the desired count.")
+                with tag("p"):
+                    doc.asis(timeline_charts(timeline))
         return format(doc.getvalue())
 
+    def format_duration(self, milliseconds: int) -> str:
+        seconds = milliseconds // 1000
+        return f"{seconds // 3600}:{seconds // 60 % 60:02}:{seconds % 60:02}"
+
+    def render_time_breakdown(self) -> str:
+        # Self times add up to the whole job, so their shares add up to 100%.
+        job_ms = sum(total.self_ms for total in self.time_breakdown)
+        rows: Dict[str, Dict[str, str]] = {}
+        for total in self.time_breakdown:
+            share = Decimal(100 * total.self_ms) / job_ms if job_ms else Decimal(0)
+            rows[total.name] = {
+                "count": f"{total.count}",
+                "self": self.format_duration(total.self_ms),
+                "percent_of_job": f"{share:.1f}",
+                "total": self.format_duration(total.total_ms),
+                "errors": f"{total.errors}",
+            }
+        return self.render_table(
+            rows, ["count", "self", "percent_of_job", "total", "errors"]
+        )
+
+    def has_timelines(self, plan: Optional[Plan]) -> bool:
+        if not plan:
+            return False
+        return any(
+            run.id in self.timelines for config in plan.history for run in config.runs
+        )
+
     def render(self) -> str:
         doc, tag, text = Doc().tagtext()
         if not self.inputs:
@@ -346,7 +475,7 @@ class HTMLReporter:
             summary["max_instance_count"] = self.recommend_max["max_instance_count"]
             summary["max_cost"] = self.recommend_max["max_cost"]
             summary["invocations_target"] = self.recommend_max["invocations_target"]
-            doc.asis(self.render_dict(summary))
+            doc.asis(self.render_dict(self.lines_to_html(summary)))
             with tag("p"):
                 text("For a Fixed Scale configuration, use the max_instance_count.")
             with tag("p"):
@@ -364,7 +493,7 @@ class HTMLReporter:
             summary["instance_type"] = self.recommend_type["instance_type"]
             summary["instance_count"] = self.recommend_max["max_instance_count"]
             summary["cost"] = self.recommend_max["max_cost"]
-            doc.asis(self.render_dict(summary))
+            doc.asis(self.render_dict(self.lines_to_html(summary)))
             with tag("p"):
                 text("For a Fixed Scale configuration, use the above configuration.")
             with tag("p"):
@@ -388,6 +517,16 @@ class HTMLReporter:
             with tag("p"):
                 text("Please try again with different inputs.")
 
+        if self.test_spend is not None:
+            with tag("p"):
+                text(
+                    f"Endpoint instances used by these tests cost about "
+                    f"${self.test_spend}"
+                )
+                if self.max_test_budget is not None:
+                    text(f" of the ${self.max_test_budget} test budget")
+                text(". See test_spend_usd in the run tables for the running total.")
+
         with tag("p"):
             text("For more debugging details, go to the Build ")
             text("Artifacts to see detailed reports for each test step.")
@@ -462,14 +601,21 @@ class HTMLReporter:
             text("Instance Type and Count (left column) vs. TPS (top row):")
 
         with tag("p"):
-            doc.asis(self.render_plan(self.type_plan))
+            doc.asis(self.render_section("plan", self.render_plan, self.type_plan))
 
         # Table with runs and Gatling client metrics
         with tag("p"):
             text("Test Configuration (left column) vs. Result Details (top row):")
 
         with tag("p"):
-            doc.asis(self.render_runs(self.type_plan))
+            doc.asis(self.render_section("runs", self.render_runs, self.type_plan))
+
+        with tag("p"):
+            text("Latency and Error Rate (left axis) vs. TPS (bottom axis), ")
+            text("hover over a point for its values:")
+
+        with tag("p"):
+            doc.asis(self.render_section("charts", plan_charts, self.type_plan))
 
         # TODO: Table with SageMaker CloudWatch metrics
 
@@ -477,7 +623,7 @@ class HTMLReporter:
             text("Instance Type Result:")
 
         if self.recommend_type:
-            doc.asis(self.render_dict(self.recommend_type))
+            doc.asis(self.render_dict(self.lines_to_html(self.recommend_type)))
             with tag("p"):
                 text("Results show an instance type meeting SLA rules (for ")
                 text("error rate and response time) at a certain TPS level.")
@@ -517,14 +663,27 @@ class HTMLReporter:
                 text("Instance Type and Count (left column) vs. TPS (top row):")
 
             with tag("p"):
-                doc.asis(self.render_plan(self.max_count_plan))
+                doc.asis(
+                    self.render_section("plan", self.render_plan, self.max_count_plan)
+                )
 
             # Table with runs and Gatling client metrics
             with tag("p"):
                 text("Test Configuration (left column) vs. Result Details (top row):")
 
             with tag("p"):
-                doc.asis(self.render_runs(self.max_count_plan))
+                doc.asis(
+                    self.render_section("runs", self.render_runs, self.max_count_plan)
+                )
+
+            if self.has_timelines(self.max_count_plan):
+                with tag("p"):
+                    text("Load and Latency during each run, per second:")
+                doc.asis(
+                    self.render_section(
+                        "timelines", self.render_timelines, self.max_count_plan
+                    )
+                )
 
             # TODO: Table with SageMaker CloudWatch metrics
 
@@ -532,7 +691,7 @@ class HTMLReporter:
                 text("Maximum Count Result:")
 
             if self.recommend_max:
-                doc.asis(self.render_dict(self.recommend_max))
+                doc.asis(self.render_dict(self.lines_to_html(self.recommend_max)))
                 with tag("p"):
                     text("Results show a working setup to meet the required ")
                     text("TPS, error rate, and response time.")
@@ -577,14 +736,29 @@ class HTMLReporter:
                 )
 
             with tag("p"):
-                doc.asis(self.render_plan(self.min_count_plan))
+                doc.asis(
+                    self.render_section("plan", self.render_plan, self.min_count_plan)
+                )
 
             # Table with runs and Gatling client metrics
             with tag("p"):
                 text("Test Configuration (left column) vs. Result Details (top row):")
 
             with tag("p"):
-                doc.asis(self.render_runs(self.min_count_plan))
+                doc.asis(
+                    self.render_section("runs", self.render_runs, self.min_count_plan)
+                )
+
+            if self.timelines:
+                with tag("p"):
+                    text("Load and Instance Counts during each run, sampled ")
+                    text("from the endpoint (scale out lag is the gap between ")
+                    text("desired and current instances):")
+                doc.asis(
+                    self.render_section(
+                        "timelines", self.render_timelines, self.min_count_plan
+                    )
+                )
 
             # TODO: Table with SageMaker CloudWatch metrics
 
@@ -592,7 +766,7 @@ class HTMLReporter:
                 text("Minimum Count Result:")
 
             if self.recommend_min:
-                doc.asis(self.render_dict(self.recommend_min))
+                doc.asis(self.render_dict(self.lines_to_html(self.recommend_min)))
                 with tag("p"):
                     text("Results show a working setup to meet the required ")
                     text("TPS, error rate, response time, and ramp pattern.")
@@ -611,6 +785,64 @@ class HTMLReporter:
                     text("For more debugging details, go to the Build ")
                     text("Artifacts to see detailed reports for each test step.")
 
+        if self.target_plan:
+            with tag("h3"):
+                text("5. Optimize Scaling Target")
+
+            with tag("p"):
+                text("Find highest invocations target that still supports ")
+                text("given ramp. A higher target scales out later in the ")
+                text("ramp, but needs fewer instances at steady state. A ")
+                text("higher min count can make up for the later scale out.")
+
+            with tag("p"):
+                text(
+                    "Instance Type and Auto Scale (left column) vs. Traffic Pattern (top row):"
+                )
+
+            with tag("p"):
+                doc.asis(
+                    self.render_section("plan", self.render_plan, self.target_plan)
+                )
+
+            with tag("p"):
+                text("Test Configuration (left column) vs. Result Details (top row):")
+
+            with tag("p"):
+                doc.asis(
+                    self.render_section("runs", self.render_runs, self.target_plan)
+                )
+
+            if self.timelines:
+                doc.asis(
+                    self.render_section(
+                        "timelines", self.render_timelines, self.target_plan
+                    )
+                )
+
+            with tag("p"):
+                text("Scaling Target Result:")
+
+            if self.recommend_target:
+                doc.asis(self.render_dict(self.lines_to_html(self.recommend_target)))
+            else:
+                with tag("p"):
+                    text("ERROR: No higher scaling target passed, so the ")
+                    text("recommendation keeps the safety factor target.")
+
+        if self.time_breakdown:
+            with tag("h3"):
+                text("Time Breakdown")
+
+            with tag("p"):
+                text("Where the job spent its time so far, by operation. ")
+                text("Self time leaves out the operations run inside, like ")
+                text("waiting for an endpoint within setup, while total time ")
+                text("includes them. Every span is also saved in spans.jsonl ")
+                text("in the job directory, in OpenTelemetry JSON format.")
+
+            doc.asis(self.render_time_breakdown())
+
         with tag("p"):
             text("For more details about the testing process for finding the ")
             text("minimum instance count or to run more tests manually, see: ")
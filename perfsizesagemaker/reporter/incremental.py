@@ -0,0 +1,44 @@
+import logging.config
+import os
+from perfsize.perfsize import Config, Plan, Reporter, ResultManager, Run
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+
+class IncrementalReporter(Reporter, ResultManager):
+    """Write the job report after every run, not just at the end of the job.
+
+    Added last to a workflow's result managers, so each run has all its
+    results by the time the report is rendered, and as the workflow's
+    reporter for the end of each phase. The report is written to a temporary
+    file and moved into place, so a reader or a crash mid write never sees a
+    partial report.
+    """
+
+    def __init__(self, render: Callable[[], str], path: str):
+        self.render_report = render
+        self.path = path
+        self.writes = 0
+
+    def __repr__(self) -> str:
+        return f"IncrementalReporter(path={self.path}, writes={self.writes})"
+
+    def write(self) -> str:
+        content = self.render_report()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(content)
+        os.replace(temp_path, self.path)
+        self.writes = self.writes + 1
+        return content
+
+    def query(self, config: Config, run: Run) -> None:
+        self.write()
+        log.debug(f"Updated report {self.path} after {run.id}")
+
+    def render(self, plan: Plan) -> str:
+        # Workflow prints what reporters return, so return where the report
+        # is instead of the whole page.
+        self.write()
+        return f"Updated report {self.path}"
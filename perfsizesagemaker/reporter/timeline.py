@@ -0,0 +1,152 @@
+from decimal import Decimal
+from perfsizesagemaker.result.timeline import TimelineSecond
+from typing import List, Optional, Sequence, Tuple, Union
+from yattag import Doc
+
+# Chart size in pixels, and the margin left for axis labels.
+WIDTH = 720
+HEIGHT = 240
+MARGIN = 40
+
+TPS_COLOR = "#4a7ebb"
+CURRENT_COLOR = "#2e8b57"
+DESIRED_COLOR = "#d2691e"
+
+# Most points drawn per line, so charts of long runs stay small.
+MAX_POINTS = 200
+
+Number = Union[int, Decimal]
+
+
+def downsample(
+    rows: Sequence[Sequence[Optional[Number]]], max_points: int = MAX_POINTS
+) -> List[List[Optional[Number]]]:
+    """At most max_points rows, by splitting rows into consecutive buckets.
+    Each bucket keeps the x (first column) of its first row and the max of
+    each other column, so spikes in load or latency are not averaged away."""
+    if len(rows) <= max_points:
+        return [list(row) for row in rows]
+    sampled: List[List[Optional[Number]]] = []
+    for i in range(max_points):
+        bucket = rows[i * len(rows) // max_points : (i + 1) * len(rows) // max_points]
+        row: List[Optional[Number]] = [bucket[0][0]]
+        for column in range(1, len(bucket[0])):
+            top: Optional[Number] = None
+            for value in (r[column] for r in bucket):
+                if value is not None and (top is None or value > top):
+                    top = value
+            row.append(top)
+        sampled.append(row)
+    return sampled
+
+
+def _points(values: List[Tuple[int, Optional[int]]], top: int) -> str:
+    # Steps from each value to the next, like the counts they stand for.
+    if not values:
+        return ""
+    last_x = values[-1][0] or 1
+    plot_width = WIDTH - 2 * MARGIN
+    plot_height = HEIGHT - 2 * MARGIN
+    points = []
+    previous_y: Optional[float] = None
+    for x, value in values:
+        if value is None:
+            continue
+        px = MARGIN + plot_width * x / last_x
+        py = HEIGHT - MARGIN - plot_height * value / max(top, 1)
+        if previous_y is not None:
+            points.append(f"{px:.1f},{previous_y:.1f}")
+        points.append(f"{px:.1f},{py:.1f}")
+        previous_y = py
+    return " ".join(points)
+
+
+def timeline_svg(timeline: List[TimelineSecond]) -> str:
+    """Inline SVG of requests per second (left axis) and current and desired
+    instance counts (right axis) over a run, so the lag between the two
+    counts shows as the gap between their lines."""
+    doc, tag, text = Doc().tagtext()
+    if not timeline:
+        return ""
+    start = timeline[0].time_ms
+    rows = downsample(
+        [
+            [
+                (second.time_ms - start) // 1000,
+                second.requests,
+                second.current_instance_count,
+                second.desired_instance_count,
+            ]
+            for second in timeline
+        ]
+    )
+    seconds = [int(row[0] or 0) for row in rows]
+    requests, current, desired = [
+        [None if row[j] is None else int(row[j] or 0) for row in rows]
+        for j in range(1, 4)
+    ]
+    top_tps = max(count or 0 for count in requests)
+    top_count = max([count for count in current + desired if count is not None] or [1])
+    # (color, dash pattern, values, top of axis) per line
+    lines: List[Tuple[str, str, List[Optional[int]], int]] = [
+        (TPS_COLOR, "", requests, top_tps),
+        (CURRENT_COLOR, "", current, top_count),
+        (DESIRED_COLOR, "4,3", desired, top_count),
+    ]
+    with tag(
+        "svg",
+        xmlns="http://www.w3.org/2000/svg",
+        width=WIDTH,
+        height=HEIGHT,
+        viewBox=f"0 0 {WIDTH} {HEIGHT}",
+    ):
+        doc.stag(
+            "rect",
+            x=MARGIN,
+            y=MARGIN,
+            width=WIDTH - 2 * MARGIN,
+            height=HEIGHT - 2 * MARGIN,
+            fill="none",
+            stroke="#cccccc",
+        )
+        for color, dash, values, top in lines:
+            points = _points(list(zip(seconds, values)), top)
+            if points:
+                doc.stag(
+                    "polyline",
+                    ("stroke-width", "1.5"),
+                    ("stroke-dasharray", dash or "none"),
+                    points=points,
+                    fill="none",
+                    stroke=color,
+                )
+        labels = [
+            (4, MARGIN - 8, "start", TPS_COLOR, f"{top_tps} TPS"),
+            (WIDTH - 4, MARGIN - 8, "end", CURRENT_COLOR, f"{top_count} instances"),
+            (MARGIN, HEIGHT - MARGIN + 16, "start", "#333333", "0s"),
+            (
+                WIDTH - MARGIN,
+                HEIGHT - MARGIN + 16,
+                "end",
+                "#333333",
+                f"{seconds[-1]}s",
+            ),
+            (
+                WIDTH // 2,
+                HEIGHT - 8,
+                "middle",
+                "#333333",
+                "requests/s (blue), current (green) and desired (dashed) instances",
+            ),
+        ]
+        for x, y, anchor, color, label in labels:
+            with tag(
+                "text",
+                ("text-anchor", anchor),
+                ("font-size", "11"),
+                x=x,
+                y=y,
+                fill=color,
+            ):
+                text(label)
+    return doc.getvalue()
@@ -0,0 +1,332 @@
+from array import array
+import argparse
+import hashlib
+import itertools
+import json
+import logging.config
+import os
+from perfsizesagemaker.result.simulation_log import INDEX_SUFFIX, Request
+import sys
+from typing import Dict, Iterator, List, Tuple
+import zipfile
+
+log = logging.getLogger(__name__)
+
+# Columnar copy of simulation.log saved in the same run directory.
+ARCHIVE_FILE = "simulation.columnar.zip"
+
+# Content-addressed store for report assets shared across runs of a job.
+ASSET_STORE = ".assets"
+
+# Line kinds stored in the "kind" column, in original line order.
+KIND_REQUEST = 0
+KIND_USER = 1
+KIND_OTHER = 2
+
+# Integer columns for each line kind. Timestamps are delta encoded, and end
+# times are stored as durations, so most values are small and compress well.
+REQUEST_COLUMNS = ["user", "group", "name", "start", "duration", "status", "message"]
+USER_COLUMNS = ["scenario", "user", "event", "start", "duration"]
+DELTA_COLUMNS = ["request.start", "user.start"]
+
+# Lines per chunk. Columns are written to the zip file and read back one
+# chunk at a time, so memory use does not grow with the size of the log.
+CHUNK_LINES = 1 << 20
+
+
+class StringTable:
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def add(self, string: str) -> int:
+        if string not in self.index:
+            self.index[string] = len(self.strings)
+            self.strings.append(string)
+        return self.index[string]
+
+
+def _is_int(token: str) -> bool:
+    # Keep values like "007" as text so restore is byte for byte the same.
+    return token.isdigit() and str(int(token)) == token
+
+
+def _empty_columns() -> Dict[str, "array[int]"]:
+    columns: Dict[str, "array[int]"] = {"kind": array("q")}
+    for column in REQUEST_COLUMNS:
+        columns[f"request.{column}"] = array("q")
+    for column in USER_COLUMNS:
+        columns[f"user.{column}"] = array("q")
+    return columns
+
+
+class ColumnarLogWriter:
+    """Convert a Gatling simulation.log into a compressed columnar zip file.
+
+    Lines are stored in chunks of chunk_lines. Each column of a chunk is a
+    separate LZMA-compressed zip member holding an int64 array. Text fields
+    are stored once in a shared string table. Lines that do not match the
+    REQUEST or USER formats are kept as raw text, so the original log can be
+    restored exactly with restore_simulation_log.
+    """
+
+    def __init__(self, chunk_lines: int = CHUNK_LINES) -> None:
+        self.chunk_lines = chunk_lines
+        self.strings = StringTable()
+        self.columns = _empty_columns()
+        self.other: List[str] = []
+        self.chunks = 0
+        self.ends_with_newline = True
+
+    def add_line(self, line: str) -> None:
+        tokens = line.split("\t")
+        columns = self.columns
+        if (
+            tokens[0] == "REQUEST"
+            and len(tokens) == 8
+            and _is_int(tokens[1])
+            and _is_int(tokens[4])
+            and _is_int(tokens[5])
+        ):
+            start = int(tokens[4])
+            columns["kind"].append(KIND_REQUEST)
+            columns["request.user"].append(int(tokens[1]))
+            columns["request.group"].append(self.strings.add(tokens[2]))
+            columns["request.name"].append(self.strings.add(tokens[3]))
+            columns["request.start"].append(start)
+            columns["request.duration"].append(int(tokens[5]) - start)
+            columns["request.status"].append(self.strings.add(tokens[6]))
+            columns["request.message"].append(self.strings.add(tokens[7]))
+        elif (
+            tokens[0] == "USER"
+            and len(tokens) == 6
+            and _is_int(tokens[2])
+            and _is_int(tokens[4])
+            and _is_int(tokens[5])
+        ):
+            start = int(tokens[4])
+            columns["kind"].append(KIND_USER)
+            columns["user.scenario"].append(self.strings.add(tokens[1]))
+            columns["user.user"].append(int(tokens[2]))
+            columns["user.event"].append(self.strings.add(tokens[3]))
+            columns["user.start"].append(start)
+            columns["user.duration"].append(int(tokens[5]) - start)
+        else:
+            columns["kind"].append(KIND_OTHER)
+            self.other.append(line)
+
+    def flush(self, z: zipfile.ZipFile) -> None:
+        """Write the lines added since the last flush as the next chunk."""
+        prefix = f"{self.chunks:06d}/"
+        for name in DELTA_COLUMNS:
+            column = self.columns[name]
+            for i in range(len(column) - 1, 0, -1):
+                column[i] = column[i] - column[i - 1]
+        for name, column in self.columns.items():
+            if sys.byteorder != "little":
+                column.byteswap()
+            z.writestr(f"{prefix}{name}.i64", column.tobytes())
+        z.writestr(f"{prefix}other.json", json.dumps(self.other))
+        self.columns = _empty_columns()
+        self.other = []
+        self.chunks = self.chunks + 1
+
+    def write(self, simulation_log_path: str, archive_path: str) -> None:
+        temp_path = archive_path + ".tmp"
+        # Lines end at "\n" only, so a stray "\r" stays inside its line.
+        with open(simulation_log_path, "r", newline="\n") as f, zipfile.ZipFile(
+            temp_path, "w", compression=zipfile.ZIP_LZMA
+        ) as z:
+            for line in f:
+                if line.endswith("\n"):
+                    self.add_line(line[:-1])
+                else:
+                    self.ends_with_newline = False
+                    self.add_line(line)
+                if len(self.columns["kind"]) >= self.chunk_lines:
+                    self.flush(z)
+            if len(self.columns["kind"]) > 0:
+                self.flush(z)
+            meta = {
+                "version": 2,
+                "chunks": self.chunks,
+                "ends_with_newline": self.ends_with_newline,
+                "strings": self.strings.strings,
+            }
+            z.writestr("meta.json", json.dumps(meta))
+        os.replace(temp_path, archive_path)
+
+
+class ColumnarLog:
+    """Read back a file written by ColumnarLogWriter, one chunk at a time."""
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        with zipfile.ZipFile(archive_path, "r") as z:
+            self.meta = json.loads(z.read("meta.json"))
+        if self.meta["version"] not in (1, 2):
+            raise ValueError(f"ERROR: Unsupported archive version: {self.meta}")
+        self.strings: List[str] = self.meta["strings"]
+        self.ends_with_newline: bool = self.meta["ends_with_newline"]
+        # Version 1 archives hold one chunk, with members at the top level.
+        self.chunks: int = self.meta.get("chunks", 1)
+
+    def _chunks(self) -> Iterator[Tuple[Dict[str, "array[int]"], List[str]]]:
+        with zipfile.ZipFile(self.archive_path, "r") as z:
+            for chunk in range(self.chunks):
+                prefix = f"{chunk:06d}/" if self.meta["version"] > 1 else ""
+                columns = _empty_columns()
+                for name, column in columns.items():
+                    column.frombytes(z.read(f"{prefix}{name}.i64"))
+                    if sys.byteorder != "little":
+                        column.byteswap()
+                for name in DELTA_COLUMNS:
+                    column = columns[name]
+                    for i in range(1, len(column)):
+                        column[i] = column[i] + column[i - 1]
+                if self.meta["version"] > 1:
+                    other = json.loads(z.read(f"{prefix}other.json"))
+                else:
+                    other = self.meta["other"]
+                yield columns, other
+
+    def requests(self) -> Iterator[Request]:
+        s = self.strings
+        for c, _ in self._chunks():
+            for i in range(len(c["request.start"])):
+                start = c["request.start"][i]
+                yield Request(
+                    name=s[c["request.name"][i]],
+                    start=start,
+                    end=start + c["request.duration"][i],
+                    status=s[c["request.status"][i]],
+                )
+
+    def lines(self) -> Iterator[str]:
+        s = self.strings
+        for c, other in self._chunks():
+            next_index = {KIND_REQUEST: 0, KIND_USER: 0, KIND_OTHER: 0}
+            for kind in c["kind"]:
+                i = next_index[kind]
+                next_index[kind] = i + 1
+                if kind == KIND_REQUEST:
+                    start = c["request.start"][i]
+                    yield (
+                        f"REQUEST\t{c['request.user'][i]}\t{s[c['request.group'][i]]}\t"
+                        f"{s[c['request.name'][i]]}\t{start}\t"
+                        f"{start + c['request.duration'][i]}\t"
+                        f"{s[c['request.status'][i]]}\t{s[c['request.message'][i]]}"
+                    )
+                elif kind == KIND_USER:
+                    start = c["user.start"][i]
+                    yield (
+                        f"USER\t{s[c['user.scenario'][i]]}\t{c['user.user'][i]}\t"
+                        f"{s[c['user.event'][i]]}\t{start}\t"
+                        f"{start + c['user.duration'][i]}"
+                    )
+                else:
+                    yield other[i]
+
+    def text_lines(self) -> Iterator[str]:
+        """Lines as they were in simulation.log, line endings included."""
+        previous = None
+        for line in self.lines():
+            if previous is not None:
+                yield previous + "\n"
+            previous = line
+        if previous is not None:
+            yield previous + "\n" if self.ends_with_newline else previous
+
+
+def restore_simulation_log(archive_path: str, simulation_log_path: str) -> None:
+    with open(simulation_log_path, "w", newline="") as f:
+        f.writelines(ColumnarLog(archive_path).text_lines())
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def deduplicate_assets(job_dir: str) -> Tuple[int, int]:
+    """Replace identical report files across runs with hard links.
+
+    Each unique file is stored once under job_dir/.assets/<sha256> and every
+    copy in the run directories becomes a hard link to it. Run specific
+    files like stats.js have different content and simply stay unique.
+    Returns (files linked, bytes saved).
+    """
+    store = os.path.join(job_dir, ASSET_STORE)
+    linked = 0
+    saved = 0
+    for run_dir in sorted(os.listdir(job_dir)):
+        run_path = os.path.join(job_dir, run_dir)
+        if run_dir == ASSET_STORE or not os.path.isdir(run_path):
+            continue
+        for dirpath, dirnames, filenames in os.walk(run_path):
+            if dirpath == run_path:
+                # Only report assets in subfolders like js/ and style/.
+                continue
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                stored = os.path.join(store, _sha256(path))
+                if not os.path.exists(stored):
+                    os.makedirs(store, exist_ok=True)
+                    os.link(path, stored)
+                elif not os.path.samefile(path, stored):
+                    size = os.path.getsize(path)
+                    temp_path = path + ".tmp"
+                    os.link(stored, temp_path)
+                    os.replace(temp_path, path)
+                    linked = linked + 1
+                    saved = saved + size
+    return linked, saved
+
+
+def archive_job(job_dir: str, remove_logs: bool = True) -> None:
+    """Post-run stage to shrink a job directory before upload.
+
+    Converts every run's simulation.log to a columnar file and hard links
+    duplicate report assets. With remove_logs, the text logs are deleted
+    once the columnar copy is verified to restore the same content, along
+    with the sidecar index SimulationLogReader saved next to them.
+    """
+    for run_dir in sorted(os.listdir(job_dir)):
+        simulation_log_path = os.path.join(job_dir, run_dir, "simulation.log")
+        if not os.path.isfile(simulation_log_path):
+            continue
+        archive_path = os.path.join(job_dir, run_dir, ARCHIVE_FILE)
+        ColumnarLogWriter().write(simulation_log_path, archive_path)
+        if remove_logs:
+            restored = ColumnarLog(archive_path).text_lines()
+            with open(simulation_log_path, "r", newline="\n") as f:
+                for original, line in itertools.zip_longest(f, restored):
+                    if line != original:
+                        raise RuntimeError(
+                            f"ERROR: Columnar archive does not match "
+                            f"{simulation_log_path}"
+                        )
+            os.remove(simulation_log_path)
+            if os.path.isfile(simulation_log_path + INDEX_SUFFIX):
+                os.remove(simulation_log_path + INDEX_SUFFIX)
+        log.debug(f"Archived {simulation_log_path} to {archive_path}")
+    linked, saved = deduplicate_assets(job_dir)
+    log.info(
+        f"Archived {job_dir}: linked {linked} duplicate files, saved {saved} bytes"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("job_dir", help="job directory with one folder per run")
+    parser.add_argument(
+        "--keep_logs",
+        help="keep text simulation.log files next to the columnar copies",
+        action="store_true",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    archive_job(args.job_dir, remove_logs=not args.keep_logs)
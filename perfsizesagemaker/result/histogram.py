@@ -0,0 +1,340 @@
+from decimal import Decimal
+import json
+import logging.config
+import os
+from perfsize.perfsize import Condition, Config, Result, ResultManager, Run
+from perfsize.result.gatling import ALL_REQUESTS, GatlingResultManager, Metric
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Name of the histogram file saved next to simulation.log in each run directory.
+HISTOGRAM_FILE = "latency_histogram.json"
+
+# Mean latency of successful requests, used as service time by the capacity
+# model. Not one of the Gatling metrics, so only in per request name results.
+LATENCY_SUCCESS_MEAN = "latency_success_mean"
+
+# Metrics added for each request name when a run has more than one.
+REQUEST_NAME_METRICS = [
+    Metric.count_total,
+    Metric.percent_fail,
+    Metric.latency_success_p50,
+    Metric.latency_success_p99,
+    LATENCY_SUCCESS_MEAN,
+]
+
+
+class LatencyHistogram:
+    """Sparse, mergeable count of latency values in milliseconds.
+
+    Gatling latencies are whole milliseconds bounded by the request timeout,
+    so every distinct value gets its own count and nothing is rounded. Two
+    histograms can be merged by adding counts, and percentiles use the same
+    linear interpolation as numpy.percentile, so a merged histogram gives the
+    same answer as parsing all raw logs together.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    def __repr__(self) -> str:
+        return f"LatencyHistogram(total={self.total}, values={len(self.counts)})"
+
+    def record(self, value: int, count: int = 1) -> None:
+        if value < 0:
+            raise ValueError(f"ERROR: latency cannot be negative: {value}")
+        self.counts[value] = self.counts.get(value, 0) + count
+        self.total = self.total + count
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total = self.total + other.total
+
+    def min(self) -> int:
+        if not self.counts:
+            raise RuntimeError("ERROR: histogram is empty")
+        return min(self.counts)
+
+    def max(self) -> int:
+        if not self.counts:
+            raise RuntimeError("ERROR: histogram is empty")
+        return max(self.counts)
+
+    def mean(self) -> Decimal:
+        if not self.total:
+            raise RuntimeError("ERROR: histogram is empty")
+        return Decimal(sum(key * count for key, count in self.counts.items())) / (
+            self.total
+        )
+
+    def value_at_rank(self, rank: int) -> int:
+        # Rank is a 0-based position in the sorted list of recorded values.
+        seen = 0
+        for key in sorted(self.counts):
+            seen = seen + self.counts[key]
+            if rank < seen:
+                return key
+        raise IndexError(f"ERROR: rank {rank} out of range for {self.total} values")
+
+    def percentile(self, percent: Decimal) -> Decimal:
+        # Same definition as numpy.percentile with default linear interpolation.
+        if not self.total:
+            raise RuntimeError("ERROR: histogram is empty")
+        rank = (self.total - 1) * percent / 100
+        lower = int(rank)
+        fraction = rank - lower
+        lower_value = self.value_at_rank(lower)
+        if not fraction:
+            return Decimal(lower_value)
+        upper_value = self.value_at_rank(lower + 1)
+        return lower_value + (upper_value - lower_value) * fraction
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": [[key, self.counts[key]] for key in sorted(self.counts)]}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = LatencyHistogram()
+        for key, count in data["counts"]:
+            histogram.counts[int(key)] = int(count)
+            histogram.total = histogram.total + int(count)
+        return histogram
+
+
+class RunHistogram:
+    """Latency histograms for one or more runs, split by request name and status.
+
+    Saved as a small JSON file next to the Gatling output of each run. Files
+    from any set of runs or load workers can be merged to get exact metrics
+    across all of them without going back to the raw simulation.log files.
+    """
+
+    def __init__(self) -> None:
+        self.success: Dict[str, LatencyHistogram] = {}
+        self.fail: Dict[str, LatencyHistogram] = {}
+        self.simulation_start: Optional[int] = None
+        self.simulation_end: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"RunHistogram(names={self.names()}, "
+            f"simulation_start={self.simulation_start}, "
+            f"simulation_end={self.simulation_end})"
+        )
+
+    def names(self) -> List[str]:
+        names = list(self.success)
+        for name in self.fail:
+            if name not in names:
+                names.append(name)
+        return names
+
+    def _histogram(
+        self, histograms: Dict[str, LatencyHistogram], name: str
+    ) -> LatencyHistogram:
+        if name not in histograms:
+            histograms[name] = LatencyHistogram()
+        return histograms[name]
+
+    def record(
+        self, name: str, start: int, end: int, status: str, count: int = 1
+    ) -> None:
+        if name == ALL_REQUESTS:
+            raise RuntimeError(
+                f"ERROR: Request name cannot be reserved word '{ALL_REQUESTS}'."
+            )
+        if status == "OK":
+            self._histogram(self.success, name).record(end - start, count)
+        else:
+            self._histogram(self.fail, name).record(end - start, count)
+        if self.simulation_start is None or start < self.simulation_start:
+            self.simulation_start = start
+        if self.simulation_end is None or end > self.simulation_end:
+            self.simulation_end = end
+
+    def merge(self, other: "RunHistogram") -> None:
+        for name, histogram in other.success.items():
+            self._histogram(self.success, name).merge(histogram)
+        for name, histogram in other.fail.items():
+            self._histogram(self.fail, name).merge(histogram)
+        if other.simulation_start is not None and (
+            self.simulation_start is None
+            or other.simulation_start < self.simulation_start
+        ):
+            self.simulation_start = other.simulation_start
+        if other.simulation_end is not None and (
+            self.simulation_end is None or other.simulation_end > self.simulation_end
+        ):
+            self.simulation_end = other.simulation_end
+
+    def combined(
+        self, histograms: Dict[str, LatencyHistogram], name: str
+    ) -> LatencyHistogram:
+        result = LatencyHistogram()
+        for key, histogram in histograms.items():
+            if name == ALL_REQUESTS or key == name:
+                result.merge(histogram)
+        return result
+
+    def stats(self, name: str = ALL_REQUESTS) -> Dict[str, Decimal]:
+        # Same metrics and rounding as GatlingResultManager.get_stats.
+        success = self.combined(self.success, name)
+        fail = self.combined(self.fail, name)
+        count_success = Decimal(success.total)
+        count_fail = Decimal(fail.total)
+        count_total = count_success + count_fail
+        if not count_total:
+            raise RuntimeError(f"ERROR: No requests recorded for {name}")
+        if not success.total:
+            # Handle case of empty success list by forcing 0.
+            success.record(0)
+        stats: Dict[str, Decimal] = {}
+        stats[Metric.count_success] = count_success
+        stats[Metric.count_fail] = count_fail
+        stats[Metric.count_total] = count_total
+        stats[Metric.percent_success] = (count_success / count_total) * 100
+        stats[Metric.percent_fail] = (count_fail / count_total) * 100
+        stats[Metric.latency_success_min] = Decimal(success.min())
+        for metric, percent in [
+            (Metric.latency_success_p25, 25),
+            (Metric.latency_success_p50, 50),
+            (Metric.latency_success_p75, 75),
+            (Metric.latency_success_p90, 90),
+            (Metric.latency_success_p95, 95),
+            (Metric.latency_success_p98, 98),
+            (Metric.latency_success_p99, 99),
+        ]:
+            stats[metric] = Decimal(int(success.percentile(Decimal(percent))))
+        stats[Metric.latency_success_max] = Decimal(success.max())
+        stats[Metric.simulation_start] = Decimal(self.simulation_start or 0)
+        stats[Metric.simulation_end] = Decimal(self.simulation_end or 0)
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 2,
+            "simulation_start": self.simulation_start,
+            "simulation_end": self.simulation_end,
+            "success": {name: h.to_dict() for name, h in self.success.items()},
+            "fail": {name: h.to_dict() for name, h in self.fail.items()},
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "RunHistogram":
+        # Version 1 rounded latencies above 2 seconds, so it cannot be merged
+        # with exact counts.
+        if data.get("version") != 2:
+            raise ValueError(f"ERROR: Unsupported histogram version: {data}")
+        run_histogram = RunHistogram()
+        run_histogram.simulation_start = data["simulation_start"]
+        run_histogram.simulation_end = data["simulation_end"]
+        for name, histogram in data["success"].items():
+            run_histogram.success[name] = LatencyHistogram.from_dict(histogram)
+        for name, histogram in data["fail"].items():
+            run_histogram.fail[name] = LatencyHistogram.from_dict(histogram)
+        return run_histogram
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, separators=(",", ":"))
+
+    @staticmethod
+    def load(path: str) -> "RunHistogram":
+        with open(path, "r") as file:
+            return RunHistogram.from_dict(json.load(file))
+
+
+def request_name_metric(metric: str, name: str) -> str:
+    return f"{metric}[{name}]"
+
+
+def request_name_results(
+    run_histogram: RunHistogram, requirements: Dict[str, List[Condition]]
+) -> List[Result]:
+    """Results for each request name, like latency_success_p99[name], when
+    the run sent more than one. A scenario that names requests by payload
+    gets a latency breakdown per payload this way."""
+    names = run_histogram.names()
+    if len(names) < 2:
+        return []
+    results = []
+    for name in sorted(names):
+        stats = run_histogram.stats(name)
+        success = run_histogram.combined(run_histogram.success, name)
+        stats[LATENCY_SUCCESS_MEAN] = success.mean() if success.total else Decimal(0)
+        for metric in REQUEST_NAME_METRICS:
+            key = request_name_metric(metric, name)
+            results.append(
+                Result(
+                    metric=key,
+                    value=stats[metric],
+                    conditions=requirements.get(key, []),
+                )
+            )
+    return results
+
+
+def merge_run_histograms(paths: List[str]) -> RunHistogram:
+    """Load and merge histogram files from any number of runs or workers."""
+    if not paths:
+        raise RuntimeError("ERROR: No histogram files given to merge")
+    merged: Optional[RunHistogram] = None
+    for path in paths:
+        run_histogram = RunHistogram.load(path)
+        if merged is None:
+            merged = run_histogram
+        else:
+            merged.merge(run_histogram)
+    assert merged is not None  # help mypy
+    return merged
+
+
+class HistogramResultManager(ResultManager):
+    """Save a RunHistogram next to the simulation.log of every run.
+
+    Meant to run alongside GatlingResultManager, which still adds the scalar
+    results to each Run. Adds only the per request name results, see
+    request_name_results.
+    """
+
+    def __init__(self, results_path: str):
+        self.results_path = results_path
+
+    def build(self, simulation_log_path: str) -> RunHistogram:
+        run_histogram = RunHistogram()
+        # Stream line by line so large endurance logs are not loaded at once.
+        # See GatlingResultManager.parse for the REQUEST line format.
+        with open(simulation_log_path) as f:
+            for line in f:
+                if line.startswith("REQUEST"):
+                    tokens = line.split("\t")
+                    if len(tokens) != 8:
+                        raise ValueError(f"Unexpected request format: {line}")
+                    run_histogram.record(
+                        name=tokens[3],
+                        start=int(tokens[4]),
+                        end=int(tokens[5]),
+                        status=tokens[6],
+                    )
+        if run_histogram.simulation_start is None:
+            raise RuntimeError(
+                f"ERROR: Simulation log has no requests: {simulation_log_path}"
+            )
+        return run_histogram
+
+    def histogram_path(self, run: Run) -> str:
+        run_dir = GatlingResultManager(self.results_path).find_run_dir(run.id)
+        return self.results_path + os.sep + run_dir + os.sep + HISTOGRAM_FILE
+
+    def query(self, config: Config, run: Run) -> None:
+        histogram_path = self.histogram_path(run)
+        simulation_log_path = (
+            os.path.dirname(histogram_path) + os.sep + "simulation.log"
+        )
+        run_histogram = self.build(simulation_log_path)
+        run_histogram.save(histogram_path)
+        log.debug(f"Saved {run_histogram} to {histogram_path}")
+        run.results.extend(request_name_results(run_histogram, config.requirements))
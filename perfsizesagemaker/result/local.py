@@ -0,0 +1,32 @@
+import logging.config
+from perfsize.perfsize import Config, Result, ResultManager, Run
+from perfsizesagemaker.load.local import LocalLoadManager
+from perfsizesagemaker.result.histogram import request_name_results
+
+log = logging.getLogger(__name__)
+
+
+class LocalResultManager(ResultManager):
+    """Add results for runs a LocalLoadManager kept in memory.
+
+    Used in place of GatlingResultManager and HistogramResultManager when the
+    load manager has write_logs False. Metrics are the same ones, computed by
+    RunHistogram.stats.
+    """
+
+    def __init__(self, load_manager: LocalLoadManager):
+        self.load_manager = load_manager
+
+    def query(self, config: Config, run: Run) -> None:
+        if run.id not in self.load_manager.histograms:
+            raise RuntimeError(f"ERROR: No local results for run {run.id}")
+        run_histogram = self.load_manager.histograms.pop(run.id)
+        stats = run_histogram.stats()
+        for metric in stats:
+            conditions = []
+            if metric in config.requirements:
+                conditions = config.requirements[metric]
+            run.results.append(
+                Result(metric=metric, value=stats[metric], conditions=conditions)
+            )
+        run.results.extend(request_name_results(run_histogram, config.requirements))
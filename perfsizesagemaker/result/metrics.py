@@ -0,0 +1,19 @@
+import logging.config
+from perfsize.perfsize import Config, ResultManager, Run
+from perfsizesagemaker.metrics import JobMetrics
+
+log = logging.getLogger(__name__)
+
+
+class MetricsResultManager(ResultManager):
+    """Publish achieved TPS, p99 latency and error rate of each run to
+    JobMetrics. Goes after the result managers that add those results."""
+
+    def __init__(self, metrics: JobMetrics):
+        self.metrics = metrics
+
+    def __repr__(self) -> str:
+        return f"MetricsResultManager(metrics={self.metrics})"
+
+    def query(self, config: Config, run: Run) -> None:
+        self.metrics.record_run(run)
@@ -0,0 +1,245 @@
+from decimal import Decimal
+import json
+import logging.config
+import mmap
+import os
+from perfsizesagemaker.result.histogram import RunHistogram
+from typing import Any, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Sidecar index file is saved next to the log as simulation.log.idx
+INDEX_SUFFIX = ".idx"
+
+# Number of log lines covered by each index entry.
+DEFAULT_INDEX_INTERVAL = 10000
+
+MILLISECONDS_PER_MINUTE = 60 * 1000
+
+
+class Request:
+    def __init__(self, name: str, start: int, end: int, status: str):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.status = status
+
+    def __repr__(self) -> str:
+        return (
+            f"Request(name={self.name}, start={self.start}, "
+            f"end={self.end}, status={self.status})"
+        )
+
+
+class IndexBlock:
+    """Byte range of the log holding a fixed number of lines.
+
+    Gatling writes requests roughly in completion order, so start times are
+    not strictly sorted. Each block keeps the min and max request start time
+    it contains, and a query reads every block whose range overlaps.
+    """
+
+    def __init__(
+        self,
+        offset: int,
+        end_offset: int,
+        min_start: Optional[int] = None,
+        max_start: Optional[int] = None,
+    ):
+        self.offset = offset
+        self.end_offset = end_offset
+        self.min_start = min_start
+        self.max_start = max_start
+
+    def __repr__(self) -> str:
+        return (
+            f"IndexBlock(offset={self.offset}, end_offset={self.end_offset}, "
+            f"min_start={self.min_start}, max_start={self.max_start})"
+        )
+
+    def overlaps(self, start: Optional[int], end: Optional[int]) -> bool:
+        if self.min_start is None or self.max_start is None:
+            # No requests in this block.
+            return False
+        if start is not None and self.max_start < start:
+            return False
+        if end is not None and self.min_start >= end:
+            return False
+        return True
+
+
+def parse_request(line: bytes) -> Request:
+    # See GatlingResultManager.parse for the REQUEST line format.
+    tokens = line.split(b"\t")
+    if len(tokens) != 8:
+        raise ValueError(f"Unexpected request format: {line!r}")
+    return Request(
+        name=tokens[3].decode(),
+        start=int(tokens[4]),
+        end=int(tokens[5]),
+        status=tokens[6].decode(),
+    )
+
+
+class SimulationLogReader:
+    """Memory-mapped reader for large Gatling simulation.log files.
+
+    On first use, scans the file once and saves a sidecar index with the byte
+    offset and request start time range of every block of lines. Later
+    time-windowed queries (ramp only, steady state only, last N minutes) only
+    touch the blocks that overlap the window, so the page cache only holds the
+    bytes actually needed. The index is rebuilt if the log changes.
+    """
+
+    def __init__(
+        self, simulation_log_path: str, index_interval: int = DEFAULT_INDEX_INTERVAL
+    ):
+        self.simulation_log_path = simulation_log_path
+        self.index_path = simulation_log_path + INDEX_SUFFIX
+        self.index_interval = index_interval
+        self.file = open(simulation_log_path, "rb")
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        if not self.size:
+            self.file.close()
+            raise RuntimeError(f"ERROR: Simulation log is empty: {simulation_log_path}")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.run_start: Optional[int] = None
+        self.blocks: List[IndexBlock] = []
+        self.load_or_build_index()
+
+    def __enter__(self) -> "SimulationLogReader":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.mm.close()
+        self.file.close()
+
+    def load_or_build_index(self) -> None:
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as file:
+                    data = json.load(file)
+                if (
+                    data["version"] == 1
+                    and data["size"] == self.size
+                    and data["mtime_ns"] == self.mtime_ns
+                    and data["index_interval"] == self.index_interval
+                ):
+                    self.run_start = data["run_start"]
+                    self.blocks = [IndexBlock(*block) for block in data["blocks"]]
+                    return
+                log.debug(f"Index {self.index_path} is stale, rebuilding...")
+            except (ValueError, KeyError, TypeError) as err:
+                log.warning(f"Ignoring unreadable index {self.index_path}: {err}")
+        self.build_index()
+        self.save_index()
+
+    def build_index(self) -> None:
+        # Check first line. Expected to have:
+        # RUN	GenericSageMakerScenario	test_run_tag	1620982654518	 	3.2.0
+        first_line = self.mm[: self.mm.find(b"\n")]
+        if not first_line.startswith(b"RUN"):
+            raise ValueError(f"Unexpected first line: {first_line!r}")
+        tokens = first_line.split(b"\t")
+        if len(tokens) != 6:
+            raise ValueError(f"Unexpected run format: {first_line!r}")
+        self.run_start = int(tokens[3])
+
+        self.blocks = []
+        block = IndexBlock(offset=0, end_offset=0)
+        lines_in_block = 0
+        offset = 0
+        mm = self.mm
+        while offset < self.size:
+            newline = mm.find(b"\n", offset)
+            next_offset = self.size if newline == -1 else newline + 1
+            if mm[offset : offset + 7] == b"REQUEST":
+                start = int(mm[offset:next_offset].split(b"\t", 5)[4])
+                if block.min_start is None or start < block.min_start:
+                    block.min_start = start
+                if block.max_start is None or start > block.max_start:
+                    block.max_start = start
+            offset = next_offset
+            lines_in_block = lines_in_block + 1
+            if lines_in_block == self.index_interval or offset >= self.size:
+                block.end_offset = offset
+                self.blocks.append(block)
+                block = IndexBlock(offset=offset, end_offset=offset)
+                lines_in_block = 0
+
+    def save_index(self) -> None:
+        data = {
+            "version": 1,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "index_interval": self.index_interval,
+            "run_start": self.run_start,
+            "blocks": [
+                [b.offset, b.end_offset, b.min_start, b.max_start] for b in self.blocks
+            ],
+        }
+        try:
+            with open(self.index_path, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+        except OSError as err:
+            # Read-only results directory, keep the index in memory only.
+            log.warning(f"Could not save index {self.index_path}: {err}")
+
+    @property
+    def last_start(self) -> Optional[int]:
+        starts = [b.max_start for b in self.blocks if b.max_start is not None]
+        return max(starts) if starts else None
+
+    def requests(
+        self, start: Optional[int] = None, end: Optional[int] = None
+    ) -> Iterator[Request]:
+        """Yield requests with start time in [start, end), in file order."""
+        for block in self.blocks:
+            if not block.overlaps(start, end):
+                continue
+            for line in self.mm[block.offset : block.end_offset].split(b"\n"):
+                if not line.startswith(b"REQUEST"):
+                    continue
+                request = parse_request(line)
+                if start is not None and request.start < start:
+                    continue
+                if end is not None and request.start >= end:
+                    continue
+                yield request
+
+    def ramp(self, ramp_minutes: Decimal) -> Iterator[Request]:
+        assert self.run_start is not None  # help mypy
+        end = self.run_start + int(ramp_minutes * MILLISECONDS_PER_MINUTE)
+        return self.requests(self.run_start, end)
+
+    def steady_state(
+        self, ramp_minutes: Decimal, steady_state_minutes: Optional[Decimal] = None
+    ) -> Iterator[Request]:
+        assert self.run_start is not None  # help mypy
+        start = self.run_start + int(ramp_minutes * MILLISECONDS_PER_MINUTE)
+        end = None
+        if steady_state_minutes is not None:
+            end = start + int(steady_state_minutes * MILLISECONDS_PER_MINUTE)
+        return self.requests(start, end)
+
+    def last_minutes(self, minutes: Decimal) -> Iterator[Request]:
+        last_start = self.last_start
+        if last_start is None:
+            return iter([])
+        return self.requests(last_start - int(minutes * MILLISECONDS_PER_MINUTE))
+
+    def histogram(
+        self, start: Optional[int] = None, end: Optional[int] = None
+    ) -> RunHistogram:
+        """Latency histogram for the given time window, see RunHistogram.stats."""
+        run_histogram = RunHistogram()
+        for request in self.requests(start, end):
+            run_histogram.record(
+                request.name, request.start, request.end, request.status
+            )
+        return run_histogram
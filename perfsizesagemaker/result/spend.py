@@ -0,0 +1,23 @@
+import logging.config
+from perfsize.perfsize import Config, Result, ResultManager, Run
+from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+
+log = logging.getLogger(__name__)
+
+# Metric name for the running total of test spend, shown with each run.
+TEST_SPEND_USD = "test_spend_usd"
+
+
+class SpendResultManager(ResultManager):
+    """Add the running total of test spend in dollars to each run."""
+
+    def __init__(self, environment_manager: MeteredEnvironmentManager):
+        self.environment_manager = environment_manager
+
+    def query(self, config: Config, run: Run) -> None:
+        self.environment_manager.observe(config)
+        total = self.environment_manager.tracker.total()
+        log.info(f"Test spend after {run.id}: ${total:.2f}")
+        run.results.append(
+            Result(metric=TEST_SPEND_USD, value=round(total, 2), conditions=[])
+        )
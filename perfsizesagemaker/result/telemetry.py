@@ -0,0 +1,187 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+import json
+import logging.config
+import os
+from perfsize.perfsize import Config, Result, ResultManager, Run
+from perfsize.result.gatling import GatlingResultManager
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND
+from perfsizesagemaker.environment.telemetry import InstanceCountSample
+from perfsizesagemaker.load.telemetry import TelemetryLoadManager
+from perfsizesagemaker.result.simulation_log import Request, SimulationLogReader
+from perfsizesagemaker.result.timeline import SCALE_OUT_LAG_SECONDS, TimelineSecond
+from typing import Any, Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Name of the timeline file saved next to simulation.log in each run directory.
+TIMELINE_FILE = "instance_timeline.json"
+
+
+def time_ms(moment: datetime) -> int:
+    # Run start and end are naive UTC datetimes, see Clock.now.
+    return int(
+        moment.replace(tzinfo=timezone.utc).timestamp() * MILLISECONDS_PER_SECOND
+    )
+
+
+def align(
+    samples: List[InstanceCountSample],
+    requests: Iterable[Request],
+    start_ms: int,
+    end_ms: int,
+) -> List[TimelineSecond]:
+    """One TimelineSecond per second from start_ms to end_ms, with the
+    requests counted by start time and the instance counts held from each
+    sample until the next."""
+    seconds = max(1, -(-(end_ms - start_ms) // MILLISECONDS_PER_SECOND))
+    timeline = [
+        TimelineSecond(time_ms=start_ms + i * MILLISECONDS_PER_SECOND)
+        for i in range(seconds)
+    ]
+    latencies: Dict[int, List[int]] = {}
+    for request in requests:
+        i = (request.start - start_ms) // MILLISECONDS_PER_SECOND
+        if i < 0 or i >= seconds:
+            continue
+        timeline[i].requests = timeline[i].requests + 1
+        if request.status == "OK":
+            latencies.setdefault(i, []).append(request.end - request.start)
+        else:
+            timeline[i].failures = timeline[i].failures + 1
+    for i, values in latencies.items():
+        values.sort()
+        # Nearest rank, so p99 of a few requests is the slowest one.
+        timeline[i].latency_p99_ms = values[-(-len(values) * 99 // 100) - 1]
+    ordered = sorted(samples, key=lambda sample: sample.time_ms)
+    k = 0
+    for second in timeline:
+        while k + 1 < len(ordered) and ordered[k + 1].time_ms <= second.time_ms:
+            k = k + 1
+        if ordered:
+            second.current_instance_count = ordered[k].current_instance_count
+            second.desired_instance_count = ordered[k].desired_instance_count
+    return timeline
+
+
+def scale_out_lag_seconds(samples: List[InstanceCountSample]) -> Optional[Decimal]:
+    """Longest time from the desired count going above the current count to
+    the current count catching up, or None if the endpoint never scaled out.
+    A scale out still pending at the last sample counts up to that sample.
+    Accurate to the sampling interval."""
+    lag: Optional[int] = None
+    behind_since: Optional[int] = None
+    last = None
+    for sample in sorted(samples, key=lambda sample: sample.time_ms):
+        current = sample.current_instance_count
+        desired = sample.desired_instance_count
+        if current is None or desired is None:
+            continue
+        last = sample.time_ms
+        if current < desired:
+            if behind_since is None:
+                behind_since = sample.time_ms
+        elif behind_since is not None:
+            lag = max(lag or 0, sample.time_ms - behind_since)
+            behind_since = None
+    if behind_since is not None and last is not None:
+        lag = max(lag or 0, last - behind_since)
+    if lag is None:
+        return None
+    return Decimal(lag) / MILLISECONDS_PER_SECOND
+
+
+class TelemetryResultManager(ResultManager):
+    """Align the instance counts a TelemetryLoadManager sampled during each
+    run with the run's per second load and latency.
+
+    Adds scale_out_lag_seconds to the run when the endpoint scaled out, keeps
+    the timeline in timelines by run id for the report, and saves it as
+    instance_timeline.json next to simulation.log. Without results_path, as
+    for local runs kept in memory, the timeline only has instance counts.
+    """
+
+    def __init__(
+        self,
+        load_manager: TelemetryLoadManager,
+        results_path: Optional[str] = None,
+        timelines: Optional[Dict[str, List[TimelineSecond]]] = None,
+    ):
+        self.load_manager = load_manager
+        self.results_path = results_path
+        self.timelines = timelines if timelines is not None else {}
+
+    def query(self, config: Config, run: Run) -> None:
+        if run.id not in self.load_manager.samples:
+            raise RuntimeError(f"ERROR: No instance count samples for run {run.id}")
+        samples = self.load_manager.samples.pop(run.id)
+        start_ms = time_ms(run.start)
+        end_ms = time_ms(run.end)
+        if self.results_path is None:
+            timeline = align(samples, [], start_ms, end_ms)
+        else:
+            run_dir = (
+                self.results_path
+                + os.sep
+                + GatlingResultManager(self.results_path).find_run_dir(run.id)
+            )
+            with SimulationLogReader(run_dir + os.sep + "simulation.log") as reader:
+                timeline = align(samples, reader.requests(), start_ms, end_ms)
+            with open(run_dir + os.sep + TIMELINE_FILE, "w") as file:
+                json.dump(
+                    {
+                        "samples": [sample.to_dict() for sample in samples],
+                        "timeline": [second.to_dict() for second in timeline],
+                    },
+                    file,
+                    separators=(",", ":"),
+                )
+        self.timelines[run.id] = timeline
+        lag = scale_out_lag_seconds(samples)
+        log.info(f"Scale out lag during {run.id}: {lag} seconds")
+        if lag is not None:
+            run.results.append(
+                Result(
+                    metric=SCALE_OUT_LAG_SECONDS,
+                    value=lag,
+                    conditions=config.requirements.get(SCALE_OUT_LAG_SECONDS, []),
+                )
+            )
+
+
+class LoadTimelineResultManager(ResultManager):
+    """Per second load and latency of each run from its simulation.log, for
+    runs without instance count samples like fixed scale endurance runs.
+
+    Keeps the timeline in timelines by run id for the report, and saves it as
+    instance_timeline.json next to simulation.log, with no samples.
+    """
+
+    def __init__(
+        self,
+        results_path: str,
+        timelines: Optional[Dict[str, List[TimelineSecond]]] = None,
+    ):
+        self.results_path = results_path
+        self.timelines = timelines if timelines is not None else {}
+
+    def __repr__(self) -> str:
+        return f"LoadTimelineResultManager(results_path={self.results_path})"
+
+    def query(self, config: Config, run: Run) -> None:
+        run_dir = (
+            self.results_path
+            + os.sep
+            + GatlingResultManager(self.results_path).find_run_dir(run.id)
+        )
+        with SimulationLogReader(run_dir + os.sep + "simulation.log") as reader:
+            timeline = align(
+                [], reader.requests(), time_ms(run.start), time_ms(run.end)
+            )
+        with open(run_dir + os.sep + TIMELINE_FILE, "w") as file:
+            json.dump(
+                {"samples": [], "timeline": [second.to_dict() for second in timeline]},
+                file,
+                separators=(",", ":"),
+            )
+        self.timelines[run.id] = timeline
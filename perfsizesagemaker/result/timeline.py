@@ -0,0 +1,51 @@
+from typing import Any, Dict, Optional
+
+# Kept apart from perfsizesagemaker.result.telemetry, so the report can use
+# these without importing the result managers and their dependencies.
+
+# Metric name for the longest wait for instances to catch up with the desired
+# count during a run, in seconds.
+SCALE_OUT_LAG_SECONDS = "scale_out_lag_seconds"
+
+
+class TimelineSecond:
+    """Load and instance counts during one second of a run.
+
+    requests and failures count requests started in the second, and
+    latency_p99_ms is over the successful ones. Instance counts are from the
+    last sample taken by the start of the second.
+    """
+
+    def __init__(
+        self,
+        time_ms: int,
+        requests: int = 0,
+        failures: int = 0,
+        latency_p99_ms: Optional[int] = None,
+        current_instance_count: Optional[int] = None,
+        desired_instance_count: Optional[int] = None,
+    ):
+        self.time_ms = time_ms
+        self.requests = requests
+        self.failures = failures
+        self.latency_p99_ms = latency_p99_ms
+        self.current_instance_count = current_instance_count
+        self.desired_instance_count = desired_instance_count
+
+    def __repr__(self) -> str:
+        return (
+            f"TimelineSecond(time_ms={self.time_ms}, requests={self.requests}, "
+            f"failures={self.failures}, latency_p99_ms={self.latency_p99_ms}, "
+            f"current_instance_count={self.current_instance_count}, "
+            f"desired_instance_count={self.desired_instance_count})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "time_ms": self.time_ms,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_p99_ms": self.latency_p99_ms,
+            "current_instance_count": self.current_instance_count,
+            "desired_instance_count": self.desired_instance_count,
+        }
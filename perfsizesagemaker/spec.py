@@ -0,0 +1,554 @@
+from decimal import Decimal, InvalidOperation
+import json
+import logging.config
+from perfsize.perfsize import Condition, eq, gt, gte, lt, lte, neq
+from perfsizesagemaker.environment.telemetry import DEFAULT_SAMPLE_SECONDS
+from perfsizesagemaker.result.timeline import SCALE_OUT_LAG_SECONDS
+from perfsizesagemaker.step.sagemaker import STRATEGIES
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Test phases in the order they run. Each needs the recommendation of the
+# one before it.
+PHASES = ["type", "max", "min", "target"]
+
+# Metrics a requirement can be set on: perfsize.result.gatling.Metric (which
+# imports pandas), plus the results added by this package. Any of the
+# latency and count metrics can also be set for one request name, like
+# latency_success_p99[name].
+METRICS = [
+    "count_success",
+    "count_fail",
+    "count_total",
+    "percent_success",
+    "percent_fail",
+    "latency_success_min",
+    "latency_success_p25",
+    "latency_success_p50",
+    "latency_success_p75",
+    "latency_success_p90",
+    "latency_success_p95",
+    "latency_success_p98",
+    "latency_success_p99",
+    "latency_success_max",
+    "latency_success_mean",
+    SCALE_OUT_LAG_SECONDS,
+]
+
+# Comparison for each requirement operator, and how it reads in the report.
+OPERATORS: Dict[str, Tuple[Callable[[Decimal], Callable[[Decimal], bool]], str]] = {
+    "lt": (lt, "<"),
+    "lte": (lte, "<="),
+    "gt": (gt, ">"),
+    "gte": (gte, ">="),
+    "eq": (eq, "=="),
+    "neq": (neq, "!="),
+}
+
+
+def text(value: Any) -> str:
+    if isinstance(value, (dict, list, bool)) or value is None:
+        raise ValueError()
+    return str(value)
+
+
+def number(value: Any) -> Decimal:
+    # Through str, so yaml floats like 0.1 stay 0.1 and are not mixed with
+    # Decimal.
+    if isinstance(value, bool):
+        raise ValueError()
+    try:
+        result = Decimal(text(value))
+    except InvalidOperation:
+        raise ValueError()
+    if not result.is_finite():
+        raise ValueError()
+    return result
+
+
+def non_negative(value: Any) -> Decimal:
+    result = number(value)
+    if result < 0:
+        raise ValueError()
+    return result
+
+
+def integer(value: Any) -> int:
+    result = number(value)
+    if result != result.to_integral_value():
+        raise ValueError()
+    return int(result)
+
+
+def port(value: Any) -> int:
+    result = integer(value)
+    if not 0 <= result <= 65535:
+        raise ValueError()
+    return result
+
+
+def boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if f"{value}".lower() in ["true", "false"]:
+        return f"{value}".lower() == "true"
+    raise ValueError()
+
+
+def listed(parse: Callable[[Any], Any]) -> Callable[[Any], List[Any]]:
+    """Parse a list, or a comma separated string as on the command line."""
+
+    def parse_list(value: Any) -> List[Any]:
+        items = value.split(",") if isinstance(value, str) else value
+        if not isinstance(items, list) or not items:
+            raise ValueError()
+        return [parse(item) for item in items]
+
+    return parse_list
+
+
+def json_text(value: Any) -> str:
+    """Json as given on the command line, or the same from a yaml list or
+    mapping, to pass on as a string."""
+    if isinstance(value, str):
+        json.loads(value)
+        return value
+    if not isinstance(value, (dict, list)):
+        raise ValueError()
+    return json.dumps(value)
+
+
+def choice(options: List[str]) -> Callable[[Any], str]:
+    def parse_choice(value: Any) -> str:
+        result = text(value)
+        if result not in options:
+            raise ValueError()
+        return result
+
+    return parse_choice
+
+
+def requirement_limits(value: Any) -> Dict[str, Dict[str, Decimal]]:
+    """Mapping of metric to mapping of operator to limit, like
+    {"latency_success_p95": {"lt": 300}}, or the same as json."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, dict) or not value:
+        raise ValueError()
+    limits: Dict[str, Dict[str, Decimal]] = {}
+    for metric, operators in value.items():
+        if not isinstance(metric, str):
+            raise ValueError()
+        base = metric.split("[")[0]
+        if base not in METRICS or (base != metric and not metric.endswith("]")):
+            raise ValueError()
+        if not isinstance(operators, dict) or not operators:
+            raise ValueError()
+        if any(operator not in OPERATORS for operator in operators):
+            raise ValueError()
+        limits[metric] = {
+            operator: number(limit) for operator, limit in operators.items()
+        }
+    return limits
+
+
+class Field:
+    """One setting of a sizing job, given as a command line argument of the
+    same name or as a key of a job spec file."""
+
+    def __init__(
+        self,
+        name: str,
+        parse: Callable[[Any], Any],
+        expected: str,
+        help: str,
+        default: Any = None,
+        required: bool = False,
+        flag: bool = False,
+    ):
+        self.name = name
+        self.parse = parse
+        self.expected = expected
+        self.help = help
+        self.default = default
+        self.required = required
+        self.flag = flag
+
+    def __repr__(self) -> str:
+        return f"Field(name={self.name}, expected={self.expected})"
+
+
+FIELDS = [
+    Field(
+        "iam_role_arn",
+        text,
+        "a string",
+        "role to assume to get credentials, otherwise will get credentials from environment",
+    ),
+    Field("host", text, "a string", "SageMaker runtime host", required=True),
+    Field(
+        "region",
+        text,
+        "a string",
+        "region name for boto3 and cost lookup",
+        required=True,
+    ),
+    Field(
+        "endpoint_name",
+        text,
+        "a string",
+        "name of SageMaker Endpoint",
+        required=True,
+    ),
+    Field(
+        "endpoint_config_name",
+        text,
+        "a string",
+        "name of SageMaker EndpointConfig",
+        required=True,
+    ),
+    Field(
+        "variant_name",
+        text,
+        "a string",
+        "name of SageMaker Endpoint Variant",
+        default="variant-name-1",
+    ),
+    Field("model_name", text, "a string", "name of SageMaker Model", required=True),
+    Field(
+        "scenario_requests",
+        json_text,
+        "a json array",
+        "json array of request file paths and weights",
+        required=True,
+    ),
+    Field("peak_tps", non_negative, "a number", "required highest TPS", required=True),
+    Field(
+        "latency_success_p99",
+        number,
+        "a number",
+        "allowed p99 latency, unless set in --requirements",
+    ),
+    Field(
+        "percent_fail",
+        number,
+        "a number",
+        "allowed failure percentage, unless set in --requirements",
+    ),
+    Field(
+        "requirements",
+        requirement_limits,
+        f"a json mapping of metric to mapping of operator (from {list(OPERATORS)}) to limit, with metrics from {METRICS}",
+        'json mapping of metric to limits every run must meet, like {"latency_success_p95": {"lt": 300}}, '
+        "in addition to --latency_success_p99 and --percent_fail",
+    ),
+    Field(
+        "type_walk",
+        listed(text),
+        "a comma separated list of strings",
+        "comma separated instance types to test",
+        required=True,
+    ),
+    Field(
+        "count_walk",
+        listed(integer),
+        "a comma separated list of integers",
+        "comma separated counts to test",
+        required=True,
+    ),
+    Field(
+        "tps_walk",
+        listed(non_negative),
+        "a comma separated list of numbers",
+        "comma separated TPS values to test",
+        required=True,
+    ),
+    Field(
+        "duration_minutes",
+        non_negative,
+        "a number",
+        "duration in minutes for type tests",
+        default=Decimal("3"),
+    ),
+    Field(
+        "endurance_ramp_start_tps",
+        non_negative,
+        "a number",
+        "TPS at start of endurance test ramp",
+        default=Decimal("0"),
+    ),
+    Field(
+        "endurance_ramp_minutes",
+        non_negative,
+        "a number",
+        "duration in minutes for endurance test ramp",
+        default=Decimal("0"),
+    ),
+    Field(
+        "endurance_steady_state_minutes",
+        non_negative,
+        "a number",
+        "duration in minutes for endurance steady state",
+        default=Decimal("30"),
+    ),
+    Field(
+        "endurance_retries",
+        integer,
+        "an integer",
+        "number of times to retry endurance test",
+        default=3,
+    ),
+    Field(
+        "phases",
+        listed(choice(PHASES)),
+        f"a comma separated list from {PHASES}, each after the one before it",
+        f"comma separated test phases to run, from {PHASES}, default all but target unless --optimize_scaling_target",
+    ),
+    Field(
+        "strategy",
+        choice(list(STRATEGIES)),
+        f"one of {list(STRATEGIES)}",
+        f"step manager strategy for the type, max and min phases, from {list(STRATEGIES)}",
+        default="default",
+    ),
+    Field(
+        "perfsize_results_dir",
+        text,
+        "a string",
+        "directory for saving test results",
+        default="perfsize-results-dir",
+    ),
+    Field(
+        "cost_file",
+        text,
+        "a string",
+        "path to file mapping instance type to hourly rate",
+        default="resources/configs/cost/us-west-2.json",
+    ),
+    Field(
+        "jar_file",
+        text,
+        "a string",
+        "path to sagmaker-gatling.jar file",
+        default="sagemaker-gatling.jar",
+    ),
+    Field(
+        "logging_config",
+        text,
+        "a string",
+        "path to logging.yml file",
+        default="resources/configs/logging/logging.yml",
+    ),
+    Field(
+        "archive_results",
+        boolean,
+        "true or false",
+        "convert simulation.log files to columnar format and deduplicate report assets at end of job",
+        default=False,
+        flag=True,
+    ),
+    Field(
+        "traffic_trace",
+        text,
+        "a string",
+        "file with captured traffic (timestamps, second,count rows, or data capture jsonl) to replay for the auto scale test instead of a ramp",
+    ),
+    Field(
+        "traffic_scale",
+        non_negative,
+        "a number",
+        "multiple of the traffic trace volume to replay",
+        default=Decimal("1"),
+    ),
+    Field(
+        "local_config",
+        text,
+        "a string",
+        "path to settings file for running against a local SageMaker emulator with simulated time instead of AWS",
+    ),
+    Field(
+        "max_test_budget_usd",
+        number,
+        "a number",
+        "stop testing before any step that could take test spend on endpoint instances over this many dollars",
+    ),
+    Field(
+        "scaling_telemetry_seconds",
+        non_negative,
+        "a non-negative number",
+        "how often to sample endpoint instance counts during auto scale tests, for scale out lag in the report, or 0 to skip",
+        default=Decimal(DEFAULT_SAMPLE_SECONDS),
+    ),
+    Field(
+        "optimize_scaling_target",
+        boolean,
+        "true or false",
+        "after finding the min count, search for the highest invocations target that still passes the ramp, instead of always using the safety factor",
+        default=False,
+        flag=True,
+    ),
+    Field(
+        "compare_types",
+        boolean,
+        "true or false",
+        "test all --type_walk types and --count_walk counts side by side, as production variants of one endpoint, instead of one after another",
+        default=False,
+        flag=True,
+    ),
+    Field(
+        "instance_quotas",
+        text,
+        "a string",
+        "json file mapping instance type to the account endpoint quota for it, so setup waits for room instead of failing",
+    ),
+    Field(
+        "quota_db",
+        text,
+        "a string",
+        "sqlite file to share --instance_quotas usage with other perfsizesagemaker processes on this host",
+    ),
+    Field(
+        "async_teardown",
+        boolean,
+        "true or false",
+        "delete each endpoint torn down in the background and set up the next config under fresh names, like endpoint_name-1, instead of waiting",
+        default=False,
+        flag=True,
+    ),
+    Field(
+        "metrics_port",
+        port,
+        "a port number",
+        "serve live job progress in the OpenMetrics format at /metrics on this port, or 0 for any free port",
+    ),
+    Field(
+        "metrics_textfile",
+        text,
+        "a string",
+        "keep live job progress in the OpenMetrics format in this file, like a .prom file for the node exporter textfile collector",
+    ),
+    Field(
+        "validate_only",
+        boolean,
+        "true or false",
+        "check the arguments and input files, then exit without creating a job directory or testing",
+        default=False,
+        flag=True,
+    ),
+]
+
+
+def load_job_spec(path: str) -> Dict[str, Any]:
+    """Read a yaml (or json) job spec, a mapping with the same keys as the
+    perfsizesagemaker.main arguments without the dashes."""
+    import yaml
+
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f)
+    if not isinstance(spec, dict):
+        raise RuntimeError(f"ERROR: {path} is not a mapping of job settings")
+    return spec
+
+
+class JobSpec:
+    """Settings of a sizing job checked against FIELDS, with typed values.
+
+    Command line arguments override the job spec file, and defaults fill in
+    the rest. Every problem found is listed in errors, so one try shows all
+    of them.
+    """
+
+    def __init__(
+        self,
+        arguments: Dict[str, Any],
+        spec: Optional[Dict[str, Any]] = None,
+        spec_path: str = "job spec",
+    ):
+        spec = spec or {}
+        self.values: Dict[str, Any] = {}
+        self.errors: List[str] = []
+        names = [field.name for field in FIELDS]
+        unknown = [key for key in spec if key not in names]
+        if unknown:
+            self.errors.append(f"{spec_path}: unknown keys {unknown}")
+        missing = []
+        for field in FIELDS:
+            if arguments.get(field.name) is not None:
+                value = arguments[field.name]
+                source = f"argument --{field.name}"
+            elif spec.get(field.name) is not None:
+                value = spec[field.name]
+                source = f"{spec_path} key {field.name}"
+            else:
+                if field.required:
+                    missing.append(f"--{field.name}")
+                self.values[field.name] = field.default
+                continue
+            try:
+                self.values[field.name] = field.parse(value)
+            except (ValueError, TypeError):
+                self.errors.append(
+                    f"{source}: expected {field.expected} but got: {value}"
+                )
+        if missing:
+            self.errors.insert(
+                0, f"the following arguments are required: {', '.join(missing)}"
+            )
+        self.phases = self._phases()
+        self.requirements = self._requirements()
+        # Endpoints still deleting hold their instances, which the quota
+        # scheduling does not count.
+        if self.values.get("async_teardown") and self.values.get("instance_quotas"):
+            self.errors.append(
+                "argument --async_teardown: not allowed with --instance_quotas"
+            )
+
+    def __repr__(self) -> str:
+        return f"JobSpec(values={self.values}, errors={self.errors})"
+
+    def _phases(self) -> List[str]:
+        phases: Optional[List[str]] = self.values.get("phases")
+        if phases is None:
+            phases = PHASES[:3]
+            if self.values.get("optimize_scaling_target"):
+                phases = PHASES
+        if phases != PHASES[: len(phases)]:
+            self.errors.append(
+                f"argument --phases: expected each phase after the one before it in {PHASES} but got: {phases}"
+            )
+        elif self.values.get("optimize_scaling_target") and "min" not in phases:
+            self.errors.append(
+                "argument --optimize_scaling_target: requires the min phase"
+            )
+        return phases
+
+    def _requirements(self) -> Dict[str, List[Condition]]:
+        requirements: Dict[str, List[Condition]] = {}
+        # Shorthand arguments also check the value is not negative.
+        for metric in ["latency_success_p99", "percent_fail"]:
+            limit = self.values.get(metric)
+            if limit is not None:
+                requirements[metric] = [
+                    Condition(lt(limit), f"{metric} < {limit}"),
+                    Condition(gte(Decimal("0")), f"{metric} >= 0"),
+                ]
+        limits: Dict[str, Dict[str, Decimal]] = self.values.get("requirements") or {}
+        for metric, operators in limits.items():
+            if metric in requirements:
+                self.errors.append(
+                    f"argument --requirements: {metric} is already set by --{metric}"
+                )
+                continue
+            requirements[metric] = [
+                Condition(
+                    OPERATORS[operator][0](limit),
+                    f"{metric} {OPERATORS[operator][1]} {limit}",
+                )
+                for operator, limit in operators.items()
+            ]
+        if not requirements:
+            self.errors.append(
+                "one of the following arguments is required: --latency_success_p99, --percent_fail or --requirements"
+            )
+        return requirements
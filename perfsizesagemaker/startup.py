@@ -0,0 +1,176 @@
+import argparse
+from decimal import Decimal
+import json
+import logging.config
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Command line entry points that should start without loading the AWS, data
+# frame, yaml or html libraries, which they only need once a job runs.
+CLI_MODULES = ["perfsizesagemaker.main", "perfsizesagemaker.capacity"]
+HEAVY_MODULES = ["boto3", "botocore", "numpy", "pandas", "yaml", "yattag"]
+
+
+class ImportTime:
+    """One line of python -X importtime output, in microseconds."""
+
+    def __init__(self, module: str, self_us: int, cumulative_us: int, depth: int):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        return (
+            f"ImportTime(module={self.module}, self_us={self.self_us}, "
+            f"cumulative_us={self.cumulative_us}, depth={self.depth})"
+        )
+
+
+def parse_import_times(output: str) -> List[ImportTime]:
+    """Lines like "import time:  1234 |  5678 |   module", where the
+    indent of the module name is its depth in the import tree."""
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            # Header line.
+            continue
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append(ImportTime(module, int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def import_times(module: str) -> List[ImportTime]:
+    """Imports of module and its parent packages, leaving out what the
+    interpreter imports at startup anyway."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"ERROR: Could not import {module}: {completed.stderr.strip()}"
+        )
+    packages = module.split(".")
+    roots = {".".join(packages[: i + 1]) for i in range(len(packages))}
+    times = []
+    subtree: List[ImportTime] = []
+    # Output is in the order imports finish, so each top level import comes
+    # right after everything it imported.
+    for t in parse_import_times(completed.stderr):
+        subtree.append(t)
+        if t.depth == 0:
+            if t.module in roots:
+                times.extend(subtree)
+            subtree = []
+    return times
+
+
+class StartupResult:
+    """Import time of a module with everything it imports, the heavy modules
+    among those, and the slowest of its direct imports."""
+
+    def __init__(self, module: str, times: List[ImportTime], top: int = 10):
+        self.module = module
+        self.total_ms = (
+            Decimal(sum(t.cumulative_us for t in times if not t.depth)) / 1000
+        )
+        imported = {t.module for t in times}
+        self.heavy = [
+            name
+            for name in HEAVY_MODULES
+            if name in imported
+            or any(other.startswith(name + ".") for other in imported)
+        ]
+        self.slowest = sorted(
+            (t for t in times if t.depth == 1),
+            key=lambda t: t.cumulative_us,
+            reverse=True,
+        )[:top]
+
+    def __repr__(self) -> str:
+        return (
+            f"StartupResult(module={self.module}, total_ms={self.total_ms}, "
+            f"heavy={self.heavy})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "module": self.module,
+            "total_ms": f"{self.total_ms:.1f}",
+            "heavy": self.heavy,
+            "slowest": {
+                t.module: f"{Decimal(t.cumulative_us) / 1000:.1f}" for t in self.slowest
+            },
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> List[StartupResult]:
+    parser = argparse.ArgumentParser(
+        description="Measure import time of command line modules with "
+        "python -X importtime, and fail if one imports a heavy module or takes "
+        "longer than --max_ms."
+    )
+    parser.add_argument(
+        "--modules",
+        help="comma separated modules to import",
+        default=",".join(CLI_MODULES),
+    )
+    parser.add_argument("--top", help="slowest imports to show", default="10")
+    parser.add_argument(
+        "--max_ms",
+        help="fail if a module takes longer than this many milliseconds to import",
+        required=False,
+    )
+    parser.add_argument(
+        "--benchmark_output",
+        help="path to save results as json",
+        required=False,
+    )
+    args = parser.parse_args(argv)
+    try:
+        top = int(args.top)
+        if top < 0:
+            raise ValueError
+    except ValueError:
+        parser.error(f"argument --top: expected a non-negative integer: {args.top}")
+    max_ms: Optional[Decimal] = None
+    if args.max_ms is not None:
+        try:
+            max_ms = Decimal(args.max_ms)
+        except:
+            parser.error(f"argument --max_ms: expected a number but got: {args.max_ms}")
+    results = [
+        StartupResult(module, import_times(module), top)
+        for module in args.modules.split(",")
+    ]
+
+    failures = []
+    for result in results:
+        print(f"{result.module}: {result.total_ms:.1f} ms")
+        for t in result.slowest:
+            print(f"  {t.module:<50}{Decimal(t.cumulative_us) / 1000:>8.1f} ms")
+        if result.heavy:
+            failures.append(f"{result.module} imports {', '.join(result.heavy)}")
+        if max_ms is not None and result.total_ms > max_ms:
+            failures.append(
+                f"{result.module} takes {result.total_ms:.1f} ms, over {max_ms} ms"
+            )
+    if args.benchmark_output:
+        with open(args.benchmark_output, "w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+    if failures:
+        raise RuntimeError(f"ERROR: Slow startup: {'; '.join(failures)}")
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,72 @@
+from decimal import Decimal
+import logging.config
+from perfsize.perfsize import Config, StepManager
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# Rough time to create and later delete an endpoint, added to each step
+# when estimating its cost.
+ENDPOINT_OVERHEAD_MINUTES = Decimal("10")
+
+
+class BudgetStepManager(StepManager):
+    """Stop a step manager before it starts a step the budget cannot cover.
+
+    Each step is estimated at worst case: the most instances the config can
+    run (max count for auto scale) for the whole ramp and steady state plus
+    ENDPOINT_OVERHEAD_MINUTES. If spend so far plus the estimate is over the
+    budget, the step is skipped and the search ends with whatever the wrapped
+    step manager recommended so far.
+    """
+
+    def __init__(
+        self, step_manager: StepManager, tracker: SpendTracker, budget: Decimal
+    ):
+        super().__init__(step_manager.plan)
+        self.step_manager = step_manager
+        self.tracker = tracker
+        self.budget = budget
+        self.stopped = False
+
+    def __repr__(self) -> str:
+        return (
+            f"BudgetStepManager(step_manager={self.step_manager}, "
+            f"budget={self.budget}, stopped={self.stopped})"
+        )
+
+    def estimate(self, config: Config) -> Decimal:
+        parameters = config.parameters
+        if Parameter.scaling_max_instance_count in parameters:
+            count = int(parameters[Parameter.scaling_max_instance_count])
+        else:
+            count = int(parameters[Parameter.initial_instance_count])
+        minutes = (
+            Decimal(parameters[Parameter.ramp_minutes])
+            + Decimal(parameters[Parameter.steady_state_minutes])
+            + ENDPOINT_OVERHEAD_MINUTES
+        )
+        return self.tracker.estimate(
+            parameters[Parameter.instance_type], count, minutes
+        )
+
+    def next(self) -> Optional[Config]:
+        if self.stopped:
+            return None
+        config = self.step_manager.next()
+        if config is None:
+            return None
+        spent = self.tracker.total()
+        estimate = self.estimate(config)
+        if spent + estimate > self.budget:
+            log.warning(
+                f"Stopping before step {config.parameters}: spent ${spent:.2f} "
+                f"plus estimated ${estimate:.2f} is over budget ${self.budget}"
+            )
+            # The wrapped step manager already recorded the step as next.
+            self.plan.history.pop()
+            self.stopped = True
+            return None
+        return config
@@ -1,4 +1,6 @@
-from typing import Optional
+from decimal import Decimal
+import math
+from typing import Dict, Optional, Tuple, Type
 from perfsize.perfsize import (
     Config,
     Plan,
@@ -249,3 +251,243 @@ class AutoScaleMinFinderStepManager(StepManager):
         config = self.plan.configs[combination]
         self.plan.history.append(config)
         return config
+
+
+# Same plan as AutoScaleMinFinderStepManager, but walk scaling_min_instance_count
+# down one at a time from scaling_max_instance_count - 1 until the first failure.
+# Takes fewer steps than binary search when the answer is close to the max,
+# which is common when the ramp is short compared to instance startup time.
+class AutoScaleMinWalkDownStepManager(AutoScaleMinFinderStepManager):
+    def next(self) -> Optional[Config]:
+        if not self.plan.history:
+            self.min_count_current = int(self.scaling_max_instance_count)
+        else:
+            previous_config = self.plan.history[-1]
+            previous_run = previous_config.runs[-1]
+            if not previous_run.status:
+                # Done testing, recommendation is the last success (if any).
+                return None
+            self.plan.recommendation = previous_config.parameters
+
+        self.min_count_current = self.min_count_current - 1
+        if self.min_count_current < 1:
+            return None
+
+        combination = (
+            self.host,
+            self.region,
+            self.endpoint_name,
+            self.endpoint_config_name,
+            self.variant_name,
+            self.model_name,
+            self.instance_type,
+            self.scaling_enabled,
+            str(self.min_count_current),
+            self.scaling_max_instance_count,
+            self.scaling_metric,
+            self.scaling_target,
+            self.ramp_start_tps,
+            self.ramp_minutes,
+            self.steady_state_tps,
+            self.steady_state_minutes,
+        )
+        config = self.plan.configs[combination]
+        self.plan.history.append(config)
+        return config
+
+
+def scaled_instance_count(parameters: Dict[str, str], tps: Decimal) -> int:
+    # Instances auto scaling settles on for the given TPS, with the target in
+    # invocations per instance per minute.
+    needed = math.ceil(tps * 60 / Decimal(parameters[Parameter.scaling_target]))
+    return min(
+        int(parameters[Parameter.scaling_max_instance_count]),
+        max(int(parameters[Parameter.scaling_min_instance_count]), needed),
+    )
+
+
+def average_instance_count(parameters: Dict[str, str]) -> Decimal:
+    """Average instances an auto scale config settles on over its traffic
+    pattern, taking the ramp at the middle of each minute and then the
+    steady state. Ignores the lag of scaling out, which the run itself tests."""
+    ramp_start_tps = Decimal(parameters[Parameter.ramp_start_tps])
+    ramp_minutes = Decimal(parameters[Parameter.ramp_minutes])
+    steady_state_tps = Decimal(parameters[Parameter.steady_state_tps])
+    steady_state_minutes = Decimal(parameters[Parameter.steady_state_minutes])
+    steady_state_count = scaled_instance_count(parameters, steady_state_tps)
+    total = steady_state_count * steady_state_minutes
+    minutes = steady_state_minutes
+    for i in range(math.ceil(ramp_minutes)):
+        tps = ramp_start_tps + (steady_state_tps - ramp_start_tps) * min(
+            Decimal(1), (i + Decimal("0.5")) / ramp_minutes
+        )
+        total = total + scaled_instance_count(parameters, tps)
+        minutes = minutes + 1
+    if not minutes:
+        return Decimal(steady_state_count)
+    return total / minutes
+
+
+# Search scaling_target together with scaling_min_instance_count, for the
+# cheapest auto scale setup that still passes the ramp. Set up plan to have
+# scaling_target as a list of candidate targets and scaling_min_instance_count
+# as a list of min counts to try, both in ascending order. All other
+# parameters would be fixed to single values.
+#
+# A higher target lets each instance take more traffic before scaling out, so
+# fewer instances run at steady state, but the endpoint scales out later in
+# the ramp. A higher min count gives more headroom at the start of the ramp,
+# so it can pass with a higher target. For each min count from lowest, binary
+# search for the highest target that passes, starting above the highest one
+# that passed for the previous min count. Cost is counted as the average
+# instances the setup settles on over the traffic pattern, since at peak
+# traffic every target runs near the max count anyway. Stop once the highest
+# target passes or the min count alone costs as much as the best setup found
+# so far.
+class AutoScaleTargetFinderStepManager(StepManager):
+    def __init__(self, plan: Plan) -> None:
+        super().__init__(plan)
+        assert len(plan.parameter_lists[Parameter.host]) == 1
+        self.host = plan.parameter_lists[Parameter.host][0]
+
+        assert len(plan.parameter_lists[Parameter.region]) == 1
+        self.region = plan.parameter_lists[Parameter.region][0]
+
+        assert len(plan.parameter_lists[Parameter.endpoint_name]) == 1
+        self.endpoint_name = plan.parameter_lists[Parameter.endpoint_name][0]
+
+        assert len(plan.parameter_lists[Parameter.endpoint_config_name]) == 1
+        self.endpoint_config_name = plan.parameter_lists[
+            Parameter.endpoint_config_name
+        ][0]
+
+        assert len(plan.parameter_lists[Parameter.variant_name]) == 1
+        self.variant_name = plan.parameter_lists[Parameter.variant_name][0]
+
+        assert len(plan.parameter_lists[Parameter.model_name]) == 1
+        self.model_name = plan.parameter_lists[Parameter.model_name][0]
+
+        assert len(plan.parameter_lists[Parameter.instance_type]) == 1
+        self.instance_type = plan.parameter_lists[Parameter.instance_type][0]
+
+        assert Parameter.initial_instance_count not in plan.parameter_lists
+
+        assert plan.parameter_lists[Parameter.scaling_enabled] == ["True"]
+        self.scaling_enabled = plan.parameter_lists[Parameter.scaling_enabled][0]
+
+        assert len(plan.parameter_lists[Parameter.scaling_max_instance_count]) == 1
+        self.scaling_max_instance_count = plan.parameter_lists[
+            Parameter.scaling_max_instance_count
+        ][0]
+
+        self.min_count_list = plan.parameter_lists[Parameter.scaling_min_instance_count]
+        min_counts = list(map(int, self.min_count_list))
+        assert min_counts and min_counts == sorted(set(min_counts))
+        assert min_counts[-1] <= int(self.scaling_max_instance_count)
+
+        assert len(plan.parameter_lists[Parameter.scaling_metric]) == 1
+        self.scaling_metric = plan.parameter_lists[Parameter.scaling_metric][0]
+
+        self.target_list = plan.parameter_lists[Parameter.scaling_target]
+        targets = list(map(int, self.target_list))
+        assert targets and targets == sorted(set(targets)) and targets[0] > 0
+
+        assert len(plan.parameter_lists[Parameter.ramp_start_tps]) == 1
+        self.ramp_start_tps = plan.parameter_lists[Parameter.ramp_start_tps][0]
+
+        assert len(plan.parameter_lists[Parameter.ramp_minutes]) == 1
+        self.ramp_minutes = plan.parameter_lists[Parameter.ramp_minutes][0]
+
+        assert len(plan.parameter_lists[Parameter.steady_state_tps]) == 1
+        self.steady_state_tps = plan.parameter_lists[Parameter.steady_state_tps][0]
+
+        assert len(plan.parameter_lists[Parameter.steady_state_minutes]) == 1
+        self.steady_state_minutes = plan.parameter_lists[
+            Parameter.steady_state_minutes
+        ][0]
+
+        # Binary search bounds on target index for the current min count:
+        # target_lower passed (or -1), target_upper failed (or past the end).
+        self.min_count_index = 0
+        self.target_lower = -1
+        self.target_upper = len(self.target_list)
+        self.target_current = -1
+        self.best_key: Optional[Tuple[Decimal, int, int]] = None
+
+    def next(self) -> Optional[Config]:
+        if not self.plan.history:
+            # No tests run yet, so proceed with initial values.
+            pass
+        else:
+            # Check most recent run, assign new bounds based on result.
+            previous_config = self.plan.history[-1]
+            previous_run = previous_config.runs[-1]
+            if previous_run.status:
+                self.target_lower = self.target_current
+                parameters = previous_config.parameters
+                # Cheapest first, then lower min count, then higher target.
+                key = (
+                    average_instance_count(parameters),
+                    int(parameters[Parameter.scaling_min_instance_count]),
+                    -int(parameters[Parameter.scaling_target]),
+                )
+                if self.best_key is None or key < self.best_key:
+                    self.best_key = key
+                    self.plan.recommendation = previous_config.parameters
+            else:
+                self.target_upper = self.target_current
+
+        while self.target_upper - self.target_lower <= 1:
+            # Done with this min count. Highest target passing here passes
+            # with any higher min count too, so keep it as lower bound.
+            if self.target_lower == len(self.target_list) - 1:
+                return None
+            self.min_count_index = self.min_count_index + 1
+            if self.min_count_index >= len(self.min_count_list):
+                return None
+            if (
+                self.best_key is not None
+                and int(self.min_count_list[self.min_count_index]) >= self.best_key[0]
+            ):
+                return None
+            self.target_upper = len(self.target_list)
+
+        self.target_current = int((self.target_lower + self.target_upper) / 2)
+        combination = (
+            self.host,
+            self.region,
+            self.endpoint_name,
+            self.endpoint_config_name,
+            self.variant_name,
+            self.model_name,
+            self.instance_type,
+            self.scaling_enabled,
+            self.min_count_list[self.min_count_index],
+            self.scaling_max_instance_count,
+            self.scaling_metric,
+            self.target_list[self.target_current],
+            self.ramp_start_tps,
+            self.ramp_minutes,
+            self.steady_state_tps,
+            self.steady_state_minutes,
+        )
+        config = self.plan.configs[combination]
+        self.plan.history.append(config)
+        return config
+
+
+# Step manager for the type, max count, and min count phases of each strategy.
+STRATEGIES: Dict[
+    str, Tuple[Type[StepManager], Type[StepManager], Type[StepManager]]
+] = {
+    "default": (
+        FirstSuccessStepManager,
+        FirstSuccessStepManager,
+        AutoScaleMinFinderStepManager,
+    ),
+    "walk_down": (
+        FirstSuccessStepManager,
+        FirstSuccessStepManager,
+        AutoScaleMinWalkDownStepManager,
+    ),
+}
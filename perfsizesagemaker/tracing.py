@@ -0,0 +1,405 @@
+from contextlib import contextmanager
+import functools
+import inspect
+import json
+import logging.config
+from perfsize.perfsize import (
+    Config,
+    EnvironmentManager,
+    LoadManager,
+    ResultManager,
+    Run,
+    StepManager,
+    Workflow,
+)
+from perfsizesagemaker.clock import Clock
+from perfsizesagemaker.constants import Parameter
+import secrets
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, cast
+
+log = logging.getLogger(__name__)
+
+NANOSECONDS_PER_MILLISECOND = 1000000
+
+# Config parameters recorded as attributes of step, setup and teardown spans.
+TRACED_PARAMETERS = [
+    Parameter.instance_type,
+    Parameter.initial_instance_count,
+    Parameter.scaling_min_instance_count,
+    Parameter.scaling_max_instance_count,
+    Parameter.scaling_target,
+    Parameter.ramp_start_tps,
+    Parameter.ramp_minutes,
+    Parameter.steady_state_tps,
+    Parameter.steady_state_minutes,
+]
+
+
+def config_attributes(config: Config) -> Dict[str, str]:
+    return {
+        parameter: config.parameters[parameter]
+        for parameter in TRACED_PARAMETERS
+        if parameter in config.parameters
+    }
+
+
+class Span:
+    """One timed operation, with the span it ran in as parent.
+
+    Times are from the tracer's clock, so spans of a local run are in
+    simulated time. child_ms adds up the time of spans that ran directly
+    inside this one, leaving the rest as time spent in this span itself.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        span_id: str,
+        parent_span_id: Optional[str],
+        start_ms: int,
+        attributes: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_span_id = parent_span_id
+        self.start_ms = start_ms
+        self.end_ms: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.child_ms = 0
+        # Started on a background thread, like a timer, outside the thread
+        # that opened the root span.
+        self.background = False
+
+    def __repr__(self) -> str:
+        return (
+            f"Span(name={self.name}, span_id={self.span_id}, "
+            f"parent_span_id={self.parent_span_id}, start_ms={self.start_ms}, "
+            f"end_ms={self.end_ms}, attributes={self.attributes}, "
+            f"error={self.error})"
+        )
+
+    def duration_ms(self) -> int:
+        if self.end_ms is None:
+            return 0
+        return self.end_ms - self.start_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Span in the OTLP JSON encoding, so the exported file can be loaded
+        by OpenTelemetry tools."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": f"{self.start_ms * NANOSECONDS_PER_MILLISECOND}",
+            "endTimeUnixNano": f"{(self.end_ms or self.start_ms) * NANOSECONDS_PER_MILLISECOND}",
+            "attributes": [
+                {"key": key, "value": {"stringValue": value}}
+                for key, value in self.attributes.items()
+            ],
+            "status": (
+                {"code": "STATUS_CODE_ERROR", "message": self.error}
+                if self.error is not None
+                else {"code": "STATUS_CODE_OK"}
+            ),
+        }
+
+
+class JsonLinesSpanExporter:
+    """Append each finished span as a line of JSON to a file, standing in for
+    an OpenTelemetry collector. Lines are written as spans end, so a job that
+    dies still leaves the spans it finished."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"JsonLinesSpanExporter(path={self.path})"
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), separators=(",", ":"))
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+def read_spans(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class SpanTotal:
+    """Time of all spans with one name: total_ms includes spans run inside
+    them, self_ms leaves those out. Self times of all names add up to the
+    time of the root spans."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0
+        self.self_ms = 0
+        self.errors = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"SpanTotal(name={self.name}, count={self.count}, "
+            f"total_ms={self.total_ms}, self_ms={self.self_ms}, "
+            f"errors={self.errors})"
+        )
+
+    def add(self, span: Span) -> None:
+        self.count += 1
+        self.total_ms += span.duration_ms()
+        self.self_ms += span.duration_ms() - span.child_ms
+        if span.error is not None:
+            self.errors += 1
+
+
+class SpanListener:
+    """Told when spans of a Tracer start and end, on the thread that runs
+    them, for live views of a job like perfsizesagemaker/metrics.py."""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+
+class Tracer:
+    """Record spans of a job, export them as they end, and keep totals by
+    span name for the report.
+
+    Each thread has its own stack of open spans, and a new span's parent is
+    the top of that stack. On a thread with no open spans, like a timer, the
+    parent is the open root span. Such background spans overlap the work of
+    the root span, so they are exported but left out of the breakdown.
+    Spans are usually opened with the span context
+    manager. start and end are for spans that do not fit a with block, like
+    a step that lasts from one StepManager.next call to the next.
+    """
+
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        exporter: Optional[JsonLinesSpanExporter] = None,
+    ):
+        self.clock = clock if clock is not None else Clock()
+        self.exporter = exporter
+        self.listeners: List[SpanListener] = []
+        self.trace_id = secrets.token_hex(16)
+        self.totals: Dict[str, SpanTotal] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.root: Optional[Span] = None
+
+    def __repr__(self) -> str:
+        return f"Tracer(trace_id={self.trace_id}, exporter={self.exporter})"
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        stack: List[Span] = self.local.stack
+        return stack
+
+    def start(self, name: str, **attributes: object) -> Span:
+        stack = self._stack()
+        with self.lock:
+            parent = stack[-1] if stack else self.root
+            span = Span(
+                name=name,
+                trace_id=self.trace_id,
+                span_id=secrets.token_hex(8),
+                parent_span_id=parent.span_id if parent else None,
+                start_ms=self.clock.time_ms(),
+                attributes={key: f"{value}" for key, value in attributes.items()},
+            )
+            if parent is None:
+                self.root = span
+            else:
+                span.background = parent.background or not stack
+        stack.append(span)
+        for listener in self.listeners:
+            try:
+                listener.on_start(span)
+            except:
+                log.exception(f"Span listener {listener} failed on start of {span}")
+        return span
+
+    def end(self, span: Span, error: Optional[BaseException] = None) -> None:
+        if span.end_ms is not None:
+            return
+        span.end_ms = self.clock.time_ms()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        stack = self._stack()
+        # Spans opened inside this one and never ended end with it.
+        while span in stack:
+            top = stack.pop()
+            if top is not span:
+                self.end(top)
+        if stack and stack[-1].span_id == span.parent_span_id:
+            stack[-1].child_ms += span.duration_ms()
+        with self.lock:
+            if span is self.root:
+                self.root = None
+            if not span.background:
+                self.totals.setdefault(span.name, SpanTotal(span.name)).add(span)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except:
+                # Tracing must not end the job.
+                log.exception(f"Could not export span {span}")
+        for listener in self.listeners:
+            try:
+                listener.on_end(span)
+            except:
+                log.exception(f"Span listener {listener} failed on end of {span}")
+
+    @contextmanager
+    def span(self, name: str, **attributes: object) -> Iterator[Span]:
+        span = self.start(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, e)
+            raise
+        self.end(span)
+
+    def breakdown(self) -> List[SpanTotal]:
+        """Totals by span name, most self time first."""
+        with self.lock:
+            totals = list(self.totals.values())
+        return sorted(totals, key=lambda total: total.self_ms, reverse=True)
+
+
+Method = TypeVar("Method", bound=Callable[..., Any])
+
+
+def traced(
+    name: str,
+    *parameters: str,
+    **attribute_getters: Callable[[Dict[str, Any]], object],
+) -> Callable[[Method], Method]:
+    """Run a method of an object with a tracer attribute in a span. The named
+    parameters become attributes of the span, and each getter computes one
+    more attribute from the arguments of the call, by parameter name."""
+
+    def decorator(method: Method) -> Method:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            arguments = signature.bind(self, *args, **kwargs)
+            arguments.apply_defaults()
+            values = arguments.arguments
+            attributes = {parameter: values[parameter] for parameter in parameters}
+            for key, getter in attribute_getters.items():
+                attributes[key] = getter(values)
+            with self.tracer.span(name, **attributes):
+                return method(self, *args, **kwargs)
+
+        return cast(Method, wrapper)
+
+    return decorator
+
+
+class TracingStepManager(StepManager):
+    """Wrap a step manager so each step is a span, from the next call that
+    returns its config to the next call after it. Setup, load and results of
+    the step then run inside that span."""
+
+    def __init__(self, step_manager: StepManager, tracer: Tracer):
+        super().__init__(step_manager.plan)
+        self.step_manager = step_manager
+        self.tracer = tracer
+        self.step: Optional[Span] = None
+
+    def __repr__(self) -> str:
+        return f"TracingStepManager(step_manager={self.step_manager})"
+
+    def next(self) -> Optional[Config]:
+        if self.step is not None:
+            self.tracer.end(self.step)
+            self.step = None
+        config = self.step_manager.next()
+        if config is not None:
+            # At most this many configs are left to test in the plan.
+            untested = len(self.plan.combinations) - len(self.plan.history)
+            self.step = self.tracer.start(
+                "step", untested_configs=untested, **config_attributes(config)
+            )
+        return config
+
+
+class TracingEnvironmentManager(EnvironmentManager):
+    def __init__(self, environment_manager: EnvironmentManager, tracer: Tracer):
+        self.environment_manager = environment_manager
+        self.tracer = tracer
+
+    def __repr__(self) -> str:
+        return (
+            f"TracingEnvironmentManager(environment_manager="
+            f"{self.environment_manager})"
+        )
+
+    def setup(self, config: Config) -> None:
+        with self.tracer.span("setup", **config_attributes(config)):
+            self.environment_manager.setup(config)
+
+    def teardown(self, config: Config) -> None:
+        with self.tracer.span("teardown", **config_attributes(config)):
+            self.environment_manager.teardown(config)
+
+
+class TracingLoadManager(LoadManager):
+    def __init__(self, load_manager: LoadManager, tracer: Tracer):
+        self.load_manager = load_manager
+        self.tracer = tracer
+
+    def __repr__(self) -> str:
+        return f"TracingLoadManager(load_manager={self.load_manager})"
+
+    def send(self, config: Config) -> Run:
+        with self.tracer.span("load send", **config_attributes(config)) as span:
+            run = self.load_manager.send(config)
+            span.attributes["run_id"] = run.id
+        return run
+
+
+class TracingResultManager(ResultManager):
+    """Wrap a result manager so each query is a span named after the wrapped
+    class, since parsing Gatling logs and writing the report take a while."""
+
+    def __init__(self, result_manager: ResultManager, tracer: Tracer):
+        self.result_manager = result_manager
+        self.tracer = tracer
+
+    def __repr__(self) -> str:
+        return f"TracingResultManager(result_manager={self.result_manager})"
+
+    def query(self, config: Config, run: Run) -> None:
+        name = type(self.result_manager).__name__
+        with self.tracer.span(f"results {name}", run_id=run.id):
+            self.result_manager.query(config, run)
+
+
+def trace_workflow(workflow: Workflow, tracer: Tracer) -> Workflow:
+    """Wrap the managers of a workflow to trace each of its steps."""
+    workflow.step_manager = TracingStepManager(workflow.step_manager, tracer)
+    workflow.environment_manager = TracingEnvironmentManager(
+        workflow.environment_manager, tracer
+    )
+    workflow.load_manager = TracingLoadManager(workflow.load_manager, tracer)
+    workflow.result_managers = [
+        TracingResultManager(result_manager, tracer)
+        for result_manager in workflow.result_managers
+    ]
+    return workflow
@@ -0,0 +1,49 @@
+from perfsize.perfsize import Config
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import LocalSageMaker
+from typing import Any, Callable, Dict
+import pytest
+
+
+@pytest.fixture
+def start() -> int:
+    return 1628676529000
+
+
+@pytest.fixture
+def account(start: int) -> Callable[..., LocalSageMaker]:
+    """Build a LocalSageMaker on a VirtualClock at start. Keyword arguments
+    are added to or replace the default settings."""
+
+    def build(**settings: Any) -> LocalSageMaker:
+        defaults: Dict[str, Any] = {
+            "create_seconds": 300,
+            "delete_seconds": 60,
+            "scale_out_seconds": 120,
+            "instance_types": {},
+        }
+        defaults.update(settings)
+        return LocalSageMaker(defaults, clock=VirtualClock(start))
+
+    return build
+
+
+@pytest.fixture
+def config() -> Callable[..., Config]:
+    """Build a Config for an endpoint on 2 ml.m5.large instances. Keyword
+    arguments are added to or replace the default parameters."""
+
+    def build(endpoint_name: str = "ep-1", **overrides: str) -> Config:
+        parameters: Dict[str, str] = {
+            Parameter.endpoint_name: endpoint_name,
+            Parameter.endpoint_config_name: f"{endpoint_name}-0",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.initial_instance_count: "2",
+        }
+        parameters.update(overrides)
+        return Config(parameters=parameters, requirements={})
+
+    return build
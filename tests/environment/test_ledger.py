@@ -0,0 +1,139 @@
+import pathlib
+from perfsize.perfsize import Config
+from perfsizesagemaker.clock import MILLISECONDS_PER_SECOND, VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.ledger import (
+    ENDPOINT,
+    ENDPOINT_CONFIG,
+    LEASE_SECONDS,
+    SCALABLE_TARGET,
+    ResourceLedger,
+)
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.reaper import reap
+import sqlite3
+import subprocess
+import sys
+
+START = 1628676529000
+
+
+def auto_scale_config() -> Config:
+    return Config(
+        parameters={
+            Parameter.endpoint_name: "ep-1",
+            Parameter.endpoint_config_name: "ep-1-0",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.scaling_enabled: "True",
+            Parameter.scaling_min_instance_count: "1",
+            Parameter.scaling_max_instance_count: "4",
+            Parameter.scaling_metric: "SageMakerVariantInvocationsPerInstance",
+            Parameter.scaling_target: "600",
+        },
+        requirements={},
+    )
+
+
+def test_ledger_follows_setup_and_teardown(tmp_path: pathlib.Path) -> None:
+    clock = VirtualClock(START)
+    ledger = ResourceLedger(f"{tmp_path}/resources.db", owner="job-1", clock=clock)
+    manager = LocalSageMakerEnvironmentManager(LocalSageMaker({}, clock), ledger=ledger)
+    config = auto_scale_config()
+    manager.setup(config)
+    resources = {
+        (resource.kind, resource.name): resource for resource in ledger.open_resources()
+    }
+    assert list(resources) == [
+        (ENDPOINT_CONFIG, "ep-1-0"),
+        (ENDPOINT, "ep-1"),
+        (SCALABLE_TARGET, "endpoint/ep-1/variant/variant-name-1"),
+    ]
+    assert resources[(ENDPOINT, "ep-1")].owner == "job-1"
+    assert resources[(ENDPOINT, "ep-1")].created_ms == START
+    # This process is still running, so nothing is orphaned.
+    assert ledger.orphans() == []
+
+    manager.teardown(config)
+    assert ledger.open_resources() == []
+
+
+def test_leases(tmp_path: pathlib.Path) -> None:
+    clock = VirtualClock(START)
+    path = f"{tmp_path}/resources.db"
+    crashed = ResourceLedger(path, owner="job-1", clock=clock)
+    manager = LocalSageMakerEnvironmentManager(
+        LocalSageMaker({}, clock), ledger=crashed
+    )
+    manager.setup(auto_scale_config())
+    # Next job in a new pod, which may even get the same process id.
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE resources SET host = 'pod-1'")
+    ledger = ResourceLedger(path, owner="job-2", clock=clock)
+    assert ledger.orphans() == []
+    assert len(ledger.orphans(include_live=True)) == 3
+
+    # Renewed while the job runs.
+    clock.advance(2 * LEASE_SECONDS * MILLISECONDS_PER_SECOND)
+    assert ledger.orphans() == []
+    assert crashed.orphans() == []
+
+    # Once it stops renewing, the lease runs out.
+    crashed.close()
+    renewed_ms = max(resource.updated_ms for resource in ledger.open_resources())
+    clock.advance(
+        renewed_ms + LEASE_SECONDS * MILLISECONDS_PER_SECOND - clock.time_ms()
+    )
+    assert ledger.orphans() == []
+    clock.advance(1)
+    assert len(ledger.orphans()) == 3
+    # Never the rows of the ledger itself.
+    assert crashed.orphans() == []
+
+
+def test_ledger_before_leases(tmp_path: pathlib.Path) -> None:
+    path = f"{tmp_path}/resources.db"
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "CREATE TABLE resources (kind TEXT, name TEXT, region TEXT, "
+            "iam_role_arn TEXT, owner TEXT, host TEXT, pid INTEGER, "
+            "created_ms INTEGER, deleted_ms INTEGER, "
+            "PRIMARY KEY (kind, name, region))"
+        )
+        db.execute(
+            "INSERT INTO resources VALUES "
+            "('endpoint', 'ep-1', '', '', 'job-1', 'pod-1', 1, ?, NULL)",
+            (START,),
+        )
+    ledger = ResourceLedger(path, clock=VirtualClock(START + 1))
+    assert [resource.updated_ms for resource in ledger.open_resources()] == [START]
+    ledger.created(ENDPOINT, "ep-2", None, None)
+    assert len(ledger.open_resources()) == 2
+    ledger.close()
+
+
+def test_reap_orphans(tmp_path: pathlib.Path) -> None:
+    clock = VirtualClock(START)
+    local = LocalSageMaker({}, clock)
+    path = f"{tmp_path}/resources.db"
+    ledger = ResourceLedger(path, owner="job-1", clock=clock)
+    manager = LocalSageMakerEnvironmentManager(local, ledger=ledger)
+    manager.setup(auto_scale_config())
+
+    # Job killed before teardown: its rows now belong to a process that is gone.
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE resources SET pid = ?", (exited.pid,))
+    orphans = ResourceLedger(path, owner="job-2", clock=clock).orphans()
+    assert len(orphans) == 3
+
+    assert reap(ledger, orphans, lambda resource: manager) == []
+    assert local.endpoints == {}
+    assert local.endpoint_configs == {}
+    assert local.scalable_targets == {}
+    assert ledger.open_resources() == []
@@ -0,0 +1,103 @@
+from botocore.exceptions import ClientError, WaiterError
+from perfsize.perfsize import Config
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+import pytest
+from typing import Callable
+
+
+class TestLocalSageMaker:
+    def test_not_found_errors_match_boto(
+        self, account: Callable[..., LocalSageMaker]
+    ) -> None:
+        manager = LocalSageMakerEnvironmentManager(account())
+        assert manager.get_endpoint_config("missing") is None
+        assert manager.get_endpoint("missing").endpoint_status == "NotFound"
+        client = manager._client("sagemaker")
+        with pytest.raises(ClientError, match="Could not find endpoint"):
+            client.delete_endpoint(EndpointName="missing")
+        with pytest.raises(WaiterError):
+            client.get_waiter("endpoint_in_service").wait(EndpointName="missing")
+
+    def test_setup_and_teardown(
+        self,
+        start: int,
+        account: Callable[..., LocalSageMaker],
+        config: Callable[..., Config],
+    ) -> None:
+        local = account()
+        manager = LocalSageMakerEnvironmentManager(local)
+        endpoint = config()
+        manager.setup(endpoint)
+        status = manager.get_status("ep-1")
+        assert status.endpoint_status == "InService"
+        assert status.current_instance_count == 2
+        assert status.instance_type == "ml.m5.large"
+        # Waiter polls every 30 seconds, endpoint takes 300 to create.
+        assert local.now - start == 300000
+
+        # Same config again needs no changes.
+        manager.setup(endpoint)
+        assert local.now - start == 300000
+
+        manager.teardown(endpoint)
+        assert manager.get_status("ep-1").endpoint_status == "NotFound"
+        assert manager.get_endpoint_config("ep-1-0") is None
+        assert local.now - start == 360000
+
+    def test_auto_scaling(
+        self, account: Callable[..., LocalSageMaker], config: Callable[..., Config]
+    ) -> None:
+        local = account()
+        manager = LocalSageMakerEnvironmentManager(local)
+        endpoint = config(
+            **{
+                Parameter.scaling_enabled: "True",
+                Parameter.scaling_min_instance_count: "1",
+                Parameter.scaling_max_instance_count: "4",
+                Parameter.scaling_metric: "SageMakerVariantInvocationsPerInstance",
+                Parameter.scaling_target: "600",
+            }
+        )
+        del endpoint.parameters[Parameter.initial_instance_count]
+        manager.setup(endpoint)
+        status = manager.get_status("ep-1")
+        assert status.scaling_enabled
+        assert status.scaling_min_instance_count == 1
+        assert status.scaling_max_instance_count == 4
+        assert status.scaling_target == 600
+
+        # 30 TPS is 1800 invocations per minute, needs 3 instances at target 600.
+        for second in range(60):
+            local.advance(1000)
+            local.record_invocations("ep-1", 30)
+        assert local.in_service_instance_count("ep-1") == 1
+        assert manager.get_endpoint("ep-1").endpoint_status == "Updating"
+        assert manager.get_endpoint("ep-1").desired_instance_count == 3
+        local.advance(120000)
+        assert local.in_service_instance_count("ep-1") == 3
+        assert manager.get_endpoint("ep-1").endpoint_status == "InService"
+
+        manager.teardown(endpoint)
+        assert manager.get_status("ep-1").endpoint_status == "NotFound"
+        assert not local.scalable_targets
+        assert not local.scaling_policies
+
+    def test_spend(
+        self, account: Callable[..., LocalSageMaker], config: Callable[..., Config]
+    ) -> None:
+        local = account()
+        manager = LocalSageMakerEnvironmentManager(local)
+        endpoint = config()
+        manager.setup(endpoint)
+        # Billing starts at create, so 2 instances for the 300 second create.
+        assert f'{local.spend({"ml.m5.large": 0.12}):.4f}' == "0.0200"
+        local.advance(3600000)
+        assert f'{local.spend({"ml.m5.large": 0.12}):.4f}' == "0.2600"
+        manager.teardown(endpoint)
+        spend = local.spend({"ml.m5.large": 0.12})
+        local.advance(3600000)
+        assert local.spend({"ml.m5.large": 0.12}) == spend
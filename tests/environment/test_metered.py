@@ -0,0 +1,47 @@
+from datetime import datetime
+from perfsize.perfsize import Config, Run
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+from perfsizesagemaker.result.spend import TEST_SPEND_USD, SpendResultManager
+
+
+def test_metered_setup_and_teardown() -> None:
+    clock = VirtualClock(1628676529000)
+    local = LocalSageMaker({"create_seconds": 360, "delete_seconds": 0}, clock)
+    tracker = SpendTracker({"ml.m5.large": 0.1}, clock)
+    manager = MeteredEnvironmentManager(
+        LocalSageMakerEnvironmentManager(local), tracker
+    )
+    config = Config(
+        parameters={
+            Parameter.endpoint_name: "ep-1",
+            Parameter.endpoint_config_name: "ep-1-0",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.initial_instance_count: "5",
+        },
+        requirements={},
+    )
+    # 5 instances for 6 minutes to create is half an instance hour.
+    manager.setup(config)
+    assert tracker.total() == local.spend({"ml.m5.large": 0.1})
+    assert f"{tracker.total():.3f}" == "0.050"
+
+    # Another 6 minutes of load, then the result manager records the total.
+    clock.advance(360000)
+    run = Run(id="run-1", start=datetime.utcnow(), end=datetime.utcnow(), results=[])
+    SpendResultManager(manager).query(config, run)
+    assert run.results[0].metric == TEST_SPEND_USD
+    assert str(run.results[0].value) == "0.10"
+    assert run.status is None
+
+    manager.teardown(config)
+    clock.advance(360000)
+    assert f"{tracker.total():.3f}" == "0.100"
@@ -0,0 +1,211 @@
+from decimal import Decimal
+from perfsize.perfsize import Config, EnvironmentManager
+from perfsizesagemaker.clock import Clock, VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.quota import (
+    InstanceQuota,
+    QuotaEnvironmentManager,
+    SharedInstanceQuota,
+    instances_needed,
+)
+from pathlib import Path
+import pytest
+import subprocess
+import sys
+import threading
+import time
+from typing import List
+
+
+def test_instances_needed() -> None:
+    assert instances_needed(Config({Parameter.initial_instance_count: "2"}, {})) == 2
+    config = Config(
+        {
+            Parameter.scaling_min_instance_count: "1",
+            Parameter.scaling_max_instance_count: "6",
+        },
+        {},
+    )
+    assert instances_needed(config) == 6
+
+
+def wait_for_waiters(quota: InstanceQuota, count: int) -> None:
+    for _ in range(500):
+        with quota.condition:
+            if len(quota.waiting) == count:
+                return
+        time.sleep(0.01)
+    raise AssertionError(f"expected {count} waiters: {quota}")
+
+
+def test_priority_order() -> None:
+    quota = InstanceQuota(4)
+    quota.acquire("big", 4, Decimal("0"))
+    granted: List[str] = []
+
+    def acquire(owner: str, priority: str) -> None:
+        quota.acquire(owner, 3, Decimal(priority))
+        granted.append(owner)
+
+    short = threading.Thread(target=acquire, args=("short", "10"))
+    short.start()
+    wait_for_waiters(quota, 1)
+    long = threading.Thread(target=acquire, args=("long", "90"))
+    long.start()
+    wait_for_waiters(quota, 2)
+
+    # Room for one of them, the one with more time left goes first.
+    quota.release("big")
+    long.join(timeout=5)
+    assert granted == ["long"]
+    quota.release("long")
+    short.join(timeout=5)
+    assert granted == ["long", "short"]
+    assert quota.held == {"short": ("", 3)}
+
+
+def test_type_limits() -> None:
+    quota = InstanceQuota(max_instances=6, type_limits={"ml.m5.large": 2})
+    quota.acquire("ep-1", 2, Decimal("0"), "ml.m5.large")
+    # Other types only count against max_instances.
+    quota.acquire("ep-2", 4, Decimal("0"), "ml.c5.large")
+    with quota.condition:
+        assert not quota._fits(quota.held, "ep-3", "ml.m5.large", 1)
+        assert quota._fits(quota.held, "ep-1", "ml.m5.large", 2)
+        assert not quota._fits(quota.held, "ep-1", "ml.c5.xlarge", 3)
+    with pytest.raises(RuntimeError, match="more than the quota of 2"):
+        quota.acquire("ep-3", 3, Decimal("0"), "ml.m5.large")
+
+
+def test_errors() -> None:
+    with pytest.raises(RuntimeError, match="must be positive"):
+        InstanceQuota(0)
+    with pytest.raises(RuntimeError, match="must be positive"):
+        InstanceQuota(type_limits={"ml.m5.large": 0})
+    with pytest.raises(RuntimeError, match="needs max_instances or type_limits"):
+        InstanceQuota()
+    with pytest.raises(RuntimeError, match="more than the quota"):
+        InstanceQuota(2).acquire("ep-1", 3, Decimal("0"))
+
+
+class FailingEnvironmentManager(EnvironmentManager):
+    def setup(self, config: Config) -> None:
+        raise RuntimeError("ERROR: ResourceLimitExceeded")
+
+    def teardown(self, config: Config) -> None:
+        pass
+
+
+def test_setup_failure_releases() -> None:
+    quota = InstanceQuota(2)
+    manager = QuotaEnvironmentManager(
+        FailingEnvironmentManager(), quota, "ep-1", lambda: Decimal("0")
+    )
+    with pytest.raises(RuntimeError, match="ResourceLimitExceeded"):
+        manager.setup(Config({Parameter.initial_instance_count: "2"}, {}))
+    assert quota.held == {}
+
+
+def test_shared_quota_across_instances(tmp_path: Path) -> None:
+    # Two quotas on one file stand in for two processes.
+    path = str(tmp_path / "quota.sqlite")
+    limits = {"ml.m5.large": 3}
+    first = SharedInstanceQuota(path, type_limits=limits)
+    second = SharedInstanceQuota(path, type_limits=limits, poll_seconds=0.01)
+    first.acquire("ep-1", 2, Decimal("0"), "ml.m5.large")
+    granted = threading.Event()
+
+    def acquire() -> None:
+        second.acquire("ep-2", 2, Decimal("0"), "ml.m5.large")
+        granted.set()
+
+    waiter = threading.Thread(target=acquire)
+    waiter.start()
+    assert not granted.wait(0.2)
+    first.release("ep-1")
+    waiter.join(timeout=5)
+    assert granted.is_set()
+    assert first.held_instances() == {"ep-2": ("ml.m5.large", 2)}
+
+
+def test_shared_quota_clears_dead_processes(tmp_path: Path) -> None:
+    path = str(tmp_path / "quota.sqlite")
+    quota = SharedInstanceQuota(path, type_limits={"ml.m5.large": 2})
+    child = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    dead_pid = int(child.stdout)
+    with quota._connect() as db:
+        db.execute(
+            "INSERT INTO held VALUES (?, ?, ?, ?, ?)",
+            ("ep-dead", "ml.m5.large", 2, quota.host, dead_pid),
+        )
+        db.execute(
+            "INSERT INTO held VALUES (?, ?, ?, ?, ?)",
+            ("ep-remote", "ml.c5.large", 2, "other-host", dead_pid),
+        )
+    quota.acquire("ep-1", 2, Decimal("0"), "ml.m5.large")
+    assert quota.held_instances() == {
+        "ep-remote": ("ml.c5.large", 2),
+        "ep-1": ("ml.m5.large", 2),
+    }
+
+
+def test_setup_retries_resource_limit_exceeded() -> None:
+    account = LocalSageMaker(
+        {"instance_types": {}, "instance_quotas": {"ml.m5.large": 2}},
+        clock=VirtualClock(1628676529000),
+    )
+    # Something outside the quota holds the instances for 15 minutes.
+    other = LocalSageMakerEnvironmentManager(account)
+    parameters = {
+        Parameter.endpoint_name: "other",
+        Parameter.endpoint_config_name: "other-0",
+        Parameter.variant_name: "variant-name-1",
+        Parameter.model_name: "model-simulator",
+        Parameter.instance_type: "ml.m5.large",
+        Parameter.initial_instance_count: "2",
+    }
+    other_config = Config(dict(parameters), {})
+    other.setup(other_config)
+
+    class TearingDownClock(Clock):
+        def sleep(self, seconds: float) -> None:
+            account.clock.sleep(seconds)
+            if (
+                account.clock.elapsed_ms() >= 15 * 60 * 1000
+                and "other" in account.endpoints
+            ):
+                other.teardown(other_config)
+
+    quota = InstanceQuota(type_limits={"ml.m5.large": 2})
+    manager = QuotaEnvironmentManager(
+        LocalSageMakerEnvironmentManager(account),
+        quota,
+        "ep-1",
+        lambda: Decimal("0"),
+        clock=TearingDownClock(),
+        retry_seconds=60,
+    )
+    parameters[Parameter.endpoint_name] = "ep-1"
+    parameters[Parameter.endpoint_config_name] = "ep-1-0"
+    manager.setup(Config(dict(parameters), {}))
+    assert account.endpoints["ep-1"].status == "InService"
+    assert quota.held == {"ep-1": ("ml.m5.large", 2)}
+
+    manager.retries = 0
+    with pytest.raises(Exception, match="ResourceLimitExceeded"):
+        manager.setup(
+            Config(
+                dict(parameters, endpoint_name="ep-2", endpoint_config_name="ep-2-0"),
+                {},
+            )
+        )
+    assert "ep-2" not in quota.held
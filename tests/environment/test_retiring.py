@@ -0,0 +1,126 @@
+from perfsize.perfsize import Config
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.metered import MeteredEnvironmentManager
+from perfsizesagemaker.environment.retiring import (
+    CleanupLedger,
+    RetiringEnvironmentManager,
+)
+
+RATES = {"ml.m5.large": 0.1}
+
+
+def make_config(count: str) -> Config:
+    return Config(
+        parameters={
+            Parameter.endpoint_name: "ep-1",
+            Parameter.endpoint_config_name: "ep-1-config",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.initial_instance_count: count,
+        },
+        requirements={},
+    )
+
+
+def test_retire_and_drain() -> None:
+    clock = VirtualClock(1628676529000)
+    local = LocalSageMaker({"create_seconds": 360, "delete_seconds": 60}, clock)
+    tracker = SpendTracker(RATES, clock)
+    ledger = CleanupLedger(clock)
+    manager = RetiringEnvironmentManager(
+        MeteredEnvironmentManager(LocalSageMakerEnvironmentManager(local), tracker),
+        ledger,
+    )
+
+    first = make_config("1")
+    manager.setup(first)
+    # Nothing retired yet, so setting up again keeps the endpoint.
+    manager.setup(first)
+    assert list(local.endpoints) == ["ep-1"]
+    start = clock.time_ms()
+    manager.teardown(first)
+    assert clock.time_ms() == start
+    assert local.endpoints["ep-1"].status == "Deleting"
+    assert [entry.status for entry in ledger.pending()] == ["Deleting"]
+
+    # Next setup deploys under fresh names while ep-1 is deleted.
+    second = make_config("2")
+    manager.setup(second)
+    # The config keeps the plan's names, the ledger has the deployed ones.
+    assert second.parameters[Parameter.endpoint_name] == "ep-1"
+    deployed = ledger.deployed(second)
+    assert deployed.parameters[Parameter.endpoint_name] == "ep-1-1"
+    assert deployed.parameters[Parameter.endpoint_config_name] == "ep-1-config-1"
+    assert clock.time_ms() - start == 360000
+    assert list(local.endpoints) == ["ep-1-1"]
+    assert list(local.endpoint_configs) == ["ep-1-config-1"]
+    assert ledger.entries[0].status == "Deleted"
+    assert ledger.entries[0].deleted_ms == start + 60000
+    assert ledger.timer is None
+
+    manager.teardown(second)
+    ledger.drain()
+    assert local.endpoints == {}
+    assert local.endpoint_configs == {}
+    assert [entry.status for entry in ledger.entries] == ["Deleted", "Deleted"]
+    # Billed until each endpoint was gone, like a synchronous teardown.
+    assert tracker.total() == local.spend(RATES)
+
+    # Fresh names come from the original name and stay within limits.
+    long_name = "x" * 63
+    assert ledger.fresh_names("ep-1-1", long_name) == ("ep-1-2", "x" * 61 + "-2")
+
+
+def test_retire_on_change() -> None:
+    clock = VirtualClock(1628676529000)
+    local = LocalSageMaker({"create_seconds": 360, "delete_seconds": 60}, clock)
+    tracker = SpendTracker(RATES, clock)
+    ledger = CleanupLedger(clock)
+    manager = RetiringEnvironmentManager(
+        MeteredEnvironmentManager(LocalSageMakerEnvironmentManager(local), tracker),
+        ledger,
+    )
+    manager.setup(make_config("1"))
+    start = clock.time_ms()
+    # A different count without teardown retires ep-1 instead of waiting.
+    second = make_config("2")
+    manager.setup(second)
+    assert clock.time_ms() - start == 360000
+    assert [entry.endpoint_name for entry in ledger.entries] == ["ep-1"]
+    assert list(local.endpoints) == ["ep-1-1"]
+    assert local.endpoints["ep-1-1"].desired_instance_count == 2
+    assert second.parameters[Parameter.endpoint_name] == "ep-1"
+
+    # Same config again is reused under the fresh name.
+    manager.setup(make_config("2"))
+    assert len(ledger.entries) == 1
+    assert clock.time_ms() - start == 360000
+    manager.teardown(second)
+    ledger.drain()
+    assert local.endpoints == {}
+    assert tracker.total() == local.spend(RATES)
+
+
+def test_teardown_without_endpoint() -> None:
+    clock = VirtualClock(1628676529000)
+    local = LocalSageMaker({}, clock)
+    ledger = CleanupLedger(clock)
+    manager = RetiringEnvironmentManager(
+        MeteredEnvironmentManager(
+            LocalSageMakerEnvironmentManager(local), SpendTracker(RATES, clock)
+        ),
+        ledger,
+    )
+    config = make_config("1")
+    manager.teardown(config)
+    assert ledger.entries == []
+    manager.setup(config)
+    assert config.parameters[Parameter.endpoint_name] == "ep-1"
+    ledger.drain()
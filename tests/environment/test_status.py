@@ -0,0 +1,137 @@
+from perfsize.perfsize import Config
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment import status as status_module
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.status import StatusService
+import pytest
+from typing import Any, Callable, Counter
+
+
+class Counted:
+    def __init__(self, client: Any, calls: Counter[str]):
+        self.client = client
+        self.calls = calls
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.client, name)
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            self.calls[name] += 1
+            return method(*args, **kwargs)
+
+        return call
+
+
+class CountingEnvironmentManager(LocalSageMakerEnvironmentManager):
+    def __init__(self, account: LocalSageMaker):
+        super().__init__(account)
+        self.calls: Counter[str] = Counter()
+
+    def _client(self, service_name: str) -> Any:
+        self.calls[service_name] += 1
+        return Counted(super()._client(service_name), self.calls)
+
+
+def deploy(local: LocalSageMaker, config: Callable[..., Config]) -> None:
+    manager = LocalSageMakerEnvironmentManager(local)
+    scaled = config(
+        "ep-1",
+        **{
+            Parameter.scaling_enabled: "True",
+            Parameter.scaling_min_instance_count: "1",
+            Parameter.scaling_max_instance_count: "4",
+            Parameter.scaling_metric: "SageMakerVariantInvocationsPerInstance",
+            Parameter.scaling_target: "600",
+        },
+    )
+    del scaled.parameters[Parameter.initial_instance_count]
+    manager.setup(scaled)
+    manager.setup(config("ep-2"))
+    manager.setup(config("ep-3", **{Parameter.instance_type: "ml.c5.xlarge"}))
+
+
+NAMES = ["ep-1", "ep-2", "ep-3", "missing"]
+
+
+class TestStatusService:
+    def test_matches_get_status_with_batched_calls(
+        self, account: Callable[..., LocalSageMaker], config: Callable[..., Config]
+    ) -> None:
+        local = account()
+        deploy(local, config)
+        manager = CountingEnvironmentManager(local)
+        service = StatusService(manager)
+        statuses = service.statuses(NAMES)
+        assert manager.calls == {
+            "sagemaker": 1,
+            "application-autoscaling": 1,
+            "describe_endpoint": 4,
+            "describe_endpoint_config": 3,
+            "describe_scalable_targets": 1,
+            "describe_scaling_policies": 1,
+        }
+        for name in NAMES:
+            assert statuses[name] == manager.get_status(name)
+        assert statuses["ep-1"].scaling_enabled
+        assert statuses["ep-1"].scaling_target == 600
+        assert not statuses["ep-2"].scaling_enabled
+        assert statuses["missing"].endpoint_status == "NotFound"
+
+    def test_snapshots_shared_until_ttl(
+        self, account: Callable[..., LocalSageMaker], config: Callable[..., Config]
+    ) -> None:
+        local = account()
+        deploy(local, config)
+        manager = CountingEnvironmentManager(local)
+        service = StatusService(manager, ttl_seconds=10)
+        service.statuses(["ep-1", "ep-2"])
+        assert manager.calls["describe_endpoint"] == 2
+        local.advance(9000)
+        assert service.status("ep-1").current_instance_count == 1
+        assert manager.calls["describe_endpoint"] == 2
+        # A new endpoint refreshes all watched ones, to keep them in step.
+        service.status("ep-3")
+        assert manager.calls["describe_endpoint"] == 5
+        local.advance(9999)
+        service.statuses(["ep-1", "ep-3"])
+        assert manager.calls["describe_endpoint"] == 5
+        local.advance(1)
+        service.status("ep-3")
+        assert manager.calls["describe_endpoint"] == 8
+        assert manager.calls["describe_scalable_targets"] == 3
+        # Invalidated endpoints are dropped and described fresh next time.
+        service.invalidate("ep-2")
+        LocalSageMakerEnvironmentManager(local).teardown(config("ep-2"))
+        assert service.status("ep-2").endpoint_status == "NotFound"
+        assert manager.calls["describe_endpoint"] == 11
+
+    def test_resource_ids_chunked(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        account: Callable[..., LocalSageMaker],
+        config: Callable[..., Config],
+    ) -> None:
+        monkeypatch.setattr(status_module, "RESOURCE_IDS_PER_CALL", 2)
+        local = account()
+        deploy(local, config)
+        manager = CountingEnvironmentManager(local)
+        statuses = StatusService(manager).statuses(NAMES)
+        assert manager.calls["describe_scalable_targets"] == 2
+        assert manager.calls["describe_scaling_policies"] == 1
+        assert statuses["ep-1"].scaling_max_instance_count == 4
+
+    def test_error_only_fails_its_endpoint(
+        self, account: Callable[..., LocalSageMaker], config: Callable[..., Config]
+    ) -> None:
+        local = account()
+        deploy(local, config)
+        del local.endpoint_configs["ep-3-0"]
+        service = StatusService(CountingEnvironmentManager(local))
+        with pytest.raises(RuntimeError, match="ep-3-0"):
+            service.statuses(NAMES)
+        assert service.status("ep-2").instance_type == "ml.m5.large"
+        with pytest.raises(RuntimeError, match="ep-3-0"):
+            service.status("ep-3")
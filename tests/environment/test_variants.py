@@ -0,0 +1,94 @@
+from decimal import Decimal
+from perfsize.perfsize import Plan
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.variants import (
+    VariantsEnvironmentManager,
+    variant_name,
+)
+
+RATES = {"ml.m5.large": 0.115, "ml.c5.large": 0.102}
+
+
+def plan() -> Plan:
+    return Plan(
+        parameter_lists={
+            Parameter.endpoint_name: ["ep-1"],
+            Parameter.endpoint_config_name: ["ep-1-0"],
+            Parameter.variant_name: ["variant-name-1"],
+            Parameter.model_name: ["model-simulator"],
+            Parameter.instance_type: ["ml.m5.large", "ml.c5.large"],
+            Parameter.initial_instance_count: ["1", "2"],
+            Parameter.steady_state_tps: ["100", "200"],
+        },
+        requirements={},
+    )
+
+
+def test_variant_name() -> None:
+    parameters = (
+        plan()
+        .configs[
+            (
+                "ep-1",
+                "ep-1-0",
+                "variant-name-1",
+                "model-simulator",
+                "ml.c5.large",
+                "2",
+                "200",
+            )
+        ]
+        .parameters
+    )
+    assert variant_name(parameters) == "variant-name-1-ml-c5-large-2"
+
+
+def test_setup_once_and_teardown() -> None:
+    account = LocalSageMaker({"instance_types": {}}, clock=VirtualClock(0))
+    local = LocalSageMakerEnvironmentManager(account)
+    tracker = SpendTracker(RATES, account.clock)
+    comparison = plan()
+    manager = VariantsEnvironmentManager(local, tracker, comparison)
+    assert manager.variants == {
+        "variant-name-1-ml-m5-large-1": ("ml.m5.large", 1),
+        "variant-name-1-ml-m5-large-2": ("ml.m5.large", 2),
+        "variant-name-1-ml-c5-large-1": ("ml.c5.large", 1),
+        "variant-name-1-ml-c5-large-2": ("ml.c5.large", 2),
+    }
+    configs = list(comparison.configs.values())
+    manager.setup(configs[0])
+    created = account.clock.elapsed_ms()
+    assert local.get_variant_instance_counts("ep-1") == {
+        name: count for name, (_, count) in manager.variants.items()
+    }
+    # Single variant view of the comparison endpoint never matches a setup.
+    endpoint = local.get_endpoint("ep-1")
+    assert endpoint.current_instance_count == 6
+    assert endpoint.variant_name and endpoint.variant_name.count(",") == 3
+    endpoint_config = local.get_endpoint_config("ep-1-0")
+    assert endpoint_config
+    assert endpoint_config.instance_type.split(",") == [
+        "ml.m5.large",
+        "ml.m5.large",
+        "ml.c5.large",
+        "ml.c5.large",
+    ]
+
+    # Other configs of the plan use the same endpoint.
+    for config in configs[1:]:
+        manager.setup(config)
+    assert account.clock.elapsed_ms() == created
+
+    account.advance(3600 * 1000)
+    manager.teardown(configs[-1])
+    assert "ep-1" not in account.endpoints
+    assert "ep-1-0" not in account.endpoint_configs
+    # Tracker and emulator agree on instance time of all the variants.
+    assert f"{tracker.total():.4f}" == f"{account.spend(RATES):.4f}"
+    assert tracker.total() > Decimal("3") * Decimal("0.217")
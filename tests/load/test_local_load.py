@@ -0,0 +1,117 @@
+from decimal import Decimal
+import os
+import pathlib
+from perfsize.perfsize import Config
+from perfsize.result.gatling import GatlingResultManager, Metric
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.load.local import (
+    LocalLoadManager,
+    ramp_arrivals,
+    split,
+    weighted_cycle,
+)
+from perfsizesagemaker.load.payload import Payload
+from typing import Dict, List, Optional
+
+
+def run(
+    tmp_path: pathlib.Path,
+    steady_state_tps: str,
+    payloads: Optional[List[Payload]] = None,
+    name: str = "SageMaker-ep-1",
+) -> Dict[str, Decimal]:
+    local = LocalSageMaker(
+        {
+            "queue_limit_seconds": 1,
+            "seed": 1,
+            "instance_types": {
+                "ml.m5.large": {
+                    "capacity_tps": 100,
+                    "latency_median_ms": 40,
+                    "latency_sigma": 0.2,
+                    "concurrency": 2,
+                    "latency_ms_per_kb": 10,
+                }
+            },
+        }
+    )
+    config = Config(
+        parameters={
+            Parameter.endpoint_name: "ep-1",
+            Parameter.endpoint_config_name: "ep-1-0",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.initial_instance_count: "1",
+            Parameter.ramp_start_tps: "0",
+            Parameter.ramp_minutes: "0",
+            Parameter.steady_state_tps: steady_state_tps,
+            Parameter.steady_state_minutes: "1",
+        },
+        requirements={},
+    )
+    LocalSageMakerEnvironmentManager(local).setup(config)
+    start = local.now
+    load_manager = LocalLoadManager(local, str(tmp_path), payloads=payloads)
+    run = load_manager.send(config)
+    assert local.now - start == 60000
+    assert run.id.endswith(f"-ml.m5.large-1-{steady_state_tps}TPS")
+    result_manager = GatlingResultManager(str(tmp_path))
+    run_dir = result_manager.find_run_dir(run.id)
+    stats = result_manager.parse(os.path.join(tmp_path, run_dir, "simulation.log"))
+    return stats[name]
+
+
+def test_ramp_arrivals() -> None:
+    counts = list(ramp_arrivals(Decimal(0), Decimal(1), Decimal(10), Decimal(1)))
+    assert len(counts) == 120
+    assert 299 <= sum(counts[:60]) <= 300
+    assert 899 <= sum(counts) <= 900
+    assert counts[61:] == [10] * 59
+
+
+def test_below_capacity(tmp_path: pathlib.Path) -> None:
+    stats = run(tmp_path, "50")
+    assert stats[Metric.count_total] == 3000
+    assert stats[Metric.count_fail] == 0
+    assert 30 < stats[Metric.latency_success_p50] < 60
+
+
+def test_above_capacity(tmp_path: pathlib.Path) -> None:
+    stats = run(tmp_path, "200")
+    assert stats[Metric.count_total] == 12000
+    # Only capacity (plus the one second queue) gets served.
+    assert 5500 < stats[Metric.count_fail] < 6500
+    assert stats[Metric.latency_success_p99] > 500
+
+
+def test_split() -> None:
+    assert split(10, [50, 30, 20]) == [5, 3, 2]
+    assert split(7, [1, 1, 1]) == [2, 2, 3]
+    assert sum(split(12345, [33, 33, 34])) == 12345
+
+
+def test_weighted_cycle() -> None:
+    cycle = weighted_cycle([75, 25])
+    assert len(cycle) == 100
+    assert cycle.count(1) == 25
+    # Spread out, never two of the lighter one in a row.
+    assert cycle[:8] == [0, 0, 1, 0, 0, 0, 1, 0]
+
+
+def test_payload_names(tmp_path: pathlib.Path) -> None:
+    payloads = [
+        Payload("small.json", 75, b"{}", "utf-8", "a"),
+        Payload("large.json", 25, b"x" * 10240, "utf-8", "b"),
+    ]
+    small = run(tmp_path / "small", "50", payloads, "SageMaker-ep-1-small")
+    large = run(tmp_path / "large", "50", payloads, "SageMaker-ep-1-large")
+    assert small[Metric.count_total] == 2250
+    assert large[Metric.count_total] == 750
+    # 10 KiB at 10 ms per KiB adds about 100 ms of service time.
+    gap = large[Metric.latency_success_p50] - small[Metric.latency_success_p50]
+    assert 90 < gap < 110
@@ -0,0 +1,109 @@
+import json
+import os
+import pathlib
+from perfsizesagemaker.load.payload import MANIFEST_FILE, PayloadBundle
+import pytest
+from typing import Dict, List
+
+
+def write(tmp_path: pathlib.Path, name: str, content: bytes) -> str:
+    path = os.path.join(tmp_path, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def scenario(items: List[Dict[str, object]]) -> str:
+    return json.dumps(items)
+
+
+class TestPayloadBundle:
+    def test_validate(self, tmp_path: pathlib.Path) -> None:
+        small = write(tmp_path, "small.json", b'{"a": 1}')
+        large = write(tmp_path, "large.json", b'{"a": "' + b"x" * 100 + b'"}')
+        bundle = PayloadBundle(
+            scenario([{"path": small, "weight": 75}, {"path": large, "weight": 25}])
+        )
+        assert [p.size for p in bundle.payloads] == [8, 109]
+        profile = bundle.profile()
+        assert profile["payload_count"] == "2"
+        assert profile["payload_bytes_min"] == "8"
+        assert profile["payload_bytes_p50"] == "8"
+        assert profile["payload_bytes_max"] == "109"
+        assert profile["payload_bytes_weighted_mean"] == "33.2"
+
+    @pytest.mark.parametrize(
+        "name, content, error",
+        [
+            ("bad.json", b"{not json", "is not valid json"),
+            ("bad.csv", b"\xff\xfe\x00", "is not valid utf-8"),
+            ("empty.csv", b"", "is empty"),
+        ],
+    )
+    def test_invalid_content(
+        self, tmp_path: pathlib.Path, name: str, content: bytes, error: str
+    ) -> None:
+        path = write(tmp_path, name, content)
+        with pytest.raises(RuntimeError, match=error):
+            PayloadBundle(scenario([{"path": path, "weight": 100}]))
+
+    def test_encoding(self, tmp_path: pathlib.Path) -> None:
+        path = write(tmp_path, "latin.csv", "café".encode("latin-1"))
+        with pytest.raises(RuntimeError):
+            PayloadBundle(scenario([{"path": path, "weight": 100}]))
+        PayloadBundle(scenario([{"path": path, "weight": 100, "encoding": "latin-1"}]))
+
+    def test_weights(self, tmp_path: pathlib.Path) -> None:
+        path = write(tmp_path, "a.json", b"{}")
+        with pytest.raises(RuntimeError, match="sum_of_weights=100"):
+            PayloadBundle(scenario([{"path": path, "weight": 50}]))
+        with pytest.raises(RuntimeError, match="negative weight"):
+            PayloadBundle(scenario([{"path": path, "weight": -1}]))
+        with pytest.raises(RuntimeError, match="does not exist"):
+            PayloadBundle(scenario([{"path": path + "x", "weight": 100}]))
+
+    def test_write(self, tmp_path: pathlib.Path) -> None:
+        first = write(tmp_path, "first.json", b"{}")
+        second = write(tmp_path, "second.json", b"{}")
+        bundle = PayloadBundle(
+            scenario([{"path": first, "weight": 50}, {"path": second, "weight": 50}])
+        )
+        bundle_dir = os.path.join(tmp_path, "payloads")
+        items = json.loads(bundle.write(bundle_dir))
+        # Identical content is stored once.
+        assert items[0]["path"] == items[1]["path"]
+        assert [item["weight"] for item in items] == [50, 50]
+        assert bundle.profile()["payload_unique"] == "1"
+        with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        assert [entry["source"] for entry in manifest] == [first, second]
+        # Bundle can be validated again as regular scenario_requests.
+        PayloadBundle(json.dumps(items))
+
+    def test_names(self, tmp_path: pathlib.Path) -> None:
+        small = write(tmp_path, "small.json", b"{}")
+        large = write(tmp_path, "large.json", b"[]")
+        bundle = PayloadBundle(
+            scenario(
+                [
+                    {"path": small, "weight": 50},
+                    {"path": large, "weight": 50, "name": "big"},
+                ]
+            )
+        )
+        assert [payload.name for payload in bundle.payloads] == ["small", "big"]
+        assert bundle.match("SageMaker-ep-1-big") == bundle.payloads[1]
+        assert bundle.match("small") == bundle.payloads[0]
+        assert bundle.match("SageMaker-ep-1") is None
+        # Only given names are passed on to tag requests.
+        items = json.loads(bundle.write(os.path.join(tmp_path, "payloads")))
+        assert ["name" in item for item in items] == [False, True]
+        with pytest.raises(RuntimeError, match="name big is used more than once"):
+            PayloadBundle(
+                scenario(
+                    [
+                        {"path": small, "weight": 50, "name": "big"},
+                        {"path": large, "weight": 50, "name": "big"},
+                    ]
+                )
+            )
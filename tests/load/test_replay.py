@@ -0,0 +1,133 @@
+from botocore.exceptions import ClientError
+from decimal import Decimal
+import json
+import os
+import pathlib
+from perfsize.perfsize import Config
+from perfsize.result.gatling import GatlingResultManager, Metric
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.load.replay import ReplayLoadManager, TraceReader
+import pytest
+from typing import Any, Dict, List
+
+
+def write_trace(tmp_path: pathlib.Path, lines: List[str]) -> str:
+    path = os.path.join(tmp_path, "trace.csv")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+class FakeBody:
+    def read(self) -> bytes:
+        return b"{}"
+
+
+class FakeRuntimeClient:
+    def __init__(self, fail_every: int = 0) -> None:
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def invoke_endpoint(self, **kwargs: Any) -> Dict[str, Any]:
+        self.calls = self.calls + 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ClientError(
+                {"Error": {}, "ResponseMetadata": {"HTTPStatusCode": 503}},
+                "InvokeEndpoint",
+            )
+        return {"Body": FakeBody()}
+
+
+class TestTraceReader:
+    def test_timestamps(self, tmp_path: pathlib.Path) -> None:
+        path = write_trace(
+            tmp_path, ["timestamp", "1628676533.100", "1628676533.150", "1628676535"]
+        )
+        assert list(TraceReader(path)) == [0, 50, 1900]
+
+    def test_per_second_counts(self, tmp_path: pathlib.Path) -> None:
+        path = write_trace(tmp_path, ["second,count", "0,4", "# quiet", "1,0", "2,1"])
+        assert list(TraceReader(path)) == [0, 250, 500, 750, 2000]
+
+    def test_data_capture(self, tmp_path: pathlib.Path) -> None:
+        records = [
+            {"eventMetadata": {"inferenceTime": "2021-08-11T10:08:51Z"}},
+            {"eventMetadata": {"inferenceTime": "2021-08-11T10:08:51.500000Z"}},
+            {"eventMetadata": {"inferenceTime": "2021-08-11T10:08:53Z"}},
+        ]
+        path = write_trace(tmp_path, [json.dumps(record) for record in records])
+        assert list(TraceReader(path)) == [0, 500, 2000]
+
+    def test_scale(self, tmp_path: pathlib.Path) -> None:
+        path = write_trace(tmp_path, ["0", "1", "2", "3"])
+        assert list(TraceReader(path, Decimal("2"))) == [
+            0,
+            0,
+            1000,
+            1000,
+            2000,
+            2000,
+            3000,
+            3000,
+        ]
+        assert list(TraceReader(path, Decimal("0.5"))) == [1000, 3000]
+        with pytest.raises(RuntimeError, match="must be positive"):
+            TraceReader(path, Decimal("0"))
+
+    def test_profile(self, tmp_path: pathlib.Path) -> None:
+        path = write_trace(tmp_path, ["0,10", "1,30", "2,20"])
+        profile = TraceReader(path).profile()
+        assert profile["trace_requests"] == "60"
+        assert profile["trace_peak_tps"] == "30"
+        assert profile["trace_mean_tps"] == "20.00"
+        assert profile["trace_duration_minutes"] == "0.05"
+
+    def test_errors(self, tmp_path: pathlib.Path) -> None:
+        path = write_trace(tmp_path, ["5", "4"])
+        with pytest.raises(RuntimeError, match="sorted by time"):
+            list(TraceReader(path))
+        path = write_trace(tmp_path, ["5", "oops"])
+        with pytest.raises(RuntimeError, match="line 2"):
+            list(TraceReader(path))
+        # Only the first row may be a header, a second bad row is an error.
+        path = write_trace(tmp_path, ["timestamp", "oops", "5"])
+        with pytest.raises(RuntimeError, match="line 2"):
+            list(TraceReader(path))
+        path = write_trace(tmp_path, ["second,count", "0,0", "oops", "1,1"])
+        with pytest.raises(RuntimeError, match="line 3"):
+            list(TraceReader(path))
+        with pytest.raises(RuntimeError, match="does not exist"):
+            TraceReader(path + ".missing")
+
+
+class TestReplayLoadManager:
+    def test_send(self, tmp_path: pathlib.Path) -> None:
+        payload_path = os.path.join(tmp_path, "payload.json")
+        with open(payload_path, "w") as f:
+            f.write("{}")
+        trace_path = write_trace(tmp_path, ["0,40"])
+        client = FakeRuntimeClient(fail_every=10)
+        load_manager = ReplayLoadManager(
+            scenario_requests=json.dumps([{"path": payload_path, "weight": 100}]),
+            trace_path=trace_path,
+            results_path=str(tmp_path),
+            max_in_flight=4,
+        )
+        load_manager._client = lambda: client  # type: ignore
+        config = Config(
+            parameters={
+                Parameter.endpoint_name: "endpoint-1",
+                Parameter.instance_type: "ml.m5.large",
+                Parameter.initial_instance_count: "1",
+            },
+            requirements={},
+        )
+        run = load_manager.send(config)
+        assert run.id.endswith("-ml.m5.large-1-replay1x")
+        assert client.calls == 40
+
+        result_manager = GatlingResultManager(str(tmp_path))
+        run_dir = result_manager.find_run_dir(run.id)
+        stats = result_manager.parse(os.path.join(tmp_path, run_dir, "simulation.log"))
+        assert stats["SageMaker-endpoint-1"][Metric.count_total] == 40
+        assert stats["SageMaker-endpoint-1"][Metric.count_fail] == 4
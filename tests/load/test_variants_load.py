@@ -0,0 +1,120 @@
+from decimal import Decimal
+import pathlib
+from perfsize.perfsize import Config, Plan
+from perfsize.result.gatling import GatlingResultManager, Metric
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.variants import VariantsEnvironmentManager
+from perfsizesagemaker.load.local import LocalLoadManager
+from perfsizesagemaker.load.variants import (
+    SageMakerVariantsSender,
+    VariantsLoadManager,
+    arrival_offsets,
+)
+from typing import Any, Dict, List
+
+PROFILES = {
+    "ml.t2.medium": {"capacity_tps": 40, "latency_median_ms": 60, "concurrency": 1},
+    "ml.m5.large": {"capacity_tps": 260, "latency_median_ms": 40, "concurrency": 2},
+}
+
+
+def plan() -> Plan:
+    return Plan(
+        parameter_lists={
+            Parameter.endpoint_name: ["ep-1"],
+            Parameter.endpoint_config_name: ["ep-1-0"],
+            Parameter.variant_name: ["variant-name-1"],
+            Parameter.model_name: ["model-simulator"],
+            Parameter.instance_type: ["ml.t2.medium", "ml.m5.large"],
+            Parameter.initial_instance_count: ["1"],
+            Parameter.ramp_start_tps: ["0"],
+            Parameter.ramp_minutes: ["0"],
+            Parameter.steady_state_tps: ["100"],
+            Parameter.steady_state_minutes: ["3"],
+        },
+        requirements={},
+    )
+
+
+def test_arrival_offsets() -> None:
+    assert list(arrival_offsets(iter([2, 0, 1]))) == [0, 500, 2000]
+
+
+def test_one_run_per_level(tmp_path: pathlib.Path) -> None:
+    account = LocalSageMaker(
+        {"seed": 1, "instance_types": PROFILES}, clock=VirtualClock(1628676529000)
+    )
+    comparison = plan()
+    environment_manager = VariantsEnvironmentManager(
+        LocalSageMakerEnvironmentManager(account),
+        SpendTracker({"ml.t2.medium": 0.056, "ml.m5.large": 0.115}, account.clock),
+        comparison,
+    )
+    load_manager = VariantsLoadManager(
+        LocalLoadManager(account, str(tmp_path)), environment_manager.variants
+    )
+    small, large = comparison.configs.values()
+    environment_manager.setup(small)
+    start = account.clock.time_ms()
+    small_run = load_manager.send(small)
+    assert account.clock.time_ms() - start == 3 * 60 * 1000
+    # The other variant got the same load over the same time.
+    large_run = load_manager.send(large)
+    assert account.clock.time_ms() - start == 3 * 60 * 1000
+    assert (large_run.start, large_run.end) == (small_run.start, small_run.end)
+    assert "ml.m5.large" in large_run.id and "ml.t2.medium" in small_run.id
+
+    stats: Dict[str, Dict[str, Decimal]] = {}
+    result_manager = GatlingResultManager(str(tmp_path))
+    for config, run in [(small, small_run), (large, large_run)]:
+        result_manager.query(config, run)
+        stats[run.id] = {result.metric: result.value for result in run.results}
+    # 100 TPS is over the capacity of ml.t2.medium but fine for ml.m5.large.
+    assert stats[small_run.id][Metric.percent_fail] > 0
+    assert stats[large_run.id][Metric.percent_fail] == 0
+    assert stats[large_run.id][Metric.latency_success_p99] < 200
+
+    # Sending the same config again sends a new load level to everyone.
+    again = load_manager.send(large)
+    assert account.clock.time_ms() - start == 6 * 60 * 1000
+    assert again.id != large_run.id
+
+
+class FakeBody:
+    def read(self) -> bytes:
+        return b"{}"
+
+
+class RecordingRuntimeClient:
+    def __init__(self) -> None:
+        self.targets: List[str] = []
+
+    def invoke_endpoint(self, **kwargs: Any) -> Dict[str, Any]:
+        self.targets.append(kwargs["TargetVariant"])
+        return {"Body": FakeBody()}
+
+
+def test_sagemaker_sender_targets_variants(tmp_path: pathlib.Path) -> None:
+    client = RecordingRuntimeClient()
+    sender = SageMakerVariantsSender(
+        scenario_requests='[{"path":"resources/samples/model-simulator/sample.input.json","weight":100}]',
+        results_path=str(tmp_path),
+        clock=VirtualClock(1628676529000),
+    )
+    sender._client = lambda: client  # type: ignore
+    comparison = plan()
+    variants = {
+        f"variant-{i}": config for i, config in enumerate(comparison.configs.values())
+    }
+    config = Config(dict(variants["variant-0"].parameters), requirements={})
+    config.parameters[Parameter.steady_state_minutes] = "0.05"
+    runs = sender.send_variants(config, variants)
+    assert sorted(runs) == ["variant-0", "variant-1"]
+    assert sorted(set(client.targets)) == ["variant-0", "variant-1"]
+    assert client.targets.count("variant-0") == 300
@@ -0,0 +1,18 @@
+from perfsizesagemaker.reporter.batch import BatchReporter
+
+
+def test_render() -> None:
+    content = BatchReporter(
+        [
+            {
+                "model_name": "m1",
+                "status": "done",
+                "instance_type": "ml.m5.large",
+                "report": "job-1/Final_Job_Report.html",
+            },
+            {"model_name": "m2", "status": "error", "error": "RuntimeError: boom"},
+        ]
+    ).render()
+    assert "1 of 2 sizing jobs finished" in content
+    assert '<a href="job-1/Final_Job_Report.html">' in content
+    assert "error: RuntimeError: boom" in content
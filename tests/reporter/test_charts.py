@@ -0,0 +1,102 @@
+from decimal import Decimal
+import json
+from perfsize.perfsize import Result
+from perfsizesagemaker.reporter.benchmark import synthetic_plan
+from perfsizesagemaker.reporter.charts import (
+    line_chart,
+    plan_charts,
+    plan_series,
+    timeline_charts,
+)
+from perfsizesagemaker.reporter.timeline import downsample
+from perfsizesagemaker.result.timeline import TimelineSecond
+import re
+from typing import Any, Dict, List, Optional
+
+START = 1600000000000
+
+
+def chart_data(html: str) -> List[Dict[str, Any]]:
+    return [
+        json.loads(data.replace("<\\/", "</"))
+        for data in re.findall(r'class="chart-data">(.*?)</script>', html)
+    ]
+
+
+def test_downsample() -> None:
+    rows: List[List[Optional[Decimal]]] = [
+        [Decimal(i), Decimal(i % 10), None] for i in range(1000)
+    ]
+    rows[555][1] = Decimal(99)
+    sampled = downsample(rows, 100)
+    assert len(sampled) == 100
+    assert sampled[0][0] == Decimal(0)
+    assert sampled[1][0] == Decimal(10)
+    # Each point keeps the max of the rows it stands for, so spikes remain.
+    assert all(row[1] == Decimal(9) for row in sampled if row[0] != Decimal(550))
+    assert sampled[55][1] == Decimal(99)
+    assert all(row[2] is None for row in sampled)
+    assert downsample(rows[:50], 100) == rows[:50]
+
+
+def test_line_chart() -> None:
+    html = line_chart(
+        "Latency</script>",
+        "TPS",
+        "ms",
+        [Decimal(1), Decimal(2), Decimal(3)],
+        [("p99", "#b22222", [Decimal("10.5"), None, Decimal(30)])],
+    )
+    assert html.count("<polyline") == 1
+    assert html.count("<circle") == 2
+    assert "<title>p99: 10.5 ms at 1 TPS</title>" in html
+    assert html.count("</script>") == 1
+    assert chart_data(html) == [
+        {
+            "title": "Latency</script>",
+            "x_label": "TPS",
+            "y_label": "ms",
+            "x": [1.0, 2.0, 3.0],
+            "lines": {"p99": [10.5, None, 30.0]},
+        }
+    ]
+    assert line_chart("Empty", "TPS", "ms", [], []) == ""
+
+
+def test_plan_charts() -> None:
+    plan = synthetic_plan(400, 0)
+    for config in plan.history:
+        tps = Decimal(config.parameters["steady_state_tps"])
+        config.runs[-1].results.append(Result("latency_success_p99", tps * 2, []))
+    series = plan_series(plan)
+    assert list(series) == ["ml.m5.large x 1"]
+    assert series["ml.m5.large x 1"][0][0] == Decimal(1)
+    html = plan_charts(plan)
+    data = chart_data(html)
+    assert [chart["title"] for chart in data] == [
+        "ml.m5.large x 1 latency",
+        "Error rate",
+    ]
+    # Downsampled from 400 runs, keeping the worst of each bucket.
+    assert len(data[0]["x"]) == 200
+    assert data[0]["lines"]["p99"][:2] == [4.0, 8.0]
+    assert data[0]["lines"]["p50"] == [None] * 200
+    # No line for percentiles without results.
+    assert html.count("<polyline") == 2
+    assert plan_charts(None) == ""
+
+
+def test_timeline_charts_without_instance_counts() -> None:
+    timeline = [
+        TimelineSecond(START + i * 1000, 10, i % 2, 100 + i, None, None)
+        for i in range(60)
+    ]
+    html = timeline_charts(timeline)
+    data = chart_data(html)
+    assert [chart["title"] for chart in data] == ["Load", "Latency"]
+    assert data[0]["x"][-1] == 59
+    assert data[0]["lines"]["requests"] == [10] * 60
+    assert sum(data[0]["lines"]["failures"]) == 30
+    assert data[1]["lines"]["p99"][-1] == 159
+    assert "<circle" not in html
+    assert timeline_charts([]) == ""
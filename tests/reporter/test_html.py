@@ -6,7 +6,8 @@ from perfsize.result.gatling import Metric
 from perfsizesagemaker.constants import Parameter, SageMaker
 from perfsizesagemaker.cost import CostEstimator
 from perfsizesagemaker.reporter.html import HTMLReporter
-from typing import Dict, List
+from perfsizesagemaker.result.timeline import SCALE_OUT_LAG_SECONDS, TimelineSecond
+from typing import Dict, List, Optional
 import pytest
 
 
@@ -1299,6 +1300,53 @@ def recommend_min(
 
 
 class TestHTMLReporter:
+    def test_render_table(self) -> None:
+        content = HTMLReporter().render_table(
+            {"run-1": {"a": "1", "b": "<p>2</p>"}, "run-2": {"b": "3"}},
+            ["a", "b"],
+            {"run-1": {"b": "background-color: e5ffe5"}},
+        )
+        assert '<th class="col_heading level0 col1">b</th>' in content
+        assert (
+            '<td style="background-color: e5ffe5" class="data row0 col1"><p>2</p></td>'
+            in content
+        )
+        assert '<td class="data row1 col0"></td>' in content
+
+    def test_render_timelines(
+        self,
+        inputs: Dict[str, str],
+        type_plan: Plan,
+        max_count_plan: Plan,
+        min_count_plan: Plan,
+        recommend_type: Dict[str, str],
+        recommend_max: Dict[str, str],
+        recommend_min: Dict[str, str],
+    ) -> None:
+        run = min_count_plan.history[0].runs[0]
+        run.results.append(
+            Result(metric=SCALE_OUT_LAG_SECONDS, value=Decimal("110"), conditions=[])
+        )
+        timeline = [
+            TimelineSecond(i * 1000, 20, 0, 50, 1 if i < 5 else 2, 2) for i in range(10)
+        ]
+        reporter = HTMLReporter(
+            inputs=inputs,
+            type_plan=type_plan,
+            max_count_plan=max_count_plan,
+            min_count_plan=min_count_plan,
+            recommend_type=recommend_type,
+            recommend_max=recommend_max,
+            recommend_min=recommend_min,
+            timelines={run.id: timeline},
+        )
+        content = reporter.render()
+        assert f"{run.id}: instances took up to 110 seconds" in content
+        # Load and instance counts, then p99 latency.
+        timelines = reporter.render_timelines(min_count_plan)
+        assert timelines.count("<svg") == 2
+        assert timelines.count("<polyline") == 4
+
     def test_render_all_tests_pass(
         self,
         inputs: Dict[str, str],
@@ -1329,6 +1377,32 @@ class TestHTMLReporter:
         )
         assert summary in content
 
+    def test_render_sections_cached(
+        self,
+        inputs: Dict[str, str],
+        type_plan: Plan,
+        recommend_type: Dict[str, str],
+    ) -> None:
+        reporter = HTMLReporter(
+            inputs=inputs, type_plan=type_plan, recommend_type=recommend_type
+        )
+        rendered: List[Plan] = []
+        render_plan = reporter.render_plan
+
+        def counting_render_plan(plan: Optional[Plan]) -> str:
+            assert plan is not None
+            rendered.append(plan)
+            return render_plan(plan)
+
+        reporter.render_plan = counting_render_plan  # type: ignore[method-assign]
+        reporter.render()
+        reporter.render()
+        assert rendered == [type_plan]
+        # Another run of the plan renders its sections again.
+        type_plan.history.append(type_plan.history[-1])
+        reporter.render()
+        assert rendered == [type_plan, type_plan]
+
     def test_render_auto_scale_failed(
         self,
         inputs: Dict[str, str],
@@ -0,0 +1,26 @@
+import os
+import pathlib
+from perfsize.perfsize import Config, Plan, Run
+from perfsizesagemaker.reporter.incremental import IncrementalReporter
+from datetime import datetime
+from typing import List
+
+
+def test_write(tmp_path: pathlib.Path) -> None:
+    pages: List[str] = []
+
+    def render() -> str:
+        pages.append(f"<p>page {len(pages)}</p>")
+        return pages[-1]
+
+    path = os.path.join(tmp_path, "Final_Job_Report.html")
+    report = IncrementalReporter(render, path)
+    config = Config(parameters={}, requirements={})
+    report.query(config, Run("run-1", datetime.now(), datetime.now(), []))
+    with open(path) as file:
+        assert file.read() == "<p>page 0</p>"
+    assert report.render(Plan({}, {})) == f"Updated report {path}"
+    with open(path) as file:
+        assert file.read() == "<p>page 1</p>"
+    assert report.writes == 2
+    assert os.listdir(tmp_path) == ["Final_Job_Report.html"]
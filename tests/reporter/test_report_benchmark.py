@@ -0,0 +1,36 @@
+import json
+import os
+import pathlib
+from perfsizesagemaker.reporter.benchmark import main, synthetic_plan
+from perfsizesagemaker.reporter.html import HTMLReporter
+import pytest
+
+
+def test_synthetic_plan() -> None:
+    plan = synthetic_plan(runs=3, metrics=2)
+    assert len(plan.history) == 3
+    content = HTMLReporter().render_runs(plan)
+    assert content.count("<tr>") == 4
+    assert "metric_1" in content
+
+
+def test_main(tmp_path: pathlib.Path) -> None:
+    output = os.path.join(tmp_path, "benchmark.json")
+    results = main(
+        [
+            "--backends=yattag",
+            "--runs=5",
+            "--metrics=2",
+            "--repeat=1",
+            f"--benchmark_output={output}",
+        ]
+    )
+    assert [result.backend for result in results] == ["yattag"]
+    assert results[0].import_seconds is not None
+    assert results[0].render_seconds is not None
+    with open(output) as f:
+        assert json.load(f)[0]["backend"] == "yattag"
+    with pytest.raises(SystemExit):
+        main(["--runs=0"])
+    with pytest.raises(RuntimeError):
+        main(["--backends=matplotlib", "--runs=1"])
@@ -0,0 +1,144 @@
+import filecmp
+import os
+import pathlib
+from perfsizesagemaker.result.archive import (
+    ARCHIVE_FILE,
+    ASSET_STORE,
+    ColumnarLog,
+    ColumnarLogWriter,
+    archive_job,
+    deduplicate_assets,
+    restore_simulation_log,
+)
+from perfsizesagemaker.result.simulation_log import (
+    INDEX_SUFFIX,
+    SimulationLogReader,
+    parse_request,
+)
+import pytest
+import shutil
+from typing import Iterator
+
+SAMPLE_JOB = "resources/samples/model-simulator/job-2021-08-11-100314-model-simulator"
+SAMPLE_RUNS = [
+    "1628676529-ml.m5.large-1-1TPS-20210811100851239",
+    "1628676714-ml.m5.large-1-2TPS-20210811101156366",
+]
+
+
+def copy_runs(tmp_path: pathlib.Path) -> str:
+    job_dir = os.path.join(tmp_path, "job")
+    for run in SAMPLE_RUNS:
+        shutil.copytree(os.path.join(SAMPLE_JOB, run), os.path.join(job_dir, run))
+    return job_dir
+
+
+class TestColumnarLog:
+    def test_round_trip(self, tmp_path: pathlib.Path) -> None:
+        original = os.path.join(SAMPLE_JOB, SAMPLE_RUNS[0], "simulation.log")
+        archive_path = os.path.join(tmp_path, ARCHIVE_FILE)
+        ColumnarLogWriter().write(original, archive_path)
+        restored = os.path.join(tmp_path, "simulation.log")
+        restore_simulation_log(archive_path, restored)
+        assert filecmp.cmp(original, restored, shallow=False)
+
+    def test_round_trip_unusual_lines(self, tmp_path: pathlib.Path) -> None:
+        original = os.path.join(tmp_path, "original.log")
+        with open(original, "w") as f:
+            f.write("RUN\tScenario\ttag\t1620982654518\t \t3.2.0\n")
+            f.write("REQUEST\t007\t\tname\t1\t2\tOK\t \n")
+            f.write("ERROR\tcarriage\rreturn\t1620982654519\r\n")
+            f.write("ERROR\tsomething went wrong\t1620982654519")
+        archive_path = os.path.join(tmp_path, ARCHIVE_FILE)
+        ColumnarLogWriter().write(original, archive_path)
+        restored = os.path.join(tmp_path, "restored.log")
+        restore_simulation_log(archive_path, restored)
+        assert filecmp.cmp(original, restored, shallow=False)
+
+    def test_round_trip_chunks(self, tmp_path: pathlib.Path) -> None:
+        original = os.path.join(SAMPLE_JOB, SAMPLE_RUNS[0], "simulation.log")
+        archive_path = os.path.join(tmp_path, ARCHIVE_FILE)
+        writer = ColumnarLogWriter(chunk_lines=7)
+        writer.write(original, archive_path)
+        assert writer.chunks > 1
+        restored = os.path.join(tmp_path, "simulation.log")
+        restore_simulation_log(archive_path, restored)
+        assert filecmp.cmp(original, restored, shallow=False)
+
+        single_path = os.path.join(tmp_path, "single.zip")
+        ColumnarLogWriter().write(original, single_path)
+        assert [
+            (r.name, r.start, r.end, r.status)
+            for r in ColumnarLog(archive_path).requests()
+        ] == [
+            (r.name, r.start, r.end, r.status)
+            for r in ColumnarLog(single_path).requests()
+        ]
+
+    def test_requests(self, tmp_path: pathlib.Path) -> None:
+        original = os.path.join(SAMPLE_JOB, SAMPLE_RUNS[0], "simulation.log")
+        archive_path = os.path.join(tmp_path, ARCHIVE_FILE)
+        ColumnarLogWriter().write(original, archive_path)
+        with open(original, "rb") as f:
+            expected = [
+                (r.name, r.start, r.end, r.status)
+                for r in [
+                    parse_request(line)
+                    for line in f.read().split(b"\n")
+                    if line.startswith(b"REQUEST")
+                ]
+            ]
+        actual = [
+            (r.name, r.start, r.end, r.status)
+            for r in ColumnarLog(archive_path).requests()
+        ]
+        assert actual == expected
+
+
+class TestArchiveJob:
+    def test_deduplicate_assets(self, tmp_path: pathlib.Path) -> None:
+        job_dir = copy_runs(tmp_path)
+        linked, saved = deduplicate_assets(job_dir)
+        assert linked > 0
+        assert saved > 0
+        first = os.path.join(job_dir, SAMPLE_RUNS[0], "js", "jquery.min.js")
+        second = os.path.join(job_dir, SAMPLE_RUNS[1], "js", "jquery.min.js")
+        assert os.path.samefile(first, second)
+        assert os.path.isdir(os.path.join(job_dir, ASSET_STORE))
+        # Running again finds nothing new to link.
+        assert deduplicate_assets(job_dir) == (0, 0)
+
+    def test_archive_job(self, tmp_path: pathlib.Path) -> None:
+        job_dir = copy_runs(tmp_path)
+        # The result manager read the first run, leaving its index behind.
+        SimulationLogReader(
+            os.path.join(job_dir, SAMPLE_RUNS[0], "simulation.log")
+        ).close()
+        archive_job(job_dir)
+        for run in SAMPLE_RUNS:
+            run_dir = os.path.join(job_dir, run)
+            assert not os.path.exists(os.path.join(run_dir, "simulation.log"))
+            assert not os.path.exists(
+                os.path.join(run_dir, "simulation.log" + INDEX_SUFFIX)
+            )
+            restored = os.path.join(tmp_path, "restored.log")
+            restore_simulation_log(os.path.join(run_dir, ARCHIVE_FILE), restored)
+            original = os.path.join(SAMPLE_JOB, run, "simulation.log")
+            assert filecmp.cmp(original, restored, shallow=False)
+
+    def test_archive_job_mismatch(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        job_dir = copy_runs(tmp_path)
+        lines = ColumnarLog.lines
+
+        def drop_last_line(self: ColumnarLog) -> Iterator[str]:
+            restored = list(lines(self))
+            return iter(restored[:-1])
+
+        monkeypatch.setattr(ColumnarLog, "lines", drop_last_line)
+        with pytest.raises(RuntimeError, match="does not match"):
+            archive_job(job_dir)
+        # The text log is kept when the check fails.
+        simulation_log_path = os.path.join(job_dir, SAMPLE_RUNS[0], "simulation.log")
+        assert os.path.isfile(simulation_log_path)
@@ -0,0 +1,135 @@
+from datetime import datetime
+from decimal import Decimal
+import glob
+import os
+import pathlib
+from perfsize.perfsize import Config, Run
+from perfsize.result.gatling import ALL_REQUESTS, GatlingResultManager, Metric
+from perfsizesagemaker.result.histogram import (
+    HISTOGRAM_FILE,
+    LATENCY_SUCCESS_MEAN,
+    HistogramResultManager,
+    LatencyHistogram,
+    RunHistogram,
+    merge_run_histograms,
+    request_name_results,
+)
+import pytest
+import shutil
+from typing import List
+
+SAMPLE_JOB = "resources/samples/model-simulator/job-2021-08-11-100314-model-simulator"
+
+
+@pytest.fixture
+def simulation_logs() -> List[str]:
+    return sorted(glob.glob(f"{SAMPLE_JOB}/*/simulation.log"))
+
+
+class TestLatencyHistogram:
+    def test_exact_percentiles(self) -> None:
+        # Spread over 1.5 to 9 seconds, where rounding would show.
+        values = [1500 + (i * 7919) % 7501 for i in range(1001)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        ordered = sorted(values)
+        for percent in [50, 99]:
+            rank = Decimal(1000 * percent) / 100
+            lower = int(rank)
+            expected = Decimal(ordered[lower])
+            if rank > lower:
+                expected += (ordered[lower + 1] - ordered[lower]) * (rank - lower)
+            assert histogram.percentile(Decimal(percent)) == expected
+        assert histogram.max() == max(values)
+        assert histogram.mean() == Decimal(sum(values)) / len(values)
+        with pytest.raises(ValueError):
+            histogram.record(-1)
+
+    def test_percentile_matches_linear_interpolation(self) -> None:
+        histogram = LatencyHistogram()
+        for value in [10, 20, 30, 40]:
+            histogram.record(value)
+        assert histogram.percentile(Decimal(50)) == Decimal(25)
+        assert histogram.percentile(Decimal(0)) == Decimal(10)
+        assert histogram.percentile(Decimal(100)) == Decimal(40)
+
+    def test_merge(self) -> None:
+        a = LatencyHistogram()
+        a.record(5, count=3)
+        b = LatencyHistogram()
+        b.record(5)
+        b.record(7)
+        a.merge(b)
+        assert a.counts == {5: 4, 7: 1}
+        assert a.total == 5
+
+    def test_mean(self) -> None:
+        histogram = LatencyHistogram()
+        histogram.record(10, count=3)
+        histogram.record(50)
+        assert histogram.mean() == Decimal(20)
+        with pytest.raises(RuntimeError, match="empty"):
+            LatencyHistogram().mean()
+
+
+def test_request_name_results() -> None:
+    run_histogram = RunHistogram()
+    run_histogram.record("SageMaker-ep-1-small", 0, 20, "OK", 3)
+    run_histogram.record("SageMaker-ep-1-large", 0, 80, "OK")
+    run_histogram.record("SageMaker-ep-1-large", 0, 5, "KO")
+    results = {
+        result.metric: result
+        for result in request_name_results(
+            run_histogram,
+            {"percent_fail[SageMaker-ep-1-large]": []},
+        )
+    }
+    assert results[f"{LATENCY_SUCCESS_MEAN}[SageMaker-ep-1-small]"].value == 20
+    assert results[f"{Metric.count_total}[SageMaker-ep-1-large]"].value == 2
+    assert results[f"{Metric.percent_fail}[SageMaker-ep-1-large]"].value == 50
+    assert len(results) == 10
+    # Nothing to break down with a single request name.
+    single = RunHistogram()
+    single.record("SageMaker-ep-1", 0, 20, "OK")
+    assert request_name_results(single, {}) == []
+
+
+class TestHistogramResultManager:
+    def test_stats_match_gatling(self, simulation_logs: List[str]) -> None:
+        gatling = GatlingResultManager(results_path=SAMPLE_JOB)
+        manager = HistogramResultManager(results_path=SAMPLE_JOB)
+        for path in simulation_logs[:5]:
+            expected = gatling.parse(path)[ALL_REQUESTS]
+            assert manager.build(path).stats() == expected
+
+    def test_merged_stats_match_combined_logs(
+        self, simulation_logs: List[str], tmp_path: pathlib.Path
+    ) -> None:
+        manager = HistogramResultManager(results_path=SAMPLE_JOB)
+        paths = []
+        for index, path in enumerate(simulation_logs[:3]):
+            histogram_path = os.path.join(tmp_path, f"{index}.json")
+            manager.build(path).save(histogram_path)
+            paths.append(histogram_path)
+        combined_log = os.path.join(tmp_path, "simulation.log")
+        with open(combined_log, "w") as combined:
+            for path in simulation_logs[:3]:
+                with open(path) as f:
+                    combined.write(f.read())
+        expected = GatlingResultManager(results_path=SAMPLE_JOB).parse(combined_log)
+        assert merge_run_histograms(paths).stats() == expected[ALL_REQUESTS]
+
+    def test_query_saves_histogram(
+        self, simulation_logs: List[str], tmp_path: pathlib.Path
+    ) -> None:
+        run_dir = os.path.basename(os.path.dirname(simulation_logs[0]))
+        os.mkdir(os.path.join(tmp_path, run_dir))
+        shutil.copy(simulation_logs[0], os.path.join(tmp_path, run_dir))
+        run_id = "-".join(run_dir.split("-")[:-1])
+        now = datetime.utcnow()
+        run = Run(id=run_id, start=now, end=now, results=[])
+        manager = HistogramResultManager(results_path=str(tmp_path))
+        manager.query(Config(parameters={}, requirements={}), run)
+        saved = RunHistogram.load(os.path.join(tmp_path, run_dir, HISTOGRAM_FILE))
+        assert saved.stats()[Metric.count_total] == Decimal(180)
@@ -0,0 +1,78 @@
+from datetime import datetime
+from decimal import Decimal
+import os
+import pathlib
+from perfsize.perfsize import Config, Run
+from perfsize.result.gatling import GatlingResultManager, Metric
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.load.local import LocalLoadManager
+from perfsizesagemaker.result.local import LocalResultManager
+import pytest
+from typing import Dict
+
+
+def stats(tmp_path: pathlib.Path, write_logs: bool) -> Dict[str, Decimal]:
+    tmp_path.mkdir()
+    local = LocalSageMaker(
+        {
+            "queue_limit_seconds": 1,
+            "instance_types": {
+                "ml.m5.large": {
+                    "capacity_tps": 100,
+                    "latency_median_ms": 40,
+                    "latency_sigma": 0.2,
+                    "concurrency": 2,
+                }
+            },
+        }
+    )
+    config = Config(
+        parameters={
+            Parameter.endpoint_name: "ep-1",
+            Parameter.endpoint_config_name: "ep-1-0",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.initial_instance_count: "1",
+            Parameter.ramp_start_tps: "0",
+            Parameter.ramp_minutes: "1",
+            Parameter.steady_state_tps: "150",
+            Parameter.steady_state_minutes: "1",
+        },
+        requirements={},
+    )
+    LocalSageMakerEnvironmentManager(local).setup(config)
+    load_manager = LocalLoadManager(local, str(tmp_path), write_logs=write_logs)
+    run = load_manager.send(config)
+    if write_logs:
+        result_manager = GatlingResultManager(str(tmp_path))
+        run_dir = result_manager.find_run_dir(run.id)
+        log_path = os.path.join(tmp_path, run_dir, "simulation.log")
+        return result_manager.parse(log_path)["SageMaker-ep-1"]
+    assert not os.listdir(tmp_path)
+    LocalResultManager(load_manager).query(config, run)
+    assert not load_manager.histograms
+    return {result.metric: result.value for result in run.results}
+
+
+def test_matches_simulation_log(tmp_path: pathlib.Path) -> None:
+    exact = stats(tmp_path / "logs", write_logs=True)
+    fast = stats(tmp_path / "memory", write_logs=False)
+    assert fast[Metric.count_total] == exact[Metric.count_total]
+    assert fast[Metric.count_fail] == exact[Metric.count_fail]
+    for metric in [Metric.latency_success_p50, Metric.latency_success_p99]:
+        assert fast[metric] == pytest.approx(exact[metric], rel=Decimal("0.1"))
+    assert fast[Metric.simulation_end] - fast[Metric.simulation_start] == 120000
+
+
+def test_missing_run(tmp_path: pathlib.Path) -> None:
+    load_manager = LocalLoadManager(
+        LocalSageMaker({"instance_types": {}}), str(tmp_path)
+    )
+    run = Run(id="missing", start=datetime.utcnow(), end=datetime.utcnow(), results=[])
+    with pytest.raises(RuntimeError, match="No local results"):
+        LocalResultManager(load_manager).query(Config({}, {}), run)
@@ -0,0 +1,82 @@
+from decimal import Decimal
+import os
+import pathlib
+from perfsize.result.gatling import ALL_REQUESTS, GatlingResultManager
+from perfsizesagemaker.result.simulation_log import (
+    INDEX_SUFFIX,
+    SimulationLogReader,
+    parse_request,
+)
+import pytest
+import shutil
+from typing import List
+
+SAMPLE_LOG = (
+    "resources/samples/model-simulator/job-2021-08-11-100314-model-simulator/"
+    "1628679877-ml.m5.large-1-100TPS-20210811110439817/simulation.log"
+)
+
+
+@pytest.fixture
+def simulation_log(tmp_path: pathlib.Path) -> str:
+    # Copy so the sidecar index is written to a temporary directory.
+    path = os.path.join(tmp_path, "simulation.log")
+    shutil.copy(SAMPLE_LOG, path)
+    return path
+
+
+def brute_force(path: str) -> List[List[int]]:
+    requests = []
+    with open(path, "rb") as f:
+        for line in f.read().split(b"\n"):
+            if line.startswith(b"REQUEST"):
+                request = parse_request(line)
+                requests.append([request.start, request.end])
+    return requests
+
+
+class TestSimulationLogReader:
+    def test_builds_and_reuses_index(self, simulation_log: str) -> None:
+        with SimulationLogReader(simulation_log, index_interval=1000) as reader:
+            blocks = len(reader.blocks)
+            assert blocks > 1
+        assert os.path.exists(simulation_log + INDEX_SUFFIX)
+        with SimulationLogReader(simulation_log, index_interval=1000) as reader:
+            assert len(reader.blocks) == blocks
+
+    def test_rebuilds_stale_index(self, simulation_log: str) -> None:
+        with SimulationLogReader(simulation_log, index_interval=1000) as reader:
+            total = len(list(reader.requests()))
+        with open(simulation_log, "rb") as f:
+            lines = f.read().split(b"\n")
+        with open(simulation_log, "wb") as f:
+            f.write(b"\n".join(lines[: len(lines) // 2]) + b"\n")
+        with SimulationLogReader(simulation_log, index_interval=1000) as reader:
+            assert len(list(reader.requests())) < total
+
+    def test_window_matches_full_scan(self, simulation_log: str) -> None:
+        expected = brute_force(simulation_log)
+        with SimulationLogReader(simulation_log, index_interval=500) as reader:
+            assert [[r.start, r.end] for r in reader.requests()] == expected
+            assert reader.run_start is not None
+            start = reader.run_start + 60000
+            end = reader.run_start + 120000
+            window = [[r.start, r.end] for r in reader.requests(start, end)]
+            assert window == [r for r in expected if start <= r[0] < end]
+            assert 0 < len(window) < len(expected)
+
+    def test_phases(self, simulation_log: str) -> None:
+        expected = brute_force(simulation_log)
+        with SimulationLogReader(simulation_log, index_interval=500) as reader:
+            ramp = list(reader.ramp(Decimal("1")))
+            steady = list(reader.steady_state(Decimal("1")))
+            assert len(ramp) + len(steady) == len(expected)
+            last = list(reader.last_minutes(Decimal("0.5")))
+            assert last
+            assert reader.last_start is not None
+            assert min(r.start for r in last) >= reader.last_start - 30000
+
+    def test_histogram_matches_gatling(self, simulation_log: str) -> None:
+        expected = GatlingResultManager(results_path="").parse(simulation_log)
+        with SimulationLogReader(simulation_log) as reader:
+            assert reader.histogram().stats() == expected[ALL_REQUESTS]
@@ -0,0 +1,165 @@
+from decimal import Decimal
+import json
+import os
+import pathlib
+from perfsize.perfsize import Config
+from perfsize.result.gatling import GatlingResultManager
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.environment.telemetry import (
+    InstanceCountSample,
+    InstanceCountSampler,
+)
+from perfsizesagemaker.load.local import LocalLoadManager
+from perfsizesagemaker.load.telemetry import TelemetryLoadManager
+from perfsizesagemaker.result.simulation_log import Request
+from perfsizesagemaker.result.telemetry import (
+    TIMELINE_FILE,
+    LoadTimelineResultManager,
+    TelemetryResultManager,
+    align,
+    scale_out_lag_seconds,
+)
+from perfsizesagemaker.result.timeline import SCALE_OUT_LAG_SECONDS, TimelineSecond
+import pytest
+from typing import Callable, Dict, List
+
+
+def test_scale_out_lag_seconds() -> None:
+    def samples(counts: List[List[int]]) -> List[InstanceCountSample]:
+        return [
+            InstanceCountSample(i * 10000, current, desired)
+            for i, (current, desired) in enumerate(counts)
+        ]
+
+    assert scale_out_lag_seconds(samples([[1, 1], [1, 1]])) is None
+    assert scale_out_lag_seconds([]) is None
+    # Behind from 10s to 40s, then from 50s until the last sample at 60s.
+    lag = scale_out_lag_seconds(
+        samples([[1, 1], [1, 3], [2, 3], [2, 3], [3, 3], [3, 4], [3, 4]])
+    )
+    assert lag == Decimal("30")
+    assert scale_out_lag_seconds(samples([[1, 1], [1, 2], [1, 2]])) == Decimal("10")
+
+
+def test_align(start: int) -> None:
+    requests = [
+        Request("r", start + 100, start + 140, "OK"),
+        Request("r", start + 900, start + 1000, "OK"),
+        Request("r", start + 1500, start + 1505, "KO"),
+        Request("r", start + 2500, start + 2530, "OK"),
+        Request("r", start + 9000, start + 9030, "OK"),
+    ]
+    samples = [
+        InstanceCountSample(start, 1, 1),
+        InstanceCountSample(start + 1500, 1, 2),
+        InstanceCountSample(start + 3000, 2, 2),
+    ]
+    timeline = align(samples, requests, start, start + 2500)
+    assert [second.to_dict() for second in timeline] == [
+        TimelineSecond(start, 2, 0, 100, 1, 1).to_dict(),
+        TimelineSecond(start + 1000, 1, 1, None, 1, 1).to_dict(),
+        TimelineSecond(start + 2000, 1, 0, 30, 1, 2).to_dict(),
+    ]
+
+
+@pytest.fixture
+def auto_scale_config(config: Callable[..., Config]) -> Config:
+    scaled = config(
+        **{
+            Parameter.scaling_enabled: "True",
+            Parameter.scaling_min_instance_count: "1",
+            Parameter.scaling_max_instance_count: "3",
+            Parameter.scaling_metric: "SageMakerVariantInvocationsPerInstance",
+            Parameter.scaling_target: "1200",
+            Parameter.ramp_start_tps: "10",
+            Parameter.ramp_minutes: "1",
+            Parameter.steady_state_tps: "50",
+            Parameter.steady_state_minutes: "4",
+        }
+    )
+    del scaled.parameters[Parameter.initial_instance_count]
+    return scaled
+
+
+@pytest.fixture
+def local_sagemaker(account: Callable[..., LocalSageMaker]) -> LocalSageMaker:
+    return account(
+        scale_evaluation_seconds=60,
+        queue_limit_seconds=2,
+        seed=0,
+        instance_types={
+            "ml.m5.large": {
+                "capacity_tps": 30,
+                "latency_median_ms": 40,
+                "latency_sigma": 0.2,
+                "concurrency": 2,
+            }
+        },
+    )
+
+
+def test_telemetry_during_auto_scale(
+    tmp_path: pathlib.Path, local_sagemaker: LocalSageMaker, auto_scale_config: Config
+) -> None:
+    local = local_sagemaker
+    environment_manager = LocalSageMakerEnvironmentManager(local)
+    config = auto_scale_config
+    environment_manager.setup(config)
+    load_manager = TelemetryLoadManager(
+        LocalLoadManager(local, str(tmp_path)),
+        InstanceCountSampler(environment_manager, interval_seconds=10),
+    )
+    run = load_manager.send(config)
+    samples = load_manager.samples[run.id]
+    # At start, every 10 seconds of the 5 minute run, and at stop.
+    assert len(samples) == 1 + 30 + 1
+    assert samples[0].current_instance_count == 1
+    assert samples[-1].current_instance_count == 2
+    assert samples[-1].desired_instance_count == 3
+    assert all(timer.stopped.is_set() for timer in local.clock.timers)
+
+    timelines: Dict[str, List[TimelineSecond]] = {}
+    TelemetryResultManager(load_manager, str(tmp_path), timelines).query(config, run)
+    assert run.id not in load_manager.samples
+    timeline = timelines[run.id]
+    assert len(timeline) == 300
+    assert sum(second.requests for second in timeline) == 60 * 30 + 240 * 50
+    assert timeline[200].requests == 50
+    # Desired count goes up at the first evaluation after a minute, seen by
+    # the sample at 70 seconds, and the instance is in service by the sample
+    # at 180 seconds, scale_out_seconds later.
+    assert [result.metric for result in run.results] == [SCALE_OUT_LAG_SECONDS]
+    assert run.results[0].value == Decimal("110")
+    assert timeline[70].current_instance_count == 1
+    assert timeline[70].desired_instance_count == 2
+    run_dir = GatlingResultManager(str(tmp_path)).find_run_dir(run.id)
+    with open(os.path.join(tmp_path, run_dir, TIMELINE_FILE)) as file:
+        saved = json.load(file)
+    assert len(saved["samples"]) == len(samples)
+    assert saved["timeline"][70] == timeline[70].to_dict()
+
+
+def test_load_timeline(
+    tmp_path: pathlib.Path, local_sagemaker: LocalSageMaker, auto_scale_config: Config
+) -> None:
+    local = local_sagemaker
+    config = auto_scale_config
+    LocalSageMakerEnvironmentManager(local).setup(config)
+    run = LocalLoadManager(local, str(tmp_path)).send(config)
+
+    timelines: Dict[str, List[TimelineSecond]] = {}
+    LoadTimelineResultManager(str(tmp_path), timelines).query(config, run)
+    timeline = timelines[run.id]
+    assert len(timeline) == 300
+    assert sum(second.requests for second in timeline) == 60 * 30 + 240 * 50
+    assert all(second.current_instance_count is None for second in timeline)
+    assert run.results == []
+    run_dir = GatlingResultManager(str(tmp_path)).find_run_dir(run.id)
+    with open(os.path.join(tmp_path, run_dir, TIMELINE_FILE)) as file:
+        saved = json.load(file)
+    assert saved["samples"] == []
+    assert saved["timeline"][200] == timeline[200].to_dict()
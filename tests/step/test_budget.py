@@ -0,0 +1,68 @@
+from decimal import Decimal
+from perfsize.perfsize import Condition, Config, Plan, Run, Workflow, gte, lt
+from perfsize.environment.mock import MockEnvironmentManager
+from perfsize.load.mock import MockLoadManager
+from perfsize.reporter.mock import MockReporter
+from perfsize.result.mock import MockResultManager
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.step.budget import BudgetStepManager
+from perfsizesagemaker.step.sagemaker import FirstSuccessStepManager
+
+
+class HourLongLoadManager(MockLoadManager):
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+
+    def send(self, config: Config) -> Run:
+        self.clock.advance(3600000)
+        return super().send(config)
+
+
+def test_budget_stops_search() -> None:
+    plan = Plan(
+        parameter_lists={
+            Parameter.host: ["runtime.sagemaker.us-west-2.amazonaws.com"],
+            Parameter.region: ["us-west-2"],
+            Parameter.endpoint_name: ["ep-1"],
+            Parameter.endpoint_config_name: ["ep-1-0"],
+            Parameter.variant_name: ["variant-name-1"],
+            Parameter.model_name: ["model-simulator"],
+            Parameter.instance_type: ["ml.m5.large"],
+            Parameter.initial_instance_count: ["1"],
+            Parameter.ramp_start_tps: ["0"],
+            Parameter.ramp_minutes: ["0"],
+            Parameter.steady_state_tps: ["10", "20", "30", "40"],
+            Parameter.steady_state_minutes: ["50"],
+        },
+        requirements={
+            "percent_fail": [
+                Condition(lt(Decimal("0.01")), "value < 0.01"),
+                Condition(gte(Decimal("0")), "value >= 0"),
+            ],
+        },
+    )
+    clock = VirtualClock(0)
+    tracker = SpendTracker({"ml.m5.large": 0.1}, clock)
+    # Each step is estimated at 1 instance for 60 minutes, so $0.10.
+    step_manager = BudgetStepManager(
+        FirstSuccessStepManager(plan), tracker, Decimal("0.25")
+    )
+    assert step_manager.estimate(plan.configs[plan.combinations[0]]) == Decimal("0.1")
+    tracker.update("ep-1", "ml.m5.large", 1)
+    clock.advance(3600000)  # $0.10 already spent
+    workflow = Workflow(
+        plan=plan,
+        step_manager=step_manager,
+        environment_manager=MockEnvironmentManager(),
+        load_manager=HourLongLoadManager(clock),
+        result_managers=[MockResultManager()],
+        reporters=[MockReporter()],
+    )
+    recommendation = workflow.run()
+    # After the first step, $0.20 spent plus $0.10 estimated is over budget.
+    assert step_manager.stopped
+    assert len(plan.history) == 1
+    assert recommendation[Parameter.steady_state_tps] == "10"
+    assert step_manager.next() is None
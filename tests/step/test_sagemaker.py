@@ -1,9 +1,13 @@
 from decimal import Decimal
 from perfsize.perfsize import (
     Condition,
+    Config,
     gte,
     lt,
     Plan,
+    Result,
+    ResultManager,
+    Run,
     Workflow,
 )
 from perfsize.environment.mock import MockEnvironmentManager
@@ -14,6 +18,9 @@ from perfsizesagemaker.constants import Parameter
 from perfsizesagemaker.step.sagemaker import (
     FirstSuccessStepManager,
     AutoScaleMinFinderStepManager,
+    AutoScaleMinWalkDownStepManager,
+    AutoScaleTargetFinderStepManager,
+    average_instance_count,
 )
 import pytest
 
@@ -171,3 +178,137 @@ class TestAutoScaleMinFinderStepManager:
             "steady_state_tps": "400",
             "steady_state_minutes": "30",
         }
+
+
+class TestAutoScaleMinWalkDownStepManager:
+    def test_plan(self, auto_scale_plan: Plan) -> None:
+        workflow = Workflow(
+            plan=auto_scale_plan,
+            step_manager=AutoScaleMinWalkDownStepManager(auto_scale_plan),
+            environment_manager=MockEnvironmentManager(),
+            load_manager=MockLoadManager(),
+            result_managers=[MockResultManager()],
+            reporters=[MockReporter()],
+        )
+        recommendation = workflow.run()
+        # Mock run always passes, so walks down from 4 all the way to 1.
+        assert [
+            config.parameters[Parameter.scaling_min_instance_count]
+            for config in auto_scale_plan.history
+        ] == ["4", "3", "2", "1"]
+        assert recommendation[Parameter.scaling_min_instance_count] == "1"
+
+
+class RampResultManager(ResultManager):
+    # Passes while the target is at most 600 plus 100 per min instance over 2,
+    # like a ramp that needs more headroom at the start for a later scale out.
+    def query(self, config: Config, run: Run) -> None:
+        min_count = int(config.parameters[Parameter.scaling_min_instance_count])
+        target = int(config.parameters[Parameter.scaling_target])
+        passed = target <= 600 + 100 * (min_count - 2)
+        run.results.append(
+            Result(
+                "percent_fail",
+                Decimal("0") if passed else Decimal("1"),
+                config.requirements["percent_fail"],
+            )
+        )
+
+
+@pytest.fixture
+def target_plan() -> Plan:
+    return Plan(
+        parameter_lists={
+            Parameter.host: ["runtime.sagemaker.us-west-2.amazonaws.com"],
+            Parameter.region: ["us-west-2"],
+            Parameter.endpoint_name: ["LEARNING-model-simulator-1"],
+            Parameter.endpoint_config_name: ["LEARNING-model-simulator-1-0"],
+            Parameter.variant_name: ["variant-name-1"],
+            Parameter.model_name: ["model-simulator"],
+            Parameter.instance_type: ["ml.m5.large"],
+            Parameter.scaling_enabled: ["True"],
+            Parameter.scaling_min_instance_count: [str(i) for i in range(2, 11)],
+            Parameter.scaling_max_instance_count: ["10"],
+            Parameter.scaling_metric: ["SageMakerVariantInvocationsPerInstance"],
+            Parameter.scaling_target: ["600", "700", "800", "900", "1000", "1200"],
+            Parameter.ramp_start_tps: ["0"],
+            Parameter.ramp_minutes: ["15"],
+            Parameter.steady_state_tps: ["100"],
+            Parameter.steady_state_minutes: ["30"],
+        },
+        requirements={
+            "percent_fail": [
+                Condition(lt(Decimal("0.01")), "value < 0.01"),
+                Condition(gte(Decimal("0")), "value >= 0"),
+            ],
+        },
+    )
+
+
+class TestAutoScaleTargetFinderStepManager:
+    def test_plan(self, target_plan: Plan) -> None:
+        workflow = Workflow(
+            plan=target_plan,
+            step_manager=AutoScaleTargetFinderStepManager(target_plan),
+            environment_manager=MockEnvironmentManager(),
+            load_manager=MockLoadManager(),
+            result_managers=[RampResultManager()],
+            reporters=[MockReporter()],
+        )
+        recommendation = workflow.run()
+        assert [
+            (
+                config.parameters[Parameter.scaling_min_instance_count],
+                config.parameters[Parameter.scaling_target],
+            )
+            for config in target_plan.history
+        ] == [
+            ("2", "800"),
+            ("2", "600"),
+            ("2", "700"),
+            # Each min count starts above the target that passed for the last.
+            ("3", "900"),
+            ("3", "700"),
+            ("3", "800"),
+            ("4", "900"),
+            ("4", "800"),
+            ("5", "1000"),
+            ("5", "900"),
+            ("6", "1000"),
+            ("6", "1200"),
+        ]
+        # 6000 invocations per minute at target 1000 need 6 instances, and a
+        # min count of 7 or more cannot average fewer, so the search stops.
+        assert recommendation[Parameter.scaling_min_instance_count] == "6"
+        assert recommendation[Parameter.scaling_target] == "1000"
+        assert average_instance_count(recommendation) == Decimal("6")
+
+    def test_highest_target_passes(self, target_plan: Plan) -> None:
+        # Mock run always passes, so the first min count takes the top target.
+        workflow = Workflow(
+            plan=target_plan,
+            step_manager=AutoScaleTargetFinderStepManager(target_plan),
+            environment_manager=MockEnvironmentManager(),
+            load_manager=MockLoadManager(),
+            result_managers=[MockResultManager()],
+            reporters=[MockReporter()],
+        )
+        recommendation = workflow.run()
+        assert [
+            config.parameters[Parameter.scaling_target]
+            for config in target_plan.history
+        ] == ["800", "1000", "1200"]
+        assert recommendation[Parameter.scaling_min_instance_count] == "2"
+        assert recommendation[Parameter.scaling_target] == "1200"
+
+
+def test_average_instance_count(target_plan: Plan) -> None:
+    config = target_plan.configs[target_plan.combinations[0]]
+    parameters = dict(config.parameters)
+    assert parameters[Parameter.scaling_target] == "600"
+    # Ramp from 0 to 100 TPS over 15 minutes is 6000 invocations per minute at
+    # the end, so 1 to 10 instances, minimum 2, then 10 for 30 minutes.
+    ramp = [max(2, -(-(2 * i + 1) * 200 // 600)) for i in range(15)]
+    assert average_instance_count(parameters) == (sum(ramp) + 10 * 30) / Decimal(45)
+    parameters[Parameter.ramp_minutes] = "0"
+    assert average_instance_count(parameters) == 10
@@ -0,0 +1,121 @@
+import os
+import pathlib
+from perfsizesagemaker.batch import load_manifest, main, manifest_argv
+import pytest
+from typing import Any, Dict, List
+import yaml
+
+
+def write_manifest(tmp_path: pathlib.Path, models: List[Dict[str, Any]]) -> str:
+    manifest = {
+        "defaults": {
+            "host": "runtime.sagemaker.us-west-2.amazonaws.com",
+            "region": "us-west-2",
+            "scenario_requests": [
+                {
+                    "path": "resources/samples/model-simulator/sample.input.json",
+                    "weight": 100,
+                }
+            ],
+            "peak_tps": 100,
+            "latency_success_p99": 400,
+            "percent_fail": 0.1,
+            "type_walk": ["ml.m5.large"],
+            "count_walk": [1],
+            "tps_walk": [50, 100],
+            "duration_minutes": 1,
+            "endurance_steady_state_minutes": 0,
+            "local_config": "resources/configs/local/model-simulator.json",
+        },
+        "models": models,
+    }
+    path = os.path.join(tmp_path, "manifest.yml")
+    with open(path, "w") as f:
+        yaml.safe_dump(manifest, f)
+    return path
+
+
+def test_manifest_argv() -> None:
+    argv = manifest_argv(
+        {
+            "model_name": "m1",
+            "type_walk": ["ml.m5.large", "ml.m5.xlarge"],
+            "scenario_requests": [{"path": "a.json", "weight": 100}],
+            "archive_results": True,
+            "traffic_trace": None,
+            "requirements": {"latency_success_p95": {"lt": 300}},
+        }
+    )
+    assert argv == [
+        "--model_name=m1",
+        "--type_walk=ml.m5.large,ml.m5.xlarge",
+        '--scenario_requests=[{"path": "a.json", "weight": 100}]',
+        "--archive_results",
+        '--requirements={"latency_success_p95": {"lt": 300}}',
+    ]
+
+
+def test_load_manifest_errors(tmp_path: pathlib.Path) -> None:
+    path = write_manifest(
+        tmp_path,
+        [
+            {"model_name": "m1", "endpoint_name": "ep-1"},
+            {"model_name": "m2", "endpoint_name": "ep-1"},
+        ],
+    )
+    with pytest.raises(RuntimeError, match="duplicate endpoint_name"):
+        load_manifest(path)
+    path = write_manifest(tmp_path, [{"model_name": "m1"}])
+    with pytest.raises(RuntimeError, match="missing endpoint_name"):
+        load_manifest(path)
+
+
+def test_batch(tmp_path: pathlib.Path) -> None:
+    path = write_manifest(
+        tmp_path,
+        [
+            {
+                "model_name": "m1",
+                "endpoint_name": "ep-1",
+                "endpoint_config_name": "ep-1-0",
+            },
+            {
+                "model_name": "m2",
+                "endpoint_name": "ep-2",
+                "endpoint_config_name": "ep-2-0",
+                "tps_walk": [50, 100, 200, 300],
+            },
+        ],
+    )
+    results_dir = os.path.join(tmp_path, "results")
+    jobs = main(
+        [
+            f"--manifest={path}",
+            "--max_concurrent_jobs=2",
+            "--max_instances=1",
+            f"--batch_results_dir={results_dir}",
+        ]
+    )
+    # Longest estimate first.
+    assert [job.model_name for job in jobs] == ["m2", "m1"]
+    for job in jobs:
+        assert job.error is None
+        assert job.recommend_type
+        assert os.path.isfile(job.report_file())
+    with open(os.path.join(results_dir, "index.html")) as f:
+        index = f.read()
+    assert "2 of 2 sizing jobs finished" in index
+    assert "m1" in index and "m2" in index
+    assert "Final_Job_Report.html" in index
+
+
+@pytest.mark.parametrize("value", ["0", "-1", "two"])
+def test_max_concurrent_jobs_errors(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str], value: str
+) -> None:
+    path = write_manifest(tmp_path, [{"model_name": "m1", "endpoint_name": "ep-1"}])
+    with pytest.raises(SystemExit):
+        main([f"--manifest={path}", f"--max_concurrent_jobs={value}"])
+    assert (
+        "--max_concurrent_jobs: expected a positive integer" in capsys.readouterr().err
+    )
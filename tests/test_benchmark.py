@@ -0,0 +1,61 @@
+import json
+import os
+import pathlib
+from perfsizesagemaker.benchmark import main, run_strategy
+import pytest
+from typing import List
+
+
+def job_args(tmp_path: pathlib.Path) -> List[str]:
+    return [
+        "--host=runtime.sagemaker.us-west-2.amazonaws.com",
+        "--region=us-west-2",
+        "--endpoint_name=ep-1",
+        "--endpoint_config_name=ep-1-0",
+        "--model_name=model-simulator",
+        '--scenario_requests=[{"path":"resources/samples/model-simulator/sample.input.json","weight":100}]',
+        "--peak_tps=1000",
+        "--latency_success_p99=400",
+        "--percent_fail=0.1",
+        "--type_walk=ml.m5.large",
+        "--count_walk=1",
+        "--tps_walk=100,200,300",
+        "--duration_minutes=3",
+        "--endurance_ramp_start_tps=100",
+        "--endurance_ramp_minutes=10",
+        "--endurance_steady_state_minutes=30",
+        "--endurance_retries=2",
+        f"--perfsize_results_dir={tmp_path}",
+        "--cost_file=resources/configs/cost/us-west-2.json",
+        "--logging_config=resources/configs/logging/logging.yml",
+        "--local_config=resources/configs/local/model-simulator.json",
+    ]
+
+
+def test_strategies(tmp_path: pathlib.Path) -> None:
+    output = os.path.join(tmp_path, "benchmark.json")
+    results = main(
+        ["--strategies=default,walk_down", f"--benchmark_output={output}"]
+        + job_args(tmp_path)
+    )
+    default, walk_down = results
+    # Both find the same answer, at different cost.
+    assert default.recommendation == walk_down.recommendation
+    assert default.recommendation["instance_type"] == "ml.m5.large"
+    assert int(default.recommendation["min_instance_count"]) > 1
+    for result in results:
+        assert result.steps > 0
+        assert result.simulated_seconds > 3600
+        assert result.simulated_spend > 0
+        assert result.real_seconds < result.simulated_seconds
+    with open(output) as f:
+        assert [row["strategy"] for row in json.load(f)] == ["default", "walk_down"]
+
+
+def test_errors(tmp_path: pathlib.Path) -> None:
+    args = [arg for arg in job_args(tmp_path) if not arg.startswith("--local_config")]
+    with pytest.raises(RuntimeError, match="Unknown strategy"):
+        run_strategy("bogus", args)
+    with pytest.raises(SystemExit):
+        # Without the emulator, Main needs a Gatling jar to exist.
+        run_strategy("default", args + ["--jar_file=missing.jar"])
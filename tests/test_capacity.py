@@ -0,0 +1,128 @@
+from decimal import Decimal
+import json
+import os
+import pathlib
+from perfsize.perfsize import Config
+from perfsizesagemaker.capacity import CapacityModel, PayloadSample, main
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.environment.local import (
+    LocalSageMaker,
+    LocalSageMakerEnvironmentManager,
+)
+from perfsizesagemaker.load.local import LocalLoadManager
+from perfsizesagemaker.load.payload import PayloadBundle
+from perfsizesagemaker.result.local import LocalResultManager
+import pytest
+from typing import Dict
+
+
+def bundle(tmp_path: pathlib.Path, weights: Dict[int, int]) -> PayloadBundle:
+    # One payload of each size in KiB, named by size.
+    items = []
+    for kb, weight in weights.items():
+        path = os.path.join(tmp_path, f"{kb}kb.json")
+        with open(path, "w") as f:
+            f.write('"' + "x" * (kb * 1024 - 2) + '"')
+        items.append({"path": path, "weight": weight})
+    return PayloadBundle(json.dumps(items))
+
+
+def model() -> CapacityModel:
+    return CapacityModel(
+        instance_type="ml.m5.large",
+        tps_per_instance=Decimal(100),
+        samples=[
+            PayloadSample("1kb", 1024, 50, 500, Decimal(20)),
+            PayloadSample("3kb", 3072, 50, 500, Decimal(40)),
+        ],
+    )
+
+
+class TestCapacityModel:
+    def test_fit(self) -> None:
+        fitted = model()
+        assert fitted.ms_per_byte == Decimal(20) / 2048
+        assert fitted.service_time_ms("2kb", 2048) == Decimal(30)
+        assert fitted.service_time_ms("1kb", 1024) == Decimal(20)
+        assert fitted.measured_service_time_ms() == Decimal(30)
+
+    def test_predict(self, tmp_path: pathlib.Path) -> None:
+        # All large payloads take 40 ms instead of 30 ms on average.
+        prediction = model().predict(bundle(tmp_path, {3: 100}).payloads, Decimal(300))
+        assert prediction["max_tps_per_instance"] == "75.00"
+        assert prediction["max_instance_count"] == "4"
+        assert prediction["invocations_target"] == "2250"
+
+    def test_single_size(self) -> None:
+        single = CapacityModel(
+            "ml.m5.large", Decimal(100), [PayloadSample("a", 10, 100, 5, Decimal(7))]
+        )
+        assert single.ms_per_byte == 0
+        assert single.service_time_ms("b", 1000) == Decimal(7)
+
+    def test_save_and_main(self, tmp_path: pathlib.Path) -> None:
+        path = os.path.join(tmp_path, "capacity_model.json")
+        model().save(path)
+        assert CapacityModel.load(path).to_dict() == model().to_dict()
+        payloads = bundle(tmp_path, {1: 100})
+        scenario = json.dumps(
+            [{"path": payload.path, "weight": 100} for payload in payloads.payloads]
+        )
+        prediction = main(
+            [
+                f"--capacity_model={path}",
+                f"--scenario_requests={scenario}",
+                "--peak_tps=300",
+            ]
+        )
+        assert prediction["max_instance_count"] == "2"
+        with pytest.raises(SystemExit):
+            main([f"--capacity_model={path}x", f"--scenario_requests={scenario}"])
+
+
+def test_from_local_run(tmp_path: pathlib.Path) -> None:
+    local = LocalSageMaker(
+        {
+            "seed": 1,
+            "instance_types": {
+                "ml.m5.large": {
+                    "capacity_tps": 100,
+                    "latency_median_ms": 20,
+                    "latency_sigma": 0.1,
+                    "concurrency": 4,
+                    "latency_ms_per_kb": 5,
+                }
+            },
+        }
+    )
+    config = Config(
+        parameters={
+            Parameter.endpoint_name: "ep-1",
+            Parameter.endpoint_config_name: "ep-1-0",
+            Parameter.variant_name: "variant-name-1",
+            Parameter.model_name: "model-simulator",
+            Parameter.instance_type: "ml.m5.large",
+            Parameter.initial_instance_count: "1",
+            Parameter.ramp_start_tps: "0",
+            Parameter.ramp_minutes: "0",
+            Parameter.steady_state_tps: "20",
+            Parameter.steady_state_minutes: "1",
+        },
+        requirements={},
+    )
+    payloads = bundle(tmp_path, {1: 50, 4: 50})
+    LocalSageMakerEnvironmentManager(local).setup(config)
+    load_manager = LocalLoadManager(
+        local, str(tmp_path), write_logs=False, payloads=payloads.payloads
+    )
+    run = load_manager.send(config)
+    LocalResultManager(load_manager).query(config, run)
+    fitted = CapacityModel.from_run("ml.m5.large", Decimal(20), run, payloads)
+    assert fitted is not None
+    assert [sample.name for sample in fitted.samples] == ["1kb", "4kb"]
+    # Simulator adds 5 ms per KiB, so about 5 / 1024 ms per byte.
+    assert fitted.ms_per_byte * 1024 == pytest.approx(Decimal(5), rel=Decimal("0.1"))
+    # Request names that do not identify payloads give no model.
+    (tmp_path / "other").mkdir()
+    other = bundle(tmp_path / "other", {2: 100})
+    assert CapacityModel.from_run("ml.m5.large", Decimal(20), run, other) is None
@@ -0,0 +1,47 @@
+from datetime import datetime
+from perfsizesagemaker.clock import Clock, VirtualClock
+import pytest
+import threading
+from typing import List
+
+
+def test_clock() -> None:
+    clock = Clock()
+    before = clock.time_ms()
+    assert clock.now() <= datetime.utcnow()
+    assert clock.time_ms() >= before
+
+
+def test_virtual_clock() -> None:
+    clock = VirtualClock(1628676529000)
+    assert clock.now() == datetime(2021, 8, 11, 10, 8, 49)
+    clock.sleep(30)
+    clock.advance(500)
+    assert clock.time_ms() == 1628676559500
+    assert clock.elapsed_ms() == 30500
+    with pytest.raises(RuntimeError, match="cannot go back"):
+        clock.advance(-1)
+
+
+def test_virtual_clock_timers() -> None:
+    clock = VirtualClock(0)
+    ticks: List[int] = []
+    timer = clock.every(10, lambda: ticks.append(clock.time_ms()))
+    clock.advance(25000)
+    assert ticks == [10000, 20000]
+    assert clock.time_ms() == 25000
+    clock.sleep(5)
+    assert ticks == [10000, 20000, 30000]
+    timer.stop()
+    clock.advance(60000)
+    assert len(ticks) == 3
+    assert not clock.timers
+
+
+def test_clock_timer() -> None:
+    clock = Clock()
+    ticked = threading.Event()
+    timer = clock.every(0.01, ticked.set)
+    assert ticked.wait(5)
+    timer.stop()
+    assert timer.thread and not timer.thread.is_alive()
@@ -1,4 +1,6 @@
-from perfsizesagemaker.cost import CostEstimator
+from decimal import Decimal
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.cost import CostEstimator, SpendTracker
 import pytest
 
 
@@ -79,3 +81,26 @@ class TestCostEstimator:
         explanation = cost.explain("ml.m5.invalid", 1)
         print(explanation)
         assert explanation == "ERROR: Cost lookup did not find type ml.m5.invalid"
+
+
+class TestSpendTracker:
+    def test_total(self) -> None:
+        clock = VirtualClock(0)
+        tracker = SpendTracker({"ml.m5.large": 0.1, "ml.m5.xlarge": 0.2}, clock)
+        tracker.update("ep-1", "ml.m5.large", 2)
+        clock.advance(1800000)
+        assert tracker.total() == Decimal("0.1")
+        tracker.update("ep-1", "ml.m5.xlarge", 1)
+        tracker.update("ep-2", "ml.m5.large", 1)
+        clock.advance(3600000)
+        assert tracker.total() == Decimal("0.4")
+        tracker.update("ep-1", "ml.m5.xlarge", 0)
+        tracker.update("ep-2", "ml.m5.large", 0)
+        clock.advance(3600000)
+        assert tracker.total() == Decimal("0.4")
+
+    def test_estimate(self) -> None:
+        tracker = SpendTracker({"ml.m5.large": 0.1}, VirtualClock(0))
+        assert tracker.estimate("ml.m5.large", 3, Decimal("30")) == Decimal("0.15")
+        with pytest.raises(RuntimeError, match="did not find type"):
+            tracker.update("ep-1", "ml.m5.invalid", 1)
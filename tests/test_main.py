@@ -1,3 +1,225 @@
+from decimal import Decimal
+import json
+import logging
+import pathlib
+from perfsizesagemaker.capacity import CapacityModel
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.main import Main
+from perfsizesagemaker.reporter.html import HTMLReporter
+from perfsizesagemaker.tracing import read_spans
+import pytest
+from typing import Any, Dict, List
+
+
 def test_placeholder() -> None:
     # TODO: add some tests with Mocking for the environment and load parts
     assert True
+
+
+def local_args(tmp_path: pathlib.Path) -> List[str]:
+    return [
+        "--host=runtime.sagemaker.us-west-2.amazonaws.com",
+        "--region=us-west-2",
+        "--endpoint_name=ep-1",
+        "--endpoint_config_name=ep-1-0",
+        "--model_name=model-simulator",
+        '--scenario_requests=[{"path":"resources/samples/model-simulator/sample.input.json","weight":100}]',
+        "--peak_tps=500",
+        "--latency_success_p99=400",
+        "--percent_fail=0.1",
+        "--type_walk=ml.t2.medium,ml.t2.large,ml.m5.large",
+        "--count_walk=1",
+        "--tps_walk=100,200,300",
+        "--duration_minutes=3",
+        f"--perfsize_results_dir={tmp_path}",
+        "--cost_file=resources/configs/cost/us-west-2.json",
+        "--logging_config=resources/configs/logging/logging.yml",
+        "--local_config=resources/configs/local/model-simulator.json",
+    ]
+
+
+def test_compare_types(tmp_path: pathlib.Path) -> None:
+    one_by_one = Main(local_args(tmp_path / "one_by_one"))
+    assert one_by_one.local_account
+    expected = one_by_one.test_type()
+    assert expected and expected[Parameter.instance_type] == "ml.m5.large"
+
+    side_by_side = Main(local_args(tmp_path / "side_by_side") + ["--compare_types"])
+    assert side_by_side.local_account
+    assert side_by_side.test_type() == expected
+    assert side_by_side.type_plan and one_by_one.type_plan
+    steps = [
+        config.parameters[Parameter.instance_type]
+        for config in side_by_side.type_plan.history
+    ]
+    assert steps == [
+        config.parameters[Parameter.instance_type]
+        for config in one_by_one.type_plan.history
+    ]
+    # Types at the same TPS share one load run and one endpoint creation.
+    assert (
+        side_by_side.local_account.clock.elapsed_ms()
+        < one_by_one.local_account.clock.elapsed_ms() / 2
+    )
+
+
+def test_optimize_scaling_target(tmp_path: pathlib.Path) -> None:
+    main = Main(
+        local_args(tmp_path)
+        + [
+            "--endurance_ramp_minutes=10",
+            "--endurance_steady_state_minutes=1",
+            "--optimize_scaling_target",
+        ]
+    )
+    main.write_logs = False
+    main.run()
+    assert main.recommend_max and main.recommend_min and main.recommend_target
+    assert main.target_plan and main.target_plan.history
+    # Safety factor target is the lowest candidate, and a higher one passed.
+    targets = main.target_plan.parameter_lists[Parameter.scaling_target]
+    assert targets[0] == "5000"
+    assert int(main.recommend_target["invocations_target"]) > 5000
+    assert (
+        main.recommend_max["invocations_target"]
+        == main.recommend_target["invocations_target"]
+    )
+    assert (
+        main.recommend_min["min_instance_count"]
+        == main.recommend_target["min_instance_count"]
+    )
+    content = HTMLReporter(
+        inputs={"model_name": "model-simulator"},
+        min_count_plan=main.min_count_plan,
+        target_plan=main.target_plan,
+        recommend_target=main.recommend_target,
+        timelines=main.timelines,
+    ).render()
+    assert "5. Optimize Scaling Target" in content
+    assert f"ml.m5.large: min 2, max 3, target {targets[-1]}" in content
+
+
+def test_capacity_model(tmp_path: pathlib.Path) -> None:
+    sample = "resources/samples/model-simulator/sample.input.json"
+    scenario = (
+        f'[{{"path":"{sample}","weight":60,"name":"a"}},'
+        f'{{"path":"{sample}","weight":40,"name":"b"}}]'
+    )
+    main = Main(
+        [arg for arg in local_args(tmp_path) if "--scenario_requests" not in arg]
+        + [f"--scenario_requests={scenario}", "--endurance_steady_state_minutes=1"]
+    )
+    main.write_logs = False
+    main.run()
+    assert main.recommend_max
+    model = CapacityModel.load(main.recommend_max["capacity_model"])
+    assert [sample.name for sample in model.samples] == ["a", "b"]
+    assert model.tps_per_instance == Decimal(main.recommend_max["max_tps_per_instance"])
+
+
+def test_async_teardown(tmp_path: pathlib.Path) -> None:
+    args = ["--endurance_steady_state_minutes=1"]
+    waiting = Main(local_args(tmp_path / "waiting") + args)
+    waiting.write_logs = False
+    waiting.main()
+    retiring = Main(local_args(tmp_path / "retiring") + args + ["--async_teardown"])
+    retiring.write_logs = False
+    retiring.main()
+    assert retiring.recommend_max == waiting.recommend_max
+    assert retiring.local_account and waiting.local_account
+    assert (
+        retiring.local_account.clock.elapsed_ms()
+        < waiting.local_account.clock.elapsed_ms()
+    )
+    # Every retired endpoint was deleted before main returned.
+    assert retiring.cleanup and retiring.cleanup.entries
+    assert {entry.status for entry in retiring.cleanup.entries} == {"Deleted"}
+    assert retiring.local_account.endpoints == {}
+    assert retiring.local_account.endpoint_configs == {}
+    # Fresh names stay out of the plans, so reports show the job's own names.
+    assert retiring.cleanup.renamed
+    assert retiring.type_plan and retiring.max_count_plan
+    for plan in [retiring.type_plan, retiring.max_count_plan]:
+        assert {
+            config.parameters[Parameter.endpoint_name] for config in plan.history
+        } == {retiring.endpoint_name}
+
+
+def test_report_after_every_run(tmp_path: pathlib.Path) -> None:
+    main = Main(local_args(tmp_path) + ["--endurance_steady_state_minutes=1"])
+    main.write_logs = False
+    main.main()
+    assert main.report and main.type_plan and main.max_count_plan
+    runs = len(main.type_plan.history) + len(main.max_count_plan.history)
+    # Start, each run, end of each phase, and the final recommendations.
+    assert main.report.writes == 1 + runs + 2 + 1
+    with open(main.report.path) as file:
+        content = file.read()
+    assert "Success! Based on the provided inputs" in content
+    assert "Time Breakdown" in content
+    spans = read_spans(f"{main.job_id_dir}/spans.jsonl")
+    assert spans[-1]["name"] == "job"
+    assert {span["name"] for span in spans} >= {
+        "test_type",
+        "test_max",
+        "step",
+        "setup",
+        "create endpoint",
+        "wait endpoint in service",
+        "load send",
+    }
+
+
+def test_logging_config(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "handlers", [])
+    # Applied for every job, not only ones publishing metrics.
+    Main(local_args(tmp_path))
+    assert [type(handler) for handler in root.handlers] == [logging.StreamHandler]
+    assert logging.getLogger("perfsizesagemaker.main").level == logging.DEBUG
+
+
+def test_validate_only(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    main = Main(local_args(tmp_path / "results") + ["--validate_only"])
+    main.main()
+    assert not (tmp_path / "results").exists()
+    assert main.report is None
+    assert f"Arguments are valid for job {main.job_id_dir}" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        Main(local_args(tmp_path / "results") + ["--validate_only", "--peak_tps=x"])
+
+
+def test_job_spec(tmp_path: pathlib.Path) -> None:
+    spec: Dict[str, Any] = {
+        arg[2:].split("=")[0]: arg.split("=", 1)[1]
+        for arg in local_args(tmp_path)
+        if arg.split("=")[0] not in ["--latency_success_p99", "--percent_fail"]
+    }
+    spec["type_walk"] = ["ml.m5.large"]
+    spec["tps_walk"] = [100, 200]
+    spec["requirements"] = {
+        "latency_success_p95": {"lt": 300},
+        "percent_fail": {"lt": 0.1},
+    }
+    spec["phases"] = ["type", "max"]
+    spec["endurance_ramp_minutes"] = 1
+    spec["endurance_steady_state_minutes"] = 1
+    path = tmp_path / "job.json"
+    path.write_text(json.dumps(spec))
+    # Command line arguments override the spec.
+    main = Main([f"--job_spec={path}", "--peak_tps=300"])
+    assert main.peak_tps == Decimal("300")
+    assert main.tps_walk == [Decimal("100"), Decimal("200")]
+    main.write_logs = False
+    main.run()
+    assert main.type_plan and main.recommend_max
+    assert list(main.type_plan.requirements) == ["latency_success_p95", "percent_fail"]
+    results = main.type_plan.history[0].runs[-1].results
+    p95 = [result for result in results if result.metric == "latency_success_p95"]
+    assert [c.description for c in p95[0].conditions] == ["latency_success_p95 < 300"]
+    # Ramp was set, but the min phase was not asked for.
+    assert main.min_count_plan is None
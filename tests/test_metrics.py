@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import os
+import pathlib
+from perfsize.perfsize import Config, Result, Run
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.cost import SpendTracker
+from perfsizesagemaker.metrics import CONTENT_TYPE, JobMetrics, MetricsServer
+from perfsizesagemaker.result.metrics import MetricsResultManager
+from perfsizesagemaker.tracing import Tracer
+import pytest
+import threading
+import urllib.error
+import urllib.request
+from typing import Dict
+
+START = 1600000000000
+
+
+def samples(text: str) -> Dict[str, str]:
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#")
+    )
+
+
+def test_job_metrics(tmp_path: pathlib.Path) -> None:
+    clock = VirtualClock(START)
+    spend = SpendTracker({"ml.m5.large": "0.115"}, clock)
+    textfile = f"{tmp_path}/job.prom"
+    metrics = JobMetrics("job-1", 'model "a"', spend, textfile=textfile)
+    tracer = Tracer(clock)
+    tracer.listeners.append(metrics)
+    job = 'job="job-1"'
+    endpoint = f'{job},endpoint="ep-1"'
+
+    with tracer.span("job"):
+        with tracer.span("test_type"):
+            step = tracer.start(
+                "step",
+                untested_configs=5,
+                **{Parameter.instance_type: "ml.m5.large"},
+            )
+            with tracer.span("get status", endpoint_name="ep-1") as status:
+                status.attributes["endpoint_status"] = "NotFound"
+            with tracer.span("create endpoint", endpoint_name="ep-1"):
+                clock.advance(60000)
+                with tracer.span("wait endpoint in service", endpoint_name="ep-1"):
+                    clock.advance(240000)
+                    spend.update("ep-1", "ml.m5.large", 1)
+                    clock.advance(3600000)
+                    # A stalled wait is listed with its start time.
+                    with open(textfile) as f:
+                        stalled = f.read()
+            start = clock.now()
+            clock.advance(60000)
+            MetricsResultManager(metrics).query(
+                Config({}, {}),
+                Run(
+                    "run-1",
+                    start,
+                    start + timedelta(seconds=60),
+                    [
+                        Result("count_total", Decimal(6000), []),
+                        Result("latency_success_p99", Decimal("120.5"), []),
+                        Result("percent_fail", Decimal(0), []),
+                    ],
+                ),
+            )
+            tracer.end(step)
+            running = metrics.render()
+
+    values = samples(stalled)
+    assert values[f'perfsize_job_info{{{job},model="model \\"a\\""}}'] == "1"
+    assert values[f"perfsize_job_running{{{job}}}"] == "1"
+    assert values[f'perfsize_job_phase{{{job},perfsize_job_phase="test_type"}}'] == "1"
+    assert values[f'perfsize_job_phase{{{job},perfsize_job_phase="test_max"}}'] == "0"
+    assert values[f'perfsize_job_step_info{{{job},instance_type="ml.m5.large"}}'] == "1"
+    assert values[f"perfsize_job_steps_remaining{{{job}}}"] == "5"
+    assert (
+        values[
+            f'perfsize_job_operation_started_seconds{{{job},operation="wait endpoint in service"}}'
+        ]
+        == "1600000060"
+    )
+    assert (
+        values[
+            f'perfsize_endpoint_status{{{endpoint},perfsize_endpoint_status="Creating"}}'
+        ]
+        == "1"
+    )
+    assert stalled.endswith("# EOF\n")
+
+    values = samples(running)
+    assert values[f"perfsize_job_steps_completed_total{{{job}}}"] == "1"
+    assert values[f"perfsize_runs_completed_total{{{job}}}"] == "1"
+    assert values[f"perfsize_run_tps{{{job}}}"] == "100.000"
+    assert values[f"perfsize_run_latency_success_p99_milliseconds{{{job}}}"] == "120.5"
+    assert values[f"perfsize_test_spend_usd{{{job}}}"] == "0.1169"
+    assert not any("perfsize_job_step_info" in sample for sample in values)
+    assert not any("operation_started" in sample for sample in values)
+    transitions = {
+        sample.split(",", 2)[2]: count
+        for sample, count in values.items()
+        if sample.startswith("perfsize_endpoint_status_transitions_total")
+    }
+    assert transitions == {
+        'from="NotFound",to="Creating"}': "1",
+        'from="Creating",to="InService"}': "1",
+    }
+
+    with open(textfile) as f:
+        values = samples(f.read())
+    assert values[f"perfsize_job_running{{{job}}}"] == "0"
+    assert values[f'perfsize_job_phase{{{job},perfsize_job_phase="test_type"}}'] == "0"
+
+
+def test_textfile_from_threads(tmp_path: pathlib.Path) -> None:
+    clock = VirtualClock(START)
+    textfile = f"{tmp_path}/job.prom"
+    metrics = JobMetrics("job-1", "model", SpendTracker({}, clock), textfile=textfile)
+    threads = [threading.Thread(target=metrics.changed) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(textfile) as f:
+        assert f.read() == metrics.render()
+    assert os.listdir(tmp_path) == ["job.prom"]
+
+    # A textfile that cannot be written is logged, not raised to the job.
+    metrics.textfile = f"{tmp_path}/missing/job.prom"
+    metrics.record_run(
+        Run(
+            id="run-1",
+            start=datetime(2021, 8, 11),
+            end=datetime(2021, 8, 11, 0, 1),
+            results=[],
+        )
+    )
+    assert metrics.runs_completed == 1
+
+
+def test_metrics_server() -> None:
+    clock = VirtualClock(START)
+    metrics = JobMetrics("job-1", "model", SpendTracker({}, clock))
+    server = MetricsServer(metrics, 0, host="127.0.0.1")
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert response.read().decode("utf-8") == metrics.render()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        server.stop()
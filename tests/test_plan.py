@@ -0,0 +1,99 @@
+from decimal import Decimal
+from perfsize.perfsize import Condition, Plan, Workflow, gte, lt
+from perfsize.environment.mock import MockEnvironmentManager
+from perfsize.load.mock import MockLoadManager
+from perfsize.reporter.mock import MockReporter
+from perfsize.result.mock import MockResultManager
+import itertools
+import json
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.plan import Combinations, LazyPlan
+from perfsizesagemaker.step.sagemaker import FirstSuccessStepManager
+import pytest
+from typing import Dict, List
+
+REQUIREMENTS = {
+    "latency_success_p99": [
+        Condition(lt(Decimal("200")), "value < 200"),
+        Condition(gte(Decimal("0")), "value >= 0"),
+    ],
+    "percent_fail": [
+        Condition(lt(Decimal("0.01")), "value < 0.01"),
+        Condition(gte(Decimal("0")), "value >= 0"),
+    ],
+}
+
+
+def parameter_lists(tps_steps: int) -> Dict[str, List[str]]:
+    return {
+        Parameter.host: ["runtime.sagemaker.us-west-2.amazonaws.com"],
+        Parameter.region: ["us-west-2"],
+        Parameter.endpoint_name: ["ep-1"],
+        Parameter.endpoint_config_name: ["ep-1-0"],
+        Parameter.variant_name: ["variant-name-1"],
+        Parameter.model_name: ["model-simulator"],
+        Parameter.instance_type: ["ml.m5.large", "ml.m5.xlarge", "ml.m5.2xlarge"],
+        Parameter.initial_instance_count: ["1", "2"],
+        Parameter.ramp_start_tps: ["0"],
+        Parameter.ramp_minutes: ["0"],
+        Parameter.steady_state_tps: [f"{tps}" for tps in range(1, tps_steps + 1)],
+        Parameter.steady_state_minutes: ["3"],
+    }
+
+
+def test_combinations() -> None:
+    lists = parameter_lists(5)
+    combinations = Combinations(lists)
+    expected = list(itertools.product(*lists.values()))
+    assert len(combinations) == 30
+    assert list(combinations) == expected
+    assert [combinations[i] for i in range(30)] == expected
+    assert combinations[-1] == expected[-1]
+    assert combinations[2:7] == expected[2:7]
+    assert list(reversed(combinations)) == list(reversed(expected))
+    assert expected[4] in combinations
+    assert expected[4][:-1] not in combinations
+    with pytest.raises(IndexError):
+        combinations[30]
+    assert combinations.index(expected[4]) == 4
+    assert combinations.count(expected[4]) == 1
+    assert combinations == Combinations(parameter_lists(5))
+    assert combinations != Combinations(parameter_lists(6))
+    assert combinations != expected
+    with pytest.raises(TypeError):
+        json.dumps(combinations)
+
+
+def test_configs_on_demand() -> None:
+    plan = LazyPlan(parameter_lists(1000000), requirements={})
+    assert len(plan.combinations) == 6000000
+    assert len(plan.configs) == 0
+    combination = plan.combinations[3999999]
+    assert combination[6:8] == ("ml.m5.xlarge", "2")
+    config = plan.configs[combination]
+    assert config.parameters == dict(zip(plan.parameter_lists.keys(), combination))
+    assert config.parameters[Parameter.steady_state_tps] == "1000000"
+    assert plan.configs[combination] is config
+    assert list(plan.configs) == [combination]
+    with pytest.raises(KeyError):
+        plan.configs[combination[:7] + ("3",) + combination[8:]]
+
+
+def test_same_as_plan() -> None:
+    results = []
+    for plan in [
+        Plan(parameter_lists(20), REQUIREMENTS),
+        LazyPlan(parameter_lists(20), REQUIREMENTS),
+    ]:
+        recommendation = Workflow(
+            plan=plan,
+            step_manager=FirstSuccessStepManager(plan),
+            environment_manager=MockEnvironmentManager(),
+            load_manager=MockLoadManager(),
+            result_managers=[MockResultManager()],
+            reporters=[MockReporter()],
+        ).run()
+        results.append((recommendation, [config.parameters for config in plan.history]))
+    assert results[0] == results[1]
+    # Only the first type and count were tested, so only those configs exist.
+    assert len(plan.configs) == 20
@@ -0,0 +1,27 @@
+import pathlib
+from perfsizesagemaker.environment.ledger import ENDPOINT, ResourceLedger
+from perfsizesagemaker.reaper import main
+import pytest
+import sqlite3
+import subprocess
+import sys
+
+
+def test_dry_run(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit):
+        main(["--perfsize_results_dir", f"{tmp_path}", "--dry_run"])
+    assert "no ledger found" in capsys.readouterr().err
+
+    ledger = ResourceLedger(f"{tmp_path}/resources.db", owner="job-1")
+    ledger.created(ENDPOINT, "ep-1", "us-west-2", None)
+    ledger.created(ENDPOINT, "ep-2", "us-west-2", None)
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    with sqlite3.connect(f"{tmp_path}/resources.db") as db:
+        db.execute("UPDATE resources SET pid = ? WHERE name = 'ep-1'", (exited.pid,))
+
+    orphans = main(["--perfsize_results_dir", f"{tmp_path}", "--dry_run"])
+    assert [resource.name for resource in orphans] == ["ep-1"]
+    assert capsys.readouterr().out.startswith("endpoint ep-1 in us-west-2 from job-1")
+    # Dry run leaves the ledger as it was.
+    assert len(ledger.open_resources()) == 2
@@ -0,0 +1,149 @@
+from decimal import Decimal
+import os
+import pathlib
+from perfsize.result.gatling import Metric
+from perfsizesagemaker.spec import METRICS, PHASES, JobSpec, load_job_spec
+import pytest
+from typing import Any, Dict
+import yaml
+
+SPEC: Dict[str, Any] = {
+    "host": "runtime.sagemaker.us-west-2.amazonaws.com",
+    "region": "us-west-2",
+    "endpoint_name": "ep-1",
+    "endpoint_config_name": "ep-1-0",
+    "model_name": "model-simulator",
+    "scenario_requests": [{"path": "sample.input.json", "weight": 100}],
+    "peak_tps": 500,
+    "percent_fail": 0.1,
+    "requirements": {
+        "latency_success_p95": {"lt": 300, "gte": 0},
+        "latency_success_p99[predict]": {"lte": 450.5},
+    },
+    "type_walk": ["ml.m5.large", "ml.m5.xlarge"],
+    "count_walk": [1, 2],
+    "tps_walk": "100,200.5",
+    "endurance_ramp_minutes": 2.5,
+    "archive_results": True,
+}
+
+
+def test_metrics() -> None:
+    gatling = [name for name in vars(Metric) if not name.startswith("_")]
+    assert [name for name in gatling if not name.startswith("simulation_")] == [
+        name for name in METRICS if name in gatling
+    ]
+
+
+def test_load_job_spec(tmp_path: pathlib.Path) -> None:
+    path = os.path.join(tmp_path, "job.yml")
+    with open(path, "w") as f:
+        yaml.safe_dump(SPEC, f, sort_keys=False)
+    spec = JobSpec({"peak_tps": "600", "archive_results": None}, load_job_spec(path))
+    assert spec.errors == []
+    values = spec.values
+    # Typed once, with yaml floats read as the Decimal they were written as.
+    assert values["peak_tps"] == Decimal("600")
+    assert values["endurance_ramp_minutes"] == Decimal("2.5")
+    assert values["tps_walk"] == [Decimal("100"), Decimal("200.5")]
+    assert values["count_walk"] == [1, 2]
+    assert values["type_walk"] == ["ml.m5.large", "ml.m5.xlarge"]
+    assert values["scenario_requests"] == (
+        '[{"path": "sample.input.json", "weight": 100}]'
+    )
+    assert values["archive_results"] is True
+    assert values["duration_minutes"] == Decimal("3")
+    assert values["strategy"] == "default"
+    assert spec.phases == PHASES[:3]
+    assert {
+        metric: [condition.description for condition in conditions]
+        for metric, conditions in spec.requirements.items()
+    } == {
+        "percent_fail": ["percent_fail < 0.1", "percent_fail >= 0"],
+        "latency_success_p95": [
+            "latency_success_p95 < 300",
+            "latency_success_p95 >= 0",
+        ],
+        "latency_success_p99[predict]": ["latency_success_p99[predict] <= 450.5"],
+    }
+    p95 = spec.requirements["latency_success_p95"]
+    assert [c.function(Decimal("299.9")) for c in p95] == [True, True]
+    assert [c.function(Decimal("300")) for c in p95] == [False, True]
+
+    with open(path, "w") as f:
+        f.write("- not a mapping\n")
+    with pytest.raises(RuntimeError, match="not a mapping"):
+        load_job_spec(path)
+
+
+def test_errors() -> None:
+    spec = JobSpec(
+        {"count_walk": "1,x", "phases": "type,min"},
+        {
+            "peak_tps": -1,
+            "tps_walk": [],
+            "requirements": {"latency_success_p99": {"below": 1}},
+            "latency_success_p99": "fast",
+            "endurance_minutes": 30,
+            "metrics_port": 70000,
+            "async_teardown": True,
+            "instance_quotas": "quotas.json",
+        },
+        "job.yml",
+    )
+    assert spec.errors == [
+        "the following arguments are required: --host, --region, "
+        "--endpoint_name, --endpoint_config_name, --model_name, "
+        "--scenario_requests, --type_walk",
+        "job.yml: unknown keys ['endurance_minutes']",
+        "job.yml key peak_tps: expected a number but got: -1",
+        "job.yml key latency_success_p99: expected a number but got: fast",
+        "job.yml key requirements: expected a json mapping of metric to mapping "
+        f"of operator (from ['lt', 'lte', 'gt', 'gte', 'eq', 'neq']) to limit, "
+        f"with metrics from {METRICS} but got: "
+        "{'latency_success_p99': {'below': 1}}",
+        "argument --count_walk: expected a comma separated list of integers but "
+        "got: 1,x",
+        "job.yml key tps_walk: expected a comma separated list of numbers but "
+        "got: []",
+        "job.yml key metrics_port: expected a port number but got: 70000",
+        "argument --phases: expected each phase after the one before it in "
+        f"{PHASES} but got: ['type', 'min']",
+        "one of the following arguments is required: --latency_success_p99, "
+        "--percent_fail or --requirements",
+        "argument --async_teardown: not allowed with --instance_quotas",
+    ]
+
+
+def test_requirements_and_phases() -> None:
+    arguments = {key: value for key, value in SPEC.items()}
+    arguments["latency_success_p99"] = "400"
+    arguments["requirements"] = '{"latency_success_p99": {"lt": 300}}'
+    spec = JobSpec(arguments)
+    assert spec.errors == [
+        "argument --requirements: latency_success_p99 is already set by "
+        "--latency_success_p99"
+    ]
+    arguments["requirements"] = '{"latency_success_p99[a": {"lt": 300}}'
+    assert JobSpec(arguments).errors[0].startswith("argument --requirements")
+    del arguments["latency_success_p99"]
+    arguments["requirements"] = '{"scale_out_lag_seconds": {"lt": 120}}'
+    arguments["optimize_scaling_target"] = True
+    spec = JobSpec(arguments)
+    assert spec.errors == []
+    assert list(spec.requirements) == ["percent_fail", "scale_out_lag_seconds"]
+    assert spec.phases == PHASES
+    arguments["phases"] = "type,max"
+    assert JobSpec(arguments).errors == [
+        "argument --optimize_scaling_target: requires the min phase"
+    ]
+
+
+def test_sample_job_spec() -> None:
+    spec = JobSpec({}, load_job_spec("resources/configs/job/model-simulator.yml"))
+    assert spec.errors == []
+    assert list(spec.requirements) == [
+        "latency_success_p99",
+        "latency_success_p95",
+        "percent_fail",
+    ]
@@ -0,0 +1,45 @@
+from decimal import Decimal
+from perfsizesagemaker.startup import (
+    CLI_MODULES,
+    StartupResult,
+    import_times,
+    main,
+    parse_import_times,
+)
+import pytest
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       299 |        299 |   _io
+import time:       866 |       1760 | encodings
+import time:       100 |        100 |     yaml.error
+import time:       400 |        500 |   yaml
+import time:       250 |        250 |   json
+import time:       300 |       1050 | perfsizesagemaker
+"""
+
+
+def test_parse_import_times() -> None:
+    times = parse_import_times(OUTPUT)
+    assert [(t.module, t.depth) for t in times] == [
+        ("_io", 1),
+        ("encodings", 0),
+        ("yaml.error", 2),
+        ("yaml", 1),
+        ("json", 1),
+        ("perfsizesagemaker", 0),
+    ]
+    result = StartupResult("perfsizesagemaker", times[2:], top=1)
+    assert result.total_ms == Decimal("1.05")
+    assert result.heavy == ["yaml"]
+    assert [t.module for t in result.slowest] == ["yaml"]
+
+
+def test_cli_modules_start_fast() -> None:
+    # Guards against a module level import of boto3, pandas, yaml or yattag
+    # coming back, which adds most of a second to every command.
+    for module in CLI_MODULES:
+        times = import_times(module)
+        assert times[-1].module == module
+        assert StartupResult(module, times).heavy == []
+    with pytest.raises(RuntimeError, match="imports boto3"):
+        main(["--modules=perfsizesagemaker.environment.sagemaker"])
@@ -0,0 +1,158 @@
+import pathlib
+from perfsize.perfsize import (
+    Config,
+    EnvironmentManager,
+    LoadManager,
+    Plan,
+    Run,
+    StepManager,
+    Workflow,
+)
+from perfsize.reporter.mock import MockReporter
+from perfsize.result.mock import MockResultManager
+from perfsizesagemaker.clock import VirtualClock
+from perfsizesagemaker.constants import Parameter
+from perfsizesagemaker.tracing import (
+    JsonLinesSpanExporter,
+    Tracer,
+    read_spans,
+    trace_workflow,
+)
+import pytest
+import threading
+from typing import Optional
+
+
+class MinuteEnvironmentManager(EnvironmentManager):
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+
+    def setup(self, config: Config) -> None:
+        self.clock.advance(60000)
+
+    def teardown(self, config: Config) -> None:
+        self.clock.advance(60000)
+
+
+class MinuteLoadManager(LoadManager):
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+
+    def send(self, config: Config) -> Run:
+        start = self.clock.now()
+        self.clock.advance(60000)
+        return Run(f"run-{self.clock.time_ms()}", start, self.clock.now(), [])
+
+
+class AllStepManager(StepManager):
+    def __init__(self, plan: Plan):
+        super().__init__(plan)
+        self.configs = list(plan.configs.values())
+
+    def next(self) -> Optional[Config]:
+        if not self.configs:
+            return None
+        return self.configs.pop(0)
+
+
+def test_spans(tmp_path: pathlib.Path) -> None:
+    clock = VirtualClock(1000)
+    path = f"{tmp_path}/spans.jsonl"
+    tracer = Tracer(clock, JsonLinesSpanExporter(path))
+    with tracer.span("job", model_name="m") as job:
+        clock.advance(1000)
+        with tracer.span("setup", count=2) as setup:
+            clock.advance(3000)
+        step = tracer.start("step")
+        clock.advance(2000)
+        with pytest.raises(RuntimeError):
+            with tracer.span("load send"):
+                clock.advance(500)
+                raise RuntimeError("ERROR: load failed")
+    # Spans left open end with their parent.
+    assert step.end_ms == job.end_ms == 7500
+    assert setup.parent_span_id == job.span_id
+    assert [t.name for t in tracer.breakdown()] == ["setup", "step", "job", "load send"]
+    totals = {t.name: t for t in tracer.breakdown()}
+    assert totals["job"].total_ms == 6500
+    assert totals["job"].self_ms == 1000
+    assert totals["step"].self_ms == 2000
+    assert totals["load send"].errors == 1
+    assert sum(t.self_ms for t in tracer.breakdown()) == totals["job"].total_ms
+
+    spans = read_spans(path)
+    assert [span["name"] for span in spans] == ["setup", "load send", "step", "job"]
+    assert {span["traceId"] for span in spans} == {tracer.trace_id}
+    assert spans[0]["startTimeUnixNano"] == "2000000000"
+    assert spans[0]["attributes"] == [{"key": "count", "value": {"stringValue": "2"}}]
+    assert spans[1]["status"] == {
+        "code": "STATUS_CODE_ERROR",
+        "message": "RuntimeError: ERROR: load failed",
+    }
+    assert spans[3]["parentSpanId"] == ""
+
+
+def test_trace_workflow() -> None:
+    clock = VirtualClock(0)
+    tracer = Tracer(clock)
+    plan = Plan(
+        parameter_lists={
+            Parameter.instance_type: ["ml.m5.large"],
+            Parameter.steady_state_tps: ["1", "2"],
+        },
+        requirements={},
+    )
+    workflow = trace_workflow(
+        Workflow(
+            plan=plan,
+            step_manager=AllStepManager(plan),
+            environment_manager=MinuteEnvironmentManager(clock),
+            load_manager=MinuteLoadManager(clock),
+            result_managers=[MockResultManager()],
+            reporters=[MockReporter()],
+            teardown_between_steps=True,
+            teardown_at_end=True,
+        ),
+        tracer,
+    )
+    with tracer.span("test_type"):
+        workflow.run()
+    totals = {t.name: t for t in tracer.breakdown()}
+    assert totals["step"].count == 2
+    assert totals["step"].total_ms == 6 * 60000
+    assert totals["step"].self_ms == 0
+    assert totals["setup"].self_ms == totals["teardown"].self_ms == 2 * 60000
+    assert totals["load send"].count == 2
+    assert totals["results MockResultManager"].count == 2
+    assert totals["test_type"].total_ms == 6 * 60000
+
+
+def test_background_spans() -> None:
+    clock = VirtualClock(1000)
+    tracer = Tracer(clock)
+    spans = {}
+
+    def poll() -> None:
+        with tracer.span("poll") as span:
+            with tracer.span("get status") as child:
+                clock.advance(1000)
+        spans["poll"] = span
+        spans["get status"] = child
+
+    with tracer.span("job") as job:
+        clock.advance(5000)
+        thread = threading.Thread(target=poll)
+        thread.start()
+        thread.join()
+    # Parented to the job, but not counted in its time breakdown.
+    assert spans["poll"].parent_span_id == job.span_id
+    assert spans["get status"].parent_span_id == spans["poll"].span_id
+    assert [total.name for total in tracer.breakdown()] == ["job"]
+    assert tracer.breakdown()[0].self_ms == job.duration_ms() == 6000
+
+    # Once the job ended, a span on another thread is a root of its own.
+    thread = threading.Thread(target=poll)
+    thread.start()
+    thread.join()
+    assert spans["poll"].parent_span_id is None
+    assert {total.name for total in tracer.breakdown()} == {"job", "poll", "get status"}